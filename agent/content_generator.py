@@ -1,4 +1,3 @@
-import google.generativeai as genai
 import json
 import hashlib
 import mimetypes
@@ -9,10 +8,6 @@ import uuid
 import os
 import re
 import logging
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -168,14 +163,12 @@ class ContentGenerator:
         
         self.provider = provider
 
+        # Clients come from the shared registry: building a generator no longer
+        # sets up an SDK client (or a new connection) of its own
+        from backend.app.core.llm_clients import get_llm_client
+
         if provider == "google":
-            # Initialize Gemini
-            if api_key:
-                genai.configure(api_key=api_key)
-            else:
-                api_key = os.getenv("GEMINI_API_KEY")
-                if api_key:
-                    genai.configure(api_key=api_key)
+            api_key = api_key or os.getenv("GEMINI_API_KEY")
             
             # Map model IDs to actual Gemini model names
             model_map = {
@@ -185,18 +178,9 @@ class ContentGenerator:
             }
             
             model_name = model_map.get(self.card_model_id, self.card_model_id)
-            if not model_name.startswith("models/"):
-                model_name = f"models/{model_name}"
-            
-            # Only create model if we have an API key or generic setup
-            self.model = genai.GenerativeModel(model_name)
-            self.openai_client = None
+            self.llm_client = get_llm_client("google", api_key, model_name)
             
         elif provider in ["deepseek", "alibaba"]:
-            # Initialize OpenAI-compatible client
-            if OpenAI is None:
-                raise ImportError("openai package is required. pip install openai")
-            
             api_key_env = "DEEPSEEK_API_KEY" if provider == "deepseek" else "DASHSCOPE_API_KEY"
             model_api_key = api_key or os.getenv(api_key_env)
             
@@ -223,11 +207,12 @@ class ContentGenerator:
             if not base_url:
                  if provider == "deepseek": base_url = "https://api.deepseek.com"
 
-            self.openai_client = OpenAI(
-                api_key=model_api_key,
-                base_url=base_url
-            )
-            self.model = None
+            # FIX: Handle case where model_config is None (custom model ID)
+            if self.model_config:
+                model_name = self.model_config.get("model_name", self.card_model_id)
+            else:
+                model_name = self.card_model_id
+            self.llm_client = get_llm_client(provider, model_api_key, model_name, base_url)
         else:
             raise ValueError(f"Unsupported provider: {provider}")
     
@@ -243,25 +228,10 @@ class ContentGenerator:
         """
         if self.provider == "google":
             # Use Gemini
-            response = self.model.generate_content(prompt)
-            return response.text
+            return self.llm_client.complete(prompt)
         elif self.provider in ["deepseek", "alibaba"]:
             # Use OpenAI-compatible API
-            
-            # FIX: Handle case where model_config is None (custom model ID)
-            if self.model_config:
-                model_name = self.model_config.get("model_name", self.card_model_id)
-            else:
-                model_name = self.card_model_id
-
-            response = self.openai_client.chat.completions.create(
-                model=model_name,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
-            return response.choices[0].message.content
+            return self.llm_client.complete(prompt, temperature=0.7)
         else:
             raise ValueError(f"Unsupported provider: {self.provider}")
 
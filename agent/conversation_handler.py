@@ -1,9 +1,8 @@
-import google.generativeai as genai
 import os
 import base64
 import json
 import requests
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional
 from datetime import datetime
 from pathlib import Path
 
@@ -22,13 +21,13 @@ class ConversationHandler:
             with open(model_config_path, 'r') as f:
                 model_config = json.load(f)
         
-        if api_key:
-            genai.configure(api_key=api_key)
-        else:
-            # Try to get from environment
-            api_key = os.getenv("GEMINI_API_KEY")
-            if api_key:
-                genai.configure(api_key=api_key)
+        # Imported on first use: the registry loads the SDK, which is slow to import
+        from backend.app.core.llm_clients import get_llm_client, ensure_genai_configured
+
+        # Try to get from environment
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
+        # Image generation still goes through the SDK's global default client
+        ensure_genai_configured(api_key)
         
         # Map model IDs to actual Gemini model names
         self._model_map = {
@@ -39,9 +38,7 @@ class ConversationHandler:
         
         # Initialize the model for text generation
         model_name = self._model_map.get(card_model, card_model) if card_model else "models/gemini-3.1-pro-preview"
-        if model_name and not model_name.startswith("models/"):
-            model_name = f"models/{model_name}"
-        self.model = genai.GenerativeModel(model_name)
+        self.llm_client = get_llm_client("google", api_key, model_name)
         self.card_model_id = card_model
         
         # Store image model configuration
@@ -83,8 +80,7 @@ class ConversationHandler:
             print(system_prompt)
             print("="*80 + "\n")
             
-            response = self.model.generate_content(system_prompt)
-            content = response.text
+            content = self.llm_client.complete(system_prompt)
             
             print("\n" + "="*80)
             print("💬 CONVERSATION RESPONSE:")
@@ -98,6 +94,39 @@ class ConversationHandler:
             print(f"Conversation handler error: {e}")
             return self._get_fallback_response(message)
     
+    def stream_conversation(self, message: str, context_tags: List[Dict[str, Any]] = None,
+                            child_profile: Dict[str, Any] = None,
+                            chat_history: List[Dict[str, Any]] = None,
+                            cancel=None) -> Iterator[str]:
+        """
+        Streaming counterpart of handle_conversation: yields the reply as it is generated.
+        
+        Args:
+            message: The user's message
+            context_tags: Parsed @mentions for context
+            child_profile: Child's profile data
+            chat_history: Recent chat history for context
+            cancel: Optional CancelToken that aborts the upstream request
+            
+        Yields:
+            Response text deltas (the fallback response if nothing was generated)
+            
+        Raises:
+            The upstream error if the stream fails after text was already sent,
+            so the caller does not mistake the partial reply for a finished one.
+        """
+        system_prompt = self._build_conversation_prompt(message, context_tags, child_profile, chat_history)
+        emitted = False
+        try:
+            for delta in self.llm_client.stream(system_prompt, cancel=cancel):
+                emitted = True
+                yield delta
+        except Exception as e:
+            print(f"Conversation handler error: {e}")
+            if emitted or (cancel is not None and cancel.cancelled):
+                raise
+            yield self._get_fallback_response(message)
+    
     def _build_conversation_prompt(self, message: str, context_tags: List[Dict[str, Any]] = None,
                                  child_profile: Dict[str, Any] = None,
                                  chat_history: List[Dict[str, Any]] = None) -> str:
@@ -261,8 +290,7 @@ Generate the image description now:"""
             print(prompt)
             print("="*80 + "\n")
             
-            response = self.model.generate_content(prompt)
-            content = response.text
+            content = self.llm_client.complete(prompt)
             
             print("\n" + "="*80)
             print("🎨 IMAGE DESCRIPTION GENERATED:")
@@ -340,6 +368,7 @@ Generate an image that matches this description exactly."""
                 print(f"User Request: {user_request}")
                 
                 # Create model instance for this attempt
+                import google.generativeai as genai
                 image_model = genai.GenerativeModel(model_name)
                 
                 # Use Gemini's image generation model with proper configuration
@@ -472,6 +501,7 @@ Generate an image that matches this description exactly."""
             print(f"User Request: {user_request}")
             
             # 1. Use standard GenerativeModel, NOT ImageGenerationModel
+            import google.generativeai as genai
             model = genai.GenerativeModel(model_name)
             
             # 2. Call standard generate_content with response_modalities=["IMAGE"]
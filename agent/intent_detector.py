@@ -1,5 +1,6 @@
 import json
 import logging
+import re
 from enum import Enum
 from typing import Dict, Any, Optional
 
@@ -9,18 +10,98 @@ class IntentType(Enum):
     CONVERSATION = "conversation"
     CARD_GENERATION = "card_generation"
 
+# Rule-based pre-classification: messages these patterns settle are never sent to the LLM
+RULE_CONFIDENCE_THRESHOLD = 0.9
+# Without an API key, rule results at least this confident are used instead of defaulting to chat
+RULE_FALLBACK_CONFIDENCE = 0.75
+
+# @word:/@template:/... tags only ever come from the card generation UI
+_CARD_TAG = re.compile(r"@(word|vocabulary|template|prompt|notetype|note-type|quantity):([^\s@,]+)", re.IGNORECASE)
+# Explicit card verbs: the only wording (besides tags) trusted without asking the LLM
+_CARD_REQUEST = re.compile(
+    r"\b(make|create|generate|build|give me|prepare)\b.{0,40}\b(flash\s*)?cards?\b"
+    r"|(生成|制作|做|出)(几张|一些)?.{0,10}(卡片|闪卡|卡)",
+    re.IGNORECASE,
+)
+# Could be a card request, but parents also ask "How do I teach him to ...?" or
+# "Do the cards for colors work?"; scored below the threshold so the LLM decides
+_CARD_HINT = re.compile(
+    r"\bcards?\s+(for|about|on)\b"
+    r"|\bteach\s+(me|him|her|them|us)\b|\bhelp\s+(me|him|her|them|us)\s+learn\b"
+    r"|教(我|他|她|孩子)",
+    re.IGNORECASE,
+)
+_CARD_TOPIC = re.compile(
+    r"(?:cards?\s+(?:for|about|on)|teach\s+(?:me|him|her|them|us)(?:\s+(?:the word|the concept of|about))?)\s+"
+    r"['\"]?([^'\"?.!,]{1,40})",
+    re.IGNORECASE,
+)
+_CARD_TOPIC_ZH = re.compile(r"(?:卡片|闪卡)[：:\s]+([^\s，。！？,.!?]{1,20})")
+_SMALL_TALK = re.compile(
+    r"^\s*(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening)|who are you|what can you do"
+    r"|你好|您好|谢谢|早上好|晚上好|你是谁)\b[\s!.?！。？]*$",
+    re.IGNORECASE,
+)
+
+
 class IntentDetector:
     """
-    LLM-based Micro-Router.
-    Uses the configured LLM to classify user intent and extract topics.
+    Micro-Router: keyword rules first, then the configured LLM for anything
+    the rules can't settle (classifies user intent and extracts topics).
     """
+
+    @staticmethod
+    def classify_by_rules(message: str) -> Optional[Dict[str, Any]]:
+        """
+        Local keyword/pattern classifier. Returns a detect_intent-style result,
+        or None when the message is ambiguous and needs the LLM.
+        """
+        text = (message or "").strip()
+        if not text:
+            return {"intent": IntentType.CONVERSATION, "confidence": 1.0, "extracted_topic": None}
+
+        tag = _CARD_TAG.search(text)
+        if tag:
+            word = re.search(r"@(?:word|vocabulary):([^\s@,]+)", text, re.IGNORECASE)
+            return {
+                "intent": IntentType.CARD_GENERATION,
+                "confidence": 0.98,
+                "extracted_topic": word.group(1) if word else None,
+            }
+
+        explicit = _CARD_REQUEST.search(text)
+        if explicit or _CARD_HINT.search(text):
+            topic = _CARD_TOPIC.search(text) or _CARD_TOPIC_ZH.search(text)
+            if explicit:
+                # Without a recognisable topic the LLM is still asked to extract one
+                confidence = 0.92 if topic else 0.8
+            else:
+                confidence = 0.6
+            return {
+                "intent": IntentType.CARD_GENERATION,
+                "confidence": confidence,
+                "extracted_topic": topic.group(1).strip() if topic else None,
+            }
+
+        if _SMALL_TALK.match(text):
+            return {"intent": IntentType.CONVERSATION, "confidence": 0.95, "extracted_topic": None}
+
+        return None
     
     @staticmethod
     def detect_intent(message: str, api_key: Optional[str], provider: str = "google") -> Dict[str, Any]:
         """
-        Classifies intent using a lightweight LLM call.
-        Returns: {"intent": IntentType, "confidence": float, "topic": str | None}
+        Classifies intent with the keyword rules, falling back to a lightweight
+        LLM call when they are not confident.
+        Returns: {"intent": IntentType, "confidence": float, "extracted_topic": str | None}
         """
+        rule_result = IntentDetector.classify_by_rules(message)
+        if rule_result and rule_result["confidence"] >= RULE_CONFIDENCE_THRESHOLD:
+            logger.info(
+                f"🧠 Micro-Router (rules): {rule_result['intent'].value} | Topic: {rule_result['extracted_topic']}"
+            )
+            return rule_result
+
         # 1. Avoid circular imports by importing inside method
         from backend.app.services.agent_service import AgentService
 
@@ -37,6 +118,8 @@ class IntentDetector:
         RULES:
         - "Teach me X", "Make cards for X", "Help me learn X", "@word:X" -> CARD_GENERATION
         - "Hi", "Who are you?", "Why is the sky blue?" -> CONVERSATION
+        - Parenting advice ("How do I teach him to use the toilet?") and questions
+          about existing cards ("Do the cards for colors work?") -> CONVERSATION
         
         OUTPUT JSON ONLY:
         {{
@@ -52,6 +135,8 @@ class IntentDetector:
             
             # Ensure we have an API key (AgentService._call_llm requires it)
             if not api_key:
+                if rule_result and rule_result["confidence"] >= RULE_FALLBACK_CONFIDENCE:
+                    return rule_result
                 logger.warning("⚠️ No API key provided for intent detection. Defaulting to CONVERSATION.")
                 return {"intent": IntentType.CONVERSATION, "confidence": 0.0, "extracted_topic": None}
             
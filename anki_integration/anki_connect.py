@@ -12,7 +12,10 @@ import json
 import re
 import base64
 import hashlib
-from typing import List, Dict, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
 
 TAG_ANNOTATION_PREFIXES = (
@@ -26,23 +29,70 @@ TAG_ANNOTATION_PREFIXES = (
 )
 
 
+# Actions per `multi` request and notes per addNotes request. AnkiConnect runs
+# each request on Anki's main thread, so very large batches freeze the UI.
+MULTI_BATCH_SIZE = 50
+ADD_NOTES_BATCH_SIZE = 100
+
+# Concurrent storeMediaFile requests for file uploads
+MEDIA_UPLOAD_WORKERS = 4
+
+# (done, total) callback used to report bulk progress
+ProgressCallback = Callable[[int, int], None]
+
+# Pure Hash media names: 12 hex chars of the content hash + extension.
+# A name of this form identifies its content, so if Anki already has the
+# file there is nothing to upload.
+CONTENT_HASH_FILENAME = re.compile(r'^[a-fA-F0-9]{12}\.\w+$')
+
+
+def is_content_addressed(filename: str) -> bool:
+    """True if the filename follows the Pure Hash naming scheme."""
+    return bool(CONTENT_HASH_FILENAME.match(filename or ""))
+
+
 def sanitize_tags_for_anki(raw_tags: List[Any]) -> List[str]:
     """Return an empty tag list so that metadata lives in _Remarks instead of Anki tags."""
     return []
 
 
+def _chunked(items: List[Any], size: int):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+class AnkiConnectError(Exception):
+    """Raised when AnkiConnect is unreachable or returns an error."""
+    pass
+
+
 class AnkiConnect:
     """Client for communicating with Anki via AnkiConnect API."""
     
-    def __init__(self, url: str = "http://localhost:8765"):
+    def __init__(self, url: str = "http://localhost:8765", timeout: float = 10):
         """
         Initialize AnkiConnect client.
         
         Args:
             url: AnkiConnect server URL (default: http://localhost:8765)
+            timeout: Per-request timeout in seconds
         """
         self.url = url
         self.version = 6
+        self.timeout = timeout
+        # One keep-alive Session per thread: requests.Session is not thread-safe,
+        # and upload_media_paths issues actions from several worker threads
+        self._local = threading.local()
+        # Names in Anki's media folder, fetched once per client (see media_manifest)
+        self._media_manifest: Optional[Set[str]] = None
+    
+    @property
+    def session(self) -> requests.Session:
+        """The calling thread's keep-alive Session, created on first use."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
     
     def _invoke(self, action: str, params: Optional[Dict[str, Any]] = None) -> Any:
         """
@@ -56,7 +106,7 @@ class AnkiConnect:
             The result from AnkiConnect
             
         Raises:
-            Exception: If AnkiConnect returns an error
+            AnkiConnectError: If AnkiConnect is unreachable or returns an error
         """
         payload = {
             "action": action,
@@ -67,18 +117,56 @@ class AnkiConnect:
             payload["params"] = params
         
         try:
-            response = requests.post(self.url, json=payload, timeout=10)
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             
             result = response.json()
             
             if result.get("error"):
-                raise Exception(f"AnkiConnect error: {result['error']}")
+                raise AnkiConnectError(f"AnkiConnect error: {result['error']}")
             
             return result.get("result")
         
         except requests.exceptions.RequestException as e:
-            raise Exception(f"Failed to connect to AnkiConnect: {e}")
+            raise AnkiConnectError(f"Failed to connect to AnkiConnect: {e}")
+    
+    def multi(
+        self,
+        actions: List[Tuple[str, Optional[Dict[str, Any]]]],
+        batch_size: int = MULTI_BATCH_SIZE,
+    ) -> List[Any]:
+        """
+        Run many actions through AnkiConnect's `multi` action, batch_size per request.
+        
+        Args:
+            actions: (action, params) pairs
+            batch_size: Actions per HTTP round-trip
+            
+        Returns:
+            One entry per action, in order. Actions that failed yield an
+            AnkiConnectError instance instead of raising, so one bad action
+            does not hide the results of the others.
+            
+        Raises:
+            AnkiConnectError: If a whole `multi` request fails
+        """
+        results: List[Any] = []
+        for chunk in _chunked(actions, batch_size):
+            payload_actions = []
+            for action, params in chunk:
+                entry = {"action": action, "version": self.version}
+                if params:
+                    entry["params"] = params
+                payload_actions.append(entry)
+            
+            for response in self._invoke("multi", {"actions": payload_actions}) or []:
+                if isinstance(response, dict) and response.get("error"):
+                    results.append(AnkiConnectError(f"AnkiConnect error: {response['error']}"))
+                elif isinstance(response, dict) and "result" in response:
+                    results.append(response["result"])
+                else:
+                    results.append(response)
+        return results
     
     def ping(self) -> bool:
         """
@@ -97,10 +185,39 @@ class AnkiConnect:
         """Get list of all deck names."""
         return self._invoke("deckNames")
     
+    def media_manifest(self, refresh: bool = False) -> Set[str]:
+        """
+        Names of the files in Anki's media folder.
+        
+        Fetched with getMediaFilesNames on first use and then kept for the
+        lifetime of this client; uploads made through it are added as they
+        succeed. Returns an empty set (and retries next time) if the listing
+        fails, so callers simply upload everything.
+        """
+        if self._media_manifest is None or refresh:
+            try:
+                names = self._invoke("getMediaFilesNames", {"pattern": "*"}) or []
+            except AnkiConnectError as e:
+                print(f"⚠️  Could not list Anki media files: {e}")
+                return set()
+            self._media_manifest = set(names)
+            print(f"📁 Anki media manifest: {len(self._media_manifest)} files")
+        return self._media_manifest
+    
+    def has_media_file(self, filename: str) -> bool:
+        """True if a content-addressed file is already in Anki's media folder."""
+        return is_content_addressed(filename) and filename in self.media_manifest()
+    
+    def _remember_media(self, filename: Optional[str]) -> None:
+        if filename and self._media_manifest is not None:
+            self._media_manifest.add(filename)
+    
     def store_media_file(self, filename: str, data: str) -> str:
         """
         Store a media file in Anki's media folder.
         
+        Content-addressed files that Anki already has are not uploaded again.
+        
         Args:
             filename: Name of the file
             data: Base64-encoded file data
@@ -108,17 +225,93 @@ class AnkiConnect:
         Returns:
             The filename as stored in Anki
         """
-        return self._invoke("storeMediaFile", {
+        if self.has_media_file(filename):
+            return filename
+        stored = self._invoke("storeMediaFile", {
             "filename": filename,
             "data": data
         })
+        self._remember_media(stored or filename)
+        return stored
+    
+    def store_media_files(self, files: Dict[str, str]) -> Dict[str, Optional[str]]:
+        """
+        Store several media files with batched `multi` requests.
+        
+        Content-addressed files that Anki already has are skipped.
+        
+        Args:
+            files: filename -> base64-encoded data
+            
+        Returns:
+            filename -> error message (None when stored or already present)
+        """
+        filenames = [name for name in files if not self.has_media_file(name)]
+        results = self.multi([
+            ("storeMediaFile", {"filename": name, "data": files[name]})
+            for name in filenames
+        ])
+        errors: Dict[str, Optional[str]] = {name: None for name in files}
+        for name, result in zip(filenames, results):
+            if isinstance(result, AnkiConnectError):
+                errors[name] = str(result)
+            else:
+                self._remember_media(result or name)
+        return errors
+    
+    def upload_media_paths(
+        self,
+        files: Dict[str, Path],
+        max_workers: int = MEDIA_UPLOAD_WORKERS,
+    ) -> Dict[str, Union[str, Exception]]:
+        """
+        Upload local files concurrently, skipping content-addressed files Anki already has.
+        
+        Each worker reads and encodes its own file, so only max_workers
+        payloads are held in memory at a time.
+        
+        Args:
+            files: Anki filename -> local path
+            max_workers: Concurrent storeMediaFile requests
+            
+        Returns:
+            Anki filename -> stored filename, or the exception raised for it
+        """
+        results: Dict[str, Union[str, Exception]] = {}
+        to_upload = {}
+        for filename, path in files.items():
+            if self.has_media_file(filename):
+                results[filename] = filename
+            else:
+                to_upload[filename] = path
+        
+        def upload(filename: str) -> str:
+            data = base64.b64encode(Path(to_upload[filename]).read_bytes()).decode('utf-8')
+            return self.store_media_file(filename, data)
+        
+        if to_upload:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                futures = {name: executor.submit(upload, name) for name in to_upload}
+                for filename, future in futures.items():
+                    try:
+                        results[filename] = future.result()
+                    except Exception as e:
+                        results[filename] = e
+        return results
     
-    def _process_html_images(self, html: str) -> str:
+    def _process_html_images(
+        self,
+        html: str,
+        pending_media: Optional[Dict[str, Tuple[str, str]]] = None,
+    ) -> str:
         """
         Convert base64 embedded images to Anki media references.
         
         Args:
             html: HTML content with embedded base64 images
+            pending_media: If given, images are not uploaded here; instead
+                filename -> (base64 data, original tag) is recorded so the
+                caller can upload everything in one batch
             
         Returns:
             HTML with media file references instead of base64
@@ -137,6 +330,10 @@ class AnkiConnect:
             content_hash = hashlib.md5(img_data.encode()).hexdigest()[:12]
             filename = f"{content_hash}.{img_type}"
             
+            if pending_media is not None:
+                pending_media.setdefault(filename, (img_data, match.group(0)))
+                return f'<img src="/static/media/{filename}">'
+            
             try:
                 # Store the file in Anki's media folder
                 self.store_media_file(filename, img_data)
@@ -454,13 +651,197 @@ class AnkiConnect:
             "errors": errors,
         }
 
-    def sync_cards(self, deck_name: str, cards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def add_notes_bulk(
+        self,
+        notes: List[Dict[str, Any]],
+        batch_size: int = ADD_NOTES_BATCH_SIZE,
+        progress: Optional[ProgressCallback] = None,
+    ) -> List[Tuple[Optional[int], Optional[str]]]:
+        """
+        Add notes in addNotes batches and report an outcome for every note.
+        
+        Each batch is pre-screened with canAddNotesWithErrorDetail so that one
+        bad note does not fail the whole addNotes call (older AnkiConnect
+        versions reject the entire batch instead of returning null for it).
+        
+        Args:
+            notes: Complete addNote payloads (deckName, modelName, fields, tags, options)
+            batch_size: Notes per addNotes request
+            progress: Called with (notes processed, total) after every batch
+            
+        Returns:
+            (note_id, error) per input note, in order; exactly one is None
+        """
+        outcomes: List[Tuple[Optional[int], Optional[str]]] = []
+        total = len(notes)
+        for chunk in _chunked(notes, batch_size):
+            try:
+                checks = self._invoke("canAddNotesWithErrorDetail", {"notes": chunk})
+            except AnkiConnectError:
+                # Action missing on older AnkiConnect; let addNotes decide
+                checks = None
+            
+            chunk_outcomes: List[Tuple[Optional[int], Optional[str]]] = [(None, None)] * len(chunk)
+            addable = []
+            for i, note in enumerate(chunk):
+                check = checks[i] if checks else None
+                if isinstance(check, dict) and not check.get("canAdd", True):
+                    chunk_outcomes[i] = (None, check.get("error") or "Note cannot be added")
+                else:
+                    addable.append(i)
+            
+            if addable:
+                try:
+                    note_ids = self._invoke("addNotes", {"notes": [chunk[i] for i in addable]}) or []
+                    for i, note_id in zip(addable, note_ids):
+                        chunk_outcomes[i] = (
+                            (note_id, None) if note_id is not None
+                            else (None, "Note failed to create (possibly duplicate)")
+                        )
+                except AnkiConnectError as e:
+                    for i in addable:
+                        chunk_outcomes[i] = (None, str(e))
+            
+            outcomes.extend(chunk_outcomes)
+            if progress:
+                progress(len(outcomes), total)
+        return outcomes
+    
+    def _build_sync_note(
+        self,
+        deck_name: str,
+        card: Dict[str, Any],
+        pending_media: Dict[str, Tuple[str, str]],
+    ) -> Dict[str, Any]:
+        """
+        Build the addNote payload for one card from the sync_cards input format.
+        
+        Embedded images are replaced by media references and queued in
+        pending_media; the caller uploads them before adding the note.
+        
+        Raises:
+            ValueError: If the card would produce a completely empty note
+        """
+        card_type = card.get("card_type", "basic")
+        front = card.get("front", "")
+        back = card.get("back", "")
+        tags = sanitize_tags_for_anki(card.get("tags", []))
+        cloze_text = card.get("cloze_text")
+        text_field = card.get("text_field")
+        extra_field = card.get("extra_field", "")
+        note_type = card.get("note_type")
+        remarks_value = card.get("field__Remarks") or card.get("field__remarks") or ""
+        
+        def images(html: str) -> str:
+            return self._process_html_images(html, pending_media)
+        
+        # Handle custom note types
+        if note_type:
+            # Determine field names based on note type
+            # "CUMA - Basic" and "CUMA - Basic (and reversed card)" use "Front"/"Back"
+            # "CUMA - Cloze", "CUMA - Interactive Cloze", "Interactive Cloze" use "Text"/"Extra"
+            is_basic_type = "Basic" in note_type and "Cloze" not in note_type
+            
+            if is_basic_type:
+                primary_field = "Front"
+                secondary_field = "Back"
+            else:
+                primary_field = "Text"
+                secondary_field = "Extra"
+            
+            # Custom note type with custom fields
+            fields = {}
+            
+            # Try text_field first, then fallback to front or cloze_text
+            content_for_primary = None
+            if text_field and text_field.strip():
+                content_for_primary = text_field
+            elif front and front.strip():
+                content_for_primary = front
+            elif cloze_text and cloze_text.strip():
+                content_for_primary = cloze_text
+            
+            # Ensure primary field exists even if empty (Anki requires all fields)
+            fields[primary_field] = images(content_for_primary) if content_for_primary else ""
+            
+            # Try extra_field first, then fallback to back
+            content_for_secondary = None
+            if extra_field and extra_field.strip():
+                content_for_secondary = extra_field
+            elif back and back.strip():
+                content_for_secondary = back
+            
+            # Ensure secondary field exists even if empty (Anki requires all fields)
+            fields[secondary_field] = images(content_for_secondary) if content_for_secondary else ""
+            
+            # Add any other custom fields from the card (but don't overwrite primary/secondary fields)
+            for key, value in card.items():
+                if key.startswith("field_"):
+                    if key == "field__Remarks_annotations":
+                        continue
+                    field_name = key.replace("field_", "")
+                    # Don't overwrite the primary/secondary fields we just set
+                    if field_name in (primary_field, secondary_field):
+                        continue
+                    # Only add non-empty values
+                    if value and (isinstance(value, str) and value.strip() or not isinstance(value, str)):
+                        fields[field_name] = str(value) if value else ""
+            if remarks_value and "_Remarks" not in fields:
+                fields["_Remarks"] = remarks_value
+            
+            # Validate that we have at least one non-empty field (Anki rejects completely empty notes)
+            non_empty_fields = {k: v for k, v in fields.items() if v and str(v).strip()}
+            if not non_empty_fields:
+                raise ValueError(
+                    f"Card {card.get('id')} has empty fields. "
+                    f"text_field: {repr(text_field[:50]) if text_field else 'None'}, "
+                    f"extra_field: {repr(extra_field[:50]) if extra_field else 'None'}, "
+                    f"front: {repr(front[:50]) if front else 'None'}, "
+                    f"back: {repr(back[:50]) if back else 'None'}, "
+                    f"cloze_text: {repr(cloze_text[:50]) if cloze_text else 'None'}, "
+                    f"note_type: {note_type}, "
+                    f"card_type: {card_type}, "
+                    f"fields set: {list(fields.keys())}, "
+                    f"non_empty: {list(non_empty_fields.keys())}"
+                )
+            model_name = note_type
+        
+        # Handle standard card types
+        elif card_type == "cloze" and cloze_text:
+            fields = {"Text": images(cloze_text), "Extra": "", "_Remarks": remarks_value}
+            model_name = "CUMA - Cloze"
+        elif card_type == "basic_reverse":
+            fields = {"Front": images(front), "Back": images(back), "_Remarks": remarks_value}
+            model_name = "CUMA - Basic (and reversed card)"
+        else:  # basic
+            fields = {"Front": images(front), "Back": images(back), "_Remarks": remarks_value}
+            model_name = "CUMA - Basic"
+        
+        return {
+            "deckName": deck_name,
+            "modelName": model_name,
+            "fields": fields,
+            "tags": tags,
+            "options": {"allowDuplicate": True},
+        }
+    
+    def sync_cards(
+        self,
+        deck_name: str,
+        cards: List[Dict[str, Any]],
+        progress: Optional[ProgressCallback] = None,
+    ) -> Dict[str, Any]:
         """
         Sync multiple cards to Anki.
         
+        Notes are built locally, their images uploaded in batched `multi`
+        requests, and the notes inserted with addNotes, so a deck costs a
+        handful of round-trips instead of one (or more) per card.
+        
         Args:
             deck_name: Target deck name
             cards: List of card dictionaries with card_type, front, back, etc.
+            progress: Called with (cards processed, total) after every addNotes batch
             
         Returns:
             Dictionary with sync results
@@ -477,139 +858,56 @@ class AnkiConnect:
         except:
             pass  # Deck might already exist
         
+        pending_media: Dict[str, Tuple[str, str]] = {}
+        built: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
         for card in cards:
             try:
-                card_type = card.get("card_type", "basic")
-                front = card.get("front", "")
-                back = card.get("back", "")
-                tags = sanitize_tags_for_anki(card.get("tags", []))
-                cloze_text = card.get("cloze_text")
-                text_field = card.get("text_field")
-                extra_field = card.get("extra_field", "")
-                note_type = card.get("note_type")
-                remarks_value = card.get("field__Remarks") or card.get("field__remarks") or ""
-                
-                print(f"  Processing card {card.get('id')}: type={card_type}, note_type={note_type}")
-                print(f"    Debug - text_field: {repr(text_field[:100]) if text_field else 'None'}")
-                print(f"    Debug - extra_field: {repr(extra_field[:100]) if extra_field else 'None'}")
-                print(f"    Debug - front: {repr(front[:100]) if front else 'None'}")
-                print(f"    Debug - back: {repr(back[:100]) if back else 'None'}")
-                print(f"    Debug - cloze_text: {repr(cloze_text[:100]) if cloze_text else 'None'}")
-                
-                # Handle custom note types
-                if note_type:
-                    # Determine field names based on note type
-                    # "CUMA - Basic" and "CUMA - Basic (and reversed card)" use "Front"/"Back"
-                    # "CUMA - Cloze", "CUMA - Interactive Cloze", "Interactive Cloze" use "Text"/"Extra"
-                    is_basic_type = "Basic" in note_type and "Cloze" not in note_type
-                    
-                    if is_basic_type:
-                        primary_field = "Front"
-                        secondary_field = "Back"
-                    else:
-                        primary_field = "Text"
-                        secondary_field = "Extra"
-                    
-                    print(f"    Field mapping: note_type='{note_type}', is_basic_type={is_basic_type}, primary='{primary_field}', secondary='{secondary_field}'")
-                    
-                    # Custom note type with custom fields
-                    fields = {}
-                    
-                    # Try text_field first, then fallback to front or cloze_text
-                    content_for_primary = None
-                    if text_field and text_field.strip():
-                        content_for_primary = text_field
-                    elif front and front.strip():
-                        content_for_primary = front
-                    elif cloze_text and cloze_text.strip():
-                        content_for_primary = cloze_text
-                    
-                    if content_for_primary:
-                        # Process images in primary field
-                        processed_primary = self._process_html_images(content_for_primary)
-                        fields[primary_field] = processed_primary
-                        print(f"    {primary_field} field length: {len(content_for_primary)} chars (original), {len(processed_primary)} chars (processed)")
-                    else:
-                        # Ensure primary field exists even if empty (Anki requires all fields)
-                        fields[primary_field] = ""
-                    
-                    # Try extra_field first, then fallback to back
-                    content_for_secondary = None
-                    if extra_field and extra_field.strip():
-                        content_for_secondary = extra_field
-                    elif back and back.strip():
-                        content_for_secondary = back
-                    
-                    if content_for_secondary:
-                        # Process images in secondary field
-                        processed_secondary = self._process_html_images(content_for_secondary)
-                        fields[secondary_field] = processed_secondary
-                        print(f"    {secondary_field} field length: {len(content_for_secondary)} chars (original), {len(processed_secondary)} chars (processed)")
-                    else:
-                        # Ensure secondary field exists even if empty (Anki requires all fields)
-                        fields[secondary_field] = ""
-                    
-                    # Add any other custom fields from the card (but don't overwrite primary/secondary fields)
-                    for key, value in card.items():
-                        if key.startswith("field_"):
-                            if key == "field__Remarks_annotations":
-                                continue
-                            field_name = key.replace("field_", "")
-                            # Don't overwrite the primary/secondary fields we just set
-                            if field_name in (primary_field, secondary_field):
-                                continue
-                            # Only add non-empty values
-                            if value and (isinstance(value, str) and value.strip() or not isinstance(value, str)):
-                                fields[field_name] = str(value) if value else ""
-                    if remarks_value and "_Remarks" not in fields:
-                        fields["_Remarks"] = remarks_value
-                    
-                    # Validate that we have at least one non-empty field (Anki rejects completely empty notes)
-                    non_empty_fields = {k: v for k, v in fields.items() if v and str(v).strip()}
-                    if not non_empty_fields:
-                        raise ValueError(
-                            f"Card {card.get('id')} has empty fields. "
-                            f"text_field: {repr(text_field[:50]) if text_field else 'None'}, "
-                            f"extra_field: {repr(extra_field[:50]) if extra_field else 'None'}, "
-                            f"front: {repr(front[:50]) if front else 'None'}, "
-                            f"back: {repr(back[:50]) if back else 'None'}, "
-                            f"cloze_text: {repr(cloze_text[:50]) if cloze_text else 'None'}, "
-                            f"note_type: {note_type}, "
-                            f"card_type: {card_type}, "
-                            f"fields set: {list(fields.keys())}, "
-                            f"non_empty: {list(non_empty_fields.keys())}"
-                        )
-                    
-                    print(f"    Adding custom note: {note_type} with fields: {list(fields.keys())} (values: {[(k, len(str(v)) if v else 0) for k, v in fields.items()]})")
-                    note_id = self.add_custom_note(deck_name, note_type, fields, tags)
-                    print(f"    ✅ Created note ID: {note_id}")
-                
-                # Handle standard card types
-                elif card_type == "cloze" and cloze_text:
-                    # Process images in cloze text
-                    processed_cloze = self._process_html_images(cloze_text)
-                    note_id = self.add_cloze_card(deck_name, processed_cloze, "", tags, remarks_value)
-                elif card_type == "basic_reverse":
-                    # Process images in front and back
-                    processed_front = self._process_html_images(front)
-                    processed_back = self._process_html_images(back)
-                    note_id = self.add_basic_reverse_card(deck_name, processed_front, processed_back, tags, remarks_value)
-                else:  # basic
-                    # Process images in front and back
-                    processed_front = self._process_html_images(front)
-                    processed_back = self._process_html_images(back)
-                    note_id = self.add_basic_card(deck_name, processed_front, processed_back, tags, remarks_value)
-                
+                built.append((card, self._build_sync_note(deck_name, card, pending_media)))
+            except Exception as e:
+                print(f"    ❌ Error syncing card {card.get('id')}: {e}")
+                results["failed"].append({
+                    "card_id": card.get("id"),
+                    "error": str(e)
+                })
+        
+        if pending_media:
+            try:
+                media_errors = self.store_media_files(
+                    {filename: data for filename, (data, _) in pending_media.items()}
+                )
+            except AnkiConnectError as e:
+                media_errors = {filename: str(e) for filename in pending_media}
+            failed_media = {name: error for name, error in media_errors.items() if error}
+            print(f"  🖼️  Stored {len(pending_media) - len(failed_media)}/{len(pending_media)} media files")
+            if failed_media:
+                # Keep the original embedded image rather than a dangling reference
+                for filename, error in failed_media.items():
+                    print(f"Warning: Failed to store image {filename}: {error}")
+                for _, note in built:
+                    for field, value in note["fields"].items():
+                        for filename in failed_media:
+                            reference = f'<img src="/static/media/{filename}">'
+                            if isinstance(value, str) and reference in value:
+                                value = value.replace(reference, pending_media[filename][1])
+                        note["fields"][field] = value
+        
+        def report(done: int, total: int) -> None:
+            print(f"  📤 Added {done}/{total} notes to '{deck_name}'")
+            if progress:
+                progress(done + len(results["failed"]), len(cards))
+        
+        outcomes = self.add_notes_bulk([note for _, note in built], progress=report) if built else []
+        for (card, _), (note_id, error) in zip(built, outcomes):
+            if note_id is not None:
                 results["success"].append({
                     "card_id": card.get("id"),
                     "note_id": note_id
                 })
-            
-            except Exception as e:
-                print(f"    ❌ Error syncing card {card.get('id')}: {e}")
+            else:
+                print(f"    ❌ Error syncing card {card.get('id')}: {error}")
                 results["failed"].append({
                     "card_id": card.get("id"),
-                    "error": str(e)
+                    "error": error
                 })
         
         return results
@@ -0,0 +1,241 @@
+"""
+Per-resource thread pools for blocking work done inside async endpoints.
+
+Most endpoints are `async def` but talk to AnkiConnect, Oxigraph, SQLite or an
+LLM SDK through synchronous clients, which used to stall the event loop for
+the whole call (a deck sync could freeze every other request for minutes).
+Blocking calls now run on a small pool per resource class so that a slow Anki
+sync cannot starve KG lookups, and vice versa:
+
+    anki  AnkiConnect HTTP calls (Anki serialises requests anyway; keep small)
+    kg    Oxigraph / Fuseki queries
+    db    SQLAlchemy / sqlite3 work
+    llm   Gemini / OpenAI-compatible SDK calls (network bound; can be wider)
+
+Pool sizes come from `<NAME>_POOL_SIZE` environment variables.  Each pool
+keeps queue-depth and wait-time counters, exposed through `pool_metrics()`.
+Tasks run in a copy of the caller's context, so per-request context variables
+(e.g. the SQLite query metrics) follow the work onto the pool thread.
+`iterate_blocking` does the same for blocking generators (LLM token streams),
+handing each item to the event loop as soon as it is produced.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional
+
+DEFAULT_POOL_SIZES = {
+    "anki": 4,
+    "kg": 4,
+    "db": 8,
+    "llm": 8,
+}
+
+
+class ResourcePool:
+    """A named ThreadPoolExecutor that tracks queued/active tasks and wait times."""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def submit(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        enqueued_at = time.perf_counter()
+        context = contextvars.copy_context()
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        def run() -> Any:
+            started_at = time.perf_counter()
+            wait = started_at - enqueued_at
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            ok = False
+            try:
+                result = context.run(func, *args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.total_run += time.perf_counter() - started_at
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        return self._executor.submit(run)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "max_queued": self.max_queued,
+                "avg_wait_ms": round(1000 * self.total_wait / finished, 2) if finished else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait, 2),
+                "avg_run_ms": round(1000 * self.total_run / finished, 2) if finished else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+_pools: Dict[str, ResourcePool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_size(name: str) -> int:
+    default = DEFAULT_POOL_SIZES.get(name, 4)
+    try:
+        return max(1, int(os.getenv(f"{name.upper()}_POOL_SIZE", default)))
+    except ValueError:
+        return default
+
+
+def get_pool(name: str) -> ResourcePool:
+    """Return the pool for a resource class, creating it on first use."""
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = ResourcePool(name, _pool_size(name))
+                _pools[name] = pool
+    return pool
+
+
+async def run_blocking(resource: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking callable on the resource's pool and await its result."""
+    return await asyncio.wrap_future(get_pool(resource).submit(func, *args, **kwargs))
+
+
+_ITEM, _ERROR, _DONE = "item", "error", "done"
+
+
+async def iterate_blocking(
+    resource: str,
+    make_iterable: Callable[[], Iterable[Any]],
+    cancel: Optional[Callable[[], Any]] = None,
+    max_buffered: Optional[int] = None,
+) -> AsyncIterator[Any]:
+    """
+    Drain a blocking iterable on the resource's pool and yield its items as they arrive.
+
+    The iterable is created, consumed and closed on one pool thread.  If the
+    consumer stops early (e.g. the client disconnected and the response task was
+    cancelled), the producer stops at its next item and `cancel` is called so
+    that a producer blocked on I/O can be interrupted as well.  With
+    `max_buffered`, the producer waits while that many items are still
+    unconsumed, so a slow client applies backpressure instead of the whole
+    result piling up in memory.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stopped = threading.Event()
+    slots = threading.Semaphore(max_buffered) if max_buffered else None
+
+    def put(kind: str, value: Any) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (kind, value))
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    def produce() -> None:
+        iterator = None
+        try:
+            iterator = iter(make_iterable())
+            for item in iterator:
+                if slots is not None:
+                    while not slots.acquire(timeout=0.1) and not stopped.is_set():
+                        pass
+                if stopped.is_set():
+                    break
+                put(_ITEM, item)
+        except Exception as exc:
+            put(_ERROR, exc)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            put(_DONE, None)
+
+    get_pool(resource).submit(produce)
+    finished = False
+    try:
+        while True:
+            kind, value = await queue.get()
+            if kind == _DONE:
+                finished = True
+                break
+            if kind == _ERROR:
+                finished = True
+                raise value
+            if slots is not None:
+                slots.release()
+            yield value
+    finally:
+        if not finished:
+            stopped.set()
+            if cancel is not None:
+                cancel()
+
+
+def offload(resource: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Turn a synchronous endpoint into an async one that runs on a resource pool.
+
+    FastAPI reads the parameters through `functools.wraps`, so dependencies
+    and request bodies behave exactly as on the undecorated function.  The
+    decorated module must not use string annotations (`from __future__ import
+    annotations`); call `run_blocking` directly there instead.
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return await run_blocking(resource, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of every pool's counters (pools that were never used are listed idle)."""
+    metrics = {}
+    for name in sorted(set(DEFAULT_POOL_SIZES) | set(_pools)):
+        pool = _pools.get(name)
+        if pool is None:
+            metrics[name] = {"max_workers": _pool_size(name), "queued": 0, "active": 0, "completed": 0}
+        else:
+            metrics[name] = pool.metrics()
+    return metrics
+
+
+def shutdown_pools(wait: bool = False) -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait)
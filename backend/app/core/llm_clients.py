@@ -0,0 +1,407 @@
+"""
+Process-wide registry of reusable LLM clients.
+
+Every chat turn used to build its SDK clients from scratch: `OpenAI(...)` per
+call in AgentService._call_llm, `genai.configure()` (which throws away
+Gemini's cached gRPC channels) per ContentGenerator / ConversationHandler,
+so each request paid for client construction plus a fresh TLS handshake.
+Clients are now created once per (provider, base_url, api key hash, model)
+and kept, together with their keep-alive connection pools:
+
+    client = get_llm_client("deepseek", api_key, "deepseek-chat", base_url)
+    text = client.complete(prompt)
+
+`complete()` and `stream()` (text deltas as they arrive) are blocking (run
+them on the "llm" pool from async code), are limited to a per-provider
+number of concurrent calls and record latency and token usage per provider,
+exposed through `llm_metrics()`.  A stream given a CancelToken aborts the
+upstream request as soon as the token is cancelled, even mid-read.
+
+Environment:
+    LLM_MAX_CONCURRENCY=8              concurrent calls per provider
+    LLM_MAX_CONCURRENCY_<PROVIDER>=n   per-provider override (e.g. _DEEPSEEK)
+    LLM_MAX_CONNECTIONS=20             HTTP connections per OpenAI-compatible client
+    LLM_TIMEOUT=120                    request timeout in seconds
+    LLM_CLIENT_CACHE_SIZE=32           clients kept before the least recently used is dropped
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from importlib import metadata
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+DEFAULT_BASE_URLS = {
+    "deepseek": "https://api.deepseek.com",
+    "openai": "https://api.openai.com/v1",
+}
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+CLIENT_CACHE_SIZE = int(os.getenv("LLM_CLIENT_CACHE_SIZE", "32"))
+
+
+class ProviderStats:
+    """Call, latency and token counters for one provider."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.max_concurrency = int(os.getenv(f"LLM_MAX_CONCURRENCY_{provider.upper()}", MAX_CONCURRENCY))
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.total_wait_ms = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, elapsed_ms: float, ok: bool, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+        with self._lock:
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self.in_flight,
+                "calls": self.calls,
+                "errors": self.errors,
+                "avg_ms": round(self.total_ms / self.calls, 1) if self.calls else 0.0,
+                "max_ms": round(self.max_ms, 1),
+                "avg_wait_ms": round(self.total_wait_ms / self.calls, 1) if self.calls else 0.0,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+
+class CancelToken:
+    """Thread-safe cancellation flag; cancel() also runs the abort callbacks registered by streams."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], Any]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass  # The stream may already be closed
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to `timeout` seconds; returns True if cancelled meanwhile."""
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback: Callable[[], Any]) -> None:
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+
+# google-generativeai has no public per-model API key or stream cancel.  The releases
+# listed here keep the service client in GenerativeModel._client and the gRPC call in
+# the streaming response's _iterator; on any other release both hooks are skipped.
+_GENAI_PRIVATE_API_VERSIONS = {(0, 8)}
+
+
+def _genai_private_api_supported() -> bool:
+    try:
+        major, minor = metadata.version("google-generativeai").split(".")[:2]
+        return (int(major), int(minor)) in _GENAI_PRIVATE_API_VERSIONS
+    except (metadata.PackageNotFoundError, ValueError):
+        return False
+
+
+def _gemini_stream_abort(response: Any) -> Callable[[], Any]:
+    """Callable that cancels a streaming generate_content call (a no-op where unsupported)."""
+    if _genai_private_api_supported():
+        abort = getattr(getattr(response, "_iterator", None), "cancel", None)
+        if callable(abort):
+            return abort
+    return lambda: None
+
+
+class LLMClient:
+    """A configured SDK client for one provider/model, safe to share between threads."""
+
+    def __init__(self, provider: str, model: str, api_key: Optional[str], base_url: Optional[str], stats: ProviderStats):
+        self.provider = provider
+        self.model = model
+        self.base_url = base_url
+        self.stats = stats
+        self._http_client = None
+        if provider == "google":
+            self._sdk = self._make_gemini_model(model, api_key)
+        else:
+            self._sdk = self._make_openai_client(api_key, base_url)
+
+    @staticmethod
+    def _make_gemini_model(model: str, api_key: Optional[str]):
+        import google.generativeai as genai
+        from google.ai import generativelanguage as glm
+
+        if not model.startswith("models/"):
+            model = f"models/{model}"
+        gemini_model = genai.GenerativeModel(model)
+        if not api_key:
+            return gemini_model
+        if _genai_private_api_supported():
+            # Bind a client for this key rather than the process-global default set by
+            # genai.configure(): requests with different keys can't reconfigure each other,
+            # and the gRPC channel lives as long as this client does
+            gemini_model._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+        else:
+            print("⚠️ Unrecognised google-generativeai version; using the global genai.configure() key")
+            ensure_genai_configured(api_key)
+        return gemini_model
+
+    def _make_openai_client(self, api_key: Optional[str], base_url: Optional[str]):
+        import httpx
+        from openai import OpenAI
+
+        self._http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+            timeout=TIMEOUT,
+        )
+        try:
+            return OpenAI(api_key=api_key, base_url=base_url, http_client=self._http_client)
+        except Exception:
+            self._http_client.close()
+            raise
+
+    def complete(self, prompt: str, **kwargs: Any) -> str:
+        """Send one user prompt and return the text of the reply (blocking)."""
+        stats = self.stats
+        queued_at = time.perf_counter()
+        stats.slots.acquire()
+        started = time.perf_counter()
+        with stats._lock:
+            stats.in_flight += 1
+            stats.total_wait_ms += 1000 * (started - queued_at)
+        ok = False
+        prompt_tokens = completion_tokens = 0
+        try:
+            if self.provider == "google":
+                response = self._sdk.generate_content(prompt, **kwargs)
+                usage = getattr(response, "usage_metadata", None)
+                if usage is not None:
+                    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+                    completion_tokens = getattr(usage, "candidates_token_count", 0) or 0
+                text = response.text
+            else:
+                response = self._sdk.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    **kwargs,
+                )
+                if response.usage is not None:
+                    prompt_tokens = response.usage.prompt_tokens or 0
+                    completion_tokens = response.usage.completion_tokens or 0
+                text = response.choices[0].message.content
+            ok = True
+            return text
+        finally:
+            with stats._lock:
+                stats.in_flight -= 1
+            stats.slots.release()
+            stats.record(1000 * (time.perf_counter() - started), ok, prompt_tokens, completion_tokens)
+
+    def stream(self, prompt: str, cancel: Optional[CancelToken] = None, **kwargs: Any) -> Iterator[str]:
+        """
+        Send one user prompt and yield the reply's text as it arrives (blocking).
+
+        Stops quietly once `cancel` is cancelled; the upstream request is
+        aborted rather than left to run to completion.
+        """
+        stats = self.stats
+        queued_at = time.perf_counter()
+        stats.slots.acquire()
+        started = time.perf_counter()
+        with stats._lock:
+            stats.in_flight += 1
+            stats.total_wait_ms += 1000 * (started - queued_at)
+        ok = False
+        prompt_tokens = completion_tokens = 0
+        try:
+            if self.provider == "google":
+                response = self._sdk.generate_content(prompt, stream=True, **kwargs)
+                # Cancelling the gRPC call ends the server stream; otherwise we stop at the next chunk
+                abort = _gemini_stream_abort(response)
+                if cancel is not None:
+                    cancel.on_cancel(abort)
+                try:
+                    for chunk in response:
+                        if cancel is not None and cancel.cancelled:
+                            break
+                        usage = getattr(chunk, "usage_metadata", None)
+                        if usage is not None:
+                            prompt_tokens = getattr(usage, "prompt_token_count", 0) or prompt_tokens
+                            completion_tokens = getattr(usage, "candidates_token_count", 0) or completion_tokens
+                        try:
+                            text = chunk.text
+                        except ValueError:
+                            continue  # Chunk without text parts (e.g. only safety ratings)
+                        if text:
+                            yield text
+                finally:
+                    abort()  # No-op once the stream has completed
+            else:
+                response = self._sdk.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    stream=True,
+                    **kwargs,
+                )
+                if cancel is not None:
+                    # Closing the HTTP response from another thread unblocks the read below
+                    cancel.on_cancel(response.close)
+                with response:
+                    for chunk in response:
+                        if cancel is not None and cancel.cancelled:
+                            break
+                        if getattr(chunk, "usage", None) is not None:
+                            prompt_tokens = chunk.usage.prompt_tokens or 0
+                            completion_tokens = chunk.usage.completion_tokens or 0
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+            ok = True
+        except GeneratorExit:
+            ok = True  # Consumer stopped reading early
+            raise
+        except Exception:
+            if cancel is not None and cancel.cancelled:
+                ok = True  # Read interrupted by the abort
+                return
+            raise
+        finally:
+            with stats._lock:
+                stats.in_flight -= 1
+            stats.slots.release()
+            stats.record(1000 * (time.perf_counter() - started), ok, prompt_tokens, completion_tokens)
+
+    def close(self) -> None:
+        if self._http_client is not None:
+            self._http_client.close()
+
+
+_clients: "OrderedDict[Tuple[str, str, str, str], LLMClient]" = OrderedDict()
+_stats: Dict[str, ProviderStats] = {}
+_lock = threading.Lock()
+
+
+def _key_hash(api_key: Optional[str]) -> str:
+    # Keys are never kept in the registry key itself (it shows up in logs and metrics)
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16] if api_key else ""
+
+
+def get_provider_stats(provider: str) -> ProviderStats:
+    with _lock:
+        stats = _stats.get(provider)
+        if stats is None:
+            stats = _stats[provider] = ProviderStats(provider)
+        return stats
+
+
+def get_llm_client(
+    provider: str,
+    api_key: Optional[str],
+    model: str,
+    base_url: Optional[str] = None,
+) -> LLMClient:
+    """
+    Shared client for a provider/model/key/base_url combination, created on first use.
+
+    provider is "google" (Gemini) or any OpenAI-compatible provider ("deepseek",
+    "openai", "alibaba", ...); base_url defaults per provider where known.
+    """
+    provider = (provider or "google").lower()
+    if provider == "gemini":
+        provider = "google"
+    if provider != "google" and not base_url:
+        base_url = DEFAULT_BASE_URLS.get(provider)
+    key = (provider, base_url or "", _key_hash(api_key), model)
+
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            _clients.move_to_end(key)
+            return client
+
+    stats = get_provider_stats(provider)
+    # Built outside the lock: importing an SDK and opening a channel can take a while
+    client = LLMClient(provider, model, api_key, base_url, stats)
+    with _lock:
+        existing = _clients.get(key)
+        if existing is None:
+            _clients[key] = client
+            # Evicted clients may still be mid-call elsewhere; they are left to the GC, not closed
+            while len(_clients) > CLIENT_CACHE_SIZE:
+                _clients.popitem(last=False)
+            return client
+    client.close()  # Another thread built the same client first
+    return existing
+
+
+_genai_configured_key: Optional[str] = None
+_genai_lock = threading.Lock()
+
+
+def ensure_genai_configured(api_key: Optional[str]) -> None:
+    """
+    genai.configure() for code that still uses the SDK's global default client
+    (e.g. image generation), skipped when the key is unchanged: every call
+    discards the SDK's cached clients and their connections.
+    """
+    global _genai_configured_key
+    if not api_key:
+        return
+    with _genai_lock:
+        if _genai_configured_key == api_key:
+            return
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        _genai_configured_key = api_key
+
+
+def llm_metrics() -> Dict[str, Any]:
+    with _lock:
+        providers = dict(_stats)
+        clients = [
+            {"provider": provider, "base_url": base_url or None, "model": model}
+            for provider, base_url, _, model in _clients
+        ]
+    return {
+        "providers": {name: stats.as_dict() for name, stats in sorted(providers.items())},
+        "clients": clients,
+    }
+
+
+def close_llm_clients() -> None:
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
@@ -0,0 +1,191 @@
+"""
+Background warm-up of caches and heavy subsystems after startup.
+
+`startup_event` used to load ontologies into Oxigraph, build the literacy
+cache and compile the quest catalog one after another before the server
+accepted its first request, even though nothing was waiting for most of it
+yet.  Every one of those caches is also built lazily on first use, so the
+server can start serving immediately and warm them in the background:
+
+    orchestrator = WarmupOrchestrator()
+    orchestrator.add("label_index", build_label_index)
+    orchestrator.add("prerequisites", build_prerequisites, after=("label_index",))
+    orchestrator.start()
+
+Independent tasks run in parallel on a small thread pool; a task with `after`
+dependencies starts once they are ready.  If a dependency failed or was
+skipped, the dependent is skipped as well (it loads on first use instead of
+being built from incomplete state).  `status()` reports per-subsystem state
+for the readiness endpoint.
+
+Environment:
+    WARMUP_DISABLED=1          skip background warm-up (caches load on first use)
+    WARMUP_SKIP=a,b            skip individual tasks by name
+    WARMUP_WORKERS=4           parallel warm-up threads
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PENDING, WARMING, READY, FAILED, SKIPPED = "pending", "warming", "ready", "failed", "skipped"
+_FINISHED = {READY, FAILED, SKIPPED}
+
+
+@dataclass
+class WarmupTask:
+    name: str
+    func: Callable[[], Any]
+    after: Tuple[str, ...] = ()
+    status: str = PENDING
+    started_at: Optional[float] = None
+    duration_ms: Optional[float] = None
+    detail: Optional[str] = None
+    error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        info: Dict[str, Any] = {"status": self.status}
+        if self.after:
+            info["after"] = list(self.after)
+        if self.duration_ms is not None:
+            info["duration_ms"] = self.duration_ms
+        elif self.started_at is not None:
+            info["elapsed_ms"] = round(1000 * (time.perf_counter() - self.started_at), 1)
+        if self.detail:
+            info["detail"] = self.detail
+        if self.error:
+            info["error"] = self.error
+        return info
+
+
+class WarmupOrchestrator:
+    """Runs named warm-up tasks in dependency order on a background thread pool."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("WARMUP_WORKERS", "4"))
+        self.tasks: Dict[str, WarmupTask] = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    def add(self, name: str, func: Callable[[], Any], after: Tuple[str, ...] = ()) -> None:
+        """
+        Register a task. `func` may return a short string (e.g. "1234 quests"),
+        which is reported as the task's detail.
+        """
+        if name in self.tasks:
+            raise ValueError(f"Warm-up task '{name}' is already registered")
+        self.tasks[name] = WarmupTask(name=name, func=func, after=tuple(after))
+
+    def start(self) -> None:
+        """Start warming in the background and return immediately."""
+        unknown = {dep for task in self.tasks.values() for dep in task.after if dep not in self.tasks}
+        if unknown:
+            raise ValueError(f"Unknown warm-up dependencies: {sorted(unknown)}")
+
+        skip = {name.strip() for name in os.getenv("WARMUP_SKIP", "").split(",") if name.strip()}
+        disabled = os.getenv("WARMUP_DISABLED", "").lower() in ("1", "true", "yes")
+        self._started_at = time.perf_counter()
+        with self._lock:
+            for task in self.tasks.values():
+                if disabled or task.name in skip:
+                    task.status = SKIPPED
+                    task.detail = "loads on first use"
+            runnable = self._claim_runnable()
+            if all(task.status in _FINISHED for task in self.tasks.values()):
+                self._finish()
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="warmup")
+        print(f"🔥 Warming {len(self.tasks)} subsystem(s) in the background...")
+        for task in runnable:
+            self._submit(task)
+
+    def _claim_runnable(self) -> List[WarmupTask]:
+        # Caller holds self._lock
+        self._skip_blocked()
+        runnable = []
+        for task in self.tasks.values():
+            if task.status == PENDING and all(self.tasks[dep].status == READY for dep in task.after):
+                task.status = WARMING
+                task.started_at = time.perf_counter()
+                runnable.append(task)
+        return runnable
+
+    def _skip_blocked(self) -> None:
+        # Caller holds self._lock; repeat so skips cascade down dependency chains
+        changed = True
+        while changed:
+            changed = False
+            for task in self.tasks.values():
+                if task.status != PENDING:
+                    continue
+                blocked = [dep for dep in task.after if self.tasks[dep].status in (FAILED, SKIPPED)]
+                if blocked:
+                    task.status = SKIPPED
+                    task.detail = f"{', '.join(blocked)} did not complete; loads on first use"
+                    changed = True
+
+    def _submit(self, task: WarmupTask) -> None:
+        self._executor.submit(self._run, task)
+
+    def _run(self, task: WarmupTask) -> None:
+        try:
+            result = task.func()
+            status, detail, error = READY, result if isinstance(result, str) else None, None
+        except Exception as exc:
+            status, detail, error = FAILED, None, f"{type(exc).__name__}: {exc}"
+
+        with self._lock:
+            task.duration_ms = round(1000 * (time.perf_counter() - task.started_at), 1)
+            task.status, task.detail, task.error = status, detail, error
+            runnable = self._claim_runnable()
+            finished = all(t.status in _FINISHED for t in self.tasks.values())
+
+        if status == READY:
+            print(f"  ✅ Warm-up {task.name}: {detail or 'ready'} ({task.duration_ms:.0f} ms)")
+        else:
+            print(f"  ⚠️  Warm-up {task.name} failed after {task.duration_ms:.0f} ms: {error}")
+
+        for next_task in runnable:
+            self._submit(next_task)
+        if finished:
+            self._finish()
+
+    def _finish(self) -> None:
+        self._finished_at = time.perf_counter()
+        self._done.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        failed = [t.name for t in self.tasks.values() if t.status == FAILED]
+        total_ms = 1000 * (self._finished_at - (self._started_at or self._finished_at))
+        if failed:
+            print(f"⚠️  Warm-up finished in {total_ms:.0f} ms with failures: {', '.join(failed)}")
+        else:
+            print(f"✅ Warm-up finished in {total_ms:.0f} ms")
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every task has finished (for scripts and tests)."""
+        return self._done.wait(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            subsystems = {name: task.as_dict() for name, task in self.tasks.items()}
+        elapsed = None
+        if self._started_at is not None:
+            end = self._finished_at or time.perf_counter()
+            elapsed = round(1000 * (end - self._started_at), 1)
+        return {
+            "ready": self.ready,
+            "degraded": sorted(name for name, info in subsystems.items() if info["status"] == FAILED),
+            "elapsed_ms": elapsed,
+            "subsystems": subsystems,
+        }
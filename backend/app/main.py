@@ -6,6 +6,7 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict, Any, Set
 import json
 import os
+import threading
 from datetime import datetime
 import requests
 from urllib.parse import urlencode
@@ -19,7 +20,15 @@ from functools import lru_cache, partial
 import asyncio
 from pathlib import Path
 from .core.config import PROJECT_ROOT, PROFILES_FILE, CARDS_FILE, ANKI_PROFILES_FILE, CHAT_HISTORY_FILE, PROMPT_TEMPLATES_FILE, WORD_KP_CACHE_FILE, MODEL_CONFIG_FILE, ENGLISH_SIMILARITY_FILE, GRAMMAR_CORRECTIONS_FILE, MASTER_KG_FILE
-from .utils.pinyin_utils import get_word_knowledge, get_word_image_map, fetch_word_knowledge_points, fix_iu_ui_tone_placement
+from .core.executors import offload, run_blocking, pool_metrics, shutdown_pools
+from .core.startup import WarmupOrchestrator
+from backend.app.core.llm_clients import llm_metrics, close_llm_clients
+from .utils.pinyin_utils import (
+    get_word_knowledge,
+    get_word_image_map,
+    fetch_word_knowledge_points,
+    fix_iu_ui_tone_placement,
+)
 from .utils.common import (
     load_json_file,
     save_json_file,
@@ -45,16 +54,15 @@ from sys import stdout
 # Database imports
 import sys
 # sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
-from database.db import get_db, init_db, get_db_session
-from database.services import ProfileService, CardService, ChatService
+from database.db import get_db, init_db, get_db_session, engine as db_engine
+from backend.database.sqlite_pool import track_queries, global_query_stats, pool_status as sqlite_pool_status
+from database.services import ProfileService, CardService, ChatService, ChatSessionService
 from sqlalchemy.orm import Session
 from fastapi import Depends
 
 from logging import StreamHandler
 from sys import stdout
 
-import google.generativeai as genai
-
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)  # Ensure our logger captures INFO messages
@@ -68,7 +76,6 @@ logger.addHandler(handler)
 
 print(f"PROJECT_ROOT: {PROJECT_ROOT}")
 
-from openai import OpenAI
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -114,7 +121,7 @@ app.include_router(kg_router.router, prefix="/api/kg", tags=["Knowledge Graph"])
 app.include_router(graph.router, prefix="/api/graph", tags=["Knowledge Graph"])
 app.include_router(daily_deck.router, tags=["daily-deck"])
 app.include_router(survey.router, tags=["survey"])
-# cards._set_genai_model will be called after _genai_model is initialized
+# cards._set_genai_model_provider is called below, next to the Gemini configuration
 app.include_router(cards.router, tags=["cards"])
 app.include_router(test_sync.router, tags=["debug"])
 
@@ -238,68 +245,213 @@ def get_pure_hash_filename(original_filename: str, file_data: bytes) -> str:
     # Return pure hash filename
     return f"{content_hash}{file_ext}"
 
-# Initialize database on startup
+
+def upload_media_to_anki(anki, sources: Dict[str, Path], label: str = "media") -> Dict[str, str]:
+    """
+    Upload local media files to Anki under Pure Hash names.
+
+    Files whose hash name is already in Anki's media folder are not read or
+    sent again, identical contents are uploaded once, and the remaining
+    uploads run concurrently.
+
+    Args:
+        anki: AnkiConnect client (its media manifest is reused across calls)
+        sources: Original filename -> local file path
+        label: Word used in log lines ("image", "audio", ...)
+
+    Returns:
+        Original filename -> filename to reference in Anki fields. Files that
+        fail to upload keep their original name.
+    """
+    import hashlib
+
+    anki_media_map: Dict[str, str] = {}
+    uploaded_hashes: Dict[str, str] = {}  # content_hash -> anki_filename
+    pending: Dict[str, Path] = {}  # anki_filename -> local path
+    already_in_anki = 0
+
+    for original_filename, source_file in sources.items():
+        # Hash-named files identify their content; no need to read them if Anki has them
+        if anki.has_media_file(original_filename):
+            anki_media_map[original_filename] = original_filename
+            already_in_anki += 1
+            continue
+
+        try:
+            with open(source_file, 'rb') as f:
+                file_data = f.read()
+        except OSError as e:
+            print(f"  ⚠️  Failed to upload {original_filename}: {e}")
+            anki_media_map[original_filename] = original_filename
+            continue
+
+        content_hash = hashlib.md5(file_data).hexdigest()
+        if content_hash in uploaded_hashes:
+            anki_media_map[original_filename] = uploaded_hashes[content_hash]
+            print(f"  ℹ️  Reusing {original_filename} → {uploaded_hashes[content_hash]} (duplicate)")
+            continue
+
+        anki_filename = get_pure_hash_filename(original_filename, file_data)
+        uploaded_hashes[content_hash] = anki_filename
+        anki_media_map[original_filename] = anki_filename
+        if anki.has_media_file(anki_filename):
+            already_in_anki += 1
+        else:
+            pending[anki_filename] = source_file
+
+    results = anki.upload_media_paths(pending) if pending else {}
+    for original_filename, anki_filename in list(anki_media_map.items()):
+        result = results.get(anki_filename)
+        if isinstance(result, Exception):
+            print(f"  ⚠️  Failed to upload {original_filename}: {result}")
+            anki_media_map[original_filename] = original_filename
+        elif result:
+            anki_media_map[original_filename] = result
+    uploaded = sum(1 for result in results.values() if not isinstance(result, Exception))
+
+    print(f"  ✅ {label.capitalize()}: uploaded {uploaded}, already in Anki {already_in_anki}, "
+          f"failed {len(results) - uploaded}")
+    return anki_media_map
+
+# Initialize database on startup; heavy caches are warmed in the background
+
+def _load_startup_ontologies() -> str:
+    """Load quest_full.ttl / pep3_master.ttl and the survey graphs into Oxigraph."""
+    from database.kg_client import KnowledgeGraphClient
+    quest_path = PROJECT_ROOT / "knowledge_graph" / "quest_full.ttl"
+    pep3_path = PROJECT_ROOT / "knowledge_graph" / "pep3_master.ttl"
+    client = KnowledgeGraphClient()
+    loaded = []
+    for name, path in [("quest_full.ttl", quest_path), ("pep3_master.ttl", pep3_path)]:
+        if path.exists():
+            client.load_file(str(path))
+            loaded.append(name)
+        else:
+            print(f"⚠️  {name} not found at {path}")
+    survey_schema = PROJECT_ROOT / "knowledge_graph" / "ontology" / "survey_schema.ttl"
+    survey_parent = PROJECT_ROOT / "knowledge_graph" / "survey_parent_full.ttl"
+    vbmapp_candidates = [
+        PROJECT_ROOT / "knowledge_graph" / "ontology" / "vbmapp_woven_ontology.ttl",
+        PROJECT_ROOT / "scripts" / "data_extraction" / "vbmapp_woven_ontology.ttl",
+    ]
+    if survey_schema.exists():
+        client.load_file(str(survey_schema))
+        loaded.append(survey_schema.name)
+    else:
+        print(f"⚠️  survey_schema.ttl not found at {survey_schema}")
+    loaded_vbmapp = False
+    for vbmapp_path in vbmapp_candidates:
+        if vbmapp_path.exists():
+            client.load_file(str(vbmapp_path))
+            loaded.append(vbmapp_path.name)
+            loaded_vbmapp = True
+            break
+    if not loaded_vbmapp:
+        print("⚠️  vbmapp_woven_ontology.ttl not found — survey level filter may return no rows")
+    if survey_parent.exists():
+        client.load_file(str(survey_parent))
+        loaded.append(survey_parent.name)
+    else:
+        print(f"⚠️  survey_parent_full.ttl not found at {survey_parent}")
+    return f"loaded {', '.join(loaded) or 'nothing'}"
+
+
+def _warm_literacy_cache() -> None:
+    from .routers.literacy import initialize_literacy_cache
+    initialize_literacy_cache()
+
+
+def _warm_quest_catalog() -> str:
+    # Pre-compile the daily scheduler's quest catalog so /api/daily_quests never parses Turtle per request
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.insert(0, str(PROJECT_ROOT))
+    from scripts.daily_scheduler import get_quest_catalog
+    return f"{len(get_quest_catalog().by_id)} quests"
+
+
+def _warm_label_index() -> str:
+    from .utils.label_index import get_label_index
+    return f"{len(get_label_index())} keys"
+
+
+def _warm_prerequisite_index() -> str:
+    index = graph.get_prerequisite_index()
+    return f"{sum(len(targets) for targets in index.forward.values())} edges"
+
+
+def _warm_survey_index() -> str:
+    index = survey.get_survey_index(survey.get_kg_client())
+    return f"{len(index.by_uri)} questions"
+
+
+def _warm_english_ppr() -> None:
+    from services.ppr_recommender_service import get_ppr_service
+    get_ppr_service()
+
+
+def _warm_chinese_ppr() -> None:
+    from services.chinese_ppr_recommender_service import get_chinese_ppr_service
+    get_chinese_ppr_service()
+
+
+# The ontologies themselves are loaded in startup_event (nothing else loads them); only
+# caches derived from the store, which also build on first use, are warmed here
+warmup = WarmupOrchestrator()
+warmup.add("literacy_cache", _warm_literacy_cache)
+warmup.add("kg_label_index", _warm_label_index)
+warmup.add("kg_prerequisite_index", _warm_prerequisite_index)
+warmup.add("survey_index", _warm_survey_index)
+warmup.add("quest_catalog", _warm_quest_catalog)
+warmup.add("ppr_english", _warm_english_ppr)
+warmup.add("ppr_chinese", _warm_chinese_ppr)
+
+
+def _import_chat_history_file():
+    """Move the legacy chat_history.json into the chat message table (first start only)."""
+    with get_db_session() as db:
+        imported = ChatSessionService.import_history_file(db, CHAT_HISTORY_FILE)
+    if imported:
+        print(f"💬 Imported {imported} message(s) from {CHAT_HISTORY_FILE.name}")
+
 
 @app.on_event("startup")
 async def startup_event():
     print("🚀 Starting Curious Mario API...")
     print("📊 Initializing database...")
     init_db()
+    _import_chat_history_file()
     from backend.database.db import DB_PATH
     print(f"🚀 ACTIVE DATABASE PATH: {DB_PATH}")
     print("✅ Database ready!")
-    
-    # Initialize literacy cache (Anki order + sorted vocab list)
-    try:
-        from .routers.literacy import initialize_literacy_cache
-        initialize_literacy_cache()
-    except ImportError:
-        # Fallback for absolute import
-        from routers.literacy import initialize_literacy_cache
-        initialize_literacy_cache()
-    except Exception as e:
-        print(f"⚠️  Warning: Failed to initialize literacy cache: {e}")
-        # Continue startup even if cache init fails
 
-    # Load quest_full.ttl and pep3_master.ttl into Oxigraph for cognition quest library
+    # Requests query the KG as soon as they are served, so it must be complete first
+    print("📚 Loading ontologies into Oxigraph...")
     try:
-        from database.kg_client import KnowledgeGraphClient
-        quest_path = PROJECT_ROOT / "knowledge_graph" / "quest_full.ttl"
-        pep3_path = PROJECT_ROOT / "knowledge_graph" / "pep3_master.ttl"
-        client = KnowledgeGraphClient()
-        for name, path in [("quest_full.ttl", quest_path), ("pep3_master.ttl", pep3_path)]:
-            if path.exists():
-                client.load_file(str(path))
-                print(f"✅ Loaded {name} into Oxigraph")
-            else:
-                print(f"⚠️  {name} not found at {path}")
-        survey_schema = PROJECT_ROOT / "knowledge_graph" / "ontology" / "survey_schema.ttl"
-        survey_parent = PROJECT_ROOT / "knowledge_graph" / "survey_parent_full.ttl"
-        vbmapp_candidates = [
-            PROJECT_ROOT / "knowledge_graph" / "ontology" / "vbmapp_woven_ontology.ttl",
-            PROJECT_ROOT / "scripts" / "data_extraction" / "vbmapp_woven_ontology.ttl",
-        ]
-        if survey_schema.exists():
-            client.load_file(str(survey_schema))
-            print(f"✅ Loaded survey_schema.ttl into Oxigraph")
-        else:
-            print(f"⚠️  survey_schema.ttl not found at {survey_schema}")
-        loaded_vbmapp = False
-        for vbmapp_path in vbmapp_candidates:
-            if vbmapp_path.exists():
-                client.load_file(str(vbmapp_path))
-                print(f"✅ Loaded {vbmapp_path.name} into Oxigraph")
-                loaded_vbmapp = True
-                break
-        if not loaded_vbmapp:
-            print("⚠️  vbmapp_woven_ontology.ttl not found — survey level filter may return no rows")
-        if survey_parent.exists():
-            client.load_file(str(survey_parent))
-            print(f"✅ Loaded survey_parent_full.ttl into Oxigraph")
-        else:
-            print(f"⚠️  survey_parent_full.ttl not found at {survey_parent}")
+        print(f"✅ Ontologies: {await run_blocking('kg', _load_startup_ontologies)}")
     except Exception as e:
-        print(f"⚠️  Warning: Failed to load quest TTL into Oxigraph: {e}")
+        print(f"⚠️  Ontology load failed: {e}")
+
+    # Caches derived from the database/KG; each also builds on first use, warming just gets there first
+    warmup.start()
+
+
+@app.get("/health/ready")
+async def get_readiness(response: Response):
+    """
+    Per-subsystem warm-up state. Returns 503 until every warm-up task has
+    finished (failed tasks are listed under "degraded"; they load on first use).
+    """
+    status = warmup.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Don't wait for in-flight Anki/LLM calls; their requests are being torn down anyway
+    shutdown_pools(wait=False)
+    close_llm_clients()
 
 
 # CORS middleware for frontend communication
@@ -309,6 +461,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Custom response headers the frontend reads (keyset cursors, query metrics)
+    expose_headers=["X-Next-Before-Id", "X-DB-Queries", "X-DB-Time-Ms"],
 )
 
 # Data models
@@ -322,22 +476,39 @@ app.add_middleware(
 # Ensure data directories exist
 
 
-# Gemini configuration for fallback knowledge lookups
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Gemini configuration for fallback knowledge lookups. google.generativeai takes
+# seconds to import, so the model is built on first use instead of at startup.
 GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL", "models/gemini-3.1-pro-preview")
 _genai_model = None
-if GEMINI_API_KEY:
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        _genai_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-        # Inject Gemini model into cards router
-        cards._set_genai_model(_genai_model)
-    except Exception as exc:
-        print(f"⚠️ Unable to configure Gemini model: {exc}")
-else:
-    print("⚠️ GEMINI_API_KEY not set; falling back to cache-only knowledge lookup.")
+_genai_model_loaded = False
+_genai_model_lock = threading.Lock()
+
+
+def _get_genai_model():
+    global _genai_model, _genai_model_loaded
+    if _genai_model_loaded:
+        return _genai_model
+    with _genai_model_lock:
+        if _genai_model_loaded:
+            return _genai_model
+        api_key = os.getenv("GEMINI_API_KEY")
+        if api_key:
+            try:
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                _genai_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+            except Exception as exc:
+                print(f"⚠️ Unable to configure Gemini model: {exc}")
+        else:
+            print("⚠️ GEMINI_API_KEY not set; falling back to cache-only knowledge lookup.")
+        _genai_model_loaded = True
+    return _genai_model
+
 
-    _word_kp_cache = {}
+# Inject the (lazily configured) Gemini model into cards router
+cards._set_genai_model_provider(_get_genai_model)
+
+_word_kp_cache = {}
 
 def get_llm_client_from_request(request: Request):
     """
@@ -365,11 +536,12 @@ def get_llm_client_from_request(request: Request):
         if api_key:
             print(f"   🚀 Initializing Client -> URL: {base_url} | Key: {api_key[:6]}...***")
             try:
+                from openai import OpenAI
                 return OpenAI(api_key=api_key, base_url=base_url)
             except Exception as e:
                 print(f"Client init failed: {e}")
         return None
-    return _genai_model  # Default fallback
+    return _get_genai_model()  # Default fallback
 
 
 
@@ -425,6 +597,28 @@ async def root():
     return {"message": "Curious Mario API is running"}
 
 
+@app.get("/metrics/pools")
+async def get_pool_metrics():
+    """Queue depth, active workers and wait times of the blocking-I/O thread pools."""
+    return pool_metrics()
+
+
+@app.get("/metrics/llm")
+async def get_llm_metrics():
+    """Per-provider LLM call latency, concurrency and token counters, plus the pooled clients."""
+    return llm_metrics()
+
+
+@app.get("/metrics/db")
+async def get_db_metrics():
+    """SQLite query counts/latency since startup and connection pool occupancy."""
+    return {
+        "queries": global_query_stats.as_dict(),
+        "engine_pool": db_engine.pool.status(),
+        "raw_pools": sqlite_pool_status(),
+    }
+
+
 # Configuration endpoints
 @app.get("/config/models")
 async def get_available_models():
@@ -444,7 +638,8 @@ async def get_available_models():
 
 # AnkiConnect test endpoint
 @app.get("/anki/test")
-async def test_anki_connection():
+@offload("anki")
+def test_anki_connection():
     """Test connection to AnkiConnect."""
     try:
         import sys
@@ -474,7 +669,8 @@ async def test_anki_connection():
 
 # Get available Anki decks
 @app.get("/anki/decks")
-async def get_anki_decks():
+@offload("anki")
+def get_anki_decks():
     """Get list of all available Anki decks."""
     try:
         import sys
@@ -500,7 +696,8 @@ async def get_anki_decks():
 
 # Get available Anki note types
 @app.get("/anki/note-types")
-async def get_anki_note_types():
+@offload("anki")
+def get_anki_note_types():
     """Get list of all available Anki note types."""
     try:
         import sys
@@ -528,7 +725,8 @@ async def get_anki_note_types():
 
 # Push grouped examples to Anki (CUMA - Grouped Interactive Cloze)
 @app.post("/anki/push-grouped-examples")
-async def push_grouped_examples_to_anki(request: Dict[str, Any]):
+@offload("anki")
+def push_grouped_examples_to_anki(request: Dict[str, Any]):
     """
     Push generated vocabulary/grammar examples to Anki using the Grouped Interactive Cloze note type.
 
@@ -589,7 +787,8 @@ async def push_grouped_examples_to_anki(request: Dict[str, Any]):
 
 # Anki sync endpoint
 @app.post("/anki/sync")
-async def sync_to_anki(request: Dict[str, Any], db: Session = Depends(get_db)):
+@offload("anki")
+def sync_to_anki(request: Dict[str, Any], db: Session = Depends(get_db)):
     """
     Sync cards to Anki via AnkiConnect.
     Handles media processing: uploads local images to Anki and rewrites HTML src paths.
@@ -628,12 +827,13 @@ async def sync_to_anki(request: Dict[str, Any], db: Session = Depends(get_db)):
             except (ValueError, TypeError):
                 pass
         
-        # Query cards from database
-        if card_id_ints:
-            db_cards = db.query(ApprovedCard).filter(ApprovedCard.id.in_(card_id_ints)).all()
-        else:
-            # Fallback: query all and filter by string ID
-            db_cards = db.query(ApprovedCard).all()
+        # Query cards from database (IDs are integers, so a non-numeric ID can never match;
+        # don't scan the whole table for it)
+        db_cards = []
+        for start in range(0, len(card_id_ints), 500):
+            db_cards.extend(
+                db.query(ApprovedCard).filter(ApprovedCard.id.in_(card_id_ints[start:start + 500])).all()
+            )
         
         # Format cards and filter by ID
         all_cards_flat = [format_card_flat(card) for card in db_cards]
@@ -1842,7 +2042,8 @@ async def get_character_recognition_notes(profile_id: str):
         raise HTTPException(status_code=500, detail=f"Error loading character recognition notes: {str(e)}")
 
 @app.post("/character-recognition/sync")
-async def sync_character_recognition_notes(request: Dict[str, Any]):
+@offload("anki")
+def sync_character_recognition_notes(request: Dict[str, Any]):
     """
     Sync character recognition notes to Anki.
     Creates 7 cards per note:
@@ -2013,50 +2214,14 @@ async def sync_character_recognition_notes(request: Dict[str, Any]):
                     all_image_filenames.update(extract_image_filenames_from_html(field_value))
         
         # Upload each image file to Anki with Pure Hash naming
-        import base64
-        import hashlib
-        
-        # Track file hashes to avoid uploading duplicates
-        uploaded_hashes = {}  # Maps content_hash -> anki_filename (for duplicate detection)
-        
+        image_sources = {}
         for original_filename in all_image_filenames:
             source_file = media_dir / original_filename
             if not source_file.exists():
                 print(f"⚠️  Warning: Media file not found: {original_filename}")
                 continue
-            
-            try:
-                # Read file
-                with open(source_file, 'rb') as f:
-                    file_data = f.read()
-                
-                # Calculate content hash to detect duplicates
-                content_hash = hashlib.md5(file_data).hexdigest()
-                
-                # Check if we've already uploaded this exact file
-                if content_hash in uploaded_hashes:
-                    # Reuse the existing Anki filename
-                    anki_media_map[original_filename] = uploaded_hashes[content_hash]
-                    print(f"  ℹ️  Reusing {original_filename} → {uploaded_hashes[content_hash]} (duplicate)")
-                    continue
-                
-                # Generate Pure Hash filename (no prefixes)
-                # If filename matches hash pattern, use as-is; otherwise generate from content
-                anki_filename = get_pure_hash_filename(original_filename, file_data)
-                
-                # Encode to base64 for AnkiConnect
-                base64_data = base64.b64encode(file_data).decode('utf-8')
-                
-                # Upload to Anki
-                stored_filename = anki.store_media_file(anki_filename, base64_data)
-                anki_media_map[original_filename] = stored_filename
-                uploaded_hashes[content_hash] = stored_filename
-                print(f"  ✅ Uploaded {original_filename} → {stored_filename}")
-                
-            except Exception as e:
-                print(f"  ⚠️  Failed to upload {original_filename}: {e}")
-                # Fallback: use original filename (might cause conflicts, but better than nothing)
-                anki_media_map[original_filename] = original_filename
+            image_sources[original_filename] = source_file
+        anki_media_map.update(upload_media_to_anki(anki, image_sources, "image"))
         
         # Step 2: Update HTML to reference Anki media filenames (just filename, no path)
         # Anki does NOT support subdirectories - all files must be in collection.media root
@@ -2203,31 +2368,8 @@ async def mark_character_mastered(request: Dict[str, Any]):
         
         db = next(get_db())
         try:
-            from database.models import MasteredWord
-            
-            added_count = 0
-            for char in characters:
-                if not char or not char.strip():
-                    continue
-                
-                char_clean = char.strip()
-                
-                # Check if already mastered
-                existing = db.query(MasteredWord).filter_by(
-                    profile_id=profile_id,
-                    word=char_clean,
-                    language='character'
-                ).first()
-                
-                if not existing:
-                    mastered_char = MasteredWord(
-                        profile_id=profile_id,
-                        word=char_clean,
-                        language='character'
-                    )
-                    db.add(mastered_char)
-                    added_count += 1
-            
+            # One upsert; characters already mastered are skipped by the unique index
+            added_count = ProfileService.add_mastered_words(db, profile_id, characters, 'character')
             db.commit()
             
             return {
@@ -2393,7 +2535,8 @@ async def add_custom_word_recognition(
 
 
 @app.post("/chinese-naming/sync")
-async def sync_chinese_naming_notes(request: Dict[str, Any]):
+@offload("anki")
+def sync_chinese_naming_notes(request: Dict[str, Any]):
     """
     Sync Chinese naming notes to Anki using "CUMA - Chinese Naming v2" note type.
     
@@ -2412,8 +2555,6 @@ async def sync_chinese_naming_notes(request: Dict[str, Any]):
         import sys
         import os
         import re
-        import base64
-        import hashlib
         import random
         sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
         from anki_integration.anki_connect import AnkiConnect
@@ -2475,7 +2616,6 @@ async def sync_chinese_naming_notes(request: Dict[str, Any]):
         # Hash-based storage: Files are in content/media/objects/
         MEDIA_DIR = PROJECT_ROOT / "content" / "media" / "objects"
         anki_media_map = {}
-        uploaded_hashes = {}
         
         # Collect all media filenames (images and audio)
         all_image_filenames = set()
@@ -2498,67 +2638,24 @@ async def sync_chinese_naming_notes(request: Dict[str, Any]):
                         audio_filename = match.group(1)
                         all_audio_filenames.add(audio_filename)
         
-        # Upload images
+        # Upload images and audio
+        image_sources = {}
         for original_filename in all_image_filenames:
             source_file = MEDIA_DIR / original_filename
             if not source_file.exists():
                 print(f"⚠️  Warning: Image file not found: {original_filename}")
                 continue
-            
-            try:
-                with open(source_file, 'rb') as f:
-                    file_data = f.read()
-                
-                content_hash = hashlib.md5(file_data).hexdigest()
-                
-                if content_hash in uploaded_hashes:
-                    anki_media_map[original_filename] = uploaded_hashes[content_hash]
-                    print(f"  ℹ️  Reusing {original_filename} → {uploaded_hashes[content_hash]} (duplicate)")
-                    continue
-                
-                # Generate Pure Hash filename (no prefixes)
-                anki_filename = get_pure_hash_filename(original_filename, file_data)
-                
-                base64_data = base64.b64encode(file_data).decode('utf-8')
-                stored_filename = anki.store_media_file(anki_filename, base64_data)
-                anki_media_map[original_filename] = stored_filename
-                uploaded_hashes[content_hash] = stored_filename
-                print(f"  ✅ Uploaded image: {original_filename} → {stored_filename}")
-                
-            except Exception as e:
-                print(f"  ⚠️  Failed to upload {original_filename}: {e}")
-                anki_media_map[original_filename] = original_filename
+            image_sources[original_filename] = source_file
+        anki_media_map.update(upload_media_to_anki(anki, image_sources, "image"))
         
-        # Upload audio files
+        audio_sources = {}
         for original_filename in all_audio_filenames:
             source_file = MEDIA_DIR / original_filename
             if not source_file.exists():
                 print(f"⚠️  Warning: Audio file not found: {original_filename}")
                 continue
-            
-            try:
-                with open(source_file, 'rb') as f:
-                    file_data = f.read()
-                
-                content_hash = hashlib.md5(file_data).hexdigest()
-                
-                if content_hash in uploaded_hashes:
-                    anki_media_map[original_filename] = uploaded_hashes[content_hash]
-                    print(f"  ℹ️  Reusing {original_filename} → {uploaded_hashes[content_hash]} (duplicate)")
-                    continue
-                
-                # Generate Pure Hash filename (no prefixes)
-                anki_filename = get_pure_hash_filename(original_filename, file_data)
-                
-                base64_data = base64.b64encode(file_data).decode('utf-8')
-                stored_filename = anki.store_media_file(anki_filename, base64_data)
-                anki_media_map[original_filename] = stored_filename
-                uploaded_hashes[content_hash] = stored_filename
-                print(f"  ✅ Uploaded audio: {original_filename} → {stored_filename}")
-                
-            except Exception as e:
-                print(f"  ⚠️  Failed to upload {original_filename}: {e}")
-                anki_media_map[original_filename] = original_filename
+            audio_sources[original_filename] = source_file
+        anki_media_map.update(upload_media_to_anki(anki, audio_sources, "audio"))
         
         # Update media references (images and audio)
         def update_media_references(content: str) -> str:
@@ -2922,7 +3019,8 @@ async def get_typing_course():
 
 
 @app.post("/api/typing-course/sync")
-async def sync_typing_course_to_anki(request: Dict[str, Any] = None):
+@offload("anki")
+def sync_typing_course_to_anki(request: Dict[str, Any] = None):
     """
     Sync typing course to Anki via Anki-Connect.
     First ensures Anki environment is set up, then syncs all notes.
@@ -3287,7 +3385,8 @@ def get_pinyin_sort_key(note_dict):
 
 print("🔥🔥🔥 LOADING PINYIN ROUTE 🔥🔥🔥")
 @app.post("/pinyin/sync")
-async def sync_pinyin_notes(request: Dict[str, Any]):
+@offload("anki")
+def sync_pinyin_notes(request: Dict[str, Any]):
     """
     Sync pinyin notes (elements and/or syllables) to Anki.
     Combines both types in a single deck, ordered by 5-stage curriculum, then by display_order.
@@ -3395,15 +3494,12 @@ async def sync_pinyin_notes(request: Dict[str, Any]):
             raise HTTPException(status_code=500, detail="AnkiConnect not available")
         
         # Handle media files (images and audio)
-        import base64
-        import hashlib
         import re
         
         # Pure Hash strategy: Use 12-char hash filenames without prefixes
         # Hash-based storage: Files are in content/media/objects/
         MEDIA_DIR = PROJECT_ROOT / "content" / "media" / "objects"
         anki_media_map = {}  # Maps original filename to Anki media filename
-        uploaded_hashes = {}  # Maps content_hash -> anki_filename (for duplicate detection)
         
         # Collect all media filenames (images and audio) from all notes
         all_image_filenames = set()
@@ -3449,95 +3545,36 @@ async def sync_pinyin_notes(request: Dict[str, Any]):
         for note in all_notes:
             extract_media_from_fields(note['fields'])
         
-        # Upload image files
-        for original_filename in all_image_filenames:
+        def find_media_file(original_filename: str) -> Optional[Path]:
             # Try multiple possible locations
             possible_paths = [
                 MEDIA_DIR / original_filename,
                 PROJECT_ROOT / "media" / original_filename,
                 PROJECT_ROOT / "media" / "pinyin" / original_filename,
             ]
-            
-            source_file = None
             for path in possible_paths:
                 if path.exists():
-                    source_file = path
-                    break
-            
+                    return path
+            return None
+        
+        # Upload image and audio files
+        image_sources = {}
+        for original_filename in all_image_filenames:
+            source_file = find_media_file(original_filename)
             if not source_file:
                 print(f"⚠️  Warning: Image file not found: {original_filename}")
                 continue
-            
-            try:
-                with open(source_file, 'rb') as f:
-                    file_data = f.read()
-                
-                content_hash = hashlib.md5(file_data).hexdigest()
-                
-                # Check if we've already uploaded this file (by content hash)
-                if content_hash in uploaded_hashes:
-                    anki_media_map[original_filename] = uploaded_hashes[content_hash]
-                    print(f"  ℹ️  Reusing {original_filename} → {uploaded_hashes[content_hash]} (duplicate)")
-                    continue
-                
-                # Generate Pure Hash filename (no prefixes)
-                anki_filename = get_pure_hash_filename(original_filename, file_data)
-                
-                # Upload to Anki
-                base64_data = base64.b64encode(file_data).decode('utf-8')
-                stored_filename = anki.store_media_file(anki_filename, base64_data)
-                anki_media_map[original_filename] = stored_filename
-                uploaded_hashes[content_hash] = stored_filename
-                print(f"  ✅ Uploaded image: {original_filename} → {stored_filename}")
-                
-            except Exception as e:
-                print(f"  ⚠️  Failed to upload {original_filename}: {e}")
-                anki_media_map[original_filename] = original_filename
+            image_sources[original_filename] = source_file
+        anki_media_map.update(upload_media_to_anki(anki, image_sources, "image"))
         
-        # Upload audio files
+        audio_sources = {}
         for original_filename in all_audio_filenames:
-            # Try multiple possible locations
-            possible_paths = [
-                MEDIA_DIR / original_filename,
-                PROJECT_ROOT / "media" / original_filename,
-                PROJECT_ROOT / "media" / "pinyin" / original_filename,
-            ]
-            
-            source_file = None
-            for path in possible_paths:
-                if path.exists():
-                    source_file = path
-                    break
-            
+            source_file = find_media_file(original_filename)
             if not source_file:
                 print(f"⚠️  Warning: Audio file not found: {original_filename}")
                 continue
-            
-            try:
-                with open(source_file, 'rb') as f:
-                    file_data = f.read()
-                
-                content_hash = hashlib.md5(file_data).hexdigest()
-                
-                # Check if we've already uploaded this file
-                if content_hash in uploaded_hashes:
-                    anki_media_map[original_filename] = uploaded_hashes[content_hash]
-                    print(f"  ℹ️  Reusing {original_filename} → {uploaded_hashes[content_hash]} (duplicate)")
-                    continue
-                
-                # Generate Pure Hash filename (no prefixes)
-                anki_filename = get_pure_hash_filename(original_filename, file_data)
-                
-                # Upload to Anki
-                base64_data = base64.b64encode(file_data).decode('utf-8')
-                stored_filename = anki.store_media_file(anki_filename, base64_data)
-                anki_media_map[original_filename] = stored_filename
-                uploaded_hashes[content_hash] = stored_filename
-                print(f"  ✅ Uploaded audio: {original_filename} → {stored_filename}")
-                
-            except Exception as e:
-                print(f"  ⚠️  Failed to upload {original_filename}: {e}")
-                anki_media_map[original_filename] = original_filename
+            audio_sources[original_filename] = source_file
+        anki_media_map.update(upload_media_to_anki(anki, audio_sources, "audio"))
         
         # Function to normalize and update media references in fields
         def normalize_and_update_media(field_name: str, field_value: str) -> str:
@@ -3725,10 +3762,9 @@ async def get_pinyin_for_word(word: str):
         
         # Use get_word_knowledge but run it in executor with timeout to prevent hanging
         # This includes KG lookup, cache, and LLM fallback if needed
-        loop = asyncio.get_event_loop()
         try:
             word_info = await asyncio.wait_for(
-                loop.run_in_executor(None, lambda: get_word_knowledge(word_stripped)),
+                run_blocking("kg", get_word_knowledge, word_stripped),
                 timeout=8.0  # 8 second timeout for LLM call if needed
             )
         except asyncio.TimeoutError:
@@ -3954,6 +3990,26 @@ class RootImageRedirectMiddleware(BaseHTTPMiddleware):
 
 app.add_middleware(RootImageRedirectMiddleware)
 
+
+# Requests issuing more SQLite queries than this are logged (likely N+1 patterns)
+DB_QUERY_WARN_THRESHOLD = int(os.getenv("DB_QUERY_WARN_THRESHOLD", "50"))
+
+
+class DBQueryMetricsMiddleware(BaseHTTPMiddleware):
+    """Count SQLite queries per request and report them in X-DB-Queries / X-DB-Time-Ms."""
+
+    async def dispatch(self, request: Request, call_next):
+        with track_queries() as stats:
+            response = await call_next(request)
+        if stats.count:
+            response.headers["X-DB-Queries"] = str(stats.count)
+            response.headers["X-DB-Time-Ms"] = f"{stats.total_ms:.1f}"
+            if stats.count > DB_QUERY_WARN_THRESHOLD:
+                print(f"⚠️  {request.method} {request.url.path}: {stats.count} DB queries ({stats.total_ms:.1f} ms)")
+        return response
+
+app.add_middleware(DBQueryMetricsMiddleware)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -12,13 +12,15 @@ backend_path = os.path.abspath(os.path.join(current_dir, "../../.."))
 if backend_path not in sys.path:
     sys.path.insert(0, backend_path)
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from backend.database.db import get_db
 from backend.database.models import ApprovedCard
+from backend.database.services import CardService
 from ..core.config import CARDS_FILE
+from ..core.executors import run_blocking
 from ..utils.common import load_json_file, save_json_file, split_tag_annotations
 
 logger = logging.getLogger(__name__)
@@ -26,10 +28,21 @@ router = APIRouter()
 
 # --- GLOBALS ---
 _genai_model = None
+_genai_model_provider = None
 def _set_genai_model(model):
     global _genai_model
     _genai_model = model
 
+def _set_genai_model_provider(provider):
+    """Register a callable returning the Gemini model (configured on first use)."""
+    global _genai_model_provider
+    _genai_model_provider = provider
+
+def _get_genai_model():
+    if _genai_model is None and _genai_model_provider is not None:
+        return _genai_model_provider()
+    return _genai_model
+
 # --- SCHEMAS ---
 # We use a flexible Dict return type to support flattening
 class UpdateCardRequest(BaseModel):
@@ -106,11 +119,29 @@ def format_card_flat(card):
 
 # --- ENDPOINTS ---
 
+def _set_next_cursor(response: Response, cards: List[ApprovedCard], limit: Optional[int]) -> None:
+    """Expose the keyset cursor for the next page (only when the page is full)."""
+    if limit is not None and len(cards) == limit:
+        response.headers["X-Next-Before-Id"] = str(cards[-1].id)
+
 @router.get("/cards", response_model=List[Dict[str, Any]])
-def get_all_cards(db: Session = Depends(get_db)):
-    """Get all cards from database, ordered by ID descending (newest first)."""
+def get_all_cards(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    before_id: Optional[int] = None,
+    status: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Get cards from database, ordered by ID descending (newest first).
+
+    Without `limit` every matching card is returned (status / before_id still
+    apply). With `limit`, one page is returned and
+    the X-Next-Before-Id header holds the `before_id` for the next page.
+    """
     try:
-        cards = db.query(ApprovedCard).order_by(ApprovedCard.id.desc()).all()
+        cards = CardService.list_page(db, limit=limit, before_id=before_id, status=status)
+        _set_next_cursor(response, cards, limit)
         result = []
         for card in cards:
             flat_card = format_card_flat(card)
@@ -137,19 +168,42 @@ def get_all_cards(db: Session = Depends(get_db)):
         return []
 
 @router.get("/cards/curation/{profile_id}", response_model=List[Dict[str, Any]])
-def get_cards_for_curation(profile_id: str, db: Session = Depends(get_db)):
-    """Target endpoint returning FLAT objects."""
+def get_cards_for_curation(
+    profile_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    before_id: Optional[int] = None,
+    status: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Target endpoint returning FLAT objects, newest first.
+
+    Supports the same keyset paging as GET /cards (limit / before_id / status,
+    next page cursor in X-Next-Before-Id).
+    """
     try:
-        query = db.query(ApprovedCard)
-        cards = query.filter(ApprovedCard.profile_id == profile_id)\
-                     .order_by(ApprovedCard.id.desc()).all()  # Order by ID descending (newest first)
-        
-        if not cards:
+        cards = CardService.list_page(
+            db, profile_id=profile_id, limit=limit, before_id=before_id, status=status
+        )
+
+        # Legacy fallback: match by display name when the exact profile has no cards
+        # (later pages of a fallback listing arrive with before_id set)
+        if not cards and (
+            before_id is None
+            or db.query(ApprovedCard.id).filter(ApprovedCard.profile_id == profile_id).first() is None
+        ):
             simple_name = profile_id.split('(')[0].strip()
             if simple_name:
-                cards = query.filter(ApprovedCard.profile_id.ilike(f"%{simple_name}%"))\
-                             .order_by(ApprovedCard.id.desc()).all()
+                query = db.query(ApprovedCard).filter(ApprovedCard.profile_id.ilike(f"%{simple_name}%"))
+                if status is not None:
+                    query = query.filter(ApprovedCard.status == status)
+                if before_id is not None:
+                    query = query.filter(ApprovedCard.id < before_id)
+                query = query.order_by(ApprovedCard.id.desc())
+                cards = query.limit(limit).all() if limit is not None else query.all()
 
+        _set_next_cursor(response, cards, limit)
         return [format_card_flat(c) for c in cards]
     except Exception as e:
         logger.error(f"Error: {e}")
@@ -254,7 +308,8 @@ def delete_card(card_id: str, db: Session = Depends(get_db)):
 
 @router.post("/cards/{card_id}/image")
 async def generate_card_image(card_id: int, request: ImageGenerationRequest, db: Session = Depends(get_db)):
-    if not _genai_model:
+    model = await run_blocking("llm", _get_genai_model)  # First call imports the SDK
+    if not model:
          raise HTTPException(status_code=503, detail="Model missing")
 
     card = db.query(ApprovedCard).filter(ApprovedCard.id == card_id).first()
@@ -268,7 +323,7 @@ async def generate_card_image(card_id: int, request: ImageGenerationRequest, db:
         clean_text = re.sub(r'\[\[c\d+::(.*?)(::.*?)?\]\]', r'\1', text_to_draw)
         
         prompt = request.prompt or f"Simple illustration: {clean_text}"
-        _genai_model.generate_content(prompt)
+        await run_blocking("llm", model.generate_content, prompt)
         
         image_html = f'<img src="https://via.placeholder.com/300?text=AI+Image" alt="Generated">'
         
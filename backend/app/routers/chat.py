@@ -1,6 +1,6 @@
-from fastapi import APIRouter, HTTPException, Request, Depends, status
+from fastapi import APIRouter, HTTPException, Request, Response, Depends, status
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any, Set
 import json
@@ -19,7 +19,8 @@ from pathlib import Path
 
 # Adjust path to include backend root if needed
 sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
-from backend.database.db import get_db
+from backend.database.db import get_db, SessionLocal
+from backend.database.models import GLOBAL_CHAT_SESSION_ID
 from backend.database.services import ChatSessionService
 
 # Database models (optional, for topic history endpoint)
@@ -31,20 +32,19 @@ except ImportError:
 # Internal imports
 from ..core.config import (
     PROJECT_ROOT,
-    CHAT_HISTORY_FILE,
     PROFILES_FILE,
     CARDS_FILE,
     PROMPT_TEMPLATES_FILE,
     MODEL_CONFIG_FILE
 )
 from ..utils.common import (
-    load_json_file,
-    save_json_file,
     normalize_to_slug,
     split_tag_annotations,
     contains_chinese_chars
 )
 from ..utils.pinyin_utils import get_word_knowledge, get_word_image_map
+from ..core.executors import iterate_blocking, offload, run_blocking
+from backend.app.core.llm_clients import CancelToken
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -387,16 +387,97 @@ def parse_context_tags(content: str, mentions: List[str]) -> List[Dict[str, Any]
     logger.info(f"📋 Final context_tags count: {len(context_tags)}")
     return context_tags
 
+def _set_next_cursor(response: Response, page: list, limit: Optional[int]) -> None:
+    """Expose the keyset cursor for the next (older) page when this one is full."""
+    if limit and len(page) == limit:
+        response.headers["X-Next-Before-Id"] = str(page[-1].id)
+
+
+def _append_global_message(data: Dict[str, Any]) -> None:
+    """Append one message (ChatMessage.dict()) to the global chat history (blocking)."""
+    extra = {k: v for k, v in data.items() if k not in ("role", "content", "timestamp", "config")}
+    db = SessionLocal()
+    try:
+        ChatSessionService.append_message(
+            db, GLOBAL_CHAT_SESSION_ID, data["role"], data["content"], data.get("timestamp"), extra
+        )
+    finally:
+        db.close()
+
+
+def _recent_global_history(limit: int) -> List[Dict[str, Any]]:
+    """Latest `limit` global chat messages, oldest first (blocking)."""
+    db = SessionLocal()
+    try:
+        page = ChatSessionService.list_messages(db, GLOBAL_CHAT_SESSION_ID, limit)
+        return [ChatSessionService.message_to_dict(m) for m in reversed(page)]
+    finally:
+        db.close()
+
+
+def _resolve_child_profile(db: Session, content: str, mentions: List[str]) -> Optional[Dict[str, Any]]:
+    """Profile for the first @mention naming one (id, then indexed name lookup), else the first profile for @roster."""
+    from backend.database.services import ProfileService
+
+    for mention in mentions:
+        mention_type, _, name = mention.lstrip("@").rpartition(":")
+        if mention_type and mention_type.lower() not in ("profile", "child", "roster"):
+            continue  # @word:..., @template:... etc. never name a child
+        # The chat UI sends the profile id (a name slug like "alex-2"), typed mentions a name
+        profile = ProfileService.get_by_id(db, name) or ProfileService.find_by_name(db, name)
+        if profile is not None:
+            return ProfileService.profile_to_dict(db, profile)
+
+    # Fallback: If @roster is used but no name matched, use the first profile
+    if "@roster" in content and Profile is not None:
+        first = db.query(Profile).first()
+        if first:
+            return ProfileService.profile_to_dict(db, first)
+    return None
+
+
+def _assemble_chat_context(content: str, mentions: List[str]):
+    """Context tags, matched child profile and recent history for a chat turn (blocking)."""
+    context_tags = parse_context_tags(content, mentions)
+    db = SessionLocal()
+    try:
+        child_profile = _resolve_child_profile(db, content, mentions)
+    finally:
+        db.close()
+    return context_tags, child_profile, _recent_global_history(5)
+
+
+@lru_cache(maxsize=16)
+def _cached_conversation_handler(card_model: Optional[str], image_model: Optional[str],
+                                 api_key: Optional[str], config_mtime: Optional[int]) -> "ConversationHandler":
+    return ConversationHandler(api_key=api_key, card_model=card_model, image_model=image_model)
+
+
+def _get_conversation_handler(card_model: Optional[str], image_model: Optional[str]) -> "ConversationHandler":
+    """
+    Handlers hold no per-conversation state, so one per model setting is reused across messages.
+    The key also covers GEMINI_API_KEY and model_config.json's mtime, so edits to either take effect.
+    """
+    try:
+        config_mtime = MODEL_CONFIG_FILE.stat().st_mtime_ns
+    except OSError:
+        config_mtime = None
+    return _cached_conversation_handler(card_model, image_model, os.getenv("GEMINI_API_KEY"), config_mtime)
+
+
 @router.get("/chat/topic/history")
-async def get_topic_chat_history(
+def get_topic_chat_history(
+    response: Response,
     topic_id: Optional[str] = None,
     roster_id: Optional[str] = None,
     limit: int = 50,
+    before_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
     """
     Topic-specific chat history endpoint (matches frontend expectations).
-    Returns {messages: [...]} format.
+    Returns {messages: [...]} format, oldest first: the latest `limit` messages,
+    or those before `before_id` (cursor for the next page in X-Next-Before-Id).
     """
     try:
         if not roster_id:
@@ -407,11 +488,10 @@ async def get_topic_chat_history(
         if not roster_id or not topic_id:
             return {"messages": []}
 
-        history = []
-        if ChatSessionService:
-            history = ChatSessionService.get_history(db, topic_id, roster_id)
-            if limit and len(history) > limit:
-                history = history[-limit:]
+        session_id = ChatSessionService.session_id_for(topic_id, roster_id)
+        page = ChatSessionService.list_messages(db, session_id, limit or None, before_id)
+        _set_next_cursor(response, page, limit)
+        history = [ChatSessionService.message_to_dict(m) for m in reversed(page)]
 
         safe_history = []
         for msg in history:
@@ -459,9 +539,19 @@ async def get_topic_chat_history(
         return {"messages": []}
 
 @router.get("/chat/history", response_model=List[ChatMessage])
-async def get_chat_history():
-    """Get chat history."""
-    history = load_json_file(CHAT_HISTORY_FILE, [])
+def get_chat_history(
+    response: Response,
+    limit: int = 200,
+    before_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Get chat history: the latest `limit` messages (or those before `before_id`),
+    oldest first. The cursor for the next older page is in X-Next-Before-Id.
+    """
+    page = ChatSessionService.list_messages(db, GLOBAL_CHAT_SESSION_ID, limit, before_id)
+    _set_next_cursor(response, page, limit)
+    history = [ChatSessionService.message_to_dict(m) for m in reversed(page)]
     # Ensure all messages have mentions array
     for msg in history:
         if "mentions" not in msg or not isinstance(msg.get("mentions"), list):
@@ -474,114 +564,142 @@ async def get_chat_history():
             msg["sources"] = []
     return history
 
+def _card_generation_params(content: str, context_tags: List[Dict[str, Any]],
+                            child_profile: Optional[Dict[str, Any]],
+                            ai_extracted_topic: Optional[str] = None) -> Dict[str, Any]:
+    """AgentService.generate_cards/stream_cards arguments for a chat message (blocking: may load a profile)."""
+    from backend.database.services import ProfileService
+    from backend.database.models import Profile
+
+    # 1. Extract parameters
+    # --- TOPIC EXTRACTION LOGIC ---
+    extracted_topic = None
+    user_message = content
+    
+    # 1. Check for @word: syntax (Legacy/UI)
+    word_match = re.search(r"@word:([\w\-\s]+)", user_message)
+    if word_match:
+        extracted_topic = word_match.group(1).strip()
+    
+    # 2. Check for Quotes (Chat "Teach 'X'")
+    if not extracted_topic:
+        quote_match = re.search(r"['\"](.*?)['\"]", user_message)
+        if quote_match:
+            extracted_topic = quote_match.group(1).strip()
+            
+    # 3. Fallback (Clean cleanup)
+    if not extracted_topic:
+        clean_msg = re.sub(r"(teach|explain|create cards for)\s+(the word|the concept of)?\s*", "", user_message, flags=re.IGNORECASE)
+        extracted_topic = clean_msg.strip()
+    
+    # 4. Use AI-extracted topic as final fallback
+    if not extracted_topic and ai_extracted_topic:
+        extracted_topic = ai_extracted_topic
+        logger.info(f"🎯 Using AI-extracted topic as fallback: '{extracted_topic}'")
+        
+    logger.info(f"🎯 Extracted Topic: '{extracted_topic}'")
+    topic_id = extracted_topic
+
+    # 1. Try to get profile from DB if not passed in
+    if not child_profile:
+        db = SessionLocal()
+        try:
+            db_profile = db.query(Profile).first()
+            if db_profile:
+                child_profile = ProfileService.profile_to_dict(db, db_profile)
+                logger.info(f"👤 Loaded Profile from DB: {child_profile.get('name')}")
+        except Exception as e:
+            logger.error(f"DB Profile Fetch Error: {e}")
+        finally:
+            db.close()
+
+    # Roster/Profile
+    roster_id = "Unknown_Student"
+    if child_profile:
+        roster_id = str(child_profile.get("id") or child_profile.get("name"))
+    
+    # Template
+    template_id = None
+    for tag in context_tags:
+        if tag.get("type") == "template":
+            template_id = tag.get("value")
+            break
+    
+    # Quantity
+    quantity = 3  # Default
+    for tag in context_tags:
+        if tag.get("type") == "quantity":
+            try:
+                quantity = int(tag.get("value"))
+            except (ValueError, TypeError):
+                pass
+    
+    # Extract @word from context_tags (ground truth for target_word/knowledge_point)
+    word_param = None
+    for tag in context_tags:
+        if tag.get("type") == "word":
+            word_param = (tag.get("value") or "").strip()
+            break
+    if not word_param and extracted_topic:
+        word_param = extracted_topic  # Fallback: topic from @word: regex
+
+    return {
+        "topic_id": topic_id,
+        "roster_id": roster_id,
+        "template_id": template_id,
+        "user_instruction": content,
+        "quantity": quantity,
+        "word_param": word_param,
+    }
+
+
+def _card_generation_summary(cards: List[Dict[str, Any]], topic_id: str, template_id: Optional[str]) -> str:
+    card_count = len(cards)
+    if card_count > 0:
+        template_info = f" using template '{template_id}'" if template_id else ""
+        return f"✅ Generated {card_count} cards for '{topic_id}'{template_info}.\n👉 Check 'Card Review' tab."
+    return f"⚠️ Agent could not generate cards for '{topic_id}'. Please try being more specific."
+
+
 async def _handle_card_generation(message: ChatMessage, context_tags: List[Dict[str, Any]], 
                                 child_profile: Dict[str, Any], profiles: List[Dict[str, Any]],
                                 api_key: Optional[str], provider: str, model: Optional[str], 
                                 base_url: Optional[str], ai_extracted_topic: Optional[str] = None) -> str:
     """Handle card generation requests via AgentService (replaces Legacy ContentGenerator)."""
+    # Profile lookup, prompt building and the LLM call all block: keep them off the event loop
+    return await run_blocking(
+        "llm", _generate_chat_cards, message, context_tags, child_profile,
+        api_key, provider, model, base_url, ai_extracted_topic,
+    )
+
+
+def _generate_chat_cards(message: ChatMessage, context_tags: List[Dict[str, Any]],
+                         child_profile: Optional[Dict[str, Any]],
+                         api_key: Optional[str], provider: str, model: Optional[str],
+                         base_url: Optional[str], ai_extracted_topic: Optional[str] = None) -> str:
+    """Blocking body of _handle_card_generation; returns the assistant's reply."""
     try:
         from backend.app.services.agent_service import AgentService
         from backend.database.db import SessionLocal
-        from backend.database.services import ProfileService
-        from backend.database.models import Profile
-        
-        # 1. Extract parameters
-        # --- TOPIC EXTRACTION LOGIC ---
-        extracted_topic = None
-        user_message = message.content
-        
-        # 1. Check for @word: syntax (Legacy/UI)
-        word_match = re.search(r"@word:([\w\-\s]+)", user_message)
-        if word_match:
-            extracted_topic = word_match.group(1).strip()
         
-        # 2. Check for Quotes (Chat "Teach 'X'")
-        if not extracted_topic:
-            quote_match = re.search(r"['\"](.*?)['\"]", user_message)
-            if quote_match:
-                extracted_topic = quote_match.group(1).strip()
-                
-        # 3. Fallback (Clean cleanup)
-        if not extracted_topic:
-            clean_msg = re.sub(r"(teach|explain|create cards for)\s+(the word|the concept of)?\s*", "", user_message, flags=re.IGNORECASE)
-            extracted_topic = clean_msg.strip()
-        
-        # 4. Use AI-extracted topic as final fallback
-        if not extracted_topic and ai_extracted_topic:
-            extracted_topic = ai_extracted_topic
-            logger.info(f"🎯 Using AI-extracted topic as fallback: '{extracted_topic}'")
-            
-        logger.info(f"🎯 Extracted Topic: '{extracted_topic}'")
-        topic_id = extracted_topic
-
-        # 1. Try to get profile from DB if not passed in
-        if not child_profile:
-            db = SessionLocal()
-            try:
-                db_profile = db.query(Profile).first()
-                if db_profile:
-                    child_profile = ProfileService.profile_to_dict(db, db_profile)
-                    logger.info(f"👤 Loaded Profile from DB: {child_profile.get('name')}")
-            except Exception as e:
-                logger.error(f"DB Profile Fetch Error: {e}")
-            finally:
-                db.close()
-
-        # Roster/Profile
-        roster_id = "Unknown_Student"
-        if child_profile:
-            roster_id = str(child_profile.get("id") or child_profile.get("name"))
-        
-        # Template
-        template_id = None
-        for tag in context_tags:
-            if tag.get("type") == "template":
-                template_id = tag.get("value")
-                break
-        
-        # Quantity
-        quantity = 3  # Default
-        for tag in context_tags:
-            if tag.get("type") == "quantity":
-                try:
-                    quantity = int(tag.get("value"))
-                except (ValueError, TypeError):
-                    pass
-        
-        # Extract @word from context_tags (ground truth for target_word/knowledge_point)
-        word_param = None
-        for tag in context_tags:
-            if tag.get("type") == "word":
-                word_param = (tag.get("value") or "").strip()
-                break
-        if not word_param and extracted_topic:
-            word_param = extracted_topic  # Fallback: topic from @word: regex
-        logger.info(f"🤖 Delegate to AgentService: Topic='{topic_id}', @word='{word_param}', Template='{template_id}', Provider='{provider}'")
+        params = _card_generation_params(message.content, context_tags, child_profile, ai_extracted_topic)
+        topic_id, template_id = params["topic_id"], params["template_id"]
+        logger.info(f"🤖 Delegate to AgentService: Topic='{topic_id}', @word='{params['word_param']}', Template='{template_id}', Provider='{provider}'")
 
         # 2. Call AgentService
         db = SessionLocal()
         try:
             cards = AgentService.generate_cards(
-                topic_id=topic_id,
-                roster_id=roster_id,
-                template_id=template_id,
-                user_instruction=message.content,
-                quantity=quantity,
+                **params,
                 db=db,
                 api_key=api_key,
                 provider=provider,
                 model_name=model,
                 base_url=base_url,
-                word_param=word_param
             )
             
             # 3. Create response
-            card_count = len(cards)
-            if card_count > 0:
-                template_info = f" using template '{template_id}'" if template_id else ""
-                response_content = f"✅ Generated {card_count} cards for '{topic_id}'{template_info}.\n👉 Check 'Card Review' tab."
-            else:
-                response_content = f"⚠️ Agent could not generate cards for '{topic_id}'. Please try being more specific."
+            response_content = _card_generation_summary(cards, topic_id, template_id)
         except Exception as e:
             logger.error(f"Agent Error: {e}", exc_info=True)
             response_content = f"Error generating cards: {str(e)}"
@@ -594,57 +712,62 @@ async def _handle_card_generation(message: ChatMessage, context_tags: List[Dict[
         logger.error(f"Card generation error: {e}", exc_info=True)
         return f"I encountered an error generating cards: {str(e)}. Please try again."
 
+def _chat_llm_config(message: ChatMessage, request: Request):
+    """(api_key, provider, model, base_url) for a chat request, from headers or the message config."""
+    api_key = request.headers.get("X-LLM-Key")
+    if not api_key:
+        auth = request.headers.get("Authorization")
+        if auth and auth.startswith("Bearer "):
+            api_key = auth.split(" ")[1]
+        else:
+            api_key = message.config.get("apiKey") if message.config else None
+    
+    base_url = request.headers.get("X-LLM-Base-URL")
+    provider = request.headers.get("X-LLM-Provider", "google").lower()  # Changed default to google
+    model = request.headers.get("X-LLM-Model")
+    
+    # Normalize provider names: "gemini" -> "google"
+    if provider == "gemini":
+        provider = "google"
+    return api_key, provider, model, base_url
+
+
+def _chat_conversation_handler(message: ChatMessage):
+    """The (cached) ConversationHandler for the message's model config, and the base URL it implies."""
+    card_model_raw = message.config.get("card_model") if message.config else None
+    image_model_raw = message.config.get("image_model") if message.config else None
+    
+    base_url = os.getenv("DEEPSEEK_API_BASE", "")
+    
+    card_model = _normalize_model_name(card_model_raw, base_url) if card_model_raw else None
+    image_model = _normalize_model_name(image_model_raw, base_url) if image_model_raw else None
+    
+    if not IntentDetector or not ConversationHandler or not ContentGenerator:
+        raise ImportError("Agent modules not available")
+    
+    return _get_conversation_handler(card_model, image_model), base_url
+
+
 @router.post("/chat", response_model=ChatMessage)
 async def send_message(message: ChatMessage, request: Request):
     try:
-        import sys
-        
         # 1. Capture Credentials & Config from Headers
-        api_key = request.headers.get("X-LLM-Key")
-        if not api_key:
-            auth = request.headers.get("Authorization")
-            if auth and auth.startswith("Bearer "):
-                api_key = auth.split(" ")[1]
-            else:
-                api_key = message.config.get("apiKey") if message.config else None
-        
-        base_url = request.headers.get("X-LLM-Base-URL")
-        provider = request.headers.get("X-LLM-Provider", "google").lower()  # Changed default to google
-        model = request.headers.get("X-LLM-Model")
-        
-        # Normalize provider names: "gemini" -> "google"
-        if provider == "gemini":
-            provider = "google"
+        api_key, provider, model, base_url = _chat_llm_config(message, request)
         
-        # Save user message
-        history = load_json_file(CHAT_HISTORY_FILE, [])
-        history.append(message.dict())
-        save_json_file(CHAT_HISTORY_FILE, history)
+        # Save user message (one INSERT; the history is never rewritten)
+        await run_blocking("db", _append_global_message, message.dict())
         
         try:
             # Initialize handlers
-            card_model_raw = message.config.get("card_model") if message.config else None
-            image_model_raw = message.config.get("image_model") if message.config else None
-            
-            base_url = os.getenv("DEEPSEEK_API_BASE", "")
-            
-            card_model = _normalize_model_name(card_model_raw, base_url) if card_model_raw else None
-            image_model = _normalize_model_name(image_model_raw, base_url) if image_model_raw else None
-            
-            if not IntentDetector or not ConversationHandler or not ContentGenerator:
-                raise ImportError("Agent modules not available")
-            
-            conversation_handler = ConversationHandler(card_model=card_model, image_model=image_model)
-            
-            context_tags = parse_context_tags(message.content, message.mentions)
+            conversation_handler, base_url = _chat_conversation_handler(message)
             
-            # 1. Detect Intent (Pass credentials to the router)
-            # We use the explicit static method now, passing the key/provider we extracted earlier
-            intent_result = IntentDetector.detect_intent(
-                message=message.content, 
-                api_key=api_key, 
-                provider=provider
+            # 1. Intent detection (keyword rules, else an LLM round-trip) runs concurrently
+            # with context assembly (tags, profile lookup, recent history) instead of before it
+            intent_result, (context_tags, child_profile, history) = await asyncio.gather(
+                run_blocking("llm", IntentDetector.detect_intent, message.content, api_key, provider),
+                run_blocking("db", _assemble_chat_context, message.content, message.mentions),
             )
+            profiles = [] # Legacy compatibility
             
             intent_type = intent_result["intent"]
             confidence = intent_result["confidence"]
@@ -653,41 +776,17 @@ async def send_message(message: ChatMessage, request: Request):
             
             logger.info(f"INTENT: {intent_type.value} ({confidence}) | AI Topic: {ai_extracted_topic}")
             
-            # Match profile
-            child_profile = None
-            
-            # LOAD FROM DB INSTEAD OF JSON
-            from backend.database.db import SessionLocal
-            from backend.database.services import ProfileService
-            from backend.database.models import Profile
-
-            db = SessionLocal()
-            profiles = [] # Legacy compatibility
-            try:
-                # 1. Try to match specific mention
-                all_profiles = db.query(Profile).all()
-                for mention in message.mentions:
-                    for p in all_profiles:
-                        if p.name.lower() in mention.lower() or mention.lower() in p.name.lower():
-                            child_profile = ProfileService.profile_to_dict(db, p)
-                            break
-                    if child_profile: break
-                
-                # 2. Fallback: If @roster is used but no name matched, use the first profile
-                if not child_profile and "@roster" in message.content:
-                    first = db.query(Profile).first()
-                    if first:
-                        child_profile = ProfileService.profile_to_dict(db, first)
-            finally:
-                db.close()
-            
             # Handle intents
             if intent_type == IntentType.CONVERSATION:
-                response_content = conversation_handler.handle_conversation(
-                    message=message.content,
-                    context_tags=context_tags,
-                    child_profile=child_profile,
-                    chat_history=history[-5:]
+                response_content = await run_blocking(
+                    "llm",
+                    partial(
+                        conversation_handler.handle_conversation,
+                        message=message.content,
+                        context_tags=context_tags,
+                        child_profile=child_profile,
+                        chat_history=history[-5:],
+                    ),
                 )
             elif intent_type == IntentType.CARD_GENERATION:
                 # UNIFIED ROUTE: All card generation goes through AgentService
@@ -701,11 +800,15 @@ async def send_message(message: ChatMessage, request: Request):
                     ai_extracted_topic=ai_extracted_topic  # Pass AI-extracted topic as fallback
                 )
             else:
-                response_content = conversation_handler.handle_conversation(
-                    message=message.content,
-                    context_tags=context_tags,
-                    child_profile=child_profile,
-                    chat_history=history[-5:]
+                response_content = await run_blocking(
+                    "llm",
+                    partial(
+                        conversation_handler.handle_conversation,
+                        message=message.content,
+                        context_tags=context_tags,
+                        child_profile=child_profile,
+                        chat_history=history[-5:],
+                    ),
                 )
                 
         except ImportError as e:
@@ -724,12 +827,142 @@ async def send_message(message: ChatMessage, request: Request):
         mentions=message.mentions
     )
     
-    history = load_json_file(CHAT_HISTORY_FILE, [])
-    history.append(response.dict())
-    save_json_file(CHAT_HISTORY_FILE, history)
+    await run_blocking("db", _append_global_message, response.dict())
     
     return response
 
+# --- Streaming (server-sent events) ---
+#
+# POST /chat/stream and /agent/generate/stream send the reply as it is generated:
+#   event: intent  {"intent": "...", "confidence": ...}  /chat/stream only: the detected intent, before any token
+#   event: token   {"text": "..."}          one LLM delta
+#   event: card    {...staged card...}      a card saved as soon as its JSON object is complete
+#   event: done    final message            same body as the non-streaming endpoint
+#   event: error   {"detail": "..."}          ends the stream; a partial reply is not saved
+#   event: cancelled {}                       ends the stream after a cancel
+# Disconnecting aborts the upstream LLM request.  Clients may also pass ?stream_id=...:
+# starting another stream with the same id (a resubmit) or POST /chat/stream/{id}/cancel
+# cancels the earlier one.
+
+_active_streams: Dict[str, CancelToken] = {}
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _register_stream(stream_id: Optional[str]) -> CancelToken:
+    token = CancelToken()
+    if stream_id:
+        previous = _active_streams.get(stream_id)
+        if previous is not None:
+            previous.cancel()
+        _active_streams[stream_id] = token
+    return token
+
+
+def _release_stream(stream_id: Optional[str], token: CancelToken) -> None:
+    if stream_id and _active_streams.get(stream_id) is token:
+        del _active_streams[stream_id]
+
+
+def _stream_agent_cards(params: Dict[str, Any], cancel: CancelToken, **llm_config: Any):
+    """AgentService.stream_cards with its own session (runs entirely on one pool thread)."""
+    from backend.app.services.agent_service import AgentService
+
+    db = SessionLocal()
+    try:
+        yield from AgentService.stream_cards(**params, db=db, cancel=cancel, **llm_config)
+    finally:
+        db.close()
+
+
+@router.post("/chat/stream/{stream_id}/cancel")
+async def cancel_stream(stream_id: str):
+    token = _active_streams.pop(stream_id, None)
+    if token is not None:
+        token.cancel()
+    return {"cancelled": token is not None}
+
+
+@router.post("/chat/stream")
+async def stream_message(message: ChatMessage, request: Request, stream_id: Optional[str] = None):
+    """Server-sent-events variant of POST /chat; the done event carries the saved assistant message."""
+    api_key, provider, model, base_url = _chat_llm_config(message, request)
+    token = _register_stream(stream_id)
+
+    async def events():
+        try:
+            await run_blocking("db", _append_global_message, message.dict())
+            try:
+                conversation_handler, handler_base_url = _chat_conversation_handler(message)
+                intent_result, (context_tags, child_profile, history) = await asyncio.gather(
+                    run_blocking("llm", IntentDetector.detect_intent, message.content, api_key, provider),
+                    run_blocking("db", _assemble_chat_context, message.content, message.mentions),
+                )
+                intent_type = intent_result["intent"]
+                logger.info(f"INTENT: {intent_type.value} ({intent_result['confidence']}) | streaming")
+                yield _sse("intent", {"intent": intent_type.value, "confidence": intent_result["confidence"]})
+
+                if intent_type == IntentType.CARD_GENERATION:
+                    params = await run_blocking(
+                        "db", _card_generation_params, message.content, context_tags, child_profile,
+                        intent_result.get("extracted_topic"),
+                    )
+                    cards: List[Dict[str, Any]] = []
+                    card_stream = partial(
+                        _stream_agent_cards, params, token,
+                        api_key=api_key, provider=provider, model_name=model, base_url=handler_base_url,
+                    )
+                    async for kind, value in iterate_blocking("llm", card_stream, token.cancel):
+                        if kind == "done":
+                            cards = value
+                        else:
+                            yield _sse(kind, {"text": value} if kind == "token" else value)
+                    response_content = _card_generation_summary(cards, params["topic_id"], params["template_id"])
+                else:
+                    parts: List[str] = []
+                    reply_stream = partial(
+                        conversation_handler.stream_conversation,
+                        message=message.content,
+                        context_tags=context_tags,
+                        child_profile=child_profile,
+                        chat_history=history[-5:],
+                        cancel=token,
+                    )
+                    async for delta in iterate_blocking("llm", reply_stream, token.cancel):
+                        parts.append(delta)
+                        yield _sse("token", {"text": delta})
+                    response_content = "".join(parts)
+            except ImportError as e:
+                logger.error(f"Agent import error: {e}")
+                yield _sse("error", {"detail": f"Error: Agent modules could not be loaded. {str(e)}"})
+                return
+        except Exception as e:
+            # Cancelling aborts the upstream read, which surfaces here; report it as cancelled only
+            if not token.cancelled:
+                logger.error(f"Chat stream error: {e}", exc_info=True)
+                yield _sse("error", {"detail": f"System Error: {str(e)}"})
+                return
+        finally:
+            _release_stream(stream_id, token)
+
+        if token.cancelled:
+            yield _sse("cancelled", {})
+            return
+        response = ChatMessage(
+            id=f"resp_{datetime.now().timestamp()}",
+            content=response_content,
+            role="assistant",
+            timestamp=datetime.now(),
+            mentions=message.mentions
+        )
+        await run_blocking("db", _append_global_message, response.dict())
+        yield _sse("done", json.loads(response.json()))
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 # --- Agent Generate Endpoint ---
 
 class AgentGenerateRequest(BaseModel):
@@ -739,8 +972,72 @@ class AgentGenerateRequest(BaseModel):
     chat_instruction: str
 
 
+def _agent_llm_config(req: Request):
+    """(api_key, provider, model, base_url) from X-Llm-* / X-LLM-* headers or a Bearer token."""
+    api_key = req.headers.get("X-Llm-Key") or req.headers.get("X-LLM-Key")
+    raw_provider = (req.headers.get("X-Llm-Provider") or req.headers.get("X-LLM-Provider") or "google").lower()
+    # Normalize provider names: "gemini" -> "google"
+    provider = "google" if raw_provider == "gemini" else raw_provider
+    model = req.headers.get("X-Llm-Model") or req.headers.get("X-LLM-Model")
+    base_url = req.headers.get("X-Llm-Base-Url") or req.headers.get("X-LLM-Base-URL")
+    
+    # Fallback for Bearer Token
+    if not api_key:
+        auth = req.headers.get("Authorization")
+        if auth and auth.startswith("Bearer "):
+            api_key = auth.split(" ")[1]
+    return api_key, provider, model, base_url
+
+
+def _agent_generate_options(request: AgentGenerateRequest):
+    """(quantity, word_param) parsed from the chat instruction, as in the chat flow."""
+    quantity = 5  # Default
+    word_param = None
+    context_tags = parse_context_tags(request.chat_instruction, [])
+    for tag in context_tags:
+        if tag.get("type") == "quantity":
+            try:
+                quantity = int(tag.get("value"))
+                quantity = max(1, min(20, quantity))  # Clamp 1–20
+                break
+            except (ValueError, TypeError):
+                pass
+        if tag.get("type") == "word":
+            word_param = (tag.get("value") or "").strip()
+    if not word_param and request.topic_id:
+        word_param = request.topic_id  # Fallback: topic_id as word
+    return quantity, word_param
+
+
+def _agent_generate_result(db: Session, request: AgentGenerateRequest, generated_cards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Save the request and summary to the topic history and build the /agent/generate response (blocking)."""
+    card_count = len(generated_cards)
+    if card_count > 0:
+        response_content = f"✅ Generated {card_count} cards for {request.topic_id}."
+    else:
+        response_content = "⚠️ No cards were generated. Check backend logs."
+    # Save User Request to History
+    ChatSessionService.add_message(
+        db, request.topic_id, request.roster_id, "user", request.chat_instruction
+    )
+    # Save Assistant Response to History
+    ChatSessionService.add_message(
+        db, request.topic_id, request.roster_id, "assistant", response_content
+    )
+    return {
+        "content": response_content,
+        "cards_generated": card_count,
+        "cards": generated_cards if isinstance(generated_cards, list) else [],
+        "role": "assistant",
+        "mentions": [],
+        "suggestions": [],
+        "sources": []
+    }
+
+
 @router.post("/agent/generate")
-async def agent_generate(request: AgentGenerateRequest, req: Request, db: Session = Depends(get_db)):
+@offload("llm")
+def agent_generate(request: AgentGenerateRequest, req: Request, db: Session = Depends(get_db)):
     """
     Generate cards with DYNAMIC PROVIDER support.
     Used by TopicChat component for grammar card generation.
@@ -749,37 +1046,12 @@ async def agent_generate(request: AgentGenerateRequest, req: Request, db: Sessio
         from backend.app.services.agent_service import AgentService
         
         # 1. Extract Headers (Support both X-Llm-* and X-LLM-* for compatibility)
-        api_key = req.headers.get("X-Llm-Key") or req.headers.get("X-LLM-Key")
-        raw_provider = (req.headers.get("X-Llm-Provider") or req.headers.get("X-LLM-Provider") or "google").lower()
-        # Normalize provider names: "gemini" -> "google"
-        provider = "google" if raw_provider == "gemini" else raw_provider
-        model = req.headers.get("X-Llm-Model") or req.headers.get("X-LLM-Model")
-        base_url = req.headers.get("X-Llm-Base-Url") or req.headers.get("X-LLM-Base-URL")
-        
-        # Fallback for Bearer Token
-        if not api_key:
-            auth = req.headers.get("Authorization")
-            if auth and auth.startswith("Bearer "):
-                api_key = auth.split(" ")[1]
+        api_key, provider, model, base_url = _agent_llm_config(req)
 
         logger.info(f"🛸 Agent Request: {request.topic_id} | Template: {request.template_id or 'AUTO'}")
 
         # 2. Parse quantity and @word from chat_instruction (same as chat flow)
-        quantity = 5  # Default
-        word_param = None
-        context_tags = parse_context_tags(request.chat_instruction, [])
-        for tag in context_tags:
-            if tag.get("type") == "quantity":
-                try:
-                    quantity = int(tag.get("value"))
-                    quantity = max(1, min(20, quantity))  # Clamp 1–20
-                    break
-                except (ValueError, TypeError):
-                    pass
-            if tag.get("type") == "word":
-                word_param = (tag.get("value") or "").strip()
-        if not word_param and request.topic_id:
-            word_param = request.topic_id  # Fallback: topic_id as word
+        quantity, word_param = _agent_generate_options(request)
 
         # 3. Call Service with Explicit Config
         generated_cards = AgentService.generate_cards(
@@ -798,28 +1070,58 @@ async def agent_generate(request: AgentGenerateRequest, req: Request, db: Sessio
         )
         
         # 4. Create Response & Save History
-        card_count = len(generated_cards)
-        if card_count > 0:
-            response_content = f"✅ Generated {card_count} cards for {request.topic_id}."
-        else:
-            response_content = "⚠️ No cards were generated. Check backend logs."
-        # Save User Request to History
-        ChatSessionService.add_message(
-            db, request.topic_id, request.roster_id, "user", request.chat_instruction
-        )
-        # Save Assistant Response to History
-        ChatSessionService.add_message(
-            db, request.topic_id, request.roster_id, "assistant", response_content
-        )
-        return {
-            "content": response_content,
-            "cards_generated": card_count,
-            "cards": generated_cards if isinstance(generated_cards, list) else [],
-            "role": "assistant",
-            "mentions": [],
-            "suggestions": [],
-            "sources": []
-        }
+        return _agent_generate_result(db, request, generated_cards)
     except Exception as e:
         logger.error(f"❌ Agent Generate Error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/agent/generate/stream")
+async def agent_generate_stream(request: AgentGenerateRequest, req: Request, stream_id: Optional[str] = None):
+    """Server-sent-events variant of POST /agent/generate: cards arrive one by one as they are parsed."""
+    api_key, provider, model, base_url = _agent_llm_config(req)
+    quantity, word_param = _agent_generate_options(request)
+    params = {
+        "topic_id": request.topic_id,
+        "roster_id": request.roster_id,
+        "template_id": request.template_id,
+        "user_instruction": request.chat_instruction,
+        "quantity": quantity,
+        "word_param": word_param,
+    }
+    logger.info(f"🛸 Agent Stream Request: {request.topic_id} | Template: {request.template_id or 'AUTO'}")
+    token = _register_stream(stream_id)
+
+    def save_result(cards: List[Dict[str, Any]]) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            return _agent_generate_result(db, request, cards)
+        finally:
+            db.close()
+
+    async def events():
+        try:
+            cards: List[Dict[str, Any]] = []
+            card_stream = partial(
+                _stream_agent_cards, params, token,
+                api_key=api_key, provider=provider, model_name=model, base_url=base_url,
+            )
+            async for kind, value in iterate_blocking("llm", card_stream, token.cancel):
+                if kind == "done":
+                    cards = value
+                else:
+                    yield _sse(kind, {"text": value} if kind == "token" else value)
+            if token.cancelled:
+                yield _sse("cancelled", {})
+                return
+            yield _sse("done", await run_blocking("db", save_result, cards))
+        except Exception as e:
+            if token.cancelled:
+                yield _sse("cancelled", {})
+            else:
+                logger.error(f"❌ Agent Stream Error: {e}", exc_info=True)
+                yield _sse("error", {"detail": str(e)})
+        finally:
+            _release_stream(stream_id, token)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -139,7 +139,7 @@ def get_daily_quests(
                 custom_quests = json.load(f)
                 
             # Need to figure out which custom quests are already completed today vs pending
-            from scripts.daily_scheduler import find_child_profile, get_db_path
+            from scripts.daily_scheduler import find_child_profile, get_db_path, load_fsrs_states
             db_path = get_db_path()
             profile_row = find_child_profile(db_path, child_name)
             
@@ -147,8 +147,10 @@ def get_daily_quests(
             pending_custom_quests = []
             
             if profile_row:
-                _, _, extracted = profile_row
-                fsrs_states = extracted.get("fsrs_states", {})
+                profile_id, _, _ = profile_row
+                fsrs_states = load_fsrs_states(
+                    db_path, profile_id, [q["quest_id"] for q in custom_quests]
+                )
                 today_local_str = datetime.now().strftime("%Y-%m-%d")
                 
                 for q in custom_quests:
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import logging
+import threading
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Query
 from rdflib import Namespace
 
-from app.utils.oxigraph_utils import get_kg_store
+from app.core.executors import run_blocking
+from app.utils.label_index import LabelSearchIndex, get_label_index, local_name, normalize_label
+from database.kg_client import IRI, KnowledgeGraphClient, PreparedQuery, register_query
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -22,90 +29,131 @@ class GraphDirection(str, Enum):
     both = "both"
 
 
-def _node_term_to_value(term: dict[str, str] | None) -> Optional[str]:
-    if not term:
-        return None
-    return term.get("value")
-
-
-def _run_query_bindings(query: str) -> list[dict[str, dict[str, str]]]:
-    raw_results = get_kg_store().query(query)
-    variables = [var.value for var in raw_results.variables]
-    bindings: list[dict[str, dict[str, str]]] = []
-    for solution in raw_results:
-        row: dict[str, dict[str, str]] = {}
-        for var_name in variables:
-            try:
-                value = solution[var_name]
-            except (KeyError, TypeError):
-                continue
-            if value is None:
-                continue
-            if hasattr(value, "value"):
-                term_type = "uri"
-                if value.__class__.__name__ == "Literal":
-                    term_type = "literal"
-                row[var_name] = {"type": term_type, "value": str(value.value)}
-        bindings.append(row)
-    return bindings
-
-
-def _build_property_path(direction: GraphDirection) -> str:
-    predicate = f"<{REQUIRES_PREREQUISITE}>"
-    if direction == GraphDirection.forward:
-        return predicate
-    if direction == GraphDirection.backward:
-        return f"^{predicate}"
-    return f"({predicate}|^{predicate})"
+_kg_client: Optional[KnowledgeGraphClient] = None
 
 
-def _fetch_reachable_nodes(center_uri: str, direction: GraphDirection, max_hops: int) -> set[str]:
-    path_step = _build_property_path(direction)
-    hop_clauses = []
-    for hop in range(1, max_hops + 1):
-        path_expr = "/".join(path_step for _ in range(hop))
-        hop_clauses.append(f"{{ ?center {path_expr} ?node . }}")
-    hop_union = "\n      UNION\n      ".join(hop_clauses)
-    query = f"""
-    SELECT DISTINCT ?node
+def _get_kg_client() -> KnowledgeGraphClient:
+    global _kg_client
+    if _kg_client is None:
+        _kg_client = KnowledgeGraphClient(endpoint_url="oxigraph://embedded")
+    return _kg_client
+
+
+_PREREQUISITE_EDGES_QUERY = register_query(
+    "graph.prerequisite_edges",
+    f"""
+    SELECT ?source ?target
     WHERE {{
-      BIND(<{center_uri}> AS ?center)
-      {{
-        BIND(?center AS ?node)
-      }}
-      UNION
-      {hop_union}
+      ?source <{REQUIRES_PREREQUISITE}> ?target .
     }}
+    """,
+)
+
+
+@dataclass
+class PrerequisiteIndex:
+    """
+    In-memory adjacency of requiresPrerequisite edges.
+
+    `forward[a]` holds the nodes `a` requires; `backward[b]` the nodes that
+    require `b`.  Built once per KG generation (see get_prerequisite_index), so
+    traversals are plain BFS instead of per-hop SPARQL property paths.
     """
-    rows = _run_query_bindings(query)
-    nodes: set[str] = set()
-    for row in rows:
-        node = _node_term_to_value(row.get("node"))
-        if node:
-            nodes.add(node)
-    return nodes
+
+    forward: dict[str, set[str]] = field(default_factory=dict)
+    backward: dict[str, set[str]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, kg_client: KnowledgeGraphClient) -> "PrerequisiteIndex":
+        index = cls()
+        rows = kg_client.execute(_PREREQUISITE_EDGES_QUERY, as_tuples=True, use_cache=False).rows
+        for source, target in rows:
+            if source and target:
+                index.forward.setdefault(source, set()).add(target)
+                index.backward.setdefault(target, set()).add(source)
+        return index
+
+    @property
+    def edge_count(self) -> int:
+        return sum(len(targets) for targets in self.forward.values())
+
+    def _neighbours(self, node: str, direction: GraphDirection) -> set[str]:
+        if direction == GraphDirection.forward:
+            return self.forward.get(node, set())
+        if direction == GraphDirection.backward:
+            return self.backward.get(node, set())
+        return self.forward.get(node, set()) | self.backward.get(node, set())
+
+    def reachable(
+        self, center_uri: str, direction: GraphDirection, max_hops: Optional[int] = None
+    ) -> dict[str, int]:
+        """BFS from center_uri: {node: hop distance}, center included at 0; no limit when max_hops is None."""
+        depths = {center_uri: 0}
+        frontier = [center_uri]
+        hop = 0
+        while frontier and (max_hops is None or hop < max_hops):
+            hop += 1
+            next_frontier = []
+            for node in frontier:
+                for neighbour in self._neighbours(node, direction):
+                    if neighbour not in depths:
+                        depths[neighbour] = hop
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+        return depths
+
+    def ancestors(self, uri: str) -> set[str]:
+        """Every direct or transitive prerequisite of uri."""
+        return set(self.reachable(uri, GraphDirection.forward)) - {uri}
+
+    def descendants(self, uri: str) -> set[str]:
+        """Every node that directly or transitively requires uri."""
+        return set(self.reachable(uri, GraphDirection.backward)) - {uri}
+
+    def edges_within(self, nodes: set[str]) -> set[tuple[str, str]]:
+        return {
+            (source, target)
+            for source in nodes
+            for target in self.forward.get(source, ())
+            if target in nodes
+        }
+
+
+_prerequisite_index: Optional[tuple[int, PrerequisiteIndex]] = None
+_prerequisite_index_lock = threading.Lock()
+
+
+def get_prerequisite_index() -> PrerequisiteIndex:
+    """Prerequisite adjacency for the current KG generation (rebuilt after store writes)."""
+    global _prerequisite_index
+    kg_client = _get_kg_client()
+    generation = kg_client.generation()
+    cached = _prerequisite_index
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    with _prerequisite_index_lock:
+        cached = _prerequisite_index
+        if cached is None or cached[0] != generation:
+            index = PrerequisiteIndex.build(kg_client)
+            logger.info(
+                "Prerequisite index built: %d nodes, %d edges (generation %d)",
+                len(set(index.forward) | set(index.backward)),
+                index.edge_count,
+                generation,
+            )
+            cached = (generation, index)
+            _prerequisite_index = cached
+        return cached[1]
+
+
+def _fetch_reachable_nodes(center_uri: str, direction: GraphDirection, max_hops: int) -> set[str]:
+    return set(get_prerequisite_index().reachable(center_uri, direction, max_hops))
 
 
 def _fetch_edges_within_nodes(node_uris: set[str]) -> set[tuple[str, str]]:
     if not node_uris:
         return set()
-    values = " ".join(f"<{uri}>" for uri in sorted(node_uris))
-    query = f"""
-    SELECT DISTINCT ?source ?target
-    WHERE {{
-      VALUES ?source {{ {values} }}
-      VALUES ?target {{ {values} }}
-      ?source <{REQUIRES_PREREQUISITE}> ?target .
-    }}
-    """
-    rows = _run_query_bindings(query)
-    edges: set[tuple[str, str]] = set()
-    for row in rows:
-        source = _node_term_to_value(row.get("source"))
-        target = _node_term_to_value(row.get("target"))
-        if source and target:
-            edges.add((source, target))
-    return edges
+    return get_prerequisite_index().edges_within(node_uris)
 
 
 # Prefer English-tagged (or untagged) literals for default `label`; Chinese variants use `label_zh`.
@@ -123,78 +171,56 @@ _DESC_ZH_LANG_FILTER = (
     'FILTER(LANG(?descLit) IN ("zh", "zh-CN", "zh-Hans", "zh-Hant"))'
 )
 
-
-def _fetch_labels_any(uris: set[str]) -> dict[str, str]:
-    """One arbitrary rdfs:label per node (fallback when language-specific query misses)."""
-    if not uris:
-        return {}
-    values = " ".join(f"<{uri}>" for uri in sorted(uris))
-    query = f"""
+_LABELS_ANY_QUERY = register_query(
+    "graph.labels_any",
+    f"""
     SELECT ?node (SAMPLE(?labelLit) AS ?label)
     WHERE {{
-      VALUES ?node {{ {values} }}
+      VALUES ?node {{ $nodes }}
       OPTIONAL {{
         ?node <{RDFS_LABEL}> ?labelLit .
       }}
     }}
     GROUP BY ?node
-    """
-    rows = _run_query_bindings(query)
-    labels: dict[str, str] = {}
-    for row in rows:
-        node_uri = _node_term_to_value(row.get("node"))
-        label = _node_term_to_value(row.get("label"))
-        if node_uri:
-            labels[node_uri] = label or node_uri.rsplit("/", 1)[-1]
-    return labels
-
-
-def _fetch_labels_with_lang_filter(uris: set[str], lang_filter: str) -> dict[str, str]:
-    """rdfs:labels matching the given LANG() filter (one SAMPLE per node)."""
-    if not uris:
-        return {}
-    values = " ".join(f"<{uri}>" for uri in sorted(uris))
-    query = f"""
-    SELECT ?node (SAMPLE(?labelLit) AS ?label)
+    """,
+)
+
+
+def _lang_sample_query(query_id: str, predicate: str, var: str, lang_filter: str) -> PreparedQuery:
+    return register_query(
+        query_id,
+        f"""
+    SELECT ?node (SAMPLE(?{var}Lit) AS ?{var})
     WHERE {{
-      VALUES ?node {{ {values} }}
-      ?node <{RDFS_LABEL}> ?labelLit .
+      VALUES ?node {{ $nodes }}
+      ?node <{predicate}> ?{var}Lit .
       {lang_filter}
     }}
     GROUP BY ?node
-    """
-    rows = _run_query_bindings(query)
-    labels: dict[str, str] = {}
-    for row in rows:
-        node_uri = _node_term_to_value(row.get("node"))
-        label = _node_term_to_value(row.get("label"))
-        if node_uri and label:
-            labels[node_uri] = label
-    return labels
-
-
-def _fetch_vbmapp_descriptions_with_lang_filter(uris: set[str], lang_filter: str) -> dict[str, str]:
-    """vbmapp:description literals matching the given LANG() filter (one SAMPLE per node)."""
+    """,
+    )
+
+
+_LABELS_EN_QUERY = _lang_sample_query("graph.labels_en", RDFS_LABEL, "label", _EN_LANG_FILTER)
+_LABELS_ZH_QUERY = _lang_sample_query("graph.labels_zh", RDFS_LABEL, "label", _ZH_LANG_FILTER)
+_DESC_EN_QUERY = _lang_sample_query("graph.descriptions_en", VBMAPP_DESCRIPTION, "desc", _DESC_EN_LANG_FILTER)
+_DESC_ZH_QUERY = _lang_sample_query("graph.descriptions_zh", VBMAPP_DESCRIPTION, "desc", _DESC_ZH_LANG_FILTER)
+
+
+def _fetch_node_values(query: PreparedQuery, uris: set[str]) -> dict[str, str]:
+    """{node: value} for a per-node SAMPLE query, skipping nodes without a value."""
     if not uris:
         return {}
-    values = " ".join(f"<{uri}>" for uri in sorted(uris))
-    query = f"""
-    SELECT ?node (SAMPLE(?descLit) AS ?desc)
-    WHERE {{
-      VALUES ?node {{ {values} }}
-      ?node <{VBMAPP_DESCRIPTION}> ?descLit .
-      {lang_filter}
-    }}
-    GROUP BY ?node
-    """
-    rows = _run_query_bindings(query)
-    out: dict[str, str] = {}
-    for row in rows:
-        node_uri = _node_term_to_value(row.get("node"))
-        desc = _node_term_to_value(row.get("desc"))
-        if node_uri and desc:
-            out[node_uri] = desc
-    return out
+    rows = _get_kg_client().execute(query, {"nodes": {IRI(uri) for uri in uris}}, as_tuples=True).rows
+    return {node: value for node, value in rows if node and value}
+
+
+def _fetch_labels_any(uris: set[str]) -> dict[str, str]:
+    """One arbitrary rdfs:label per node (fallback when language-specific query misses)."""
+    if not uris:
+        return {}
+    rows = _get_kg_client().execute(_LABELS_ANY_QUERY, {"nodes": {IRI(uri) for uri in uris}}, as_tuples=True).rows
+    return {node: label or node.rsplit("/", 1)[-1] for node, label in rows if node}
 
 
 @router.get("/subgraph")
@@ -209,14 +235,19 @@ async def get_subgraph(
     if not center_uri.startswith("http://") and not center_uri.startswith("https://"):
         raise HTTPException(status_code=400, detail="center_uri must be an absolute URI")
 
+    # Index build, traversal and the label/description queries all block on the store
+    return await run_blocking("kg", _build_subgraph, center_uri, max_hops, direction)
+
+
+def _build_subgraph(center_uri: str, max_hops: int, direction: GraphDirection) -> dict[str, object]:
     visited = _fetch_reachable_nodes(center_uri, direction, max_hops)
     edges = _fetch_edges_within_nodes(visited)
 
-    labels_en = _fetch_labels_with_lang_filter(visited, _EN_LANG_FILTER)
-    labels_zh = _fetch_labels_with_lang_filter(visited, _ZH_LANG_FILTER)
+    labels_en = _fetch_node_values(_LABELS_EN_QUERY, visited)
+    labels_zh = _fetch_node_values(_LABELS_ZH_QUERY, visited)
     labels_any = _fetch_labels_any(visited)
-    descriptions_en = _fetch_vbmapp_descriptions_with_lang_filter(visited, _DESC_EN_LANG_FILTER)
-    descriptions_zh = _fetch_vbmapp_descriptions_with_lang_filter(visited, _DESC_ZH_LANG_FILTER)
+    descriptions_en = _fetch_node_values(_DESC_EN_QUERY, visited)
+    descriptions_zh = _fetch_node_values(_DESC_ZH_QUERY, visited)
 
     nodes = []
     for uri in sorted(visited):
@@ -251,40 +282,80 @@ async def get_subgraph(
     }
 
 
+@router.get("/closure")
+async def get_prerequisite_closure(
+    uri: str = Query(..., description="Node URI"),
+    direction: GraphDirection = Query(
+        GraphDirection.forward,
+        description="forward: all prerequisites (ancestors); backward: all dependents (descendants)",
+    ),
+) -> dict[str, object]:
+    uri = uri.strip()
+    index = await run_blocking("kg", get_prerequisite_index)
+    depths = index.reachable(uri, direction)
+    depths.pop(uri, None)
+    return {
+        "uri": uri,
+        "direction": direction.value,
+        "nodes": [
+            {"uri": node, "depth": depth}
+            for node, depth in sorted(depths.items(), key=lambda item: (item[1], item[0]))
+        ],
+    }
+
+
+_node_search_index: Optional[tuple[int, LabelSearchIndex]] = None
+_node_search_index_lock = threading.Lock()
+
+
+def get_node_search_index() -> LabelSearchIndex:
+    """
+    Label index restricted to prerequisite-graph nodes (rebuilt after store writes).
+
+    Every node is also indexed by its URI local name, so nodes stay findable
+    by slug whether or not they have an rdfs:label.
+    """
+    global _node_search_index
+    kg_client = _get_kg_client()
+    generation = kg_client.generation()
+    cached = _node_search_index
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    with _node_search_index_lock:
+        cached = _node_search_index
+        if cached is None or cached[0] != generation:
+            nodes = get_prerequisite_index().forward
+            labels = get_label_index(kg_client)
+            entries = [entry for entry in labels.entries if entry[0] in nodes]
+            entries.extend(
+                (uri, labels.preferred_label(uri) or "", "", normalize_label(local_name(uri)))
+                for uri in nodes
+            )
+            cached = (generation, LabelSearchIndex(entries))
+            _node_search_index = cached
+        return cached[1]
+
+
+def _search_graph_nodes(q: str, limit: int) -> list[tuple[str, Optional[str]]]:
+    if not q.strip():
+        labels = get_node_search_index()
+        uris = sorted(get_prerequisite_index().forward)[:limit]
+        return [(uri, labels.preferred_label(uri)) for uri in uris]
+    return [(hit.uri, hit.label) for hit in get_node_search_index().search(q, limit=limit)]
+
+
 @router.get("/nodes")
 async def search_graph_nodes(
     q: str = Query("", description="Keyword for URI/label lookup"),
     limit: int = Query(20, ge=1, le=50),
 ) -> dict[str, object]:
-    normalized_q = q.strip().lower()
-    q_filter = ""
-    if normalized_q:
-        escaped = normalized_q.replace('"', '\\"')
-        q_filter = (
-            f'FILTER(CONTAINS(LCASE(STR(?uri)), "{escaped}") '
-            f'|| CONTAINS(LCASE(STR(?label)), "{escaped}"))'
-        )
-    query = f"""
-    SELECT DISTINCT ?uri (SAMPLE(?labelLit) AS ?label)
-    WHERE {{
-      ?uri <{REQUIRES_PREREQUISITE}> ?any .
-      OPTIONAL {{ ?uri <{RDFS_LABEL}> ?labelLit . }}
-      BIND(COALESCE(?labelLit, STR(?uri)) AS ?label)
-      {q_filter}
-    }}
-    GROUP BY ?uri
-    LIMIT {limit}
-    """
-    rows = _run_query_bindings(query)
+    hits = await run_blocking("kg", _search_graph_nodes, q, limit)
     items = []
-    for row in rows:
-        uri = _node_term_to_value(row.get("uri"))
-        label = _node_term_to_value(row.get("label"))
-        if uri:
-            items.append(
-                {
-                    "uri": uri,
-                    "label": label or uri.rsplit("/", 1)[-1],
-                }
-            )
+    for uri, label in hits:
+        items.append(
+            {
+                "uri": uri,
+                "label": label or uri.rsplit("/", 1)[-1],
+            }
+        )
     return {"items": items}
@@ -11,8 +11,10 @@ import os
 
 from app.core.deps import get_ontology_source
 from app.core.types import OntologySource
+from app.core.executors import run_blocking
 from app.adapters.hhh_adapter import HHHAdapter
 from database.db import get_db
+from database.kg_client import KnowledgeGraphClient, register_query
 from database.services import ProfileService
 from sqlalchemy.orm import Session
 
@@ -20,6 +22,73 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+_HHH_LANGUAGE_QUERY = register_query("kg.hhh_language_curriculum", """
+    PREFIX hhh-kg: <http://cuma.org/schema/hhh/>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+    SELECT ?moduleLabel ?submoduleLabel ?focusLabel ?itemLabel ?minAge ?maxAge ?targetLabel ?activityLabel ?materialLabel
+    WHERE {
+        GRAPH <http://cuma.org/graph/heep-hong-language> {
+            ?item a hhh-kg:CurriculumItem ;
+                  rdfs:label ?itemLabel .
+            
+            OPTIONAL { ?item hhh-kg:ageMinMonths ?minAge . }
+            OPTIONAL { ?item hhh-kg:ageMaxMonths ?maxAge . }
+            
+            OPTIONAL {
+                ?item hhh-kg:hasTarget ?target .
+                ?target rdfs:label ?targetLabel .
+                OPTIONAL {
+                    ?target hhh-kg:hasActivity ?activity .
+                    ?activity rdfs:label ?activityLabel .
+                    OPTIONAL {
+                        ?activity hhh-kg:requiresMaterial ?material .
+                        ?material rdfs:label ?materialLabel .
+                    }
+                }
+            }
+            
+            # Go up the tree
+            OPTIONAL {
+                ?focus hhh-kg:hasCurriculumItem ?item ;
+                       rdfs:label ?focusLabel .
+                OPTIONAL {
+                    ?submodule hhh-kg:hasLearningFocus ?focus ;
+                               rdfs:label ?submoduleLabel .
+                    OPTIONAL {
+                        ?module hhh-kg:hasSubmodule ?submodule ;
+                                rdfs:label ?moduleLabel .
+                    }
+                }
+            }
+        }
+    }
+    """)
+
+_COGNITION_MACRO_QUERY = register_query("kg.cognition_macro_structure", """
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX ecta-kg: <http://ecta.ai/schema/>
+    PREFIX ecta-inst: <http://ecta.ai/instance/>
+
+    SELECT ?macro ?macroLabel ?ageBracket ?module ?phase ?phaseLabel ?phaseMaterial
+           ?teachingSteps ?groupClassGeneralization ?homeGeneralization
+    WHERE {
+        ?macro a ecta-kg:MacroObjective ;
+               rdfs:label ?macroLabel .
+        OPTIONAL { ?macro ecta-kg:belongsToModule ?module . }
+        OPTIONAL { ?macro ecta-kg:recommendedAgeBracket ?ageBracket . }
+        OPTIONAL {
+            ?macro ecta-kg:hasPhase ?phase .
+            ?phase rdfs:label ?phaseLabel .
+            OPTIONAL { ?phase ecta-kg:suggestedMaterials ?phaseMaterial . }
+            OPTIONAL { ?phase ecta-kg:teachingSteps ?teachingSteps . }
+            OPTIONAL { ?phase ecta-kg:groupClassGeneralization ?groupClassGeneralization . }
+            OPTIONAL { ?phase ecta-kg:homeGeneralization ?homeGeneralization . }
+        }
+    }
+    ORDER BY ?module ?ageBracket ?macro ?phase
+    """)
+
 
 class GrammarRecommendationRequest(BaseModel):
     """Request body for grammar recommendations - matches frontend (LanguageContentManager, ProfileManager)."""
@@ -104,8 +173,8 @@ Return ONLY a JSON array, no other text:
   {{"topic": "Grammar Point 2", "reason": "Extension"}}
 ]
 """
-                response = AgentService._call_llm(
-                    system_prompt, api_key, "google", "gemini-3.1-pro-preview"
+                response = await run_blocking(
+                    "llm", AgentService._call_llm, system_prompt, api_key, "google", "gemini-3.1-pro-preview"
                 )
                 if response and response != "[]":
                     clean = response.replace("```json", "").replace("```", "").strip()
@@ -157,51 +226,8 @@ async def get_hhh_language_curriculum():
     Maps Age Groups to specific Training Objectives/Targets.
     """
     try:
-        from database.kg_client import KnowledgeGraphClient
         client = KnowledgeGraphClient()
-        sparql = """
-        PREFIX hhh-kg: <http://cuma.org/schema/hhh/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-
-        SELECT ?moduleLabel ?submoduleLabel ?focusLabel ?itemLabel ?minAge ?maxAge ?targetLabel ?activityLabel ?materialLabel
-        WHERE {
-            GRAPH <http://cuma.org/graph/heep-hong-language> {
-                ?item a hhh-kg:CurriculumItem ;
-                      rdfs:label ?itemLabel .
-                
-                OPTIONAL { ?item hhh-kg:ageMinMonths ?minAge . }
-                OPTIONAL { ?item hhh-kg:ageMaxMonths ?maxAge . }
-                
-                OPTIONAL {
-                    ?item hhh-kg:hasTarget ?target .
-                    ?target rdfs:label ?targetLabel .
-                    OPTIONAL {
-                        ?target hhh-kg:hasActivity ?activity .
-                        ?activity rdfs:label ?activityLabel .
-                        OPTIONAL {
-                            ?activity hhh-kg:requiresMaterial ?material .
-                            ?material rdfs:label ?materialLabel .
-                        }
-                    }
-                }
-                
-                # Go up the tree
-                OPTIONAL {
-                    ?focus hhh-kg:hasCurriculumItem ?item ;
-                           rdfs:label ?focusLabel .
-                    OPTIONAL {
-                        ?submodule hhh-kg:hasLearningFocus ?focus ;
-                                   rdfs:label ?submoduleLabel .
-                        OPTIONAL {
-                            ?module hhh-kg:hasSubmodule ?submodule ;
-                                    rdfs:label ?moduleLabel .
-                        }
-                    }
-                }
-            }
-        }
-        """
-        bindings = client.query_bindings(sparql)
+        bindings = client.execute_bindings(_HHH_LANGUAGE_QUERY)
         
         # Group by age bracket
         # Structure: Age -> Module -> Submodule -> Focus -> Item -> [Targets]
@@ -251,32 +277,8 @@ async def get_cognition_macro_structure(source: OntologySource = Depends(get_ont
     if source == "HHH":
         return HHHAdapter().get_macro_structure()
     try:
-        from database.kg_client import KnowledgeGraphClient
         client = KnowledgeGraphClient()
-        sparql = """
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        PREFIX ecta-kg: <http://ecta.ai/schema/>
-        PREFIX ecta-inst: <http://ecta.ai/instance/>
-
-        SELECT ?macro ?macroLabel ?ageBracket ?module ?phase ?phaseLabel ?phaseMaterial
-               ?teachingSteps ?groupClassGeneralization ?homeGeneralization
-        WHERE {
-            ?macro a ecta-kg:MacroObjective ;
-                   rdfs:label ?macroLabel .
-            OPTIONAL { ?macro ecta-kg:belongsToModule ?module . }
-            OPTIONAL { ?macro ecta-kg:recommendedAgeBracket ?ageBracket . }
-            OPTIONAL {
-                ?macro ecta-kg:hasPhase ?phase .
-                ?phase rdfs:label ?phaseLabel .
-                OPTIONAL { ?phase ecta-kg:suggestedMaterials ?phaseMaterial . }
-                OPTIONAL { ?phase ecta-kg:teachingSteps ?teachingSteps . }
-                OPTIONAL { ?phase ecta-kg:groupClassGeneralization ?groupClassGeneralization . }
-                OPTIONAL { ?phase ecta-kg:homeGeneralization ?homeGeneralization . }
-            }
-        }
-        ORDER BY ?module ?ageBracket ?macro ?phase
-        """
-        bindings = client.query_bindings(sparql)
+        bindings = client.execute_bindings(_COGNITION_MACRO_QUERY)
         if not bindings:
             return {"data": [], "source": "kg_empty"}
 
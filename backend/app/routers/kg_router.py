@@ -1,13 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+import csv
+import io
 import json
 import logging
-from typing import Any
+import time
+from typing import Any, AsyncIterator, Iterator, Optional
 
 import pyoxigraph as oxigraph
-from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
+from app.core.executors import iterate_blocking, run_blocking
+from app.utils.label_index import get_label_index
 from app.utils.oxigraph_utils import get_kg_store
+from backend.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -30,49 +38,260 @@ def _term_to_sparql_json(term: Any) -> dict[str, str]:
     return {"type": "literal", "value": str(term)}
 
 
+_STREAM_FORMATS = {
+    "json": "application/sparql-results+json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "tsv": "text/tab-separated-values; charset=utf-8",
+}
+# Solutions serialised per batch while streaming
+_STREAM_BATCH_ROWS = 500
+# Batches produced ahead of the client before the kg worker waits
+_STREAM_BUFFERED_BATCHES = 4
+
+
+class QueryRowLimitExceeded(Exception):
+    pass
+
+
+class QueryDeadlineExceeded(Exception):
+    pass
+
+
+def _solution_rows(raw_results: Any) -> tuple[list[str], Iterator[list[Any]]]:
+    """Variables and a lazy iterator of term rows for SELECT (or CONSTRUCT/DESCRIBE) results."""
+    if isinstance(raw_results, oxigraph.QueryTriples):
+        triples = ([t.subject, t.predicate, t.object] for t in raw_results)
+        return ["subject", "predicate", "object"], triples
+    variables = [var.value for var in raw_results.variables]
+    return variables, ([solution[var] for var in variables] for solution in raw_results)
+
+
+def _binding(variables: list[str], terms: list[Any]) -> dict[str, dict[str, str]]:
+    return {var: _term_to_sparql_json(term) for var, term in zip(variables, terms) if term is not None}
+
+
+def _execute_query(
+    query_text: str,
+    max_rows: Optional[int] = None,
+    strict: bool = False,
+    deadline: Optional[float] = None,
+) -> dict[str, Any]:
+    """
+    Run a SPARQL query and materialise the SPARQL JSON payload (blocking).
+
+    Stops after max_rows rows, or raises QueryRowLimitExceeded if `strict`;
+    raises QueryDeadlineExceeded once time.monotonic() passes `deadline`.
+    """
+    raw_results = get_kg_store().query(query_text)
+    if isinstance(raw_results, (bool, oxigraph.QueryBoolean)):
+        return {"head": {}, "boolean": bool(raw_results)}
+
+    variables, rows = _solution_rows(raw_results)
+    bindings: list[dict[str, dict[str, str]]] = []
+    exceeded: Optional[Exception] = None
+    for terms in rows:
+        if max_rows is not None and len(bindings) >= max_rows:
+            if strict:
+                exceeded = QueryRowLimitExceeded(max_rows)
+            break
+        if deadline is not None and time.monotonic() > deadline:
+            exceeded = QueryDeadlineExceeded()
+            break
+        bindings.append(_binding(variables, terms))
+    # pyoxigraph results must be freed on this thread, not by whoever ends up holding the traceback
+    del rows, raw_results
+    if exceeded is not None:
+        raise exceeded
+
+    if not bindings:
+        logger.info("SPARQL query executed successfully but returned no bindings.")
+    return {
+        "head": {"vars": variables},
+        "results": {"bindings": bindings},
+    }
+
+
+def _csv_value(term: Any) -> str:
+    # SPARQL 1.1 CSV results: plain lexical values, blank nodes as _:label
+    if term is None:
+        return ""
+    if isinstance(term, oxigraph.BlankNode):
+        return f"_:{term.value}"
+    return str(term.value)
+
+
+class _ResultStreamer:
+    """
+    Serialises query results in batches on a kg pool thread.
+
+    pyoxigraph result iterators are bound to the thread that evaluated the
+    query, so `chunks()` is a blocking generator that evaluates the query and
+    serialises every batch on the one pool thread draining it (see
+    iterate_blocking).  Output stops at max_rows or once the deadline passes
+    (checked on every row); the JSON and NDJSON formats then end with a
+    "truncated" marker, CSV/TSV are simply cut short.
+    """
+
+    def __init__(self, query_text: str, fmt: str, max_rows: int, timeout: float):
+        self.query_text = query_text
+        self.fmt = fmt
+        self.max_rows = max_rows
+        self.deadline = time.monotonic() + timeout
+        self.rows_sent = 0
+        self.truncated: Optional[str] = None
+        self.variables: list[str] = []
+        self._boolean: Optional[bool] = None
+
+    def chunks(self) -> Iterator[str]:
+        """Header, row batches and footer of the response (blocking)."""
+        raw_results = get_kg_store().query(self.query_text)
+        if isinstance(raw_results, (bool, oxigraph.QueryBoolean)):
+            self._boolean = bool(raw_results)
+            yield self._boolean_document()
+            return
+        self.variables, rows = _solution_rows(raw_results)
+        try:
+            yield self._header()
+            parts: list[str] = []
+            for terms in rows:
+                if self.rows_sent >= self.max_rows:
+                    self.truncated = "row_limit"
+                    break
+                if time.monotonic() > self.deadline:
+                    self.truncated = "timeout"
+                    break
+                parts.append(self._format_row(terms))
+                self.rows_sent += 1
+                if len(parts) >= _STREAM_BATCH_ROWS:
+                    yield "".join(parts)
+                    parts = []
+            yield "".join(parts) + self._footer()
+        finally:
+            # Runs on this thread when the consumer stops early, too
+            del rows, raw_results
+
+    def _header(self) -> str:
+        if self.fmt == "json":
+            return '{"head":' + json.dumps({"vars": self.variables}) + ',"results":{"bindings":['
+        if self.fmt == "ndjson":
+            return json.dumps({"head": {"vars": self.variables}}) + "\n"
+        if self.fmt == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer, lineterminator="\r\n").writerow(self.variables)
+            return buffer.getvalue()
+        return "\t".join(f"?{var}" for var in self.variables) + "\n"
+
+    def _boolean_document(self) -> str:
+        if self.fmt == "json":
+            return json.dumps({"head": {}, "boolean": self._boolean})
+        if self.fmt == "ndjson":
+            return json.dumps({"boolean": self._boolean}) + "\n"
+        return f"_askResult\n{'true' if self._boolean else 'false'}\n"
+
+    def _format_row(self, terms: list[Any]) -> str:
+        if self.fmt == "json":
+            return ("," if self.rows_sent else "") + json.dumps(_binding(self.variables, terms), ensure_ascii=False)
+        if self.fmt == "ndjson":
+            return json.dumps(_binding(self.variables, terms), ensure_ascii=False) + "\n"
+        if self.fmt == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer, lineterminator="\r\n").writerow([_csv_value(term) for term in terms])
+            return buffer.getvalue()
+        # TSV results use N-Triples syntax for terms, which escapes tabs/newlines in literals
+        return "\t".join("" if term is None else str(term) for term in terms) + "\n"
+
+    def _footer(self) -> str:
+        marker = {"reason": self.truncated, "rows": self.rows_sent} if self.truncated else None
+        if self.truncated:
+            logger.warning("Streamed SPARQL query truncated (%s) after %d rows", self.truncated, self.rows_sent)
+        if self.fmt == "json":
+            return "]}" + (',"truncated":' + json.dumps(marker) if marker else "") + "}"
+        if self.fmt == "ndjson" and marker:
+            return json.dumps({"truncated": marker}) + "\n"
+        return ""
+
+
+async def _stream_results(
+    streamer: _ResultStreamer, header: str, chunks: AsyncIterator[str]
+) -> AsyncIterator[str]:
+    started = time.perf_counter()
+    completed = False
+    try:
+        yield header
+        async for chunk in chunks:
+            if chunk:
+                yield chunk
+        completed = True
+    finally:
+        # StreamingResponse cancels this generator when the client disconnects;
+        # closing `chunks` stops the kg worker before its next batch.
+        await chunks.aclose()
+        elapsed = time.perf_counter() - started
+        if completed:
+            logger.info("Streamed %d SPARQL rows in %.2fs", streamer.rows_sent, elapsed)
+        else:
+            logger.info("SPARQL stream stopped after %d rows (%.2fs): client went away", streamer.rows_sent, elapsed)
+
+
 @router.post("/query")
-async def query_kg(request: Request) -> Response:
+async def query_kg(
+    request: Request,
+    format: str = Query("json", pattern="^(json|ndjson|csv|tsv)$", description="json, ndjson, csv or tsv"),
+    stream: bool = Query(False, description="Stream rows as they are produced (always on for ndjson/csv/tsv)"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum rows to return"),
+    timeout: Optional[float] = Query(None, gt=0, description="Seconds before the result is cut off"),
+) -> Response:
     """
-    Execute raw SPARQL text against the Oxigraph store and return SPARQL JSON.
+    Execute raw SPARQL text against the Oxigraph store.
+
+    By default the full SPARQL JSON document is built in memory (up to
+    kg_query_max_buffered_rows rows; larger results get a 413 asking for
+    stream=true). Streaming responses are produced in batches and stop at
+    `limit` rows (capped by kg_query_max_rows) or after `timeout` seconds.
     """
     query_text = (await request.body()).decode("utf-8").strip()
     if not query_text:
         raise HTTPException(status_code=400, detail="Request body must contain SPARQL query text.")
 
-    try:
-        logger.info("Received SPARQL query:\n%s", query_text)
-        raw_results = get_kg_store().query(query_text)
+    timeout = min(timeout or settings.kg_query_timeout, settings.kg_query_timeout)
+    logger.info("Received SPARQL query (format=%s, stream=%s):\n%s", format, stream, query_text)
 
-        if isinstance(raw_results, bool):
-            payload: dict[str, Any] = {"boolean": raw_results}
-        elif hasattr(raw_results, "__bool__") and not hasattr(raw_results, "variables"):
-            payload = {"boolean": bool(raw_results)}
-        else:
-            variables = [var.value for var in raw_results.variables]
-            bindings: list[dict[str, dict[str, str]]] = []
-
-            for solution in raw_results:
-                row: dict[str, dict[str, str]] = {}
-                for var_name in variables:
-                    try:
-                        term = solution[var_name]
-                    except (KeyError, TypeError):
-                        continue
-                    if term is not None:
-                        row[var_name] = _term_to_sparql_json(term)
-                bindings.append(row)
-
-            payload = {
-                "head": {"vars": variables},
-                "results": {"bindings": bindings},
-            }
-            if not bindings:
-                logger.info("SPARQL query executed successfully but returned no bindings.")
+    if stream or format != "json":
+        max_rows = min(limit or settings.kg_query_max_rows, settings.kg_query_max_rows)
+        streamer = _ResultStreamer(query_text, format, max_rows, timeout)
+        chunks = iterate_blocking("kg", streamer.chunks, max_buffered=_STREAM_BUFFERED_BATCHES)
+        try:
+            # Parse/evaluation errors surface here, while a proper status code can still be sent
+            header = await asyncio.wait_for(chunks.__anext__(), timeout)
+        except asyncio.TimeoutError:
+            await chunks.aclose()
+            raise HTTPException(status_code=504, detail="SPARQL query timed out before producing results")
+        except Exception as exc:
+            await chunks.aclose()
+            logger.error("SPARQL query failed: %s", exc)
+            raise HTTPException(status_code=500, detail=f"SPARQL query failed: {exc}") from exc
+        return StreamingResponse(_stream_results(streamer, header, chunks), media_type=_STREAM_FORMATS[format])
+
+    # An explicit limit truncates quietly; otherwise a result too large to buffer is refused
+    max_rows = min(limit or settings.kg_query_max_buffered_rows, settings.kg_query_max_buffered_rows)
+    try:
+        # Query and iteration both block on the store; keep them off the event loop
+        payload = await run_blocking(
+            "kg", _execute_query, query_text, max_rows, limit is None, time.monotonic() + timeout
+        )
 
         return Response(
             content=json.dumps(payload, ensure_ascii=False),
             media_type="application/sparql-results+json",
         )
+    except QueryRowLimitExceeded:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Result exceeds {max_rows} rows; use stream=true (or format=ndjson/csv/tsv) or set limit.",
+        )
+    except QueryDeadlineExceeded:
+        raise HTTPException(status_code=504, detail=f"SPARQL query timed out after {timeout:g}s")
     except HTTPException:
         raise
     except Exception as exc:
@@ -80,6 +299,21 @@ async def query_kg(request: Request) -> Response:
         raise HTTPException(status_code=500, detail=f"SPARQL query failed: {exc}") from exc
 
 
+@router.get("/search")
+async def search_labels(
+    q: str = Query(..., min_length=1, description="English, hanzi or toneless pinyin"),
+    lang: Optional[str] = Query(None, description="Only labels in this language, e.g. zh or en"),
+    limit: int = Query(20, ge=1, le=100),
+) -> dict[str, Any]:
+    """
+    Ranked typeahead over every rdfs:label in the store.
+    """
+    # The first call after a KG write rebuilds the index; keep that off the event loop
+    index = await run_blocking("kg", get_label_index)
+    hits = index.search(q, limit=limit, lang=lang)
+    return {"query": q, "items": [hit.to_dict() for hit in hits]}
+
+
 @router.get("/inspect")
 async def inspect_kg_store() -> dict[str, Any]:
     """
@@ -87,28 +321,10 @@ async def inspect_kg_store() -> dict[str, Any]:
     """
     inspect_query = "SELECT ?s ?p ?o WHERE { ?s ?p ?o } LIMIT 20"
     try:
-        raw_results = get_kg_store().query(inspect_query)
-        variables = [var.value for var in raw_results.variables]
-        bindings: list[dict[str, dict[str, str]]] = []
-
-        for solution in raw_results:
-            row: dict[str, dict[str, str]] = {}
-            for var_name in variables:
-                try:
-                    term = solution[var_name]
-                except (KeyError, TypeError):
-                    continue
-                if term is not None:
-                    row[var_name] = _term_to_sparql_json(term)
-            bindings.append(row)
-
-        if not bindings:
+        payload = await run_blocking("kg", _execute_query, inspect_query)
+        if not payload["results"]["bindings"]:
             logger.info("KG inspect probe returned no triples for query: %s", inspect_query)
-
-        return {
-            "head": {"vars": variables},
-            "results": {"bindings": bindings},
-        }
+        return payload
     except Exception as exc:
         logger.error("KG inspect probe failed: %s", exc)
         raise HTTPException(status_code=500, detail=f"KG inspect probe failed: {exc}") from exc
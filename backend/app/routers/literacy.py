@@ -8,7 +8,7 @@ Features:
 """
 from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 import logging
 import json
@@ -18,7 +18,6 @@ import sys
 import base64
 import hashlib
 import itertools
-import time
 from datetime import datetime
 import threading
 import csv
@@ -37,8 +36,9 @@ sys.path.insert(0, str(PROJECT_ROOT))
 
 from database.db import get_db
 from database.services import ProfileService
-from database.kg_client import KnowledgeGraphClient
+from database.kg_client import IRI, KnowledgeGraphClient, register_query
 from anki_integration.anki_connect import AnkiConnect
+from ..core.executors import offload, run_blocking
 
 router = APIRouter(prefix="/literacy", tags=["literacy"])
 logger = logging.getLogger(__name__)
@@ -48,15 +48,14 @@ ENGLISH_VOCAB_DECK = PROJECT_ROOT / "data" / "content_db" / "English__Vocabulary
 # JSON file containing the extracted order
 ANKI_ORDER_JSON = PROJECT_ROOT / "data" / "content_db" / "vocab_order.json"
 
-# Cache configuration
-CACHE_TTL = 3600  # 1 hour in seconds
-
 # In-memory cache for original order (word -> order_index)
 _anki_order_cache: Optional[Dict[str, int]] = None
+_anki_order_mtime: Optional[int] = None
 
-# Global cache for sorted vocabulary list
-_sorted_vocab_cache: Optional[List[Dict[str, Any]]] = None
-_cache_timestamp: Optional[float] = None
+# Logic City vocabulary, versioned by (KG generation, curation report mtime, Anki order mtime).
+# The catalog holds every word with its details; sorted lists are derived per sort order.
+_vocab_catalog: Optional[Tuple[Tuple, List[Dict[str, Any]]]] = None
+_sorted_vocab_cache: Dict[str, Tuple[Tuple, List[Dict[str, Any]]]] = {}
 _cache_lock = threading.Lock()
 
 # --- MODELS ---
@@ -109,17 +108,25 @@ def _load_anki_order_from_json() -> Dict[str, int]:
         logger.error(f"Error reading Anki order JSON: {e}")
         return {}
 
+def _file_mtime(path: Path) -> int:
+    # Nanoseconds, so a rewrite within the same second still changes the version
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
 def get_anki_original_order() -> Dict[str, int]:
     """
-    Get Anki order from cache. Should be pre-loaded at startup.
+    Get Anki order from cache, reloading it if the JSON file changed.
     """
-    global _anki_order_cache
+    global _anki_order_cache, _anki_order_mtime
     
-    if _anki_order_cache is not None:
+    mtime = _file_mtime(ANKI_ORDER_JSON)
+    if _anki_order_cache is not None and _anki_order_mtime == mtime:
         return _anki_order_cache
     
-    # Lazy load if not initialized
     _anki_order_cache = _load_anki_order_from_json()
+    _anki_order_mtime = mtime
     return _anki_order_cache
 
 def query_sparql(query: str, output_format: str = "application/sparql-results+json", timeout: int = 30):
@@ -132,6 +139,65 @@ def query_sparql(query: str, output_format: str = "application/sparql-results+js
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Graph Error: {str(e)}")
 
+def query_prepared(query, params: Optional[Dict[str, Any]] = None, use_cache: bool = True) -> Dict[str, Any]:
+    """Run a registered query (see register_query) with the same error handling as query_sparql."""
+    try:
+        return KnowledgeGraphClient().execute(query, params, use_cache=use_cache)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Graph Error: {str(e)}")
+
+
+# English words whose concept has a Logic City Chinese word (updated for ontology v2: uses rdfs:label)
+_LOGIC_CITY_WORDS_QUERY = register_query("literacy.logic_city_words", """
+    PREFIX srs-kg: <http://srs4autism.com/schema/>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    SELECT DISTINCT ?wordUri ?englishWord (SAMPLE(?imageNode) AS ?exampleImage) WHERE {
+        ?zhNode srs-kg:learningTheme "Logic City" ; srs-kg:means ?concept .
+        ?wordUri a srs-kg:Word ; srs-kg:means ?concept ; rdfs:label ?englishWord .
+        FILTER (lang(?englishWord) = "en")
+        OPTIONAL { ?concept srs-kg:hasVisualization ?imageNode }
+    } GROUP BY ?wordUri ?englishWord
+    """)
+
+# Chinese word + image for Logic City English words
+_LOGIC_CITY_DETAIL_QUERY = register_query("literacy.logic_city_details", """
+    PREFIX srs-kg: <http://srs4autism.com/schema/>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    SELECT ?wordUri ?chineseWord ?imagePath WHERE {
+        VALUES ?wordUri { $words }
+        ?wordUri srs-kg:means ?concept .
+
+        # Fetch ONLY the Logic City tagged Chinese word (updated to check rdfs:label)
+        OPTIONAL {
+            ?zhNode rdfs:label ?chineseWord ;
+                    srs-kg:means ?concept ;
+                    srs-kg:learningTheme "Logic City" .
+            FILTER (lang(?chineseWord) = "zh")
+        }
+
+        OPTIONAL {
+            ?concept srs-kg:hasVisualization ?v . ?v srs-kg:imageFilePath ?imagePath .
+        }
+    }
+    """)
+
+# English label, Logic City Chinese label and image for the words being synced to Anki
+_LOGIC_CITY_SYNC_QUERY = register_query("literacy.logic_city_sync", """
+    PREFIX srs-kg: <http://srs4autism.com/schema/>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    SELECT ?wordUri ?english ?chinese ?imagePath WHERE {
+        VALUES ?wordUri { $words }
+        ?wordUri rdfs:label ?english .
+        FILTER(lang(?english)="en")
+        ?wordUri srs-kg:means ?c .
+        OPTIONAL {
+            ?zh srs-kg:means ?c; rdfs:label ?chinese; srs-kg:learningTheme "Logic City".
+            FILTER(lang(?chinese)="zh")
+        }
+        OPTIONAL { ?c srs-kg:hasVisualization ?v. ?v srs-kg:imageFilePath ?imagePath. }
+    }
+    """)
+
 def find_image_file(image_path: str) -> Optional[Path]:
     if not image_path: return None
     
@@ -207,9 +273,50 @@ def _load_curation_blocklist() -> Dict[str, bool]:
         logger.error(f"Gatekeeper Error: {e}")
         return set()
 
-def _build_sorted_vocab_cache(sort_order: str = "interleaved") -> List[Dict[str, Any]]:
+def _resolve_image_url(raw_img_path: Optional[str]) -> Optional[str]:
+    """Map a KG image path to the URL the frontend can load."""
+    if not raw_img_path:
+        return None
+
+    # 1. Use existing helper to find the physical file on disk
+    found_path = find_image_file(raw_img_path)
+
+    if found_path:
+        # 2. If found, construct a valid URL path
+        media_objects_dir = PROJECT_ROOT / "content" / "media" / "objects"
+
+        if media_objects_dir in found_path.parents or found_path.parent == media_objects_dir:
+            return f"/static/media/{found_path.name}"
+        try:
+            rel_path = found_path.relative_to(PROJECT_ROOT)
+            return f"/{rel_path}"
+        except ValueError:
+            return f"/media/{found_path.name}"
+
+    # 3. Fallback: Clean the raw path if file not found on disk
+    clean_path = raw_img_path.replace("content/media/", "").replace("/media/", "")
+    if clean_path.startswith("/"): clean_path = clean_path[1:]
+    if re.match(r'^[0-9a-fA-F]+\.(jpg|png|jpeg|webp|gif)$', clean_path, re.IGNORECASE):
+        return f"/static/media/{clean_path}"
+    return f"/media/{clean_path}"
+
+# One client for reading the store generation (each construction logs its banner)
+_generation_client: Optional[KnowledgeGraphClient] = None
+
+def _vocab_cache_version() -> Tuple:
+    """Changes whenever the KG, the curation report or the Anki order file changes."""
+    global _generation_client
+    if _generation_client is None:
+        _generation_client = KnowledgeGraphClient()
+    return (
+        _generation_client.generation(),
+        _file_mtime(CURATION_REPORT_PATH),
+        _file_mtime(ANKI_ORDER_JSON),
+    )
+
+def _build_vocab_catalog() -> List[Dict[str, Any]]:
     """
-    Build the sorted vocabulary cache by querying the knowledge graph.
+    Build every Logic City word with its details (Chinese, pinyin, image URL).
     This is expensive and should be cached.
     """
     anki_order = get_anki_original_order()
@@ -217,24 +324,10 @@ def _build_sorted_vocab_cache(sort_order: str = "interleaved") -> List[Dict[str,
     # 1. LOAD THE BLOCKLIST
     blocklist = _load_curation_blocklist()
 
-    # Optimized query (updated for ontology v2: uses rdfs:label)
-    light_query = """
-    PREFIX srs-kg: <http://srs4autism.com/schema/>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT DISTINCT ?wordUri ?englishWord (SAMPLE(?imageNode) AS ?exampleImage) WHERE {
-        ?zhNode srs-kg:learningTheme "Logic City" ; srs-kg:means ?concept .
-        ?wordUri a srs-kg:Word ; srs-kg:means ?concept ; rdfs:label ?englishWord .
-        FILTER (lang(?englishWord) = "en")
-        OPTIONAL { ?concept srs-kg:hasVisualization ?imageNode }
-    } GROUP BY ?wordUri ?englishWord
-    """
-
-    light_result = query_sparql(light_query)
+    light_result = query_prepared(_LOGIC_CITY_WORDS_QUERY)
     bindings = light_result.get("results", {}).get("bindings", [])
 
-    # Bucketing
-    concrete_list = []
-    abstract_list = []
+    catalog = []
     seen = set()
 
     for b in bindings:
@@ -256,20 +349,45 @@ def _build_sorted_vocab_cache(sort_order: str = "interleaved") -> List[Dict[str,
         word_uri = b['wordUri']['value']
         has_image = 'exampleImage' in b and b['exampleImage'].get('value')
 
-        item = {
+        catalog.append({
             'word_uri': word_uri,
             'word_id': word_uri.split('/')[-1],
             'english': english,
             'word_type': 'Concrete' if has_image else 'Abstract',
             'anki_order': anki_order.get(english_lower, 999999)
-        }
+        })
 
-        if item['word_type'] == 'Concrete':
-            concrete_list.append(item)
-        else:
-            abstract_list.append(item)
+    if not catalog:
+        return catalog
+
+    # Details for all words in one query (pages used to run one query each)
+    detail_res = query_prepared(
+        _LOGIC_CITY_DETAIL_QUERY, {"words": [IRI(x['word_uri']) for x in catalog]}, use_cache=False
+    )
+    details_map: Dict[str, Dict[str, str]] = {}
+    for b in detail_res.get("results", {}).get("bindings", []):
+        uri = b['wordUri']['value']
+        if uri not in details_map: details_map[uri] = {}
+        if 'chineseWord' in b: details_map[uri]['chinese'] = b['chineseWord']['value']
+        if 'imagePath' in b: details_map[uri]['image_path'] = b['imagePath']['value']
+
+    for item in catalog:
+        det = details_map.get(item['word_uri'], {})
+        chinese = det.get('chinese', '')
+        pinyin_str = ""
+        if chinese and HAS_PYPINYIN:
+            pinyin_str = " ".join([x[0] for x in get_pinyin(chinese, style=Style.TONE)])
+        item['chinese'] = chinese
+        item['pinyin'] = pinyin_str
+        item['image_path'] = _resolve_image_url(det.get('image_path'))
+
+    return catalog
+
+def _sort_vocab(catalog: List[Dict[str, Any]], sort_order: str) -> List[Dict[str, Any]]:
+    """Order catalog items: "interleaved" alternates concrete/abstract, anything else is plain Anki order."""
+    concrete_list = [x for x in catalog if x['word_type'] == 'Concrete']
+    abstract_list = [x for x in catalog if x['word_type'] != 'Concrete']
 
-    # Sorting Strategy
     final_list = []
     if sort_order == "interleaved":
         concrete_list.sort(key=lambda x: x['anki_order'])
@@ -285,37 +403,38 @@ def _build_sorted_vocab_cache(sort_order: str = "interleaved") -> List[Dict[str,
 
 def get_sorted_vocab_cache(force_refresh: bool = False, sort_order: str = "interleaved") -> List[Dict[str, Any]]:
     """
-    Get the sorted vocabulary cache, rebuilding if necessary.
+    Get the sorted vocabulary list for sort_order, rebuilding if the KG,
+    curation report or Anki order changed since it was built.
     Thread-safe with locking to prevent concurrent rebuilds.
     """
-    global _sorted_vocab_cache, _cache_timestamp
+    global _vocab_catalog
     
+    # Only two real orderings; don't let arbitrary query strings grow the cache
+    sort_order = "interleaved" if sort_order == "interleaved" else "anki"
+    version = _vocab_cache_version()
     with _cache_lock:
-        current_time = time.time()
+        cached = _sorted_vocab_cache.get(sort_order)
+        if cached is not None and cached[0] == version and not force_refresh:
+            return cached[1]
         
-        # Check if cache is valid
-        if (_sorted_vocab_cache is not None and 
-            _cache_timestamp is not None and 
-            not force_refresh and
-            (current_time - _cache_timestamp) < CACHE_TTL):
-            return _sorted_vocab_cache
+        if _vocab_catalog is None or _vocab_catalog[0] != version or force_refresh:
+            logger.info(f"Building Logic City vocabulary catalog (force_refresh={force_refresh})...")
+            _vocab_catalog = (version, _build_vocab_catalog())
+            _sorted_vocab_cache.clear()
+            logger.info(f"Catalog built: {len(_vocab_catalog[1])} words")
         
-        # Rebuild cache
-        logger.info(f"Building sorted vocabulary cache (force_refresh={force_refresh})...")
-        _sorted_vocab_cache = _build_sorted_vocab_cache(sort_order)
-        _cache_timestamp = current_time
-        logger.info(f"Cache built: {len(_sorted_vocab_cache)} words")
-        return _sorted_vocab_cache
+        sorted_list = _sort_vocab(_vocab_catalog[1], sort_order)
+        _sorted_vocab_cache[sort_order] = (version, sorted_list)
+        return sorted_list
 
 def initialize_literacy_cache():
     """
     Initialize the cache at startup. Call this from the main app's startup event.
     """
     logger.info("Initializing literacy cache at startup...")
-    global _anki_order_cache
     
     # Load Anki order
-    _anki_order_cache = _load_anki_order_from_json()
+    get_anki_original_order()
     
     # Pre-populate vocab cache
     get_sorted_vocab_cache(force_refresh=False)
@@ -380,9 +499,10 @@ async def get_logic_city_vocab(
     """
     try:
         # Get cached sorted list (or rebuild if needed)
-        final_list = get_sorted_vocab_cache(force_refresh=force_refresh, sort_order=sort_order)
+        # A cache miss runs the SPARQL catalog build; keep it off the event loop
+        final_list = await run_blocking("kg", get_sorted_vocab_cache, force_refresh, sort_order)
         
-        # OPTIMIZATION: Paginate FIRST, then only process details for the current page
+        # Details are precomputed in the cache; a page is just a slice
         total = len(final_list)
         total_pages = (total + page_size - 1) // page_size
         start = (page - 1) * page_size
@@ -398,88 +518,18 @@ async def get_logic_city_vocab(
                 total_pages=total_pages
             )
         
-        # STEP 2: Detail Fetch - ONLY for the current page (50 items max)
-        uris = " ".join([f"<{x['word_uri']}>" for x in paged_items])
-        
-        detail_query = f"""
-        PREFIX srs-kg: <http://srs4autism.com/schema/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        SELECT ?wordUri ?chineseWord ?imagePath WHERE {{
-            VALUES ?wordUri {{ {uris} }}
-            ?wordUri srs-kg:means ?concept .
-
-            # Fetch ONLY the Logic City tagged Chinese word (updated to check rdfs:label)
-            OPTIONAL {{
-                ?zhNode rdfs:label ?chineseWord ;
-                        srs-kg:means ?concept ;
-                        srs-kg:learningTheme "Logic City" .
-                FILTER (lang(?chineseWord) = "zh")
-            }}
-
-            OPTIONAL {{
-                ?concept srs-kg:hasVisualization ?v . ?v srs-kg:imageFilePath ?imagePath .
-            }}
-        }}
-        """
-        
-        detail_res = query_sparql(detail_query)
-        details_map = {}
-        for b in detail_res.get("results", {}).get("bindings", []):
-            uri = b['wordUri']['value']
-            if uri not in details_map: details_map[uri] = {}
-            if 'chineseWord' in b: details_map[uri]['chinese'] = b['chineseWord']['value']
-            if 'imagePath' in b: details_map[uri]['image_path'] = b['imagePath']['value']
-        
-        # Build Final Response - only for the current page
-        vocab = []
-        for item in paged_items:
-            det = details_map.get(item['word_uri'], {})
-            chinese = det.get('chinese', '')
-            
-            # --- START FIX: Image Path Resolution ---
-            raw_img_path = det.get('image_path')
-            final_image_path = None
-            
-            if raw_img_path:
-                # 1. Use existing helper to find the physical file on disk
-                found_path = find_image_file(raw_img_path)
-                
-                if found_path:
-                    # 2. If found, construct a valid URL path
-                    media_objects_dir = PROJECT_ROOT / "content" / "media" / "objects"
-                    
-                    if media_objects_dir in found_path.parents or found_path.parent == media_objects_dir:
-                        final_image_path = f"/static/media/{found_path.name}"
-                    else:
-                        try:
-                            rel_path = found_path.relative_to(PROJECT_ROOT)
-                            final_image_path = f"/{rel_path}"
-                        except ValueError:
-                            final_image_path = f"/media/{found_path.name}"
-                else:
-                    # 3. Fallback: Clean the raw path if file not found on disk
-                    clean_path = raw_img_path.replace("content/media/", "").replace("/media/", "")
-                    if clean_path.startswith("/"): clean_path = clean_path[1:]
-                    if re.match(r'^[0-9a-fA-F]+\.(jpg|png|jpeg|webp|gif)$', clean_path, re.IGNORECASE):
-                         final_image_path = f"/static/media/{clean_path}"
-                    else:
-                         final_image_path = f"/media/{clean_path}"
-            # --- END FIX ---
-
-            # Generate Pinyin
-            pinyin_str = ""
-            if chinese and HAS_PYPINYIN:
-                pinyin_str = " ".join([x[0] for x in get_pinyin(chinese, style=Style.TONE)])
-            
-            vocab.append(LogicCityVocabItem(
+        vocab = [
+            LogicCityVocabItem(
                 word_id=item['word_id'],
                 english=item['english'],
-                chinese=chinese,
-                pinyin=pinyin_str,
-                image_path=final_image_path,
+                chinese=item['chinese'],
+                pinyin=item['pinyin'],
+                image_path=item['image_path'],
                 word_type=item['word_type'],
                 anki_order=item['anki_order']
-            ))
+            )
+            for item in paged_items
+        ]
         
         return PaginatedVocabResponse(
             items=vocab,
@@ -494,7 +544,8 @@ async def get_logic_city_vocab(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/logic-city/sync")
-async def sync_logic_city_to_anki(request: Dict[str, Any]):
+@offload("anki")
+def sync_logic_city_to_anki(request: Dict[str, Any]):
     """Syncs cards using the new CUMA-Word-Entity-v2 Note Type"""
     try:
         word_ids = request.get("word_ids", [])
@@ -507,24 +558,7 @@ async def sync_logic_city_to_anki(request: Dict[str, Any]):
         
         # Fetch Data
         uris = [f"http://srs4autism.com/schema/{wid}" for wid in word_ids]
-        uri_str = " ".join([f"<{u}>" for u in uris])
-        
-        q = f"""
-        PREFIX srs-kg: <http://srs4autism.com/schema/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        SELECT ?wordUri ?english ?chinese ?imagePath WHERE {{
-            VALUES ?wordUri {{ {uri_str} }}
-            ?wordUri rdfs:label ?english .
-            FILTER(lang(?english)="en")
-            ?wordUri srs-kg:means ?c .
-            OPTIONAL {{
-                ?zh srs-kg:means ?c; rdfs:label ?chinese; srs-kg:learningTheme "Logic City".
-                FILTER(lang(?chinese)="zh")
-            }}
-            OPTIONAL {{ ?c srs-kg:hasVisualization ?v. ?v srs-kg:imageFilePath ?imagePath. }}
-        }}
-        """
-        res = query_sparql(q)
+        res = query_prepared(_LOGIC_CITY_SYNC_QUERY, {"words": [IRI(u) for u in uris]})
         
         processed = 0
         added = 0
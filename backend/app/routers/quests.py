@@ -11,13 +11,12 @@ if not logger.handlers:
     handler.setFormatter(formatter)
     logger.addHandler(handler)
 # ------------------------------
-import google.generativeai as genai
 from typing import Any, Dict, Optional
 from fastapi import APIRouter, HTTPException, Query
 
 from pydantic import BaseModel, Field
 from app.utils.oxigraph_utils import get_kg_store
-from scripts.daily_scheduler import record_feedback, find_child_profile, find_weakest_domain, get_db_path
+from scripts.daily_scheduler import record_feedback, find_child_profile, find_weakest_domain, get_db_path, get_profile_quest_logs
 from datetime import datetime
 
 router = APIRouter(prefix="/api/quests", tags=["Quests"])
@@ -486,9 +485,8 @@ async def generate_quest(request: QuestGenerateRequest):
                 
                 most_recent_time = None
                 
-                quest_logs = extracted_data.get("quest_logs", {})
                 for q_id in target_quest_ids:
-                    logs = quest_logs.get(q_id, [])
+                    logs = get_profile_quest_logs(db_path, lookup_row["id"], extracted_data, q_id)
                     for log in logs:
                         if log.get("role") == "system" and "✅ 打卡完成:" in str(log.get("content")):
                             log_time_str = log.get("timestamp", "")
@@ -656,6 +654,11 @@ async def generate_quest(request: QuestGenerateRequest):
     )
 
     try:
+        import google.generativeai as genai  # Imported on first use; the SDK is slow to load
+
+        api_key = os.getenv("GEMINI_API_KEY")
+        if api_key:
+            genai.configure(api_key=api_key)
         model = genai.GenerativeModel(llm_model_name)
 
         response = model.generate_content(
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import logging
+import threading
+from dataclasses import dataclass, field
 from typing import Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
@@ -95,6 +97,167 @@ def get_kg_client() -> KnowledgeGraphClient:
     return KnowledgeGraphClient(endpoint_url="oxigraph://embedded")
 
 
+# ---------------------------------------------------------------------------
+# Survey question index
+# ---------------------------------------------------------------------------
+
+_QUESTIONS_QUERY = """
+PREFIX cuma-survey: <http://cuma.ai/schema/survey/>
+PREFIX vbmapp-schema: <http://cuma.ai/schema/vbmapp/>
+
+SELECT ?q_uri ?prompt ?milestone_uri ?bottleneck ?level
+WHERE {
+    ?q_uri a cuma-survey:ParentQuestion ;
+           cuma-survey:promptTemplate ?prompt .
+    OPTIONAL {
+        ?q_uri cuma-survey:evaluatesNode ?milestone_uri .
+        OPTIONAL { ?milestone_uri vbmapp-schema:level ?level }
+    }
+    OPTIONAL { ?q_uri cuma-survey:isBottleneck ?bottleneck }
+}
+"""
+
+_OPTIONS_QUERY = """
+PREFIX cuma-survey: <http://cuma.ai/schema/survey/>
+
+SELECT ?q_uri ?opt_uri ?optText ?stateAction
+WHERE {
+    ?q_uri a cuma-survey:ParentQuestion ;
+           cuma-survey:hasOption ?opt_uri .
+    ?opt_uri cuma-survey:optionText ?optText ;
+             cuma-survey:stateAction ?stateAction .
+}
+"""
+
+
+@dataclass
+class SurveyOption:
+    option_uri: str
+    state_action: str
+    texts: dict[str, str] = field(default_factory=dict)  # lang -> text
+
+
+@dataclass
+class SurveyQuestion:
+    question_uri: str
+    milestone_uri: Optional[str] = None
+    is_bottleneck: bool = False
+    level: Optional[int] = None
+    prompts: dict[str, str] = field(default_factory=dict)  # lang -> template
+    options: list[SurveyOption] = field(default_factory=list)
+
+    def localized(self, lang: str) -> Optional[dict[str, Any]]:
+        """API payload in one language, or None if the question lacks that language."""
+        prompt = self.prompts.get(lang)
+        options = [
+            {
+                "option_uri": opt.option_uri,
+                "optionText": opt.texts[lang],
+                "stateAction": opt.state_action,
+            }
+            for opt in self.options
+            if lang in opt.texts
+        ]
+        if prompt is None or not options:
+            return None
+        return {
+            "question_uri": self.question_uri,
+            "promptTemplate": _fill_prompt_template(prompt),
+            "options": _sort_options(options),
+            "source": "kg",
+        }
+
+
+class SurveyQuestionIndex:
+    """
+    All ParentQuestions with their options, milestone and language variants.
+
+    Built with two SPARQL queries and kept until the KG store generation
+    changes. `ranked` orders questions for the next-question picker:
+    bottleneck milestones first, then by milestone level, then KG order.
+    """
+
+    def __init__(self, questions: list[SurveyQuestion]):
+        self.by_uri = {q.question_uri: q for q in questions}
+        order = {q.question_uri: i for i, q in enumerate(questions)}
+        self.ranked = sorted(
+            questions,
+            key=lambda q: (
+                not q.is_bottleneck,
+                q.level if q.level is not None else float("inf"),
+                order[q.question_uri],
+            ),
+        )
+
+    @classmethod
+    def build(cls, kg_client: KnowledgeGraphClient) -> "SurveyQuestionIndex":
+        questions: dict[str, SurveyQuestion] = {}
+        for row in kg_client.query_bindings(_QUESTIONS_QUERY):
+            q_uri = _binding_str(row.get("q_uri"))
+            if not q_uri:
+                continue
+            question = questions.setdefault(q_uri, SurveyQuestion(question_uri=q_uri))
+            prompt = row.get("prompt") or {}
+            lang = prompt.get("xml:lang")
+            if lang and lang not in question.prompts:
+                question.prompts[lang] = _binding_str(prompt)
+            if question.milestone_uri is None and row.get("milestone_uri"):
+                question.milestone_uri = _binding_str(row.get("milestone_uri"))
+            question.is_bottleneck = question.is_bottleneck or _binding_bool(row.get("bottleneck"))
+            if question.level is None and row.get("level"):
+                try:
+                    question.level = int(_binding_str(row.get("level")))
+                except ValueError:
+                    pass
+
+        options: dict[tuple[str, str], SurveyOption] = {}
+        for row in kg_client.query_bindings(_OPTIONS_QUERY):
+            q_uri = _binding_str(row.get("q_uri"))
+            opt_uri = _binding_str(row.get("opt_uri"))
+            question = questions.get(q_uri)
+            if question is None or not opt_uri:
+                continue
+            option = options.get((q_uri, opt_uri))
+            if option is None:
+                option = SurveyOption(
+                    option_uri=opt_uri,
+                    state_action=_state_action_key(row.get("stateAction")),
+                )
+                options[(q_uri, opt_uri)] = option
+                question.options.append(option)
+            text = row.get("optText") or {}
+            lang = text.get("xml:lang")
+            if lang and lang not in option.texts:
+                option.texts[lang] = _binding_str(text)
+
+        return cls(list(questions.values()))
+
+
+_survey_index: Optional[tuple[int, SurveyQuestionIndex]] = None
+_survey_index_lock = threading.Lock()
+
+
+def get_survey_index(kg_client: KnowledgeGraphClient) -> SurveyQuestionIndex:
+    """Survey question index for the current KG generation (built on first use)."""
+    global _survey_index
+    generation = kg_client.generation()
+    cached = _survey_index
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    with _survey_index_lock:
+        cached = _survey_index
+        if cached is None or cached[0] != generation:
+            index = SurveyQuestionIndex.build(kg_client)
+            logger.info(
+                "Survey question index built: %d questions (generation %d)",
+                len(index.by_uri),
+                generation,
+            )
+            cached = (generation, index)
+            _survey_index = cached
+        return cached[1]
+
+
 class SurveyAnswerBody(BaseModel):
     question_uri: str = Field(..., description="URI of the ParentQuestion answered")
     stateAction: str = Field(..., description="Selected option state, e.g. FAIL, PASS_NODE")
@@ -139,46 +302,11 @@ def get_next_survey_question(
     """
     child_profile = _require_child_profile(db, child_id)
 
-    sparql_query = """
-    PREFIX cuma-survey: <http://cuma.ai/schema/survey/>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    
-    SELECT DISTINCT ?q_uri ?promptText ?opt_uri ?optText ?stateAction
-    WHERE {{
-        ?q_uri a cuma-survey:ParentQuestion ;
-               cuma-survey:promptTemplate ?prompt_literal ;
-               cuma-survey:hasOption ?opt_uri .
-        ?opt_uri cuma-survey:optionText ?opt_literal ;
-                 cuma-survey:stateAction ?stateAction .
-
-        # Force language filtering based on request
-        FILTER(LANG(?prompt_literal) = "{lang}")
-        FILTER(LANG(?opt_literal) = "{lang}")
-        
-        BIND(STR(?prompt_literal) AS ?promptText)
-        BIND(STR(?opt_literal) AS ?optText)
-    }}
-    """
-    
     # Normalize language tag for RDF filter
     normalized_lang = "zh" if lang.lower() in ["cn", "zh"] else "en"
 
-    sparql_query_templated = sparql_query.format(lang=normalized_lang)
-
-    print("========== [DEBUG] EXECUTING SPARQL ==========")
-    print(sparql_query_templated)
-    print("==============================================")
-
     try:
-        results = kg_client.query_bindings(sparql_query_templated)
-        print("========== [DEBUG] RAW DB RESULTS (First 10) ==========")
-        # Convert results to a list to iterate multiple times if needed for debugging
-        results_list = list(results)
-        for idx, row in enumerate(results_list):
-            if idx >= 10:
-                break
-            print(row)
-        print("=======================================================")
+        index = get_survey_index(kg_client)
     except KnowledgeGraphQueryError as exc:
         logger.error("Failed to query knowledge graph for survey questions: %s", exc)
         raise HTTPException(
@@ -186,77 +314,21 @@ def get_next_survey_question(
             detail="Failed to retrieve survey questions from knowledge graph"
         )
 
-    questions_map: dict[str, dict[str, Any]] = {}
-
-    for row in results_list:
-        q_uri = _binding_str(row.get("q_uri"))
-        opt_uri = _binding_str(row.get("opt_uri"))
-
-        if not q_uri or not opt_uri:
-            continue
-
-        if q_uri not in questions_map:
-            questions_map[q_uri] = {
-                "question_uri": q_uri,
-                "promptTemplate": _fill_prompt_template(_binding_str(row.get("promptText"))),
-                "options": [],
-                "source": "kg",
-            }
-        
-        # Add option, only if not already added.
-        # Given language filter, there should only be one optionText per opt_uri.
-        option_exists = any(
-            opt.get("option_uri") == opt_uri for opt in questions_map[q_uri]["options"]
-        )
-        if not option_exists:
-            questions_map[q_uri]["options"].append(
-                {
-                    "option_uri": opt_uri,
-                    "optionText": _binding_str(row.get("optText")),
-                    "stateAction": _state_action_key(row.get("stateAction")),
-                }
-            )
-            
-    # Convert dictionary to a list of questions and sort options
-    questions = []
-
     answered_milestone_uris = {
-        mp.milestone_uri
-        for mp in db.query(MilestoneProgress).filter(MilestoneProgress.child_id == child_profile.id).all()
+        milestone_uri
+        for (milestone_uri,) in db.query(MilestoneProgress.milestone_uri)
+        .filter(MilestoneProgress.child_id == child_profile.id)
+        .all()
     }
 
-    for q_uri, q_data in questions_map.items():
-        # Query the milestone_uri for the current question_uri
-        milestone_query = """
-            PREFIX cuma-survey: <http://cuma.ai/schema/survey/>
-            SELECT ?milestone_uri
-            WHERE {{
-                <{q_uri}> cuma-survey:evaluatesNode ?milestone_uri .
-            }}
-        """
-        templated_milestone_query = milestone_query.format(q_uri=q_uri)
-        milestone_results = kg_client.query_bindings(templated_milestone_query)
-        associated_milestone_uri = None
-        for row in milestone_results:
-            associated_milestone_uri = _binding_str(row.get("milestone_uri"))
-            break
-
-        # Only add question if its associated milestone has not been answered
-        if associated_milestone_uri and associated_milestone_uri not in answered_milestone_uris:
-            q_data["options"] = _sort_options(q_data["options"])
-            questions.append(q_data)
-
-    # If there are still questions, sort them (e.g., by some priority) and return the first one
-    # For now, just return the first available (unanswered) question.
-    if questions:
-        final_question = questions[0]
-        print("========== [DEBUG] FINAL JSON PAYLOAD ==========")
-        print(final_question)
-        print("================================================")
-        return final_question
-    
-    # Fallback to mock questions if no KG questions are found (if _pick_next_mock was defined)
-    # For now, raise an error if no questions are found
+    # Only offer questions whose associated milestone has not been answered
+    for question in index.ranked:
+        if not question.milestone_uri or question.milestone_uri in answered_milestone_uris:
+            continue
+        payload = question.localized(normalized_lang)
+        if payload is not None:
+            return payload
+
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail="No survey questions found in knowledge graph"
@@ -269,35 +341,22 @@ async def post_survey_answer(
     db: Session = Depends(get_db),
     kg_client: KnowledgeGraphClient = Depends(get_kg_client),
 ) -> dict[str, str]:
-    # 1. Use SPARQL to query the milestone_uri for the given question_uri
-    sparql_query = """
-        PREFIX cuma-survey: <http://cuma.ai/schema/survey/>
-        SELECT ?milestone_uri
-        WHERE {
-            <{{question_uri}}> cuma-survey:evaluatesNode ?milestone_uri .
-        }
-    """
-    sparql_query_templated = sparql_query.replace("{{question_uri}}", body.question_uri)
-
+    # 1. Look up the milestone_uri for the given question_uri
     try:
-        kg_results = kg_client.query_bindings(sparql_query_templated)
-        milestone_uri = None
-        for row in kg_results:
-            milestone_uri = _binding_str(row.get("milestone_uri"))
-            break  # Get the first milestone_uri found
-        
-        if not milestone_uri:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Milestone URI not found for question: {body.question_uri}"
-            )
-
+        question = get_survey_index(kg_client).by_uri.get(body.question_uri)
     except KnowledgeGraphQueryError as exc:
         logger.error("Failed to query knowledge graph for milestone URI: %s", exc)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve milestone information from knowledge graph"
         )
+
+    milestone_uri = question.milestone_uri if question else None
+    if not milestone_uri:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Milestone URI not found for question: {body.question_uri}"
+        )
     
     child_profile = _require_child_profile(db, body.child_id)
     child_id = child_profile.id
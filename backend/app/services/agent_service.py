@@ -4,7 +4,7 @@ import logging
 import re
 import time
 import random
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv, find_dotenv
 
@@ -15,7 +15,9 @@ from database.kg_client import KnowledgeGraphClient
 from database.services import ProfileService, CardService
 from database.models import Profile
 from ..core.config import PROMPT_TEMPLATES_FILE
+from backend.app.core.llm_clients import CancelToken, get_llm_client
 from ..utils.common import load_json_file
+from ..utils.json_stream import JSONArrayStreamParser
 
 logger = logging.getLogger(__name__)
 
@@ -210,48 +212,15 @@ You must adhere to these rules above all else:
             logger.warning("⚠️ No valid API Key. Returning Mock.")
             return AgentService._get_mock_response()
         
-        # Default Models
-        if not model_name:
-            if provider == "google":
-                model_name = "gemini-3.1-pro-preview"
-            elif provider == "deepseek":
-                model_name = "deepseek-chat"
-            elif provider == "openai":
-                model_name = "gpt-4o-mini"
-            else:
-                model_name = "gemini-3.1-pro-preview"  # Ultimate fallback
-        
+        model_name = model_name or AgentService._default_model(provider)
         max_retries = 3
         attempt = 0
         
         while attempt <= max_retries:
             try:
-                if provider == "google":
-                    import google.generativeai as genai
-                    genai.configure(api_key=api_key)
-                    # Ensure model name has 'models/' prefix if not present
-                    if not model_name.startswith("models/"):
-                        model_name = f"models/{model_name}"
-                    model = genai.GenerativeModel(model_name)
-                    response = model.generate_content(system_prompt)
-                    return response.text
-                else:
-                    # OpenAI-compatible API (DeepSeek, OpenAI, etc.)
-                    from openai import OpenAI
-                    
-                    # Set default base_url if not provided
-                    if not base_url:
-                        if provider == "deepseek":
-                            base_url = "https://api.deepseek.com"
-                        elif provider == "openai":
-                            base_url = "https://api.openai.com/v1"
-                    
-                    client = OpenAI(api_key=api_key, base_url=base_url)
-                    response = client.chat.completions.create(
-                        model=model_name,
-                        messages=[{"role": "user", "content": system_prompt}]
-                    )
-                    return response.choices[0].message.content
+                # Shared, already-connected client (see app.core.llm_clients)
+                client = get_llm_client(provider, api_key, model_name, base_url)
+                return client.complete(system_prompt)
                     
             except Exception as e:
                 error_str = str(e).lower()
@@ -269,6 +238,61 @@ You must adhere to these rules above all else:
         logger.error(f"❌ Max retries exceeded for {provider}/{model_name}")
         return "[]"
 
+    @staticmethod
+    def _call_llm_stream(system_prompt: str, api_key: str, provider: str, model_name: Optional[str] = None, base_url: Optional[str] = None, cancel: Optional[CancelToken] = None) -> Iterator[str]:
+        """
+        Streaming counterpart of _call_llm: yields the reply text as it arrives.
+
+        Rate-limit errors are retried only until the first token has been
+        yielded.  Any other failure (including one partway through the reply)
+        is re-raised, so a streaming endpoint can report it instead of treating
+        the partial text as a finished reply; a cancelled stream just ends.
+        """
+        if not api_key:
+            logger.warning("⚠️ No valid API Key. Returning Mock.")
+            yield AgentService._get_mock_response()
+            return
+
+        model_name = model_name or AgentService._default_model(provider)
+        max_retries = 3
+        attempt = 0
+        emitted = False
+
+        while attempt <= max_retries:
+            try:
+                client = get_llm_client(provider, api_key, model_name, base_url)
+                for delta in client.stream(system_prompt, cancel=cancel):
+                    emitted = True
+                    yield delta
+                return
+
+            except Exception as e:
+                error_str = str(e).lower()
+                if not emitted and ("429" in str(e) or "quota" in error_str or "rate limit" in error_str):
+                    wait_time = 2 ** attempt  # Exponential backoff
+                    logger.warning(f"⚠️ Rate limit error (attempt {attempt + 1}/{max_retries + 1}). Waiting {wait_time}s...")
+                    if cancel is None:
+                        time.sleep(wait_time)
+                    elif cancel.wait(wait_time):
+                        return
+                    attempt += 1
+                    continue
+                if cancel is not None and cancel.cancelled:
+                    return
+                logger.error(f"❌ LLM Error ({provider}/{model_name}): {e}")
+                raise
+
+        logger.error(f"❌ Max retries exceeded for {provider}/{model_name}")
+        raise RuntimeError(f"LLM rate limit: max retries exceeded for {provider}/{model_name}")
+
+    @staticmethod
+    def _default_model(provider: str) -> str:
+        if provider == "deepseek":
+            return "deepseek-chat"
+        if provider == "openai":
+            return "gpt-4o-mini"
+        return "gemini-3.1-pro-preview"  # Google, and the ultimate fallback
+
     @staticmethod
     def _get_mock_response() -> str:
         return json.dumps([{"text_field": "Mock Card [[c1::Answer]]", "tags": ["Mock"]}])
@@ -309,9 +333,8 @@ You must adhere to these rules above all else:
             return True
 
     @staticmethod
-    def generate_cards(topic_id: str, roster_id: str, template_id: str, user_instruction: str, quantity: int, db: Session, api_key: Optional[str] = None, provider: str = "google", model_name: Optional[str] = None, base_url: Optional[str] = None, word_param: Optional[str] = None) -> List[Dict[str, Any]]:
-        print(f"🚀 Generating: '{topic_id}' | Template: '{template_id}' | Qty: {quantity} | @word: {word_param}")
-
+    def _prepare_generation(topic_id: str, roster_id: str, template_id: str, user_instruction: str, quantity: int, db: Session) -> Tuple[str, str]:
+        """Resolve the profile and build the generation prompt; returns (profile_id, system_prompt)."""
         # 1. Resolve Data
         real_profile_id = AgentService._resolve_profile_id(db, roster_id) or roster_id
         profile = ProfileService.get_by_id(db, real_profile_id)
@@ -356,6 +379,64 @@ You must adhere to these rules above all else:
                 quantity=quantity,
                 user_instruction=user_instruction
             )
+        return real_profile_id, system_prompt
+
+    @staticmethod
+    def _save_card(db: Session, card: Any, real_profile_id: str, topic_id: str, word_param: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Normalise one card from the LLM reply and store it as pending; returns the staged card."""
+        if isinstance(card, str): card = {"text_field": card}
+        if not isinstance(card, dict): return None
+        
+        text_field = card.get("text_field", card.get("front", ""))
+        extra_field = card.get("extra_field", card.get("back", ""))
+        tags = card.get("tags", ["AI_Generated"])
+        
+        # AUTO-REPAIR: Underscores -> Cloze
+        if "___" in text_field and topic_id and "[[" not in text_field:
+            text_field = re.sub(r'_+', f"[[c1::{topic_id}]]", text_field)
+            print("🔧 Auto-repaired cloze syntax")
+
+        # Determine Type
+        has_cloze = AgentService._detect_cloze_syntax(text_field)
+        if has_cloze:
+            card_type = "interactive_cloze"
+            note_type = "CUMA - Interactive Cloze"
+        else:
+            card_type = "basic"
+            note_type = "CUMA - Basic"
+
+        staging = {
+            "card_type": card_type,
+            "note_type": note_type,
+            "tags": tags,
+            "text_field": text_field,
+            "extra_field": extra_field
+        }
+
+        # Force inject @word ground truth: target_word, knowledge_point, _KG_Map
+        if word_param and word_param.strip():
+            w = word_param.strip()
+            staging["target_word"] = w
+            staging["knowledge_point"] = f"word-en-{w}"
+            # Force generate _KG_Map if LLM response is missing it
+            kg_raw = card.get("_KG_Map") or card.get("field__KG_Map") or card.get("field__kg_map") or ""
+            if AgentService._is_kg_map_empty(kg_raw):
+                staging["field__KG_Map"] = AgentService._build_kg_map_for_kp(f"word-en-{w}")
+
+        try:
+            db_card = CardService.create(db, real_profile_id, card_type, staging, "pending")
+            staging["id"] = str(db_card.id)
+            print(f"💾 Saved #{db_card.id} ({card_type})")
+            return staging
+        except Exception as e:
+            logger.error(f"Save Failed: {e}")
+            return None
+
+    @staticmethod
+    def generate_cards(topic_id: str, roster_id: str, template_id: str, user_instruction: str, quantity: int, db: Session, api_key: Optional[str] = None, provider: str = "google", model_name: Optional[str] = None, base_url: Optional[str] = None, word_param: Optional[str] = None) -> List[Dict[str, Any]]:
+        print(f"🚀 Generating: '{topic_id}' | Template: '{template_id}' | Qty: {quantity} | @word: {word_param}")
+
+        real_profile_id, system_prompt = AgentService._prepare_generation(topic_id, roster_id, template_id, user_instruction, quantity, db)
 
         # 3. Execution (with dynamic provider support)
         # Resolve API key with provider awareness
@@ -375,50 +456,46 @@ You must adhere to these rules above all else:
             return []
 
         for card in cards_data[:quantity]:
-            if isinstance(card, str): card = {"text_field": card}
-            
-            text_field = card.get("text_field", card.get("front", ""))
-            extra_field = card.get("extra_field", card.get("back", ""))
-            tags = card.get("tags", ["AI_Generated"])
-            
-            # AUTO-REPAIR: Underscores -> Cloze
-            if "___" in text_field and topic_id and "[[" not in text_field:
-                text_field = re.sub(r'_+', f"[[c1::{topic_id}]]", text_field)
-                print("🔧 Auto-repaired cloze syntax")
-
-            # Determine Type
-            has_cloze = AgentService._detect_cloze_syntax(text_field)
-            if has_cloze:
-                card_type = "interactive_cloze"
-                note_type = "CUMA - Interactive Cloze"
-            else:
-                card_type = "basic"
-                note_type = "CUMA - Basic"
-
-            staging = {
-                "card_type": card_type,
-                "note_type": note_type,
-                "tags": tags,
-                "text_field": text_field,
-                "extra_field": extra_field
-            }
-
-            # Force inject @word ground truth: target_word, knowledge_point, _KG_Map
-            if word_param and word_param.strip():
-                w = word_param.strip()
-                staging["target_word"] = w
-                staging["knowledge_point"] = f"word-en-{w}"
-                # Force generate _KG_Map if LLM response is missing it
-                kg_raw = card.get("_KG_Map") or card.get("field__KG_Map") or card.get("field__kg_map") or ""
-                if AgentService._is_kg_map_empty(kg_raw):
-                    staging["field__KG_Map"] = AgentService._build_kg_map_for_kp(f"word-en-{w}")
-
-            try:
-                db_card = CardService.create(db, real_profile_id, card_type, staging, "pending")
-                staging["id"] = str(db_card.id)
+            staging = AgentService._save_card(db, card, real_profile_id, topic_id, word_param)
+            if staging is not None:
                 saved_cards.append(staging)
-                print(f"💾 Saved #{db_card.id} ({card_type})")
-            except Exception as e:
-                logger.error(f"Save Failed: {e}")
 
         return saved_cards
+
+    @staticmethod
+    def stream_cards(topic_id: str, roster_id: str, template_id: str, user_instruction: str, quantity: int, db: Session, api_key: Optional[str] = None, provider: str = "google", model_name: Optional[str] = None, base_url: Optional[str] = None, word_param: Optional[str] = None, cancel: Optional[CancelToken] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Streaming counterpart of generate_cards (blocking generator).
+
+        Yields ("token", text) for every LLM delta and ("card", staged_card) as
+        soon as a card object in the reply's JSON array is complete and saved,
+        then ("done", saved_cards).  Once `quantity` cards are saved (or the
+        array is closed) the LLM stream is closed, which aborts the upstream
+        request instead of paying for tokens nobody will read.
+        """
+        print(f"🚀 Streaming: '{topic_id}' | Template: '{template_id}' | Qty: {quantity} | @word: {word_param}")
+
+        real_profile_id, system_prompt = AgentService._prepare_generation(topic_id, roster_id, template_id, user_instruction, quantity, db)
+        resolved_api_key = AgentService._get_valid_api_key(api_key, provider)
+
+        parser = JSONArrayStreamParser()
+        saved_cards: List[Dict[str, Any]] = []
+        deltas = AgentService._call_llm_stream(system_prompt, resolved_api_key, provider, model_name, base_url, cancel)
+        try:
+            for delta in deltas:
+                yield "token", delta
+                for card in parser.feed(delta):
+                    staging = AgentService._save_card(db, card, real_profile_id, topic_id, word_param)
+                    if staging is not None:
+                        saved_cards.append(staging)
+                        yield "card", staging
+                    if len(saved_cards) >= quantity:
+                        break
+                if len(saved_cards) >= quantity or parser.finished:
+                    break
+        finally:
+            deltas.close()
+
+        if parser.skipped or not parser.started:
+            logger.error(f"JSON Parse Error: {parser.skipped} unparseable card(s), array found: {parser.started}")
+        yield "done", saved_cards
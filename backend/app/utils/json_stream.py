@@ -0,0 +1,85 @@
+"""
+Incremental parser for a JSON array that arrives in pieces (LLM token streams).
+
+Card generation asks the model for a JSON array of cards.  Waiting for the
+whole reply before parsing means nothing can be shown until the last token;
+this parser is fed the text as it streams in and returns each top-level
+element as soon as its closing brace/bracket/quote has arrived:
+
+    parser = JSONArrayStreamParser()
+    for delta in llm_client.stream(prompt):
+        for card in parser.feed(delta):
+            ...
+
+Anything before the first `[` (prose, a ```json fence) and after the matching
+`]` is ignored.  Brackets inside strings, including escaped quotes, are
+tracked, so a cloze like "{{c1::猫}}" does not confuse the depth count.
+Elements that fail to parse are skipped and counted in `skipped`.
+"""
+
+import json
+from typing import Any, List
+
+
+class JSONArrayStreamParser:
+    """Yields the elements of the first top-level JSON array in a streamed text."""
+
+    def __init__(self):
+        self.started = False
+        self.finished = False
+        self.skipped = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._element: List[str] = []
+
+    def feed(self, text: str) -> List[Any]:
+        """Consume the next piece of text and return the elements it completed."""
+        elements: List[Any] = []
+        for ch in text:
+            if self.finished:
+                break
+            if not self.started:
+                if ch == "[":
+                    self.started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                self._element.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._complete(elements)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._element.append(ch)
+            elif ch in "{[":
+                self._depth += 1
+                self._element.append(ch)
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.finished = True
+                    break
+                self._element.append(ch)
+                if self._depth == 1:
+                    self._complete(elements)
+            elif self._depth > 1:
+                self._element.append(ch)
+            # At depth 1 only separators (and bare scalars, which cards never are) remain
+        return elements
+
+    def _complete(self, elements: List[Any]) -> None:
+        raw = "".join(self._element)
+        self._element = []
+        try:
+            elements.append(json.loads(raw))
+        except json.JSONDecodeError:
+            self.skipped += 1
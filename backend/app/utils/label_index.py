@@ -0,0 +1,253 @@
+"""
+In-memory search index over rdfs:label values in the knowledge graph.
+
+Typeahead endpoints used to run `CONTAINS(LCASE(STR(?label)), ...)` over the
+whole store for every keystroke.  This index is built once per KG generation
+and answers substring/prefix queries from n-gram postings instead:
+
+  - every label is indexed as a lower-cased key (English, hanzi, ...)
+  - words with srs-kg:pinyin are also indexed by toneless pinyin ("pingguo")
+  - every node is indexed by its URI local name (slug)
+
+Queries of 3+ characters intersect trigram postings; shorter queries use the
+unigram/bigram postings kept for CJK keys, or a binary search over sorted keys
+(prefix matches) for Latin text.  Hits are ranked exact > prefix > word
+prefix > substring, then by key length.
+"""
+
+import bisect
+import logging
+import re
+import threading
+import unicodedata
+from array import array
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from database.kg_client import KnowledgeGraphClient, register_query
+
+logger = logging.getLogger(__name__)
+
+_CJK_PATTERN = re.compile(r"[㐀-鿿豈-﫿]")
+_WORD_BOUNDARY = re.compile(r"[\s_\-/()·,]+")
+
+_LABELS_QUERY = register_query("labels.all", """
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX srs-kg: <http://srs4autism.com/schema/>
+    SELECT ?node ?label (LANG(?label) AS ?lang) ?pinyin WHERE {
+        ?node rdfs:label ?label .
+        OPTIONAL { ?node srs-kg:pinyin ?pinyin . }
+    }
+    """)
+
+# Match quality, best first
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+
+def normalize_label(text: str) -> str:
+    """Case- and width-folded form used for matching."""
+    return unicodedata.normalize("NFKC", text or "").strip().lower()
+
+
+def toneless_pinyin(text: str) -> str:
+    """'píng guǒ' / 'ping2 guo3' -> 'pingguo' (ü is typed as v)."""
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower()).replace("u\u0308", "v")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return re.sub(r"[^a-z]", "", stripped)
+
+
+def local_name(uri: str) -> str:
+    """Last path/fragment segment of a URI ('.../concept/apple' -> 'apple')."""
+    return uri.rstrip("/").rsplit("/", 1)[-1].rsplit("#", 1)[-1]
+
+
+def _is_cjk(text: str) -> bool:
+    return bool(_CJK_PATTERN.search(text))
+
+
+def _grams(key: str, n: int) -> Set[str]:
+    return {key[i:i + n] for i in range(len(key) - n + 1)}
+
+
+@dataclass(frozen=True)
+class LabelHit:
+    uri: str
+    label: str
+    lang: str
+    key: str
+    rank: int
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"uri": self.uri, "label": self.label, "lang": self.lang, "matched": self.key, "rank": self.rank}
+
+
+class LabelSearchIndex:
+    """N-gram and prefix index over (uri, label, lang, key) entries."""
+
+    def __init__(self, entries: Iterable[Tuple[str, str, str, str]]):
+        self.entries: List[Tuple[str, str, str, str]] = []
+        self.labels_by_uri: Dict[str, Dict[str, str]] = {}
+        seen: Set[Tuple[str, str]] = set()
+        postings: Dict[str, List[int]] = {}
+
+        for uri, label, lang, key in entries:
+            if not key or (uri, key) in seen:
+                continue
+            seen.add((uri, key))
+            entry_id = len(self.entries)
+            self.entries.append((uri, label, lang, key))
+            grams = _grams(key, 3)
+            if _is_cjk(key):
+                grams |= _grams(key, 1) | _grams(key, 2)
+            for gram in grams:
+                postings.setdefault(gram, []).append(entry_id)
+            if label:
+                self.labels_by_uri.setdefault(uri, {}).setdefault(lang, label)
+
+        self.postings: Dict[str, array] = {gram: array("I", ids) for gram, ids in postings.items()}
+        self.sorted_keys: List[Tuple[str, int]] = sorted(
+            (key, entry_id) for entry_id, (_, _, _, key) in enumerate(self.entries)
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[Optional[str], ...]]) -> "LabelSearchIndex":
+        """Build from (node, label, lang, pinyin) rows as returned by the labels query."""
+        def entries():
+            slugs_done: Set[str] = set()
+            for node, label, lang, pinyin in rows:
+                if not node or not label:
+                    continue
+                lang = lang or ""
+                yield node, label, lang, normalize_label(label)
+                if pinyin:
+                    yield node, label, lang, toneless_pinyin(pinyin)
+                if node not in slugs_done:
+                    slugs_done.add(node)
+                    yield node, label, lang, normalize_label(local_name(node))
+        return cls(entries())
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def preferred_label(self, uri: str, lang: Optional[str] = None) -> Optional[str]:
+        labels = self.labels_by_uri.get(uri)
+        if not labels:
+            return None
+        for candidate in (lang, "en", "", "zh"):
+            if candidate is not None and candidate in labels:
+                return labels[candidate]
+        return next(iter(labels.values()))
+
+    def _candidates(self, query: str) -> Iterable[int]:
+        if len(query) >= 3:
+            gram_lists = [self.postings.get(gram) for gram in _grams(query, 3)]
+            if any(ids is None for ids in gram_lists):
+                return ()
+            gram_lists.sort(key=len)
+            result = set(gram_lists[0])
+            for ids in gram_lists[1:]:
+                result.intersection_update(ids)
+                if not result:
+                    break
+            return result
+        if _is_cjk(query):
+            return self.postings.get(query, ())
+        # Short Latin query: prefix matches only
+        start = bisect.bisect_left(self.sorted_keys, (query, -1))
+        ids = []
+        for key, entry_id in self.sorted_keys[start:]:
+            if not key.startswith(query):
+                break
+            ids.append(entry_id)
+        return ids
+
+    @staticmethod
+    def _rank(key: str, query: str) -> Optional[int]:
+        if key == query:
+            return EXACT
+        if key.startswith(query):
+            return PREFIX
+        position = key.find(query)
+        if position < 0:
+            return None
+        if _WORD_BOUNDARY.match(key[position - 1]):
+            return WORD_PREFIX
+        return SUBSTRING
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        lang: Optional[str] = None,
+        allowed: Optional[Callable[[str], bool]] = None,
+    ) -> List[LabelHit]:
+        """
+        Ranked label hits, one per URI (its best-matching key).
+
+        Args:
+            query: Text typed by the user (case/tones are ignored for pinyin)
+            limit: Maximum hits
+            lang: Only match labels in this language (e.g. "zh", "en")
+            allowed: Optional URI filter, e.g. restrict to graph nodes
+        """
+        normalized = normalize_label(query)
+        if not normalized:
+            return []
+        queries = {normalized}
+        pinyin = toneless_pinyin(normalized) if not _is_cjk(normalized) else ""
+        if pinyin and pinyin != normalized:
+            queries.add(pinyin)
+
+        best: Dict[str, Tuple[int, int, str, int]] = {}
+        for q in queries:
+            for entry_id in self._candidates(q):
+                uri, label, entry_lang, key = self.entries[entry_id]
+                if lang is not None and not entry_lang.startswith(lang):
+                    continue
+                if allowed is not None and not allowed(uri):
+                    continue
+                rank = self._rank(key, q)
+                if rank is None:
+                    continue
+                score = (rank, len(key), label, entry_id)
+                if uri not in best or score < best[uri]:
+                    best[uri] = score
+
+        ordered = sorted(best.items(), key=lambda item: item[1])[:limit]
+        hits = []
+        for uri, (rank, _, _, entry_id) in ordered:
+            _, label, entry_lang, key = self.entries[entry_id]
+            hits.append(LabelHit(uri=uri, label=label, lang=entry_lang, key=key, rank=rank))
+        return hits
+
+
+_label_index: Optional[Tuple[int, LabelSearchIndex]] = None
+_label_index_lock = threading.Lock()
+_kg_client: Optional[KnowledgeGraphClient] = None
+
+
+def get_label_index(kg_client: Optional[KnowledgeGraphClient] = None) -> LabelSearchIndex:
+    """Label index for the current KG generation (rebuilt after store writes)."""
+    global _label_index, _kg_client
+    if kg_client is None:
+        if _kg_client is None:
+            _kg_client = KnowledgeGraphClient(endpoint_url="oxigraph://embedded")
+        kg_client = _kg_client
+    generation = kg_client.generation()
+    cached = _label_index
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    with _label_index_lock:
+        cached = _label_index
+        if cached is None or cached[0] != generation:
+            rows = kg_client.execute(_LABELS_QUERY, as_tuples=True, use_cache=False).rows
+            index = LabelSearchIndex.from_rows(rows)
+            logger.info(
+                "Label search index built: %d keys, %d grams (generation %d)",
+                len(index),
+                len(index.postings),
+                generation,
+            )
+            cached = (generation, index)
+            _label_index = cached
+        return cached[1]
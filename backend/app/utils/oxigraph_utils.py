@@ -15,6 +15,17 @@ KG_PATH = PROJECT_ROOT / "data" / "knowledge_graph_store"
 
 class OxigraphManager:
     _store_instance: Optional[oxigraph.Store] = None
+    # Bumped on every write so in-memory caches derived from the store know when to rebuild
+    _generation: int = 0
+
+    @classmethod
+    def mark_changed(cls) -> int:
+        cls._generation += 1
+        return cls._generation
+
+    @classmethod
+    def generation(cls) -> int:
+        return cls._generation
 
     @classmethod
     def get_store(cls) -> oxigraph.Store:
@@ -33,3 +44,11 @@ class OxigraphManager:
 
 def get_kg_store() -> oxigraph.Store:
     return OxigraphManager.get_store()
+
+def get_store_generation() -> int:
+    """Monotonic counter of writes to the store in this process."""
+    return OxigraphManager.generation()
+
+def mark_store_changed() -> int:
+    """Record a write to the store (call after load/update) and return the new generation."""
+    return OxigraphManager.mark_changed()
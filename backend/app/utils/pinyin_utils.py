@@ -14,17 +14,6 @@ from ..core.config import PROJECT_ROOT, ENGLISH_SIMILARITY_FILE, WORD_KP_CACHE_F
 
 from fastapi import HTTPException
 from database.kg_client import KnowledgeGraphClient, normalize_for_kg
-import google.generativeai as genai
-from openai import OpenAI
-from dotenv import load_dotenv
-
-# Try to import rdflib for TTL parsing
-try:
-    from rdflib import Graph, Literal, Namespace
-    from rdflib.namespace import RDF, RDFS
-    HAS_RDFLIB = True
-except ImportError:
-    HAS_RDFLIB = False
 
 from scripts.knowledge_graph.pinyin_parser import TONE_MARKS, extract_tone, add_tone_to_final, parse_pinyin
 
@@ -34,25 +23,40 @@ logger = logging.getLogger(__name__)
 # Load environment variables (for Gemini API key)
 WORD_IMAGE_MAP_FILE = PROJECT_ROOT / "data" / "word_image_map.json"
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # FIX: Changed default from deprecated "gemini-pro" to current "gemini-3.1-pro-preview"
 GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-3.1-pro-preview")
 
-# Initialize Gemini model
-_genai_model: Optional[genai.GenerativeModel] = None
-if GEMINI_API_KEY:
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        # Add "models/" prefix if not present (required by Gemini API)
-        model_name = GEMINI_MODEL_NAME
-        if not model_name.startswith("models/"):
-            model_name = f"models/{model_name}"
-        _genai_model = genai.GenerativeModel(model_name)
-        logger.info(f"✅ Initialized Gemini model for word lookup: {model_name}")
-    except Exception as exc:
-        logger.warning(f"⚠️ Unable to configure Gemini model: {exc}")
-else:
-    logger.warning("⚠️ GEMINI_API_KEY not set; falling back to cache-only knowledge lookup.")
+# Gemini model for word lookups. google.generativeai takes seconds to import, so it is
+# imported and configured on the first lookup that needs it (not when this module loads).
+_genai_model = None
+_genai_model_loaded = False
+_genai_model_lock = threading.Lock()
+
+
+def _get_genai_model():
+    global _genai_model, _genai_model_loaded
+    if _genai_model_loaded:
+        return _genai_model
+    with _genai_model_lock:
+        if _genai_model_loaded:
+            return _genai_model
+        api_key = os.getenv("GEMINI_API_KEY")
+        if api_key:
+            try:
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                # Add "models/" prefix if not present (required by Gemini API)
+                model_name = GEMINI_MODEL_NAME
+                if not model_name.startswith("models/"):
+                    model_name = f"models/{model_name}"
+                _genai_model = genai.GenerativeModel(model_name)
+                logger.info(f"✅ Initialized Gemini model for word lookup: {model_name}")
+            except Exception as exc:
+                logger.warning(f"⚠️ Unable to configure Gemini model: {exc}")
+        else:
+            logger.warning("⚠️ GEMINI_API_KEY not set; falling back to cache-only knowledge lookup.")
+        _genai_model_loaded = True
+    return _genai_model
 
 # Cache files
 
@@ -189,7 +193,8 @@ def _clean_llm_json(text: str) -> Dict[str, Any]:
         return {}
 
 def _fetch_word_info_via_llm(word: str) -> Dict[str, Any]:
-    if not _genai_model:
+    model = _get_genai_model()
+    if not model:
         return {}
     prompt = (
         "You are a bilingual lexicon assistant.\n"
@@ -197,7 +202,7 @@ def _fetch_word_info_via_llm(word: str) -> Dict[str, Any]:
         "Respond ONLY with JSON like: {\"pinyin\": \"dú zhě\", \"meaning\": \"reader\"}."
     )
     try:
-        response = _genai_model.generate_content(prompt)
+        response = model.generate_content(prompt)
         text = getattr(response, "text", "") or ""
         data = _clean_llm_json(text)
         result: Dict[str, Any] = {}
@@ -300,7 +305,7 @@ def get_word_knowledge(word: str) -> Dict[str, Any]:
     if not hsk_level and cache_hsk:
         hsk_level = cache_hsk
 
-    needs_llm = (not pronunciations or not meanings) and _genai_model is not None
+    needs_llm = (not pronunciations or not meanings) and _get_genai_model() is not None
     if needs_llm:
         llm_info = _fetch_word_info_via_llm(word)
         updated = False
@@ -358,7 +363,10 @@ def get_word_image_map() -> Dict[str, str]:
         if not ttl_file.exists():
             return {}
 
-        if not HAS_RDFLIB:
+        try:
+            from rdflib import Graph, Namespace
+            from rdflib.namespace import RDF, RDFS
+        except ImportError:
             logger.warning("rdflib not installed, cannot parse TTL for image mapping")
             return {}
 
@@ -28,6 +28,13 @@ class Settings(BaseSettings):
 
     # Oxigraph Configuration
     kg_store_path: str = "./cuma_knowledge_graph"
+    # Entries in the prepared-query result cache (0 disables caching)
+    kg_query_cache_size: int = 512
+    # Raw /api/kg/query limits: rows per streamed response, rows a buffered
+    # (non-streaming) response may hold in memory, and wall-clock seconds
+    kg_query_max_rows: int = 1_000_000
+    kg_query_max_buffered_rows: int = 100_000
+    kg_query_timeout: float = 120.0
 
     # Database Configuration
     database_url: Optional[str] = None
@@ -5,8 +5,8 @@ Database connection and session management.
 from contextlib import contextmanager
 from pathlib import Path
 
-from sqlalchemy import create_engine, event
-from sqlalchemy.pool import StaticPool
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.pool import QueuePool, StaticPool
 from sqlalchemy.orm import Session, sessionmaker
 
 # Import models
@@ -15,6 +15,15 @@ from backend.app.models import Base, ChildProfile, MilestoneProgress
 # Project root
 from backend.app.core.config import PROJECT_ROOT, DATABASE_PATH
 
+# Shared pragmas / pool sizing / query metrics (also used by scripts/daily_scheduler.py)
+from backend.database.sqlite_pool import (
+    BUSY_TIMEOUT_MS,
+    POOL_SIZE,
+    POOL_TIMEOUT,
+    apply_pragmas,
+    instrument_engine,
+)
+
 # Database file location
 DB_PATH = DATABASE_PATH
 
@@ -26,32 +35,69 @@ DATABASE_URL = f"sqlite:///{DB_PATH}"
 
 # Create engine
 # For SQLite, we use:
-# - check_same_thread=False to allow use in async contexts
-# - StaticPool for testing, NullPool for production
+# - check_same_thread=False to allow use in async contexts and worker pools
+# - a bounded QueuePool so connections (and their page caches) are reused
+# - WAL journal + busy timeout so concurrent readers/writers wait instead of
+#   failing with "database is locked"
+# - StaticPool for the in-memory test database
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},
+    connect_args={"check_same_thread": False, "timeout": BUSY_TIMEOUT_MS / 1000},
+    poolclass=QueuePool,
+    pool_size=POOL_SIZE,
+    max_overflow=POOL_SIZE,
+    pool_timeout=POOL_TIMEOUT,
     echo=False,  # Set to True for SQL query logging
 )
 
-# Enable foreign key support for SQLite
+# WAL, synchronous=NORMAL, cache sizing, foreign keys, ...
 @event.listens_for(engine, "connect")
 def set_sqlite_pragma(dbapi_conn, connection_record):
-    cursor = dbapi_conn.cursor()
-    cursor.execute("PRAGMA foreign_keys=ON")
-    cursor.close()
+    apply_pragmas(dbapi_conn)
+
+
+# Per-request / global query counts and latency (see sqlite_pool.track_queries)
+instrument_engine(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Idempotent SQL migrations applied by init_db once the tables they touch exist
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+STARTUP_MIGRATIONS = [
+    ("add_mastered_word_card_indexes.sql", {"mastered_words", "approved_cards"}),
+    ("add_profile_name_index.sql", {"profiles"}),
+    ("add_chat_session_messages_table.sql", set()),
+    ("move_chat_session_messages.sql", {"chat_sessions", "chat_session_messages"}),
+]
+
 
 def init_db():
     """Initialize database by creating all tables and seeding initial data"""
     print(f"Initializing database at: {DB_PATH}")
     Base.metadata.create_all(bind=engine)
+    apply_startup_migrations()
     print("✅ Database initialized successfully")
     seed_initial_data()
 
+
+def apply_startup_migrations():
+    """Run STARTUP_MIGRATIONS whose tables are present (each script is safe to re-run)."""
+    for filename, required_tables in STARTUP_MIGRATIONS:
+        # Re-inspected per script: earlier scripts may create tables later ones need
+        if not required_tables <= set(inspect(engine).get_table_names()):
+            continue
+        raw_conn = engine.raw_connection()
+        try:
+            before = raw_conn.total_changes
+            raw_conn.executescript((MIGRATIONS_DIR / filename).read_text(encoding="utf-8"))
+            raw_conn.commit()
+            changed = raw_conn.total_changes - before
+        finally:
+            raw_conn.close()
+        if changed:
+            print(f"🧹 {filename}: {changed} row(s) migrated")
+
 def seed_initial_data():
     """Seed initial data for ChildProfile if not already present."""
     with get_db_session() as db:
@@ -111,7 +157,7 @@ def create_backup(backup_path: Path = None):
     Args:
         backup_path: Optional custom backup path
     """
-    import shutil
+    import sqlite3
     from datetime import datetime
 
     if not DB_PATH.exists():
@@ -123,16 +169,31 @@ def create_backup(backup_path: Path = None):
         backup_path = PROJECT_ROOT / "data" / "backups" / f"srs4autism_{timestamp}.db"
 
     backup_path.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copy2(DB_PATH, backup_path)
+    # The online backup API reads through SQLite, so pages still in the -wal
+    # file are included (a plain file copy would miss them)
+    source = sqlite3.connect(DB_PATH)
+    target = sqlite3.connect(backup_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
     print(f"✅ Database backup created: {backup_path}")
     return backup_path
 
 
+def _remove_wal_files():
+    """Delete DB_PATH's -wal and -shm files, if any."""
+    for suffix in ("-wal", "-shm"):
+        DB_PATH.with_name(DB_PATH.name + suffix).unlink(missing_ok=True)
+
+
 def restore_backup(backup_path: Path):
     """
     Restore database from a backup
 
-    Args:\n        backup_path: Path to backup file
+    Args:
+        backup_path: Path to backup file
     """
     import shutil
 
@@ -143,7 +204,12 @@ def restore_backup(backup_path: Path):
     if DB_PATH.exists():
         create_backup(DB_PATH.parent / f"{DB_PATH.stem}_before_restore{DB_PATH.suffix}")
 
+    # Close pooled connections, and never leave the old -wal/-shm pair next to
+    # the restored file: SQLite would replay those frames onto it
+    engine.dispose()
+    _remove_wal_files()
     shutil.copy2(backup_path, DB_PATH)
+    _remove_wal_files()
     print(f"✅ Database restored from: {backup_path}")
 
 
@@ -8,7 +8,10 @@ using an embedded Oxigraph store.
 import requests
 import pyoxigraph as oxigraph
 import re
-from typing import Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Mapping, NamedTuple, Optional, Tuple, Union
 from pathlib import Path
 from backend.config import settings
 
@@ -37,6 +40,159 @@ class KnowledgeGraphQueryError(KnowledgeGraphError):
     pass
 
 
+class IRI(str):
+    """Marks a prepared-query parameter as an IRI; plain str parameters bind as string literals."""
+
+
+_PARAM_PATTERN = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)")
+
+
+def sparql_term(value: Any) -> str:
+    """
+    Serialize a Python value as a SPARQL term for a prepared-query parameter.
+
+    IRI / NamedNode -> <...>, str -> escaped string literal, bool/int/float ->
+    typed literals, Oxigraph Literal -> as-is (keeps language/datatype), and
+    list/tuple/set -> space-separated terms (for VALUES blocks).
+    """
+    if isinstance(value, IRI):
+        return str(oxigraph.NamedNode(value))
+    if isinstance(value, (oxigraph.NamedNode, oxigraph.Literal)):
+        return str(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        return str(oxigraph.Literal(repr(value), datatype=oxigraph.NamedNode("http://www.w3.org/2001/XMLSchema#double")))
+    if isinstance(value, str):
+        return str(oxigraph.Literal(value))
+    if isinstance(value, (set, frozenset)):
+        return " ".join(sorted(sparql_term(item) for item in value))
+    if isinstance(value, (list, tuple)):
+        return " ".join(sparql_term(item) for item in value)
+    raise TypeError(f"Unsupported SPARQL parameter type: {type(value).__name__}")
+
+
+def _freeze_param(value: Any) -> Any:
+    """Hashable cache-key form of a parameter; values that render as different terms never compare equal."""
+    if isinstance(value, (set, frozenset)):
+        return ("set", frozenset(_freeze_param(item) for item in value))
+    if isinstance(value, (list, tuple)):
+        return ("seq", tuple(_freeze_param(item) for item in value))
+    if isinstance(value, IRI):
+        return ("iri", str(value))
+    if isinstance(value, (oxigraph.NamedNode, oxigraph.Literal)):
+        return ("term", str(value))
+    # Tag scalars too: True == 1 == 1.0, but they render as different literals
+    return (type(value).__name__, value)
+
+
+@dataclass(frozen=True)
+class PreparedQuery:
+    """A named SPARQL template; `$name` placeholders are bound with `sparql_term`."""
+
+    query_id: str
+    template: str
+
+    @property
+    def params(self) -> Tuple[str, ...]:
+        return tuple(dict.fromkeys(_PARAM_PATTERN.findall(self.template)))
+
+    def render(self, params: Optional[Mapping[str, Any]] = None) -> str:
+        params = params or {}
+        missing = [name for name in self.params if name not in params]
+        if missing:
+            raise KnowledgeGraphQueryError(f"Query '{self.query_id}' is missing parameters: {', '.join(missing)}")
+        try:
+            return _PARAM_PATTERN.sub(lambda match: sparql_term(params[match.group(1)]), self.template)
+        except (TypeError, ValueError) as e:
+            raise KnowledgeGraphQueryError(f"Invalid parameter for query '{self.query_id}': {e}") from e
+
+
+_query_registry: Dict[str, PreparedQuery] = {}
+_registry_lock = threading.Lock()
+
+
+def register_query(query_id: str, template: str) -> PreparedQuery:
+    """
+    Register a named query template (idempotent for an identical template).
+
+    Example:
+        >>> LABELS = register_query("graph.labels", '''
+        ... SELECT ?node ?label WHERE { VALUES ?node { $nodes } ?node rdfs:label ?label }
+        ... ''')
+        >>> KnowledgeGraphClient().execute(LABELS, {"nodes": [IRI(u) for u in uris]}, as_tuples=True)
+    """
+    with _registry_lock:
+        existing = _query_registry.get(query_id)
+        if existing is not None:
+            if existing.template != template:
+                raise ValueError(f"Query id '{query_id}' is already registered with a different template")
+            return existing
+        prepared = PreparedQuery(query_id, template)
+        _query_registry[query_id] = prepared
+        return prepared
+
+
+def get_registered_query(query_id: str) -> PreparedQuery:
+    try:
+        return _query_registry[query_id]
+    except KeyError:
+        raise KnowledgeGraphQueryError(f"Unknown query id: {query_id}") from None
+
+
+class QueryRows(NamedTuple):
+    """Tuple-mode result: variable names plus one tuple of plain values (or None) per solution."""
+
+    variables: Tuple[str, ...]
+    rows: Tuple[Tuple[Optional[str], ...], ...]
+
+
+class QueryResultCache:
+    """Thread-safe LRU of query results keyed by (query id, params, store generation, mode)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+_result_cache = QueryResultCache(settings.kg_query_cache_size)
+
+
+def query_cache_stats() -> Dict[str, int]:
+    return _result_cache.stats()
+
+
 class KnowledgeGraphClient:
     """
     Client for executing SPARQL queries against an embedded Oxigraph store.
@@ -46,6 +202,9 @@ class KnowledgeGraphClient:
         >>> query = "SELECT * WHERE { ?s ?p ?o } LIMIT 10"
         >>> results = client.query(query)
         >>> bindings = results.get("results", {}).get("bindings", [])
+
+    Hot read paths should use named queries via `execute()` instead: parameters
+    are bound safely and results are cached until the store changes.
     """
 
     def __init__(self, endpoint_url: Optional[str] = None, timeout: int = 30):
@@ -99,6 +258,8 @@ class KnowledgeGraphClient:
         try:
             # Use path parameter - pyoxigraph can handle the file directly
             self.store.load(path=file_path, format=format)
+            from app.utils.oxigraph_utils import mark_store_changed
+            mark_store_changed()
         except FileNotFoundError as e:
             raise KnowledgeGraphError(
                 f"File not found: {file_path}"
@@ -108,6 +269,17 @@ class KnowledgeGraphClient:
                 f"Failed to load file {file_path}: {str(e)}"
             ) from e
 
+    def generation(self) -> int:
+        """
+        Return the store's write generation, for invalidating caches built from query results.
+
+        External endpoints are not observable from here, so they always report 0.
+        """
+        if self.is_fuseki:
+            return 0
+        from app.utils.oxigraph_utils import get_store_generation
+        return get_store_generation()
+
     def query(self, sparql_query: str) -> Dict[str, Any]:
         """
         Execute a SPARQL query and return the results in SPARQL JSON format.
@@ -223,6 +395,85 @@ class KnowledgeGraphClient:
         results = self.query(sparql_query)
         return results.get("results", {}).get("bindings", [])
 
+    def execute(
+        self,
+        query: Union[str, PreparedQuery],
+        params: Optional[Mapping[str, Any]] = None,
+        as_tuples: bool = False,
+        use_cache: bool = True,
+    ) -> Union[Dict[str, Any], QueryRows]:
+        """
+        Run a registered query with bound parameters.
+
+        Results are cached per (query id, params, store generation), so they are
+        shared between callers and must be treated as read-only.  Fuseki
+        endpoints are never cached because their generation is not observable.
+
+        Args:
+            query: A PreparedQuery or the id it was registered under
+            params: Values for the template's `$name` placeholders
+            as_tuples: Return QueryRows (plain values) instead of SPARQL JSON
+            use_cache: Set False for results the caller caches itself
+
+        Returns:
+            SPARQL JSON dict, or QueryRows when as_tuples is set
+        """
+        prepared = query if isinstance(query, PreparedQuery) else get_registered_query(query)
+        sparql_query = prepared.render(params)
+        cacheable = use_cache and not self.is_fuseki
+        if cacheable:
+            frozen = tuple(sorted((name, _freeze_param(value)) for name, value in (params or {}).items()))
+            key = (prepared.query_id, frozen, self.generation(), as_tuples)
+            cached = _result_cache.get(key)
+            if cached is not None:
+                return cached
+
+        result = self.query_tuples(sparql_query) if as_tuples else self.query(sparql_query)
+        if cacheable:
+            _result_cache.put(key, result)
+        return result
+
+    def execute_bindings(
+        self, query: Union[str, PreparedQuery], params: Optional[Mapping[str, Any]] = None, use_cache: bool = True
+    ) -> List[Dict[str, Any]]:
+        """`execute()` returning just the SPARQL JSON bindings (read-only when cached)."""
+        result = self.execute(query, params, use_cache=use_cache)
+        return result.get("results", {}).get("bindings", [])
+
+    def query_tuples(self, sparql_query: str) -> QueryRows:
+        """
+        Execute a SELECT query and return plain term values as tuples.
+
+        Skips building a dict per binding; language tags and datatypes are
+        dropped, so filter on them in the query instead.
+        """
+        if self.is_fuseki:
+            results = self.query(sparql_query)
+            variables = tuple(results.get("head", {}).get("vars", []))
+            rows = tuple(
+                tuple(binding.get(var, {}).get("value") for var in variables)
+                for binding in results.get("results", {}).get("bindings", [])
+            )
+            return QueryRows(variables, rows)
+        try:
+            results = self.store.query(sparql_query)
+            variables = tuple(var.value for var in results.variables)
+            rows = []
+            for solution in results:
+                row = []
+                for var_name in variables:
+                    try:
+                        value = solution[var_name]
+                    except (KeyError, TypeError):
+                        value = None
+                    row.append(None if value is None else str(value.value))
+                rows.append(tuple(row))
+            return QueryRows(variables, tuple(rows))
+        except Exception as e:
+            raise KnowledgeGraphQueryError(
+                f"Query execution failed: {str(e)}"
+            ) from e
+
     def health_check(self) -> bool:
         """
         Check if the knowledge graph store is accessible.
@@ -43,6 +43,12 @@ class Profile(Base):
     approved_cards = relationship("ApprovedCard", back_populates="profile", cascade="all, delete-orphan")
     chat_messages = relationship("ChatMessage", back_populates="profile", cascade="all, delete-orphan")
     
+    # Constraints
+    __table_args__ = (
+        # ProfileService.find_by_name (chat @mention resolution)
+        Index('idx_profiles_name_nocase', name.collate('NOCASE')),
+    )
+    
     def __repr__(self):
         return f"<Profile(id='{self.id}', name='{self.name}')>"
 
@@ -60,11 +66,10 @@ class MasteredWord(Base):
     # Relationship
     profile = relationship("Profile", back_populates="mastered_words")
     
-    # Constraints
+    # Constraints (kept in sync with backend/migrations/add_mastered_word_card_indexes.sql)
     __table_args__ = (
-        UniqueConstraint('profile_id', 'word', 'language', name='uq_profile_word_lang'),
-        Index('idx_mastered_words_profile', 'profile_id'),
-        Index('idx_mastered_words_language', 'language'),
+        Index('uq_profile_word_lang', 'profile_id', 'word', 'language', unique=True),
+        Index('idx_mastered_words_profile_lang', 'profile_id', 'language', 'word'),
     )
     
     def __repr__(self):
@@ -107,9 +112,10 @@ class ApprovedCard(Base):
     # Relationship
     profile = relationship("Profile", back_populates="approved_cards")
     
-    # Constraints
+    # Constraints (kept in sync with backend/migrations/add_mastered_word_card_indexes.sql)
     __table_args__ = (
-        Index('idx_approved_cards_profile', 'profile_id'),
+        Index('idx_approved_cards_profile_id', 'profile_id', 'id'),
+        Index('idx_approved_cards_profile_status', 'profile_id', 'status', 'id'),
     )
     
     def __repr__(self):
@@ -287,7 +293,7 @@ class ChatSession(Base):
     session_id = Column(String, primary_key=True)
     topic_id = Column(String, nullable=False)  # Grammar Point ID (e.g., en_grammar_101)
     roster_id = Column(String, nullable=False)  # Student profile ID (e.g., yiming)
-    messages = Column(Text, nullable=False)  # JSON array of messages
+    messages = Column(Text, nullable=False)  # Legacy JSON array; messages now live in chat_session_messages
     last_updated = Column(DateTime, default=func.now(), onupdate=func.now())
     created_at = Column(DateTime, default=func.now())
     
@@ -303,6 +309,39 @@ class ChatSession(Base):
         return f"<ChatSession(session_id='{self.session_id}', topic_id='{self.topic_id}', roster_id='{self.roster_id}')>"
 
 
+class ChatSessionMessage(Base):
+    """
+    Append-only message log for chat sessions.
+
+    Topic chats use ChatSession.session_id; the global assistant chat uses
+    GLOBAL_CHAT_SESSION_ID (it has no ChatSession row).  id is the append
+    order, so (session_id, id) serves both "latest N" and keyset paging.
+    """
+    __tablename__ = 'chat_session_messages'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(String, nullable=False)
+    role = Column(String, nullable=False)  # 'user' or 'assistant'
+    content = Column(Text, nullable=False)
+    timestamp = Column(DateTime, default=func.now())
+    extra = Column(Text)  # JSON object with any other message fields (client id, mentions, cards, ...)
+
+    # Constraints
+    __table_args__ = (
+        Index('idx_chat_session_messages_session', 'session_id', 'id'),
+        Index('idx_chat_session_messages_session_ts', 'session_id', 'timestamp'),
+        # Never reuse ids of deleted rows: before_id keyset cursors depend on it
+        # (same schema as migrations/add_chat_session_messages_table.sql)
+        {'sqlite_autoincrement': True},
+    )
+
+    def __repr__(self):
+        return f"<ChatSessionMessage(id={self.id}, session_id='{self.session_id}', role='{self.role}')>"
+
+
+GLOBAL_CHAT_SESSION_ID = "global"
+
+
 class HhsGoal(Base):
     """
     Heep Hong Society (HHS) curriculum goals ingested from scripts/data_extraction/*.ttl.
@@ -338,3 +377,50 @@ class HhsGoal(Base):
     def __repr__(self) -> str:
         return f"<HhsGoal(quest_id='{self.quest_id}', label='{self.label[:40]}...')>"
 
+
+
+class FsrsCardState(Base):
+    """
+    Current FSRS card per (profile, quest) for the daily scheduler.
+    Replaces profiles.extracted_data['fsrs_states']; due/last_review are UTC 'YYYY-MM-DDTHH:MM:SSZ'
+    strings so the scheduler can range-scan (profile_id, due).
+    """
+
+    __tablename__ = "fsrs_card_states"
+
+    profile_id = Column(String, primary_key=True)
+    quest_id = Column(String, primary_key=True)
+    due = Column(String)
+    last_review = Column(String)
+    state = Column(Integer)
+    card_json = Column(Text, nullable=False)  # fsrs Card.to_dict()
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("idx_fsrs_card_states_due", "profile_id", "due"),
+        Index("idx_fsrs_card_states_last_review", "profile_id", "last_review"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<FsrsCardState(profile_id='{self.profile_id}', quest_id='{self.quest_id}', due='{self.due}')>"
+
+
+class FsrsReviewLog(Base):
+    """Append-only log of parent/teacher feedback reviews (one row per record_feedback call)."""
+
+    __tablename__ = "fsrs_review_logs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    profile_id = Column(String, nullable=False)
+    quest_id = Column(String, nullable=False)
+    rating = Column(Integer, nullable=False)
+    prompt_level = Column(String)
+    reviewed_at = Column(String, nullable=False)
+    due_after = Column(String)
+
+    __table_args__ = (
+        Index("idx_fsrs_review_logs_quest", "profile_id", "quest_id", "reviewed_at"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<FsrsReviewLog(profile_id='{self.profile_id}', quest_id='{self.quest_id}', rating={self.rating})>"
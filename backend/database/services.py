@@ -3,11 +3,17 @@ Database service layer for business logic
 """
 
 import json
+from datetime import datetime
+from pathlib import Path
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-from .models import Profile, MasteredWord, MasteredGrammar, ApprovedCard, ChatMessage, AuditLog, ChatSession
+from .models import (
+    Profile, MasteredWord, MasteredGrammar, ApprovedCard, ChatMessage, AuditLog, ChatSession,
+    ChatSessionMessage, GLOBAL_CHAT_SESSION_ID,
+)
 
 
 class ProfileService:
@@ -26,6 +32,29 @@ class ProfileService:
         """Get profile by ID"""
         return db.query(Profile).filter(Profile.id == profile_id).first()
     
+    @staticmethod
+    def find_by_name(db: Session, name: str) -> Optional[Profile]:
+        """
+        Case-insensitive profile lookup by name: an exact match first, else the
+        first name starting with `name`.  Both use idx_profiles_name_nocase: the
+        prefix match is written as a NOCASE range, which (unlike LIKE) the
+        expression index can serve.
+        """
+        name = (name or "").strip()
+        if not name:
+            return None
+        nocase_name = Profile.name.collate("NOCASE")
+        profile = db.query(Profile).filter(nocase_name == name).first()
+        if profile is None:
+            # Every string starting with `name` sorts in [name, name + U+10FFFF)
+            profile = (
+                db.query(Profile)
+                .filter(nocase_name >= name, nocase_name < name + "\U0010FFFF")
+                .order_by(nocase_name)
+                .first()
+            )
+        return profile
+    
     @staticmethod
     def create(db: Session, profile_data: Dict[str, Any]) -> Profile:
         """Create new profile"""
@@ -48,12 +77,8 @@ class ProfileService:
         db.flush()  # Get the profile ID
         
         # Add mastered words
-        for word in mastered_words_zh:
-            if word.strip():
-                db.add(MasteredWord(profile_id=profile.id, word=word.strip(), language='zh'))
-        for word in mastered_words_en:
-            if word.strip():
-                db.add(MasteredWord(profile_id=profile.id, word=word.strip(), language='en'))
+        ProfileService.add_mastered_words(db, profile.id, mastered_words_zh, 'zh')
+        ProfileService.add_mastered_words(db, profile.id, mastered_words_en, 'en')
         
         # Add mastered grammar
         for grammar_uri in mastered_grammar_list:
@@ -105,16 +130,10 @@ class ProfileService:
         
         # Update mastered words if provided
         if mastered_words_zh is not None:
-            db.query(MasteredWord).filter_by(profile_id=profile_id, language='zh').delete()
-            for word in mastered_words_zh:
-                if word.strip():
-                    db.add(MasteredWord(profile_id=profile_id, word=word.strip(), language='zh'))
+            ProfileService.set_mastered_words(db, profile_id, mastered_words_zh, 'zh')
         
         if mastered_words_en is not None:
-            db.query(MasteredWord).filter_by(profile_id=profile_id, language='en').delete()
-            for word in mastered_words_en:
-                if word.strip():
-                    db.add(MasteredWord(profile_id=profile_id, word=word.strip(), language='en'))
+            ProfileService.set_mastered_words(db, profile_id, mastered_words_en, 'en')
         
         # Update mastered grammar if provided
         if mastered_grammar_list is not None:
@@ -173,6 +192,45 @@ class ProfileService:
         ).all()
         return [w[0] for w in words]
     
+    @staticmethod
+    def add_mastered_words(db: Session, profile_id: str, words: List[str], language: str = 'zh') -> int:
+        """
+        Insert mastered words, skipping ones the profile already has.
+
+        Relies on the (profile_id, word, language) unique index, so concurrent
+        or repeated calls cannot create duplicates. Does not commit.
+        Returns the number of newly added words.
+        """
+        rows = [
+            {'profile_id': profile_id, 'word': word, 'language': language}
+            for word in dict.fromkeys(w.strip() for w in words if w and w.strip())
+        ]
+        if not rows:
+            return 0
+        result = db.connection().execute(sqlite_insert(MasteredWord.__table__).on_conflict_do_nothing(), rows)
+        return max(result.rowcount, 0)
+    
+    @staticmethod
+    def set_mastered_words(db: Session, profile_id: str, words: List[str], language: str = 'zh') -> None:
+        """
+        Replace a profile's mastered words for one language.
+
+        Only the difference is written: removed words are deleted, new ones
+        upserted, and unchanged rows keep their original added_at. Does not commit.
+        """
+        wanted = {w.strip() for w in words if w and w.strip()}
+        existing = db.query(MasteredWord.id, MasteredWord.word).filter_by(
+            profile_id=profile_id,
+            language=language
+        ).all()
+        stale_ids = [row_id for row_id, word in existing if word not in wanted]
+        for start in range(0, len(stale_ids), 500):
+            db.query(MasteredWord).filter(
+                MasteredWord.id.in_(stale_ids[start:start + 500])
+            ).delete(synchronize_session=False)
+        current = {word for _, word in existing}
+        ProfileService.add_mastered_words(db, profile_id, [w for w in wanted if w not in current], language)
+    
     @staticmethod
     def get_mastered_grammar(db: Session, profile_id: str) -> List[str]:
         """Get list of mastered grammar URIs for a profile"""
@@ -223,6 +281,31 @@ class CardService:
         """Get all approved cards for a profile"""
         return db.query(ApprovedCard).filter_by(profile_id=profile_id).all()
     
+    @staticmethod
+    def list_page(
+        db: Session,
+        profile_id: Optional[str] = None,
+        limit: Optional[int] = 50,
+        before_id: Optional[int] = None,
+        status: Optional[str] = None,
+    ) -> List[ApprovedCard]:
+        """
+        One page of cards, newest first, using keyset pagination on id.
+
+        Pass the id of the last card of the previous page as before_id; unlike
+        OFFSET, each page is a range scan on the (profile_id, [status,] id)
+        index no matter how deep the listing goes.  limit=None returns every
+        matching card.
+        """
+        query = db.query(ApprovedCard)
+        if profile_id is not None:
+            query = query.filter(ApprovedCard.profile_id == profile_id)
+        if status is not None:
+            query = query.filter(ApprovedCard.status == status)
+        if before_id is not None:
+            query = query.filter(ApprovedCard.id < before_id)
+        return query.order_by(ApprovedCard.id.desc()).limit(limit).all()
+    
     @staticmethod
     def create(db: Session, profile_id: str, card_type: str, content: Dict[str, Any], status: str = "pending") -> ApprovedCard:
         """
@@ -269,16 +352,24 @@ class ChatService:
 
 
 class ChatSessionService:
-    """Service for topic-specific chat session operations"""
+    """
+    Service for chat session operations.
+
+    Messages are rows in chat_session_messages (append-only), so adding one
+    is a single INSERT and reading a page is an index range scan, however
+    long the conversation has grown.
+    """
+
+    @staticmethod
+    def session_id_for(topic_id: str, roster_id: str) -> str:
+        """Session ids are the md5 of "topic_id:roster_id"."""
+        import hashlib
+        return hashlib.md5(f"{topic_id}:{roster_id}".encode()).hexdigest()
     
     @staticmethod
     def get_or_create_session(db: Session, topic_id: str, roster_id: str) -> ChatSession:
         """Get existing session or create a new one for topic_id + roster_id"""
-        # Generate session_id from topic_id and roster_id
-        import hashlib
-        session_key = f"{topic_id}:{roster_id}"
-        session_id = hashlib.md5(session_key.encode()).hexdigest()
-        
+        session_id = ChatSessionService.session_id_for(topic_id, roster_id)
         session = db.query(ChatSession).filter_by(session_id=session_id).first()
         if not session:
             session = ChatSession(
@@ -295,34 +386,129 @@ class ChatSessionService:
     @staticmethod
     def get_session(db: Session, topic_id: str, roster_id: str) -> Optional[ChatSession]:
         """Get existing session for topic_id + roster_id"""
-        import hashlib
-        session_key = f"{topic_id}:{roster_id}"
-        session_id = hashlib.md5(session_key.encode()).hexdigest()
+        session_id = ChatSessionService.session_id_for(topic_id, roster_id)
         return db.query(ChatSession).filter_by(session_id=session_id).first()
+
+    @staticmethod
+    def list_messages(
+        db: Session,
+        session_id: str,
+        limit: Optional[int] = 50,
+        before_id: Optional[int] = None,
+    ) -> List[ChatSessionMessage]:
+        """
+        One page of a session's messages, newest first, using keyset pagination
+        on id (pass the smallest id of the previous page as before_id).
+        """
+        query = db.query(ChatSessionMessage).filter(ChatSessionMessage.session_id == session_id)
+        if before_id is not None:
+            query = query.filter(ChatSessionMessage.id < before_id)
+        query = query.order_by(ChatSessionMessage.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    @staticmethod
+    def message_to_dict(message: ChatSessionMessage) -> Dict[str, Any]:
+        """Message in the shape the old JSON history used (extra fields merged back in)."""
+        data: Dict[str, Any] = json.loads(message.extra) if message.extra else {}
+        data.update({
+            "role": message.role,
+            "content": message.content,
+            "timestamp": message.timestamp.isoformat() if message.timestamp else None,
+        })
+        data.setdefault("id", f"msg_{message.id}")
+        return data
     
     @staticmethod
-    def get_history(db: Session, topic_id: str, roster_id: str) -> List[Dict[str, Any]]:
-        """Get chat history for a topic and roster"""
-        session = ChatSessionService.get_session(db, topic_id, roster_id)
-        if not session:
-            return []
-        messages = json.loads(session.messages) if session.messages else []
-        return messages
+    def get_history(
+        db: Session,
+        topic_id: str,
+        roster_id: str,
+        limit: Optional[int] = None,
+        before_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Get chat history for a topic and roster (oldest first; the latest `limit` messages)"""
+        session_id = ChatSessionService.session_id_for(topic_id, roster_id)
+        page = ChatSessionService.list_messages(db, session_id, limit, before_id)
+        return [ChatSessionService.message_to_dict(message) for message in reversed(page)]
+
+    @staticmethod
+    def append_message(
+        db: Session,
+        session_id: str,
+        role: str,
+        content: str,
+        timestamp: Optional[datetime] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> ChatSessionMessage:
+        """Append one message to any session (a topic session or GLOBAL_CHAT_SESSION_ID)"""
+        message = ChatSessionMessage(
+            session_id=session_id,
+            role=role,
+            content=content,
+            timestamp=timestamp or datetime.now(),
+            extra=json.dumps(extra, default=str, ensure_ascii=False) if extra else None,
+        )
+        db.add(message)
+        db.commit()
+        return message
     
     @staticmethod
-    def add_message(db: Session, topic_id: str, roster_id: str, role: str, content: str) -> ChatSession:
+    def add_message(
+        db: Session,
+        topic_id: str,
+        roster_id: str,
+        role: str,
+        content: str,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> ChatSessionMessage:
         """Add a message to the chat session"""
-        from datetime import datetime
         session = ChatSessionService.get_or_create_session(db, topic_id, roster_id)
-        
-        messages = json.loads(session.messages) if session.messages else []
-        messages.append({
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        session.messages = json.dumps(messages)
-        db.commit()
-        db.refresh(session)
-        return session
\ No newline at end of file
+        now = datetime.now()
+        session.last_updated = now
+        return ChatSessionService.append_message(db, session.session_id, role, content, now, extra)
+
+    @staticmethod
+    def import_history_file(db: Session, path: Path, session_id: str = GLOBAL_CHAT_SESSION_ID) -> int:
+        """
+        One-time import of a JSON chat history file (e.g. chat_history.json)
+        into session_id.  The file is renamed to *.migrated afterwards so it is
+        never imported twice.  Returns the number of messages imported.
+        """
+        path = Path(path)
+        if not path.exists():
+            return 0
+        try:
+            history = json.loads(path.read_text(encoding="utf-8") or "[]")
+        except json.JSONDecodeError:
+            print(f"⚠️  {path.name} is not valid JSON; leaving it in place")
+            return 0
+
+        rows = []
+        for item in history if isinstance(history, list) else []:
+            if item is None:
+                continue  # A null entry carries no message
+            if not isinstance(item, dict):
+                # Kept as assistant text, as move_chat_session_messages.sql does
+                text = item if isinstance(item, str) else json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+                item = {"content": text}
+            # config can hold the client's apiKey; it is never stored
+            extra = {k: v for k, v in item.items() if k not in ("role", "content", "timestamp", "config")}
+            timestamp = item.get("timestamp")
+            try:
+                timestamp = datetime.fromisoformat(timestamp) if timestamp else None
+            except (TypeError, ValueError):
+                timestamp = None
+            rows.append({
+                "session_id": session_id,
+                "role": item.get("role") or "assistant",
+                "content": item.get("content") or "",
+                "timestamp": timestamp or datetime.now(),
+                "extra": json.dumps(extra, default=str, ensure_ascii=False) if extra else None,
+            })
+        if rows:
+            db.execute(ChatSessionMessage.__table__.insert(), rows)
+            db.commit()
+        path.rename(path.with_name(path.name + ".migrated"))
+        return len(rows)
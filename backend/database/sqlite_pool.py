@@ -0,0 +1,267 @@
+"""
+Shared SQLite storage layer: connection tuning, pooling and query metrics.
+
+Both the SQLAlchemy engine (database/db.py) and raw sqlite3 users such as
+scripts/daily_scheduler.py open connections through this module, so every
+connection gets the same pragmas:
+
+    journal_mode=WAL      readers no longer block the writer (and vice versa)
+    synchronous=NORMAL    safe with WAL, avoids an fsync per commit
+    busy_timeout          wait for a lock instead of failing "database is locked"
+    cache_size/mmap_size  keep hot pages in memory
+    foreign_keys=ON
+
+Raw connections come from a bounded per-file pool; `close()` returns them to
+the pool.  Query counts and latency are recorded per request (see
+`track_queries`) and process-wide (`global_query_stats`).
+
+Tuning via environment variables: SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB,
+SQLITE_MMAP_SIZE, SQLITE_SYNCHRONOUS, SQLITE_POOL_SIZE.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))
+MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+# How long a raw checkout waits for a free pooled connection before failing
+POOL_TIMEOUT = 30.0
+
+
+def apply_pragmas(conn: sqlite3.Connection) -> None:
+    """Apply the shared pragmas to a freshly opened DB-API connection."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
+
+
+# ---------------------------------------------------------------------------
+# Query metrics
+# ---------------------------------------------------------------------------
+
+@dataclass
+class QueryStats:
+    """Query count and latency for one scope (a request, or the whole process)."""
+
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_ms += elapsed_ms
+            if elapsed_ms > self.max_ms:
+                self.max_ms = elapsed_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queries": self.count,
+                "total_ms": round(self.total_ms, 2),
+                "max_ms": round(self.max_ms, 2),
+                "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            }
+
+
+global_query_stats = QueryStats()
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("sqlite_request_stats", default=None)
+
+
+def record_query(elapsed_ms: float) -> None:
+    global_query_stats.record(elapsed_ms)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(elapsed_ms)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Collect query metrics for everything run inside the block.
+
+    The stats object is shared through a ContextVar, so queries issued from
+    worker threads that inherit the context (FastAPI's threadpool, the
+    resource pools in app.core.executors) are counted too.
+    """
+    stats = QueryStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+def instrument_engine(engine) -> None:
+    """Record every statement a SQLAlchemy engine executes."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        record_query((time.perf_counter() - started) * 1000)
+
+
+# ---------------------------------------------------------------------------
+# Raw sqlite3 connections
+# ---------------------------------------------------------------------------
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_query((time.perf_counter() - started) * 1000)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record_query((time.perf_counter() - started) * 1000)
+
+    def executescript(self, sql_script):
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            record_query((time.perf_counter() - started) * 1000)
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool."""
+
+    _pool: Optional["SQLitePool"] = None
+    # Returns the pool slot if the connection is garbage-collected while checked out
+    _lease: Optional[weakref.finalize] = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def close(self) -> None:
+        if self._pool is None:
+            super().close()
+        else:
+            self._pool.release(self)
+
+    def discard(self) -> None:
+        self._pool = None
+        super().close()
+
+
+class SQLitePool:
+    """Bounded pool of tuned raw connections to one database file."""
+
+    def __init__(self, db_path: Union[str, Path], size: int = POOL_SIZE):
+        self.db_path = str(db_path)
+        self.size = size
+        self._idle: "queue.LifoQueue[PooledConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _open(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            factory=PooledConnection,
+        )
+        apply_pragmas(conn)
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        if not self._slots.acquire(timeout=POOL_TIMEOUT):
+            raise sqlite3.OperationalError(
+                f"SQLite pool exhausted ({self.size} connections to {self.db_path})"
+            )
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = self._open()
+            except Exception:
+                self._slots.release()
+                raise
+        conn._pool = self
+        conn._lease = weakref.finalize(conn, self._slots.release)
+        conn._lease.atexit = False
+        return conn
+
+    def release(self, conn: PooledConnection) -> None:
+        lease, conn._lease = conn._lease, None
+        if lease is None or lease.detach() is None:
+            return  # Already returned (close() called twice)
+        try:
+            # Don't leak an open transaction or a caller's row_factory into the next checkout
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+            self._idle.put(conn)
+        except sqlite3.Error:
+            conn.discard()
+        finally:
+            self._slots.release()
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().discard()
+            except queue.Empty:
+                return
+
+
+_pools: Dict[str, SQLitePool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_sqlite_pool(db_path: Union[str, Path]) -> SQLitePool:
+    key = str(Path(db_path).resolve())
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = SQLitePool(key)
+                _pools[key] = pool
+    return pool
+
+
+def connect(db_path: Union[str, Path]) -> PooledConnection:
+    """
+    Drop-in replacement for sqlite3.connect(db_path) backed by the shared pool.
+
+    Call close() when done (as with sqlite3) to return the connection.
+    """
+    return get_sqlite_pool(db_path).acquire()
+
+
+def pool_status() -> Dict[str, Dict[str, int]]:
+    return {
+        path: {"size": pool.size, "idle": pool._idle.qsize()}
+        for path, pool in _pools.items()
+    }
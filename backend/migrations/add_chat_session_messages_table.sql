@@ -0,0 +1,17 @@
+-- Append-only chat message log (database.models.ChatSessionMessage): one row per
+-- message instead of a JSON array rewritten on every append.
+-- Applied automatically by backend.database.db.init_db(); existing JSON histories
+-- are moved across by move_chat_session_messages.sql.
+
+CREATE TABLE IF NOT EXISTS chat_session_messages (
+    id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+    session_id VARCHAR NOT NULL,
+    role VARCHAR NOT NULL,
+    content TEXT NOT NULL,
+    timestamp DATETIME,
+    extra TEXT
+);
+
+-- Latest N / keyset pages: WHERE session_id = ? [AND id < ?] ORDER BY id DESC
+CREATE INDEX IF NOT EXISTS idx_chat_session_messages_session ON chat_session_messages (session_id, id);
+CREATE INDEX IF NOT EXISTS idx_chat_session_messages_session_ts ON chat_session_messages (session_id, timestamp);
@@ -0,0 +1,30 @@
+-- Normalized FSRS card state + append-only review log for the daily scheduler.
+-- Created on first use by scripts/daily_scheduler.py (CREATE IF NOT EXISTS).
+-- Existing profiles.extracted_data['fsrs_states'] blobs are moved across lazily per profile,
+-- or all at once with: python scripts/daily_scheduler.py migrate-fsrs
+
+CREATE TABLE IF NOT EXISTS fsrs_card_states (
+    profile_id VARCHAR NOT NULL,
+    quest_id VARCHAR NOT NULL,
+    due VARCHAR,
+    last_review VARCHAR,
+    state INTEGER,
+    card_json TEXT NOT NULL,
+    updated_at DATETIME,
+    PRIMARY KEY (profile_id, quest_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_fsrs_card_states_due ON fsrs_card_states (profile_id, due);
+CREATE INDEX IF NOT EXISTS idx_fsrs_card_states_last_review ON fsrs_card_states (profile_id, last_review);
+
+CREATE TABLE IF NOT EXISTS fsrs_review_logs (
+    id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+    profile_id VARCHAR NOT NULL,
+    quest_id VARCHAR NOT NULL,
+    rating INTEGER NOT NULL,
+    prompt_level VARCHAR,
+    reviewed_at VARCHAR NOT NULL,
+    due_after VARCHAR
+);
+
+CREATE INDEX IF NOT EXISTS idx_fsrs_review_logs_quest ON fsrs_review_logs (profile_id, quest_id, reviewed_at);
@@ -0,0 +1,20 @@
+-- Composite indexes for the per-profile MasteredWord / ApprovedCard access paths.
+-- Applied automatically by backend.database.db.init_db() once both tables exist
+-- (every statement is idempotent); can also be run by hand against data/content_db/srs4autism.db
+
+-- Older databases were created without uq_profile_word_lang: keep the first row of each duplicate
+DELETE FROM mastered_words
+WHERE id NOT IN (
+    SELECT MIN(id) FROM mastered_words GROUP BY profile_id, word, language
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_profile_word_lang ON mastered_words (profile_id, word, language);
+-- ProfileService.get_mastered_words: WHERE profile_id = ? AND language = ? (covering)
+CREATE INDEX IF NOT EXISTS idx_mastered_words_profile_lang ON mastered_words (profile_id, language, word);
+DROP INDEX IF EXISTS idx_mastered_words_profile;
+DROP INDEX IF EXISTS idx_mastered_words_language;
+
+-- Card listings: WHERE profile_id = ? [AND status = ?] ORDER BY id DESC, keyset on id
+CREATE INDEX IF NOT EXISTS idx_approved_cards_profile_id ON approved_cards (profile_id, id);
+CREATE INDEX IF NOT EXISTS idx_approved_cards_profile_status ON approved_cards (profile_id, status, id);
+DROP INDEX IF EXISTS idx_approved_cards_profile;
@@ -0,0 +1,7 @@
+-- Case-insensitive index for resolving chat @mentions to profiles by name
+-- (ProfileService.find_by_name: name = ? COLLATE NOCASE, then the prefix match as
+-- the NOCASE range name >= ? AND name < ? || char(0x10FFFF)).  Keep the prefix match
+-- a range: LIKE 'prefix%' cannot use this NOCASE index and scans the table.
+-- Applied automatically by backend.database.db.init_db().
+
+CREATE INDEX IF NOT EXISTS idx_profiles_name_nocase ON profiles (name COLLATE NOCASE);
@@ -0,0 +1,33 @@
+-- Move topic chat history out of the chat_sessions.messages JSON arrays into the
+-- append-only chat_session_messages table (one row per message).
+-- Applied automatically by backend.database.db.init_db() once both tables exist;
+-- sessions are emptied as they are copied, so re-running is a no-op
+-- (sessions whose messages are not a valid JSON array are left untouched).
+-- The global chat history file (chat_history.json) is imported by
+-- ChatSessionService.import_history_file() at startup.
+
+BEGIN;
+
+INSERT INTO chat_session_messages (session_id, role, content, timestamp, extra)
+SELECT
+    s.session_id,
+    CASE WHEN m.type = 'object' THEN COALESCE(json_extract(m.value, '$.role'), 'assistant') ELSE 'assistant' END,
+    -- Elements that are not message objects (bare strings, numbers, ...) are kept as their text
+    CASE WHEN m.type = 'object' THEN COALESCE(json_extract(m.value, '$.content'), '')
+         ELSE COALESCE(CAST(m.value AS TEXT), '') END,
+    -- isoformat() timestamps -> SQLAlchemy's "YYYY-MM-DD HH:MM:SS.ffffff"
+    replace(
+        COALESCE(CASE WHEN m.type = 'object' THEN json_extract(m.value, '$.timestamp') END, s.last_updated),
+        'T', ' '
+    ),
+    CASE WHEN m.type = 'object' THEN NULLIF(json_remove(m.value, '$.role', '$.content', '$.timestamp'), '{}') END
+FROM chat_sessions AS s, json_each(s.messages) AS m
+WHERE json_valid(s.messages) AND json_type(s.messages) = 'array' AND s.messages <> '[]'
+    AND m.type <> 'null'  -- a null element carries no message
+ORDER BY s.session_id, m.key;
+
+-- Only rows the INSERT above could read; anything else keeps its original data
+UPDATE chat_sessions SET messages = '[]'
+WHERE json_valid(messages) AND json_type(messages) = 'array' AND messages <> '[]';
+
+COMMIT;
@@ -4,10 +4,12 @@ Integrates the Personalized PageRank recommender for Chinese words with database
 """
 import sys
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Mapping, Optional, Tuple
 import json
 import math
+import threading
 import networkx as nx
+import numpy as np
 import re
 from collections import defaultdict
 
@@ -16,13 +18,17 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT / "scripts" / "recommendation_engine"))
 
 from ppr_recommender import (
-    load_similarity_graph,
     build_personalization_vector,
-    run_ppr,
+    run_ppr_batch,
+    run_ppr_vector,
     _map_word_to_node_id,
     _normalize_node_id,
 )
 
+from similarity_snapshot import load_ppr_graph, snapshot_path_for
+from word_metadata_index import read_metadata_index
+from candidate_scoring import CandidateFeatures, ScoringParams, feature_stats, score_candidates
+
 # Default configuration for Chinese
 DEFAULT_CONFIG = {
     "alpha": 0.5,
@@ -196,6 +202,36 @@ def build_chinese_label_index(metadata: Dict[str, ChineseWordMetadata]) -> Dict[
     return index
 
 
+def load_chinese_metadata_and_label_index(
+    kg_file: Path,
+) -> Tuple[Dict[str, ChineseWordMetadata], Dict[str, str]]:
+    """
+    Return (metadata, label index) for Chinese words.
+
+    Served from the precompiled word_metadata_index when it matches kg_file;
+    otherwise parses the TTL as before.
+    """
+    indexed = read_metadata_index("zh", kg_file)
+    if indexed is not None:
+        rows, label_index = indexed
+        metadata = {
+            row["node_id"]: ChineseWordMetadata(
+                node_id=row["node_id"],
+                label=row["label"],
+                hsk_level=row["hsk_level"],
+                concreteness=row["concreteness"],
+                frequency_rank=row["frequency_rank"],
+                age_of_acquisition=row["age_of_acquisition"],
+                frequency_value=row["frequency_value"],
+            )
+            for row in rows
+        }
+        return metadata, label_index
+
+    metadata = load_chinese_word_metadata(kg_file)
+    return metadata, build_chinese_label_index(metadata)
+
+
 class ChinesePPRRecommenderService:
     """Service for PPR-based Chinese word recommendations."""
     
@@ -219,18 +255,23 @@ class ChinesePPRRecommenderService:
         
         # Load similarity graph
         print(f"📊 Loading Chinese similarity graph from {self.similarity_file}...")
-        self.graph, self.labels = load_similarity_graph(
+        # CSR graph, memory-mapped from the .csr snapshot when one is up to date
+        self.graph, self.labels = load_ppr_graph(
             self.similarity_file, 
             min_similarity=self.config["min_similarity"]
         )
         print(f"   ✅ Loaded {self.graph.number_of_nodes():,} nodes, {self.graph.number_of_edges():,} edges")
         
+        # Reverse label lookup (label → similarity graph node_id), fixed once the graph is loaded
+        self.label_to_node: Dict[str, str] = {label: node_id for node_id, label in self.labels.items()}
+        
         # Chinese doesn't have spelling variants, so variant_to_canonical is empty
         self.variant_to_canonical: Dict[str, str] = {}
         
         # Word metadata and label index will be loaded on demand
         self.word_metadata: Optional[Dict[str, ChineseWordMetadata]] = None
         self.label_index: Optional[Dict[str, str]] = None
+        self._features: Optional[CandidateFeatures] = None
     
     def load_kg_metadata(self, kg_file: Optional[Path] = None) -> None:
         """Load Chinese word metadata from KG file or Fuseki."""
@@ -240,8 +281,8 @@ class ChinesePPRRecommenderService:
         
         if kg_file:
             print(f"📚 Loading Chinese word metadata from {kg_file}...")
-            self.word_metadata = load_chinese_word_metadata(kg_file)
-            self.label_index = build_chinese_label_index(self.word_metadata)
+            self.word_metadata, self.label_index = load_chinese_metadata_and_label_index(kg_file)
+            self._features = None
             print(f"   ✅ Loaded metadata for {len(self.word_metadata):,} words")
         elif self.kg_endpoint:
             # TODO: Load from Fuseki SPARQL queries
@@ -303,32 +344,8 @@ class ChinesePPRRecommenderService:
         # Merge config overrides
         config = {**self.config, **override_config}
 
-        # --- BUILD REVERSE LABEL LOOKUP ---
-        # Create label → node_id mapping from the similarity graph's labels
-        label_to_node = {label: node_id for node_id, label in self.labels.items()}
-
         # --- ALIGN AND VALIDATE SEED NODES ---
-        # Map mastered words to graph nodes using the similarity graph's labels
-        seed_nodes = []
-        unmatched_words = []
-
-        for word in mastered_words:
-            word_stripped = word.strip()
-            if not word_stripped:
-                continue
-
-            # Try direct lookup in similarity graph labels
-            if word_stripped in label_to_node:
-                node_id = label_to_node[word_stripped]
-                seed_nodes.append(node_id)
-            else:
-                # Try without spaces for compound words
-                word_no_space = word_stripped.replace(' ', '')
-                if word_no_space in label_to_node:
-                    node_id = label_to_node[word_no_space]
-                    seed_nodes.append(node_id)
-                else:
-                    unmatched_words.append(word_stripped)
+        seed_nodes, unmatched_words = self._map_seed_nodes(mastered_words)
 
         print(f"   📊 Seed validation: {len(seed_nodes)}/{len(mastered_words)} mastered words found in similarity graph")
 
@@ -339,13 +356,7 @@ class ChinesePPRRecommenderService:
         # If no seeds found, use top 5 most connected nodes as fallback
         if not seed_nodes:
             print(f"   ⚠️  WARNING: No mastered words overlap with graph. Using cold start fallback.")
-
-            # Calculate node degrees (most connected nodes)
-            node_degrees = [(node, self.graph.degree(node)) for node in self.graph.nodes()]
-            node_degrees.sort(key=lambda x: x[1], reverse=True)
-
-            # Use top 5 most connected nodes as seeds
-            seed_nodes = [node for node, _ in node_degrees[:5]]
+            seed_nodes = self._cold_start_seeds()
             print(f"   🌱 Cold start: Using top {len(seed_nodes)} most connected nodes as seeds")
             print(f"   🌱 Fallback seeds: {seed_nodes}")
 
@@ -356,73 +367,154 @@ class ChinesePPRRecommenderService:
         personalization = build_personalization_vector(self.graph, seed_weights)
         
         # Run PPR
-        scores = run_ppr(self.graph, personalization, alpha=config["alpha"])
-        
-        # Calculate statistics for transformations
-        all_ppr_scores = [s for s in scores.values() if s > 0]
-        ppr_mean = math.log10(sum(all_ppr_scores) / len(all_ppr_scores)) if all_ppr_scores else 0.0
-        ppr_std = math.sqrt(sum((math.log10(s) - ppr_mean)**2 for s in all_ppr_scores) / len(all_ppr_scores)) if len(all_ppr_scores) > 1 else 1.0
+        scores = run_ppr_vector(self.graph, personalization, alpha=config["alpha"])
         
-        all_concreteness = [
-            meta.concreteness
-            for meta in self.word_metadata.values()
-            if meta.concreteness is not None
-        ]
-        conc_mean = sum(all_concreteness) / len(all_concreteness) if all_concreteness else 3.0
-        conc_std = (
-            math.sqrt(
-                sum((c - conc_mean) ** 2 for c in all_concreteness) / len(all_concreteness)
+        return self._rank_candidates(scores, seed_weights, exclude_words, config)
+
+    def get_recommendations_batch(
+        self,
+        mastered_words_by_profile: Mapping[str, List[str]],
+        exclude_words_by_profile: Optional[Mapping[str, List[str]]] = None,
+        **override_config
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get PPR-based Chinese recommendations for many profiles in one power iteration.
+
+        Intended for bulk refreshes (e.g. nightly precompute for every child):
+        all personalization vectors are scored together as a dense matrix.
+
+        Args:
+            mastered_words_by_profile: profile_id -> mastered Chinese word texts
+            exclude_words_by_profile: Optional profile_id -> words to exclude
+            **override_config: Configuration overrides (shared by all profiles)
+
+        Returns:
+            profile_id -> recommendation list (same shape as get_recommendations)
+        """
+        config = {**self.config, **override_config}
+        exclude_words_by_profile = exclude_words_by_profile or {}
+
+        profile_ids: List[str] = []
+        batch_seeds: List[Dict[str, float]] = []
+        batch_personalizations: List[Dict[str, float]] = []
+        cold_start_seeds: Optional[List[str]] = None
+        for profile_id, mastered_words in mastered_words_by_profile.items():
+            seed_nodes, _ = self._map_seed_nodes(mastered_words)
+            if not seed_nodes:
+                if cold_start_seeds is None:
+                    cold_start_seeds = self._cold_start_seeds()
+                seed_nodes = cold_start_seeds
+            seed_weights = {node_id: 1.0 for node_id in seed_nodes}
+            profile_ids.append(profile_id)
+            batch_seeds.append(seed_weights)
+            batch_personalizations.append(build_personalization_vector(self.graph, seed_weights))
+
+        if not profile_ids:
+            return {}
+
+        print(f"   📊 Batched PPR for {len(profile_ids)} profiles")
+        score_matrix = run_ppr_batch(self.graph, batch_personalizations, alpha=config["alpha"])
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        for col, profile_id in enumerate(profile_ids):
+            results[profile_id] = self._rank_candidates(
+                score_matrix[:, col], batch_seeds[col], exclude_words_by_profile.get(profile_id), config
             )
-            if len(all_concreteness) > 1
-            else 1.5
-        )
-        
-        # Calculate frequency statistics for normalization
-        all_freq_ranks = [
-            -math.log10(meta.frequency_rank + 1)
-            for meta in self.word_metadata.values()
-            if meta.frequency_rank is not None and meta.frequency_rank > 0
-        ]
-        all_freq_values = [
-            math.log10(meta.frequency_value + 1)
-            for meta in self.word_metadata.values()
-            if meta.frequency_value is not None and meta.frequency_value > 0
-        ]
-        all_freq_transformed = all_freq_ranks + all_freq_values
-        freq_mean = sum(all_freq_transformed) / len(all_freq_transformed) if all_freq_transformed else 0.0
-        freq_std = (
-            math.sqrt(
-                sum((f - freq_mean) ** 2 for f in all_freq_transformed) / len(all_freq_transformed)
+        return results
+
+    def _map_seed_nodes(self, mastered_words: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Map mastered words to graph nodes using the similarity graph's labels.
+
+        Returns:
+            (seed_nodes, unmatched_words)
+        """
+        label_to_node = self.label_to_node
+        seed_nodes = []
+        unmatched_words = []
+
+        for word in mastered_words:
+            word_stripped = word.strip()
+            if not word_stripped:
+                continue
+
+            # Try direct lookup in similarity graph labels
+            if word_stripped in label_to_node:
+                node_id = label_to_node[word_stripped]
+                seed_nodes.append(node_id)
+            else:
+                # Try without spaces for compound words
+                word_no_space = word_stripped.replace(' ', '')
+                if word_no_space in label_to_node:
+                    node_id = label_to_node[word_no_space]
+                    seed_nodes.append(node_id)
+                else:
+                    unmatched_words.append(word_stripped)
+
+        return seed_nodes, unmatched_words
+
+    def _cold_start_seeds(self, count: int = 5) -> List[str]:
+        """Most connected graph nodes, used as seeds when no mastered word maps."""
+        node_degrees = [(node, self.graph.degree(node)) for node in self.graph.nodes()]
+        node_degrees.sort(key=lambda x: x[1], reverse=True)
+        return [node for node, _ in node_degrees[:count]]
+
+    def _candidate_features(self) -> CandidateFeatures:
+        """Per-node feature columns, built once per graph + metadata load."""
+        if self._features is None:
+            if self.word_metadata is None:
+                raise RuntimeError("KG metadata not loaded. Call load_kg_metadata first.")
+
+            def resolve(node_id: str):
+                # Graph uses 'word-学习', metadata uses 'word-zh-学习'
+                # Bridge via the label '学习'
+                label = self.labels.get(node_id)
+                meta_node_id = self.label_index.get(label) if label else None
+                meta = self.word_metadata.get(meta_node_id) if meta_node_id else None
+                return (meta_node_id, meta) if meta else None
+
+            def frequency_feature(meta: ChineseWordMetadata) -> Optional[float]:
+                # Higher frequency (lower rank / higher count) should give a positive boost
+                if meta.frequency_rank and meta.frequency_rank > 0:
+                    return -math.log10(meta.frequency_rank + 1)
+                if meta.frequency_value and meta.frequency_value > 0:
+                    return math.log10(meta.frequency_value + 1)
+                # Missing frequency: neutral instead of penalizing
+                return None
+
+            conc_stats = feature_stats(
+                [m.concreteness for m in self.word_metadata.values() if m.concreteness is not None],
+                default_mean=3.0, default_std=1.5,
             )
-            if len(all_freq_transformed) > 1
-            else 1.0
-        )
-        
-        def transform_ppr(raw_ppr: float) -> float:
-            return (math.log10(raw_ppr + 1e-10) - ppr_mean) / ppr_std if ppr_std > 0 else 0.0
-        
-        def transform_concreteness(value: Optional[float]) -> float:
-            if value is None:
-                return 0.0
-            return (value - conc_mean) / conc_std if conc_std > 0 else 0.0
-        
-        def transform_frequency(rank: Optional[int], freq_value: Optional[float]) -> float:
-            if rank and rank > 0:
-                raw = -math.log10(rank + 1)
-                # Normalize: higher frequency (lower rank) should give positive boost
-                return (raw - freq_mean) / freq_std if freq_std > 0 else 0.0
-            if freq_value and freq_value > 0:
-                raw = math.log10(freq_value + 1)
-                # Normalize: higher frequency should give positive boost
-                return (raw - freq_mean) / freq_std if freq_std > 0 else 0.0
-            # Missing frequency: use mean (neutral) instead of 0 to avoid penalizing
-            return 0.0
-        
-        def calculate_aoa_penalty(aoa: Optional[float], mental_age: Optional[float]) -> float:
-            if aoa is None or mental_age is None:
-                return 0.0
-            return max(0.0, aoa - mental_age)
-        
+            freq_stats = feature_stats(
+                [
+                    -math.log10(m.frequency_rank + 1)
+                    for m in self.word_metadata.values()
+                    if m.frequency_rank is not None and m.frequency_rank > 0
+                ] + [
+                    math.log10(m.frequency_value + 1)
+                    for m in self.word_metadata.values()
+                    if m.frequency_value is not None and m.frequency_value > 0
+                ],
+                default_mean=0.0, default_std=1.0,
+            )
+            self._features = CandidateFeatures(
+                self.graph.node_ids, resolve, self.labels,
+                frequency_feature=frequency_feature, level=lambda meta: meta.hsk_level,
+                conc_stats=conc_stats, freq_stats=freq_stats,
+            )
+        return self._features
+
+    def _rank_candidates(
+        self,
+        ppr_scores: np.ndarray,
+        seed_weights: Dict[str, float],
+        exclude_words: Optional[List[str]],
+        config: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        """Filter raw PPR scores and rank candidates with the logit model."""
+        features = self._candidate_features()
+        label_to_node = self.label_to_node
+
         # Build excluded node IDs (using similarity graph node IDs)
         excluded_node_ids = set()
         if exclude_words:
@@ -435,134 +527,80 @@ class ChinesePPRRecommenderService:
                     word_no_space = word_stripped.replace(" ", "")
                     if word_no_space in label_to_node:
                         excluded_node_ids.add(label_to_node[word_no_space])
-        
+
         mental_age = config.get("mental_age")
         aoa_buffer = config.get("aoa_buffer", 0.0)
         max_hsk_level = config.get("max_hsk_level")
-        words_filtered_by_hsk = 0
-        words_with_aoa = 0
-        words_filtered_by_aoa = 0
-        aoa_penalties_applied = []
-        
-        candidates = []
-        for node_id, raw_ppr_score in scores.items():
-            # Skip seeds
-            if node_id in seed_weights:
-                continue
-            if node_id in excluded_node_ids:
-                continue
+        result = score_candidates(
+            features,
+            ppr_scores,
+            features.rows_for_node_ids(set(seed_weights) | excluded_node_ids),
+            ScoringParams(
+                beta_intercept=config.get("beta_intercept", 0.0),
+                beta_ppr=config.get("beta_ppr", 1.0),
+                beta_concreteness=config.get("beta_concreteness", 0.8),
+                beta_frequency=config.get("beta_frequency", 0.3),
+                beta_aoa_penalty=config.get("beta_aoa_penalty", 2.0),
+                mental_age=mental_age,
+                aoa_buffer=aoa_buffer,
+                # No HSK level = treat as advanced/rare, filter out
+                max_level=max_hsk_level,
+                exclude_missing_level=True,
+                exclude_multiword=bool(config.get("exclude_multiword")),
+                top_n=config.get("top_n", 50),
+            ),
+        )
+        kept_rows = np.flatnonzero(result.kept)
 
-            # Map graph node_id to metadata via label
-            # Graph uses 'word-学习', metadata uses 'word-zh-学习'
-            # Bridge via the label '学习'
-            label = self.labels.get(node_id)
-            if not label:
-                continue
+        # Log frequency statistics
+        has_rank = np.fromiter(
+            (features.meta[row].frequency_rank is not None for row in kept_rows.tolist()),
+            dtype=bool, count=kept_rows.size,
+        )
+        words_with_freq = int(np.count_nonzero(has_rank | (features.frequency[kept_rows] != 0.0)))
+        print(f"   📊 Frequency data: {words_with_freq}/{kept_rows.size} words have frequency data")
+        sample_rows = [row for row in kept_rows[:5].tolist() if features.meta[row].frequency_rank is not None]
+        if words_with_freq > 0 and sample_rows:
+            sample = features.meta[sample_rows[0]]
+            print(f"   📊 Sample frequency data: {features.labels[sample_rows[0]]} - rank={sample.frequency_rank}, log_freq={features.frequency[sample_rows[0]]:.2f}")
 
-            # Look up metadata node ID via label
-            meta_node_id = self.label_index.get(label)
-            if not meta_node_id:
-                continue
+        # Log AoA statistics
+        if mental_age is not None:
+            kept_penalties = result.aoa_penalty[result.kept & (result.aoa_penalty > 0)]
+            print(f"   🧠 Mental age: {mental_age}, AoA buffer: {aoa_buffer}")
+            print(f"   📊 Words with AoA data: {result.counts['with_aoa']}/{kept_rows.size + result.counts['filtered_by_aoa']}")
+            print(f"   🚫 Words filtered by AoA: {result.counts['filtered_by_aoa']}")
+            if kept_penalties.size:
+                print(f"   ⚠️  AoA penalties applied: {kept_penalties.size} words, avg={kept_penalties.mean():.2f}, max={kept_penalties.max():.2f}")
 
-            # Get metadata
-            meta = self.word_metadata.get(meta_node_id)
-            if not meta:
-                continue
-            
-            # Filter by HSK level if configured
-            if max_hsk_level is not None:
-                if meta.hsk_level is None:
-                    # No HSK level = treat as advanced/rare, filter out
-                    words_filtered_by_hsk += 1
-                    continue
-                elif meta.hsk_level > max_hsk_level:
-                    words_filtered_by_hsk += 1
-                    continue
-
-            # Exclude multi-word if configured
-            if config.get("exclude_multiword") and (" " in meta.label or "-" in meta.label):
-                continue
-            
-            # Filter by AoA if mental age is set
-            if (
-                mental_age is not None
-                and meta.age_of_acquisition is not None
-            ):
-                words_with_aoa += 1
-                if meta.age_of_acquisition > mental_age + aoa_buffer:
-                    words_filtered_by_aoa += 1
-                    continue
-                # Calculate penalty
-                penalty = calculate_aoa_penalty(meta.age_of_acquisition, mental_age)
-                if penalty > 0:
-                    aoa_penalties_applied.append(penalty)
-            else:
-                penalty = 0.0
-            
-            # Transformed features
-            ppr_transformed = transform_ppr(raw_ppr_score)
-            conc_transformed = transform_concreteness(meta.concreteness)
-            freq_transformed = transform_frequency(meta.frequency_rank, meta.frequency_value)
-            aoa_penalty = penalty
-            
-            # Logit score
-            z = (
-                config.get("beta_intercept", 0.0)
-                + config.get("beta_ppr", 1.0) * ppr_transformed
-                + config.get("beta_concreteness", 0.8) * conc_transformed
-                + config.get("beta_frequency", 0.3) * freq_transformed
-                - config.get("beta_aoa_penalty", 2.0) * aoa_penalty
-            )
-            
-            # Convert to probability using sigmoid
-            final_score = 1 / (1 + math.exp(-z))
-            
-            label = meta.label or self.labels.get(node_id, node_id)
+        if max_hsk_level is not None:
+            print(f"   📘 Max HSK level: {max_hsk_level} (filtered {result.counts['filtered_by_level']} words above this level)")
+
+        candidates = []
+        for row in result.rows.tolist():
+            meta = features.meta[row]
             candidates.append({
-                "word": label,
+                "word": features.labels[row],
                 # --- CRITICAL FIX: Return the KG ID (metadata ID), not the PPR Graph ID ---
-                "node_id": meta_node_id, 
-                "graph_node_id": node_id, # Preserve graph ID just in case
-                "score": final_score,
-                "log_ppr": ppr_transformed,
-                "z_concreteness": conc_transformed,
-                "log_frequency": freq_transformed,
-                "aoa_penalty": aoa_penalty,
+                "node_id": features.output_ids[row],
+                "graph_node_id": features.node_ids[row], # Preserve graph ID just in case
+                "score": float(result.score[row]),
+                "log_ppr": float(result.log_ppr[row]),
+                "z_concreteness": float(features.concreteness[row]),
+                "log_frequency": float(features.frequency[row]),
+                "aoa_penalty": float(result.aoa_penalty[row]),
                 "hsk_level": meta.hsk_level,
                 "concreteness": meta.concreteness,
                 "frequency_rank": meta.frequency_rank,
                 "age_of_acquisition": meta.age_of_acquisition,
             })
-        
-        # Log frequency statistics
-        words_with_freq = sum(1 for c in candidates if c.get('frequency_rank') is not None or c.get('log_frequency', 0) != 0.0)
-        print(f"   📊 Frequency data: {words_with_freq}/{len(candidates)} words have frequency data")
-        if words_with_freq > 0:
-            sample_with_freq = [c for c in candidates[:5] if c.get('frequency_rank') is not None]
-            if sample_with_freq:
-                print(f"   📊 Sample frequency data: {sample_with_freq[0].get('word')} - rank={sample_with_freq[0].get('frequency_rank')}, log_freq={sample_with_freq[0].get('log_frequency', 0):.2f}")
-        
-        # Log AoA statistics
-        if mental_age is not None:
-            print(f"   🧠 Mental age: {mental_age}, AoA buffer: {aoa_buffer}")
-            print(f"   📊 Words with AoA data: {words_with_aoa}/{len(candidates) + words_filtered_by_aoa}")
-            print(f"   🚫 Words filtered by AoA: {words_filtered_by_aoa}")
-            if aoa_penalties_applied:
-                avg_penalty = sum(aoa_penalties_applied) / len(aoa_penalties_applied)
-                max_penalty = max(aoa_penalties_applied)
-                print(f"   ⚠️  AoA penalties applied: {len(aoa_penalties_applied)} words, avg={avg_penalty:.2f}, max={max_penalty:.2f}")
-
-        if max_hsk_level is not None:
-            print(f"   📘 Max HSK level: {max_hsk_level} (filtered {words_filtered_by_hsk} words above this level)")
-        
-        # Sort by score
-        candidates.sort(key=lambda item: item["score"], reverse=True)
-        
-        return candidates[:config.get("top_n", 50)]
+        return candidates
 
 
 # Global service instance (lazy-loaded)
 _chinese_service_instance: Optional[ChinesePPRRecommenderService] = None
+# Serialises the (slow) first load: startup warm-up and early requests may race
+_chinese_service_lock = threading.Lock()
 
 
 def get_chinese_ppr_service(
@@ -584,52 +622,53 @@ def get_chinese_ppr_service(
     kg_file = kg_file.resolve()
     
     # Check if files exist
-    if not similarity_file.exists():
+    if not similarity_file.exists() and not snapshot_path_for(similarity_file).exists():
         raise FileNotFoundError(f"Similarity file not found: {similarity_file}")
     if not kg_file.exists():
         raise FileNotFoundError(f"KG file not found: {kg_file}")
     
-    # Check if we need to recreate the instance (if kg_file changed or instance doesn't exist)
-    # If kg_file is explicitly provided and different from cached, reset the instance
-    # Also check file modification time to detect updates
-    should_reset = False
-    if _chinese_service_instance is None:
-        # No instance exists, create new one
-        pass
-    elif not hasattr(_chinese_service_instance, '_kg_file'):
-        # Instance exists but doesn't have _kg_file attribute (old instance), reset it
-        should_reset = True
-    elif _chinese_service_instance._kg_file != kg_file:
-        # Instance exists but kg_file changed, reset it
-        should_reset = True
-    elif hasattr(_chinese_service_instance, '_kg_file_mtime'):
-        # Check if file modification time changed (file was updated)
-        try:
-            current_mtime = kg_file.stat().st_mtime
-            if current_mtime != _chinese_service_instance._kg_file_mtime:
-                should_reset = True
-        except (OSError, AttributeError):
+    with _chinese_service_lock:
+        # Check if we need to recreate the instance (if kg_file changed or instance doesn't exist)
+        # If kg_file is explicitly provided and different from cached, reset the instance
+        # Also check file modification time to detect updates
+        should_reset = False
+        if _chinese_service_instance is None:
+            # No instance exists, create new one
             pass
-    
-    if should_reset:
-        _chinese_service_instance = None
-    
-    if _chinese_service_instance is None:
-        try:
-            _chinese_service_instance = ChinesePPRRecommenderService(
-                similarity_file=similarity_file,
-                config=config
-            )
-            _chinese_service_instance.load_kg_metadata(kg_file=kg_file)
-            # Store the kg_file path and modification time so we can detect changes
-            _chinese_service_instance._kg_file = kg_file
+        elif not hasattr(_chinese_service_instance, '_kg_file'):
+            # Instance exists but doesn't have _kg_file attribute (old instance), reset it
+            should_reset = True
+        elif _chinese_service_instance._kg_file != kg_file:
+            # Instance exists but kg_file changed, reset it
+            should_reset = True
+        elif hasattr(_chinese_service_instance, '_kg_file_mtime'):
+            # Check if file modification time changed (file was updated)
             try:
-                _chinese_service_instance._kg_file_mtime = kg_file.stat().st_mtime
+                current_mtime = kg_file.stat().st_mtime
+                if current_mtime != _chinese_service_instance._kg_file_mtime:
+                    should_reset = True
             except (OSError, AttributeError):
-                _chinese_service_instance._kg_file_mtime = None
-        except Exception as e:
-            # Reset instance on error so it can be retried
+                pass
+    
+        if should_reset:
             _chinese_service_instance = None
-            raise RuntimeError(f"Failed to initialize Chinese PPR service: {str(e)}") from e
+    
+        if _chinese_service_instance is None:
+            try:
+                _chinese_service_instance = ChinesePPRRecommenderService(
+                    similarity_file=similarity_file,
+                    config=config
+                )
+                _chinese_service_instance.load_kg_metadata(kg_file=kg_file)
+                # Store the kg_file path and modification time so we can detect changes
+                _chinese_service_instance._kg_file = kg_file
+                try:
+                    _chinese_service_instance._kg_file_mtime = kg_file.stat().st_mtime
+                except (OSError, AttributeError):
+                    _chinese_service_instance._kg_file_mtime = None
+            except Exception as e:
+                # Reset instance on error so it can be retried
+                _chinese_service_instance = None
+                raise RuntimeError(f"Failed to initialize Chinese PPR service: {str(e)}") from e
     
     return _chinese_service_instance
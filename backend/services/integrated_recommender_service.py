@@ -20,23 +20,18 @@ SCRIPTS_PATH = PROJECT_ROOT / "scripts"
 if str(SCRIPTS_PATH) not in sys.path:
     sys.path.insert(0, str(SCRIPTS_PATH))
 
-from backend.services.chinese_ppr_recommender_service import (
-    get_chinese_ppr_service,
-    ChinesePPRRecommenderService
-)
-from backend.services.ppr_recommender_service import (
-    get_ppr_service,
-    PPRRecommenderService
-)
+# Same module path as recommendations.py and the startup warm-up, so all share one PPR singleton
+from services.chinese_ppr_recommender_service import get_chinese_ppr_service
+from services.ppr_recommender_service import get_ppr_service
 from backend.database.kg_client import KnowledgeGraphClient # Corrected: Only import KnowledgeGraphClient
 from scripts.knowledge_graph.curious_mario_recommender import (
-    KnowledgeGraphService, # Corrected: Import KnowledgeGraphService from here
     KnowledgeNode,         # Corrected: Import KnowledgeNode from here
     RecommenderConfig,
     CuriousMarioRecommender,
     AnkiMasteryExtractor,
     _normalize_kg_id
 )
+from backend.services.kg_node_catalog import get_kg_node_catalog
 from backend.database.models import Profile, MasteredWord
 from backend.database.services import ProfileService
 from sqlalchemy.orm import Session
@@ -120,7 +115,9 @@ class IntegratedRecommenderService:
             prereq_threshold=0.75,
             mental_age=profile.mental_age,
         )
-        self.zpd_recommender = CuriousMarioRecommender(zpd_config, kg_client=KnowledgeGraphClient())
+        self.zpd_recommender = CuriousMarioRecommender(
+            zpd_config, kg_client=KnowledgeGraphClient(), profile_id=str(profile.id)
+        )
     
     def get_recommendations(
         self,
@@ -290,20 +287,9 @@ class IntegratedRecommenderService:
             print(f"   ⚠️  No PPR vocabulary recommendations - returning empty list")
             return []
         
-        # Get KG nodes for prerequisite checking
-        vocab_config = RecommenderConfig(
-            anki_query='_KG_Map:*',
-            kg_field_name="_KG_Map",
-            node_types=("srs-kg:Word",),
-            mastery_threshold=0.85,
-            prereq_threshold=0.75,
-            mental_age=self.profile.mental_age,
-        )
-        kg_service = KnowledgeGraphService(config=vocab_config, kg_client=KnowledgeGraphClient())
-        raw_nodes = kg_service.fetch_nodes()
-        
-        # Create a lookup map using clean IDs (strip ns1:, srs-kg:, etc.)
-        nodes = { k.split(':')[-1]: v for k, v in raw_nodes.items() }
+        # Get KG nodes for prerequisite checking (shared catalog, re-queried only when the store changes)
+        # Lookup map uses clean IDs (strip ns1:, srs-kg:, etc.)
+        nodes = get_kg_node_catalog().get_nodes_by_local_id(("srs-kg:Word",))
         
         print(f"   📊 KG has {len(nodes)} Word nodes (normalized)")
         
@@ -493,8 +479,7 @@ class IntegratedRecommenderService:
             target_language=language
         )
 
-        kg_service = KnowledgeGraphService(config, kg_client=KnowledgeGraphClient())
-        nodes = kg_service.fetch_nodes()
+        nodes = get_kg_node_catalog().get_nodes(config.node_types, target_language=language)
 
         # Language filtering is now handled within KnowledgeGraphService if target_language is set
         # No explicit filtering needed here for live KG results, as it's done at the source.
@@ -0,0 +1,105 @@
+"""
+KG Node Catalog
+Versioned, process-wide cache of KnowledgeGraphService.fetch_nodes() results.
+
+fetch_nodes() runs a full-graph SELECT with seven OPTIONALs and parses every row into a
+KnowledgeNode. The graph only changes when the Oxigraph store is (re)loaded, so results are
+cached per (node_types, target_language) and rebuilt only when the store generation moves.
+
+Returned dicts and nodes are shared between requests: treat them as read-only.
+"""
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.database.kg_client import KnowledgeGraphClient
+from scripts.knowledge_graph.curious_mario_recommender import (
+    KnowledgeGraphService,
+    KnowledgeNode,
+    RecommenderConfig,
+)
+
+CatalogKey = Tuple[Tuple[str, ...], Optional[str]]
+
+
+class KGNodeCatalog:
+    """In-memory node catalog keyed by node type(s) and target language."""
+
+    def __init__(self):
+        self._entries: Dict[CatalogKey, Tuple[int, Dict[str, KnowledgeNode]]] = {}
+        # Derived prefix-less views, tied to the exact nodes dict they were built from
+        self._local_indexes: Dict[CatalogKey, Tuple[Dict[str, KnowledgeNode], Dict[str, KnowledgeNode]]] = {}
+        self._lock = threading.Lock()
+        self._kg_client: Optional[KnowledgeGraphClient] = None
+
+    def _client(self) -> KnowledgeGraphClient:
+        if self._kg_client is None:
+            self._kg_client = KnowledgeGraphClient()
+        return self._kg_client
+
+    def get_nodes(
+        self,
+        node_types: Tuple[str, ...] = ("srs-kg:Word",),
+        target_language: Optional[str] = None,
+    ) -> Dict[str, KnowledgeNode]:
+        """
+        Return nodes for the given types/language, querying the KG only on a cold or stale entry.
+
+        Args:
+            node_types: KG classes to include (e.g. ("srs-kg:GrammarPoint",))
+            target_language: 'zh' / 'en' to apply KnowledgeGraphService's language filters
+
+        Returns:
+            Mapping of normalized node id (e.g. 'srs-inst:word-zh-饭') -> KnowledgeNode
+        """
+        key: CatalogKey = (tuple(node_types), target_language)
+        client = self._client()
+        generation = client.generation()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == generation:
+            return entry[1]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                return entry[1]
+            config = RecommenderConfig(node_types=tuple(node_types), target_language=target_language)
+            nodes = KnowledgeGraphService(config, kg_client=client).fetch_nodes()
+            self._entries[key] = (generation, nodes)
+            print(f"   📚 KG node catalog built: {len(nodes)} nodes for {key} (generation {generation})")
+            return nodes
+
+    def get_nodes_by_local_id(
+        self,
+        node_types: Tuple[str, ...] = ("srs-kg:Word",),
+        target_language: Optional[str] = None,
+    ) -> Dict[str, KnowledgeNode]:
+        """Same nodes as get_nodes(), keyed by prefix-less id (e.g. 'word-zh-饭')."""
+        nodes = self.get_nodes(node_types, target_language)
+        key: CatalogKey = (tuple(node_types), target_language)
+        cached = self._local_indexes.get(key)
+        if cached is not None and cached[0] is nodes:
+            return cached[1]
+        local_index = {k.split(':')[-1]: v for k, v in nodes.items()}
+        self._local_indexes[key] = (nodes, local_index)
+        return local_index
+
+
+_catalog: Optional[KGNodeCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_kg_node_catalog() -> KGNodeCatalog:
+    """Get the process-wide KG node catalog."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = KGNodeCatalog()
+    return _catalog
@@ -4,10 +4,12 @@ Integrates the Personalized PageRank recommender with database and Fuseki.
 """
 import sys
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Mapping, Optional, Tuple
 import json
 import math
+import threading
 import networkx as nx
+import numpy as np
 from collections import defaultdict
 
 # Add project root to path
@@ -15,16 +17,18 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT / "scripts" / "recommendation_engine"))
 
 from ppr_recommender import (
-    load_similarity_graph,
     build_personalization_vector,
-    run_ppr,
-    load_word_metadata,
-    build_label_index,
+    run_ppr_batch,
+    run_ppr_vector,
+    load_word_metadata_and_label_index,
     _map_word_to_node_id,
     _normalize_node_id,
     WordMetadata,
 )
 
+from similarity_snapshot import load_ppr_graph, snapshot_path_for
+from candidate_scoring import CandidateFeatures, ScoringParams, feature_stats, score_candidates
+
 # Default configuration
 DEFAULT_CONFIG = {
     "alpha": 0.5,
@@ -40,6 +44,9 @@ DEFAULT_CONFIG = {
     "top_n": 50,
 }
 
+# CEFR Mapping for filtering
+CEFR_VALUES = {"A1": 1, "A2": 2, "B1": 3, "B2": 4, "C1": 5, "C2": 6}
+
 
 class PPRRecommenderService:
     """Service for PPR-based English word recommendations."""
@@ -64,7 +71,8 @@ class PPRRecommenderService:
         
         # Load similarity graph
         print(f"📊 Loading similarity graph from {self.similarity_file}...")
-        self.graph, self.labels = load_similarity_graph(
+        # CSR graph, memory-mapped from the .csr snapshot when one is up to date
+        self.graph, self.labels = load_ppr_graph(
             self.similarity_file, 
             min_similarity=self.config["min_similarity"]
         )
@@ -73,6 +81,7 @@ class PPRRecommenderService:
         # Word metadata and label index will be loaded on demand
         self.word_metadata: Optional[Dict[str, WordMetadata]] = None
         self.label_index: Optional[Dict[str, str]] = None
+        self._features: Optional[CandidateFeatures] = None
     
     def load_kg_metadata(self, kg_file: Optional[Path] = None) -> None:
         """Load word metadata from KG file or Fuseki."""
@@ -81,8 +90,8 @@ class PPRRecommenderService:
         
         if kg_file:
             print(f"📚 Loading word metadata from {kg_file}...")
-            self.word_metadata = load_word_metadata(kg_file)
-            self.label_index = build_label_index(self.word_metadata)
+            self.word_metadata, self.label_index = load_word_metadata_and_label_index(kg_file)
+            self._features = None
             print(f"   ✅ Loaded metadata for {len(self.word_metadata):,} words")
         elif self.kg_endpoint:
             # TODO: Load from Fuseki SPARQL queries
@@ -170,61 +179,109 @@ class PPRRecommenderService:
         personalization = build_personalization_vector(self.graph, seed_weights)
         
         # Run PPR
-        scores = run_ppr(self.graph, personalization, alpha=config["alpha"])
-        
-        # Calculate statistics for transformations
-        all_ppr_scores = [s for s in scores.values() if s > 0]
-        ppr_mean = math.log10(sum(all_ppr_scores) / len(all_ppr_scores)) if all_ppr_scores else 0.0
-        ppr_std = math.sqrt(sum((math.log10(s) - ppr_mean)**2 for s in all_ppr_scores) / len(all_ppr_scores)) if len(all_ppr_scores) > 1 else 1.0
-
-        all_concreteness = [
-            meta.concreteness
-            for meta in self.word_metadata.values()
-            if meta.concreteness is not None
-        ]
-        conc_mean = sum(all_concreteness) / len(all_concreteness) if all_concreteness else 3.0
-        conc_std = (
-            math.sqrt(
-                sum((c - conc_mean) ** 2 for c in all_concreteness) / len(all_concreteness)
-            )
-            if len(all_concreteness) > 1
-            else 1.5
-        )
-
-        # Calculate frequency statistics for normalization
-        all_freq_ranks = [
-            -math.log10(meta.frequency_rank + 1)
-            for meta in self.word_metadata.values()
-            if meta.frequency_rank is not None and meta.frequency_rank > 0
-        ]
-        freq_mean = sum(all_freq_ranks) / len(all_freq_ranks) if all_freq_ranks else 0.0
-        freq_std = (
-            math.sqrt(
-                sum((f - freq_mean) ** 2 for f in all_freq_ranks) / len(all_freq_ranks)
-            )
-            if len(all_freq_ranks) > 1
-            else 1.0
-        )
+        scores = run_ppr_vector(self.graph, personalization, alpha=config["alpha"])
         
-        # Transform functions
-        def transform_ppr(raw_ppr: float) -> float:
-            return (math.log10(raw_ppr + 1e-10) - ppr_mean) / ppr_std if ppr_std > 0 else 0.0
+        return self._rank_candidates(scores, seed_weights, exclude_words, config)
+    
+    def get_recommendations_batch(
+        self,
+        mastered_words_by_profile: Mapping[str, List[str]],
+        exclude_words_by_profile: Optional[Mapping[str, List[str]]] = None,
+        **override_config
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get PPR-based recommendations for many profiles in one power iteration.
         
-        def transform_concreteness(value: Optional[float]) -> float:
-            if value is None:
-                return 0.0
-            return (value - conc_mean) / conc_std if conc_std > 0 else 0.0
+        Intended for bulk refreshes (e.g. nightly precompute for every child):
+        all personalization vectors are scored together as a dense matrix.
         
-        def transform_frequency(rank: Optional[int]) -> float:
-            if not rank or rank <= 0:
-                return 0.0
-            raw = -math.log10(rank + 1)
-            return (raw - freq_mean) / freq_std if freq_std > 0 else 0.0
+        Args:
+            mastered_words_by_profile: profile_id -> mastered word texts
+            exclude_words_by_profile: Optional profile_id -> words to exclude
+            **override_config: Configuration overrides (shared by all profiles)
         
-        def calculate_aoa_penalty(aoa: Optional[float], mental_age: Optional[float]) -> float:
-            if aoa is None or mental_age is None:
-                return 0.0
-            return max(0.0, aoa - mental_age)
+        Returns:
+            profile_id -> recommendation list (same shape as get_recommendations);
+            profiles with no mappable seeds get an empty list.
+        """
+        config = {**self.config, **override_config}
+        exclude_words_by_profile = exclude_words_by_profile or {}
+        
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        batch_ids: List[str] = []
+        batch_seeds: List[Dict[str, float]] = []
+        batch_personalizations: List[Dict[str, float]] = []
+        for profile_id, mastered_words in mastered_words_by_profile.items():
+            matched_ids, _ = self.get_mastered_word_ids(mastered_words, profile_id)
+            seed_weights = {node_id: 1.0 for node_id in matched_ids}
+            try:
+                personalization = build_personalization_vector(self.graph, seed_weights)
+            except ValueError:
+                results[profile_id] = []
+                continue
+            batch_ids.append(profile_id)
+            batch_seeds.append(seed_weights)
+            batch_personalizations.append(personalization)
+        
+        if not batch_ids:
+            return results
+        
+        print(f"📊 Batched PPR for {len(batch_ids)} profiles ({len(results)} without seeds)")
+        score_matrix = run_ppr_batch(self.graph, batch_personalizations, alpha=config["alpha"])
+        for col, profile_id in enumerate(batch_ids):
+            results[profile_id] = self._rank_candidates(
+                score_matrix[:, col], batch_seeds[col], exclude_words_by_profile.get(profile_id), config
+            )
+        return results
+    
+    def _candidate_features(self) -> CandidateFeatures:
+        """Per-node feature columns, built once per graph + metadata load."""
+        if self._features is None:
+            if self.word_metadata is None:
+                raise ValueError("KG metadata not loaded. Call load_kg_metadata() first.")
+            
+            def resolve(node_id: str):
+                normalized_id = _normalize_node_id(node_id)
+                meta = self.word_metadata.get(normalized_id)
+                return (normalized_id, meta) if meta else None
+            
+            def frequency_feature(meta: WordMetadata) -> Optional[float]:
+                if not meta.frequency_rank or meta.frequency_rank <= 0:
+                    return None
+                return -math.log10(meta.frequency_rank + 1)
+            
+            def cefr_level(meta: WordMetadata) -> Optional[float]:
+                cefr = getattr(meta, "cefr", None)
+                return CEFR_VALUES.get(cefr.upper(), 99) if cefr else None
+            
+            conc_stats = feature_stats(
+                [m.concreteness for m in self.word_metadata.values() if m.concreteness is not None],
+                default_mean=3.0, default_std=1.5,
+            )
+            freq_stats = feature_stats(
+                [
+                    -math.log10(m.frequency_rank + 1)
+                    for m in self.word_metadata.values()
+                    if m.frequency_rank is not None and m.frequency_rank > 0
+                ],
+                default_mean=0.0, default_std=1.0,
+            )
+            self._features = CandidateFeatures(
+                self.graph.node_ids, resolve, self.labels,
+                frequency_feature=frequency_feature, level=cefr_level,
+                conc_stats=conc_stats, freq_stats=freq_stats,
+            )
+        return self._features
+    
+    def _rank_candidates(
+        self,
+        ppr_scores: np.ndarray,
+        seed_weights: Dict[str, float],
+        exclude_words: Optional[List[str]],
+        config: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        """Filter raw PPR scores and rank candidates with the logit model."""
+        features = self._candidate_features()
         
         # Build excluded node IDs
         excluded_node_ids = set()
@@ -234,116 +291,60 @@ class PPRRecommenderService:
                 if node_id:
                     excluded_node_ids.add(_normalize_node_id(node_id))
         
-        # Score candidates
-        candidates = []
         mental_age = config.get("mental_age")
         aoa_buffer = config.get("aoa_buffer", 0.0)
-        max_level = config.get("max_level", 6)
-        
-        # CEFR Mapping for filtering
-        cefr_values = {"A1": 1, "A2": 2, "B1": 3, "B2": 4, "C1": 5, "C2": 6}
-        
-        words_with_aoa = 0
-        words_filtered_by_aoa = 0
-        words_filtered_by_level = 0
-        aoa_penalties_applied = []
-        
-        for node_id, raw_score in scores.items():
-            # Normalize node ID
-            normalized_id = _normalize_node_id(node_id)
-            
-            if normalized_id in seed_weights:
-                continue
-            if normalized_id in excluded_node_ids:
-                continue
-            
-            meta = self.word_metadata.get(normalized_id)
-            if not meta:
-                continue
-            
-            # Filter multi-word if requested
-            if config.get("exclude_multiword"):
-                label = meta.label or self.labels.get(normalized_id, normalized_id)
-                if " " in label or "-" in label:
-                    continue
-            
-            # Filter by CEFR Level
-            cefr_level = getattr(meta, 'cefr', None)
-            if cefr_level:
-                level_val = cefr_values.get(cefr_level.upper(), 99)
-                if level_val > max_level:
-                    words_filtered_by_level += 1
-                    continue
-
-            # Track AoA data availability
-            if meta.age_of_acquisition is not None:
-                words_with_aoa += 1
-            
-            # Filter by AoA
-            if (
-                mental_age is not None
-                and meta.age_of_acquisition is not None
-                and meta.age_of_acquisition > mental_age + aoa_buffer
-            ):
-                words_filtered_by_aoa += 1
-                continue
-            
-            # Transform features
-            ppr_transformed = transform_ppr(raw_score)
-            conc_transformed = transform_concreteness(meta.concreteness)
-            freq_transformed = transform_frequency(meta.frequency_rank)
-            aoa_penalty = calculate_aoa_penalty(meta.age_of_acquisition, mental_age)
-            
-            if aoa_penalty > 0:
-                aoa_penalties_applied.append(aoa_penalty)
-            
-            # Calculate logit z-score
-            z = (
-                config["beta_intercept"]
-                + config["beta_ppr"] * ppr_transformed
-                + config["beta_concreteness"] * conc_transformed
-                + config["beta_frequency"] * freq_transformed
-                - config["beta_aoa_penalty"] * aoa_penalty
-            )
-            
-            # Convert to probability
-            final_score = 1.0 / (1.0 + math.exp(-z))
-            
-            label = meta.label or self.labels.get(normalized_id, normalized_id)
-            candidates.append({
-                "word": label,
-                "node_id": normalized_id,
-                "score": final_score,
-                "log_ppr": ppr_transformed,
-                "z_concreteness": conc_transformed,
-                "log_frequency": freq_transformed,
-                "aoa_penalty": aoa_penalty,
-                "concreteness": meta.concreteness,
-                "age_of_acquisition": meta.age_of_acquisition,
-                "frequency_rank": meta.frequency_rank,
-                "cefr_level": cefr_level
-            })
+        result = score_candidates(
+            features,
+            ppr_scores,
+            features.rows_for_output_ids(set(seed_weights) | excluded_node_ids),
+            ScoringParams(
+                beta_intercept=config["beta_intercept"],
+                beta_ppr=config["beta_ppr"],
+                beta_concreteness=config["beta_concreteness"],
+                beta_frequency=config["beta_frequency"],
+                beta_aoa_penalty=config["beta_aoa_penalty"],
+                mental_age=mental_age,
+                aoa_buffer=aoa_buffer,
+                max_level=config.get("max_level", 6),
+                exclude_multiword=bool(config.get("exclude_multiword")),
+                top_n=config.get("top_n", 50),
+            ),
+        )
         
         # Log AoA statistics
         if mental_age is not None:
+            kept_penalties = result.aoa_penalty[result.kept & (result.aoa_penalty > 0)]
             print(f"   🧠 Mental age: {mental_age}, AoA buffer: {aoa_buffer}")
-            print(f"   📊 Words with AoA data: {words_with_aoa}/{len(candidates) + words_filtered_by_aoa}")
-            print(f"   🚫 Words filtered by AoA: {words_filtered_by_aoa}")
-            if aoa_penalties_applied:
-                avg_penalty = sum(aoa_penalties_applied) / len(aoa_penalties_applied)
-                max_penalty = max(aoa_penalties_applied)
-                print(f"   ⚠️  AoA penalties applied: {len(aoa_penalties_applied)} words, avg={avg_penalty:.2f}, max={max_penalty:.2f}")
+            print(f"   📊 Words with AoA data: {result.counts['with_aoa']}/{int(result.kept.sum()) + result.counts['filtered_by_aoa']}")
+            print(f"   🚫 Words filtered by AoA: {result.counts['filtered_by_aoa']}")
+            if kept_penalties.size:
+                print(f"   ⚠️  AoA penalties applied: {kept_penalties.size} words, avg={kept_penalties.mean():.2f}, max={kept_penalties.max():.2f}")
             else:
                 print(f"   ⚠️  No AoA penalties applied (all words have AoA <= mental_age or no AoA data)")
         
-        # Sort by score
-        candidates.sort(key=lambda x: x["score"], reverse=True)
-        
-        return candidates[:config.get("top_n", 50)]
+        candidates = []
+        for row in result.rows.tolist():
+            meta = features.meta[row]
+            candidates.append({
+                "word": features.labels[row],
+                "node_id": features.output_ids[row],
+                "score": float(result.score[row]),
+                "log_ppr": float(result.log_ppr[row]),
+                "z_concreteness": float(features.concreteness[row]),
+                "log_frequency": float(features.frequency[row]),
+                "aoa_penalty": float(result.aoa_penalty[row]),
+                "concreteness": meta.concreteness,
+                "age_of_acquisition": meta.age_of_acquisition,
+                "frequency_rank": meta.frequency_rank,
+                "cefr_level": getattr(meta, 'cefr', None)
+            })
+        return candidates
 
 
 # Global service instance (lazy-loaded)
 _service_instance: Optional[PPRRecommenderService] = None
+# Serialises the (slow) first load: startup warm-up and early requests may race
+_service_lock = threading.Lock()
 
 
 def get_ppr_service(
@@ -355,31 +356,34 @@ def get_ppr_service(
     global _service_instance
     
     if _service_instance is None:
-        if similarity_file is None:
-            similarity_file = PROJECT_ROOT / "data" / "content_db" / "english_word_similarity.json"
-        if kg_file is None:
-            # Use rescued KG with 18K English words
-            kg_file = PROJECT_ROOT / "knowledge_graph" / "world_model_final_master.ttl"
-        
-        # Ensure paths are absolute
-        similarity_file = similarity_file.resolve()
-        kg_file = kg_file.resolve()
-        
-        # Check if files exist
-        if not similarity_file.exists():
-            raise FileNotFoundError(f"Similarity file not found: {similarity_file}")
-        if not kg_file.exists():
-            raise FileNotFoundError(f"KG file not found: {kg_file}")
-        
-        try:
-            _service_instance = PPRRecommenderService(
-                similarity_file=similarity_file,
-                config=config
-            )
-            _service_instance.load_kg_metadata(kg_file=kg_file)
-        except Exception as e:
-            # Reset instance on error so it can be retried
-            _service_instance = None
-            raise RuntimeError(f"Failed to initialize PPR service: {str(e)}") from e
+        with _service_lock:
+            if _service_instance is None:  # Re-check under the lock
+                if similarity_file is None:
+                    similarity_file = PROJECT_ROOT / "data" / "content_db" / "english_word_similarity.json"
+                if kg_file is None:
+                    # Use rescued KG with 18K English words
+                    kg_file = PROJECT_ROOT / "knowledge_graph" / "world_model_final_master.ttl"
+        
+                # Ensure paths are absolute
+                similarity_file = similarity_file.resolve()
+                kg_file = kg_file.resolve()
+        
+                # Check if files exist
+                if not similarity_file.exists() and not snapshot_path_for(similarity_file).exists():
+                    raise FileNotFoundError(f"Similarity file not found: {similarity_file}")
+                if not kg_file.exists():
+                    raise FileNotFoundError(f"KG file not found: {kg_file}")
+        
+                try:
+                    service = PPRRecommenderService(
+                        similarity_file=similarity_file,
+                        config=config
+                    )
+                    service.load_kg_metadata(kg_file=kg_file)
+                except Exception as e:
+                    # Nothing was published, so the next call retries
+                    raise RuntimeError(f"Failed to initialize PPR service: {str(e)}") from e
+                # Publish only once loaded: the unlocked check above may see it immediately
+                _service_instance = service
     
     return _service_instance
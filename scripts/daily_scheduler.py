@@ -5,7 +5,7 @@ CUMA (Lingxi) Daily Scheduler - 基于 PEP-3 短板靶向推送的智能调度
 核心逻辑：
 1. 从 SQLite profiles 表读取 extracted_data，解析 pep3_baseline，找出最短板领域
 2. 跨图谱 SPARQL 查询：命中该领域的 PhasalObjective 任务作为靶向候选池
-3. 结合 FSRS 记忆状态，优先推送到期或未做过的靶向任务
+3. 结合 FSRS 记忆状态（fsrs_card_states 表），优先推送到期或未做过的靶向任务
 
 用法：
     # 生成每日靶向任务（默认）
@@ -14,15 +14,21 @@ CUMA (Lingxi) Daily Scheduler - 基于 PEP-3 短板靶向推送的智能调度
     # 记录家长反馈
     python scripts/daily_scheduler.py record <quest_id> <全辅助|部分辅助|独立完成> [--child 小明]
 
+    # 将旧档案 extracted_data 中的 fsrs_states 迁移到 fsrs_card_states 表
+    python scripts/daily_scheduler.py migrate-fsrs
+
 依赖：pip install fsrs rdflib
 """
 from __future__ import annotations
 
 import argparse
 import json
+import os
 import random
 import sqlite3
+import sys
 import threading
+from dataclasses import dataclass, field
 from datetime import datetime, timezone, timedelta
 
 # rdflib SPARQL parser 非线程安全 (RDFLib/rdflib#765)，需串行化
@@ -32,6 +38,11 @@ from typing import Optional
 
 # 项目根目录
 BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+# 与后端共用的 SQLite 连接池（WAL、busy_timeout 等 PRAGMA 统一设置；close() 归还连接）
+from backend.database.sqlite_pool import connect as sqlite_connect
 
 # PEP-3 领域代码 → 图谱 domain URI 后缀 映射
 DOMAIN_CODE_TO_URI_SUFFIX: dict[str, str] = {
@@ -64,14 +75,15 @@ PEP_TO_HHS_MODULES: dict[str, tuple[str, ...]] = {
 
 def _hhs_table_exists(db_path: Path) -> bool:
     try:
-        conn = sqlite3.connect(str(db_path))
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='hhs_goals'"
-        )
-        ok = cur.fetchone() is not None
-        conn.close()
-        return ok
+        conn = sqlite_connect(db_path)
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='hhs_goals'"
+            )
+            return cur.fetchone() is not None
+        finally:
+            conn.close()
     except OSError:
         return False
 
@@ -133,19 +145,21 @@ def load_hhs_quests_for_scheduler(
         if not mapped:
             return []
         modules = set(mapped)
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    if modules:
-        ph = ",".join("?" * len(modules))
-        cur.execute(
-            f"SELECT * FROM hhs_goals WHERE module_label IN ({ph}) ORDER BY RANDOM()",
-            tuple(modules),
-        )
-    else:
-        cur.execute("SELECT * FROM hhs_goals ORDER BY RANDOM()")
-    rows = cur.fetchall()
-    conn.close()
+    conn = sqlite_connect(db_path)
+    try:
+        conn.row_factory = sqlite3.Row
+        cur = conn.cursor()
+        if modules:
+            ph = ",".join("?" * len(modules))
+            cur.execute(
+                f"SELECT * FROM hhs_goals WHERE module_label IN ({ph}) ORDER BY RANDOM()",
+                tuple(modules),
+            )
+        else:
+            cur.execute("SELECT * FROM hhs_goals ORDER BY RANDOM()")
+        rows = cur.fetchall()
+    finally:
+        conn.close()
     return [_row_to_hhs_quest(r) for r in rows]
 
 
@@ -190,20 +204,21 @@ def find_child_profile(db_path: Path, child_query: str) -> Optional[tuple[str, s
     1. ``profiles.id`` 精确匹配（主键，UI / API 应始终传这个）
     2. ``profiles.name`` 精确匹配（仅兼容旧调用方按显示名查询）
     """
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
     q = (child_query or "").strip()
     if not q:
-        conn.close()
         return None
 
-    cur.execute("SELECT id, name, extracted_data FROM profiles WHERE id = ?", (q,))
-    row = cur.fetchone()
-    if not row:
-        cur.execute("SELECT id, name, extracted_data FROM profiles WHERE name = ?", (q,))
+    conn = sqlite_connect(db_path)
+    try:
+        conn.row_factory = sqlite3.Row
+        cur = conn.cursor()
+        cur.execute("SELECT id, name, extracted_data FROM profiles WHERE id = ?", (q,))
         row = cur.fetchone()
-    conn.close()
+        if not row:
+            cur.execute("SELECT id, name, extracted_data FROM profiles WHERE name = ?", (q,))
+            row = cur.fetchone()
+    finally:
+        conn.close()
     if not row:
         return None
     raw = row["extracted_data"]
@@ -251,8 +266,7 @@ def load_graph():
     from rdflib import Graph
 
     g = Graph()
-    quest_path = BASE_DIR / "knowledge_graph" / "quest_full.ttl"
-    pep3_path = BASE_DIR / "knowledge_graph" / "pep3_master.ttl"
+    quest_path, pep3_path = _quest_ttl_paths()
 
     if not quest_path.exists():
         raise FileNotFoundError(f"找不到 quest_full.ttl: {quest_path}")
@@ -264,11 +278,90 @@ def load_graph():
     return g
 
 
+def _quest_ttl_paths() -> tuple[Path, Path]:
+    return (
+        BASE_DIR / "knowledge_graph" / "quest_full.ttl",
+        BASE_DIR / "knowledge_graph" / "pep3_master.ttl",
+    )
+
+
+def _quest_ttl_signature() -> tuple[int, ...]:
+    """TTL 文件的 mtime 指纹，文件缺失时抛出与 load_graph 一致的 FileNotFoundError。"""
+    sig: list[int] = []
+    for path in _quest_ttl_paths():
+        try:
+            sig.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"找不到 {path.name}: {path}") from None
+    return tuple(sig)
+
+
+@dataclass
+class QuestCatalog:
+    """
+    预编译的 QCQ 任务目录（进程级共享，只读）。
+
+    by_domain: PEP-3 领域代码 → 靶向任务列表（等价于 get_targeted_quests 的结果）
+    fallback_pool: 全部有 alignsWithStandard 的任务（等价于 _get_fallback_quest_pool 的结果）
+    by_id: quest_id → 任务，用于历史打卡标签
+    """
+
+    signature: tuple[int, ...]
+    by_domain: dict[str, list[dict]] = field(default_factory=dict)
+    fallback_pool: list[dict] = field(default_factory=list)
+    by_id: dict[str, dict] = field(default_factory=dict)
+
+
+_quest_catalog: Optional[QuestCatalog] = None
+_quest_catalog_lock = threading.Lock()
+
+
+def _compile_quest_catalog(signature: tuple[int, ...]) -> QuestCatalog:
+    graph = load_graph()
+    by_domain = {
+        code: _query_targeted_quests(graph, code)
+        for code in DOMAIN_CODE_TO_URI_SUFFIX
+    }
+    fallback_pool = _query_fallback_quest_pool(graph)
+    return QuestCatalog(
+        signature=signature,
+        by_domain=by_domain,
+        fallback_pool=fallback_pool,
+        by_id={q["quest_id"]: q for q in fallback_pool},
+    )
+
+
+def get_quest_catalog() -> QuestCatalog:
+    """
+    获取进程级 QCQ 任务目录。首次调用（或 TTL 文件 mtime 变化后）解析图谱并编译，
+    之后的请求只做一次 stat 检查，不再重复解析 Turtle。
+    """
+    global _quest_catalog
+    signature = _quest_ttl_signature()
+    catalog = _quest_catalog
+    if catalog is not None and catalog.signature == signature:
+        return catalog
+    with _quest_catalog_lock:
+        catalog = _quest_catalog
+        if catalog is None or catalog.signature != signature:
+            catalog = _compile_quest_catalog(signature)
+            _quest_catalog = catalog
+    return catalog
+
+
 def get_targeted_quests(graph, domain_code: str) -> list[dict]:
     """
-    跨图谱 SPARQL：查询所有通过 alignsWithStandard 命中该领域的 PhasalObjective 任务。
+    查询所有通过 alignsWithStandard 命中该领域的 PhasalObjective 任务。
+    graph 为 None 时从预编译的 QuestCatalog 读取（返回的任务字典为共享只读对象）。
     返回: [{quest_id, label, pep3_items, pep3_item_nums, suggested_materials}, ...]
     """
+    if graph is None:
+        return list(get_quest_catalog().by_domain.get(domain_code.upper(), []))
+    return _query_targeted_quests(graph, domain_code)
+
+
+def _query_targeted_quests(graph, domain_code: str) -> list[dict]:
+    """跨图谱 SPARQL：按领域查询靶向任务。"""
     uri_suffix = DOMAIN_CODE_TO_URI_SUFFIX.get(domain_code.upper())
     if not uri_suffix:
         return []
@@ -419,6 +512,248 @@ def _parse_last_review_date(state: dict) -> Optional[datetime]:
     return None
 
 
+# ---------------------------------------------------------------------------
+# FSRS 卡片状态表 - 每个 (profile, quest) 一行，复习记录只追加
+# ---------------------------------------------------------------------------
+
+_FSRS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsrs_card_states (
+    profile_id VARCHAR NOT NULL,
+    quest_id VARCHAR NOT NULL,
+    due VARCHAR,
+    last_review VARCHAR,
+    state INTEGER,
+    card_json TEXT NOT NULL,
+    updated_at DATETIME,
+    PRIMARY KEY (profile_id, quest_id)
+);
+CREATE INDEX IF NOT EXISTS idx_fsrs_card_states_due ON fsrs_card_states (profile_id, due);
+CREATE INDEX IF NOT EXISTS idx_fsrs_card_states_last_review ON fsrs_card_states (profile_id, last_review);
+
+CREATE TABLE IF NOT EXISTS fsrs_review_logs (
+    id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+    profile_id VARCHAR NOT NULL,
+    quest_id VARCHAR NOT NULL,
+    rating INTEGER NOT NULL,
+    prompt_level VARCHAR,
+    reviewed_at VARCHAR NOT NULL,
+    due_after VARCHAR
+);
+CREATE INDEX IF NOT EXISTS idx_fsrs_review_logs_quest ON fsrs_review_logs (profile_id, quest_id, reviewed_at);
+"""
+
+_fsrs_schema_ready: set[str] = set()
+_fsrs_schema_lock = threading.Lock()
+
+
+def _fsrs_ts(value: Optional[datetime]) -> Optional[str]:
+    """统一为 UTC 'YYYY-MM-DDTHH:MM:SSZ'，保证 due / last_review 可按字符串做范围比较。"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _open_fsrs_db(db_path: Path) -> sqlite3.Connection:
+    """打开 SQLite 连接，首次使用时建表（CREATE IF NOT EXISTS）。"""
+    conn = sqlite_connect(db_path)
+    conn.row_factory = sqlite3.Row
+    key = str(db_path)
+    if key not in _fsrs_schema_ready:
+        with _fsrs_schema_lock:
+            try:
+                conn.executescript(_FSRS_SCHEMA)
+            except Exception:
+                conn.close()
+                raise
+            _fsrs_schema_ready.add(key)
+    return conn
+
+
+def _upsert_card_state(
+    cur: sqlite3.Cursor,
+    profile_id: str,
+    quest_id: str,
+    card_data: dict,
+    now_str: str,
+    overwrite: bool = True,
+) -> None:
+    verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+    cur.execute(
+        f"""
+        {verb} INTO fsrs_card_states
+            (profile_id, quest_id, due, last_review, state, card_json, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            profile_id,
+            quest_id,
+            _fsrs_ts(_parse_due_from_fsrs_state(card_data)),
+            _fsrs_ts(_parse_last_review_date(card_data)),
+            card_data.get("state"),
+            json.dumps(card_data, ensure_ascii=False),
+            now_str,
+        ),
+    )
+
+
+def _migrate_profile_fsrs_blob(
+    conn: sqlite3.Connection,
+    profile_id: str,
+    extracted: dict,
+) -> int:
+    """
+    将单个档案 extracted_data['fsrs_states'] 迁入 fsrs_card_states，并从 JSON 中移除该键。
+    表中已有的行优先（INSERT OR IGNORE），避免旧 blob 覆盖新复习结果。
+    """
+    states = extracted.pop("fsrs_states", None)
+    if states is None:
+        return 0
+    cur = conn.cursor()
+    now_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    moved = 0
+    if isinstance(states, dict):
+        for qid, card_data in states.items():
+            if isinstance(card_data, dict):
+                _upsert_card_state(cur, profile_id, str(qid), card_data, now_str, overwrite=False)
+                moved += 1
+    cur.execute(
+        "UPDATE profiles SET extracted_data = ?, updated_at = ? WHERE id = ?",
+        (json.dumps(extracted, ensure_ascii=False), now_str, profile_id),
+    )
+    conn.commit()
+    return moved
+
+
+def migrate_fsrs_states_from_blobs(db_path: Optional[Path] = None) -> int:
+    """一次性迁移：把所有档案 JSON 中的 fsrs_states 搬到 fsrs_card_states。返回迁移的卡片数。"""
+    db_path = db_path or get_db_path()
+    conn = _open_fsrs_db(db_path)
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT id, extracted_data FROM profiles WHERE extracted_data LIKE '%\"fsrs_states\"%'"
+        )
+        rows = cur.fetchall()
+        total = 0
+        for row in rows:
+            raw = row["extracted_data"]
+            try:
+                extracted = json.loads(raw) if raw else {}
+            except json.JSONDecodeError:
+                continue
+            total += _migrate_profile_fsrs_blob(conn, row["id"], extracted)
+        return total
+    finally:
+        conn.close()
+
+
+def _ensure_profile_migrated(db_path: Path, profile_id: str, extracted: dict) -> None:
+    """旧档案仍带 fsrs_states 时就地迁移（每个档案只发生一次）。"""
+    if "fsrs_states" not in extracted:
+        return
+    conn = _open_fsrs_db(db_path)
+    try:
+        _migrate_profile_fsrs_blob(conn, profile_id, extracted)
+    finally:
+        conn.close()
+
+
+def load_fsrs_states(
+    db_path: Path,
+    profile_id: str,
+    quest_ids: Optional[list[str]] = None,
+) -> dict[str, dict]:
+    """读取档案的 FSRS 卡片（可限定 quest_ids）。返回 quest_id -> Card.to_dict()。"""
+    conn = _open_fsrs_db(db_path)
+    try:
+        cur = conn.cursor()
+        if quest_ids is None:
+            cur.execute(
+                "SELECT quest_id, card_json FROM fsrs_card_states WHERE profile_id = ?",
+                (profile_id,),
+            )
+        else:
+            if not quest_ids:
+                return {}
+            ph = ",".join("?" * len(quest_ids))
+            cur.execute(
+                f"SELECT quest_id, card_json FROM fsrs_card_states WHERE profile_id = ? AND quest_id IN ({ph})",
+                (profile_id, *quest_ids),
+            )
+        return {row["quest_id"]: json.loads(row["card_json"]) for row in cur.fetchall()}
+    finally:
+        conn.close()
+
+
+def load_due_fsrs_states(
+    db_path: Path,
+    profile_id: str,
+    target_date_d,
+) -> tuple[dict[str, dict], set[str]]:
+    """
+    按 (profile_id, due) 索引做范围扫描。
+    返回: (到期或无 due 的卡片 quest_id -> card dict, 尚未到期的 quest_id 集合)
+    """
+    cutoff = f"{target_date_d.isoformat()}T23:59:59Z"
+    conn = _open_fsrs_db(db_path)
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT quest_id, card_json FROM fsrs_card_states
+            WHERE profile_id = ? AND (due IS NULL OR due <= ?)
+            """,
+            (profile_id, cutoff),
+        )
+        due_states = {row["quest_id"]: json.loads(row["card_json"]) for row in cur.fetchall()}
+        cur.execute(
+            "SELECT quest_id FROM fsrs_card_states WHERE profile_id = ? AND due > ?",
+            (profile_id, cutoff),
+        )
+        not_due = {row["quest_id"] for row in cur.fetchall()}
+        return due_states, not_due
+    finally:
+        conn.close()
+
+
+def load_reviewed_fsrs_states(db_path: Path, profile_id: str) -> list[tuple[str, dict]]:
+    """已复习过的卡片，按 last_review 倒序（走 (profile_id, last_review) 索引）。"""
+    conn = _open_fsrs_db(db_path)
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT quest_id, card_json FROM fsrs_card_states
+            WHERE profile_id = ? AND last_review IS NOT NULL
+            ORDER BY last_review DESC
+            """,
+            (profile_id,),
+        )
+        return [(row["quest_id"], json.loads(row["card_json"])) for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def load_review_logs(db_path: Path, profile_id: str, quest_id: str) -> list[dict]:
+    """某任务的复习记录，按时间正序。"""
+    conn = _open_fsrs_db(db_path)
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT rating, prompt_level, reviewed_at, due_after FROM fsrs_review_logs
+            WHERE profile_id = ? AND quest_id = ?
+            ORDER BY reviewed_at, id
+            """,
+            (profile_id, quest_id),
+        )
+        return [dict(row) for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+
 def _history_entry_matches_source(qid: str, quest: dict, schedule_source: str) -> bool:
     """Whether a history row belongs to the requested schedule (QCQ vs HHS)."""
     is_hhs = quest.get("content_source") == "HHS" or str(qid).startswith("hhs_")
@@ -438,7 +773,7 @@ def run_targeted_scheduler(
 ) -> tuple[dict, Optional[tuple[str, str, int]]]:
     """
     运行靶向调度：找最短板 → SPARQL 靶向任务池 → 严格 FSRS 过滤 → 排序。
-    严格从 extracted_data['fsrs_states'] 读取：due > --date 的任务坚决剔除。
+    严格从 fsrs_card_states 读取（按 due 索引范围扫描）：due > --date 的任务坚决剔除。
     今日已打卡（last_review 日期 == target_date）的任务放入 completed_today；未打卡且到期的放入 pending。
     名额计算：pending 最多 count - len(completed_today) 个。
     schedule_source: qcq = 仅 ECTA/QCQ 手册任务；hhs = 仅 Heep Hong SQLite 任务；mixed = 两者合并（旧行为）。
@@ -454,46 +789,28 @@ def run_targeted_scheduler(
     profile_row = find_child_profile(db_path, child_name)
 
     weakest: Optional[tuple[str, str, int]] = None
-    fsrs_states: dict = {}
+    profile_id: Optional[str] = None
     if profile_row:
-        _, _, extracted = profile_row
+        profile_id, _, extracted = profile_row
         weakest = find_weakest_domain(extracted)
-        fsrs_states = extracted.get("fsrs_states") or {}
-
-    graph = None
-
-    def ensure_graph():
-        nonlocal graph
-        if graph is None:
-            graph = load_graph()
-        return graph
+        _ensure_profile_migrated(db_path, profile_id, extracted)
 
     if src == "hhs":
         hhs_pep = weakest[0] if weakest else None
         quest_pool = load_hhs_quests_for_scheduler(db_path, hhs_pep)
-    elif src == "qcq":
-        g = ensure_graph()
-        if weakest:
-            domain_code, domain_name, age_months = weakest
-            quest_pool = get_targeted_quests(g, domain_code)
-            if not quest_pool:
-                quest_pool = _get_fallback_quest_pool(g)
-        else:
-            quest_pool = _get_fallback_quest_pool(g)
     else:
-        g = ensure_graph()
+        quest_pool = []
         if weakest:
             domain_code, domain_name, age_months = weakest
-            quest_pool = get_targeted_quests(g, domain_code)
-            if not quest_pool:
-                quest_pool = _get_fallback_quest_pool(g)
-        else:
-            quest_pool = _get_fallback_quest_pool(g)
-        hhs_pep = weakest[0] if weakest else None
-        quest_pool = merge_quest_pools(
-            quest_pool,
-            load_hhs_quests_for_scheduler(db_path, hhs_pep),
-        )
+            quest_pool = get_targeted_quests(None, domain_code)
+        if not quest_pool:
+            quest_pool = _get_fallback_quest_pool(None)
+        if src == "mixed":
+            hhs_pep = weakest[0] if weakest else None
+            quest_pool = merge_quest_pools(
+                quest_pool,
+                load_hhs_quests_for_scheduler(db_path, hhs_pep),
+            )
 
     target_date_d = target_date.date()
     target_dt = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -502,14 +819,19 @@ def run_targeted_scheduler(
     completed_today: list[dict] = []
     pending_unsorted: list[tuple[datetime, dict, Card | None]] = []
 
+    if profile_id is not None:
+        due_states, not_due_ids = load_due_fsrs_states(db_path, profile_id, target_date_d)
+    else:
+        due_states, not_due_ids = {}, set()
+
     for quest in quest_pool:
         qid = quest["quest_id"]
-        card_data = fsrs_states.get(qid)
+        if qid in not_due_ids:
+            continue
+        card_data = due_states.get(qid)
 
         if card_data:
             due = _parse_due_from_fsrs_state(card_data)
-            if due is not None and due.date() > target_date_d:
-                continue
             last_review = _parse_last_review_date(card_data)
             if last_review is not None:
                 last_review_local_str = (
@@ -560,14 +882,15 @@ def run_targeted_scheduler(
     if src == "hhs":
         quest_map = load_hhs_quest_map(db_path)
     elif src == "qcq":
-        g = ensure_graph()
-        quest_map = {q["quest_id"]: q for q in _get_fallback_quest_pool(g)}
+        quest_map = get_quest_catalog().by_id
     else:
-        g = ensure_graph()
-        quest_map = {q["quest_id"]: q for q in _get_fallback_quest_pool(g)}
+        quest_map = dict(get_quest_catalog().by_id)
         quest_map.update(load_hhs_quest_map(db_path))
     history_quests: list[dict] = []
-    for qid, card_data in fsrs_states.items():
+    reviewed = load_reviewed_fsrs_states(db_path, profile_id) if profile_id is not None else []
+    for qid, card_data in reviewed:
+        if len(history_quests) >= 20:
+            break
         last_review = _parse_last_review_date(card_data)
         if last_review is None:
             continue
@@ -593,7 +916,16 @@ def run_targeted_scheduler(
 
 
 def _get_fallback_quest_pool(graph) -> list[dict]:
-    """无最短板或靶向池为空时，返回全部有 alignsWithStandard 的任务。"""
+    """
+    无最短板或靶向池为空时，返回全部有 alignsWithStandard 的任务。
+    graph 为 None 时从预编译的 QuestCatalog 读取。
+    """
+    if graph is None:
+        return list(get_quest_catalog().fallback_pool)
+    return _query_fallback_quest_pool(graph)
+
+
+def _query_fallback_quest_pool(graph) -> list[dict]:
     sparql = """
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     PREFIX ecta-kg: <http://ecta.ai/schema/>
@@ -720,9 +1052,29 @@ def get_quest_logs(
     profile_row = find_child_profile(db_path, child_name)
     if not profile_row:
         return []
-    _, _, extracted = profile_row
-    quest_logs = extracted.get("quest_logs", {})
-    return quest_logs.get(quest_id, [])
+    profile_id, _, extracted = profile_row
+    return get_profile_quest_logs(db_path, profile_id, extracted, quest_id)
+
+
+def get_profile_quest_logs(
+    db_path: Path,
+    profile_id: str,
+    extracted: dict,
+    quest_id: str,
+) -> list[dict]:
+    """
+    合并 extracted_data['quest_logs'] 中的沟通记录与 fsrs_review_logs 中的打卡记录，按时间排序。
+    打卡记录以 system 消息呈现（"✅ 打卡完成: <辅助层级>"）。
+    """
+    logs = list(extracted.get("quest_logs", {}).get(quest_id, []))
+    for review in load_review_logs(db_path, profile_id, quest_id):
+        logs.append({
+            "role": "system",
+            "content": f"✅ 打卡完成: {review['prompt_level']}",
+            "timestamp": review["reviewed_at"],
+        })
+    logs.sort(key=lambda entry: entry.get("timestamp") or "")
+    return logs
 
 
 def append_quest_log(
@@ -762,15 +1114,17 @@ def append_quest_log(
     quest_logs[quest_id] = logs
     extracted["quest_logs"] = quest_logs
 
-    conn = sqlite3.connect(str(db_path))
-    cur = conn.cursor()
-    now_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-    cur.execute(
-        "UPDATE profiles SET extracted_data = ?, updated_at = ? WHERE id = ?",
-        (json.dumps(extracted, ensure_ascii=False), now_str, profile_id),
-    )
-    conn.commit()
-    conn.close()
+    conn = sqlite_connect(db_path)
+    try:
+        cur = conn.cursor()
+        now_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        cur.execute(
+            "UPDATE profiles SET extracted_data = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(extracted, ensure_ascii=False), now_str, profile_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
 
 
 def print_daily_quests(
@@ -844,50 +1198,43 @@ def record_feedback(
         raise ValueError(f"找不到儿童档案: {child_name}")
 
     profile_id, name, extracted = profile_row
-
-    # 获取或初始化数据库中的 fsrs_states
-    fsrs_states = extracted.setdefault("fsrs_states", {})
+    _ensure_profile_migrated(db_path, profile_id, extracted)
     scheduler = FSRS()
 
-    # 读取卡片历史状态
-    card_data = fsrs_states.get(quest_id)
-    card = Card.from_dict(card_data) if card_data else Card()
-
-    # FSRS 要求：state != New 时必须有 last_review，否则 review_card 会报错
-    if card.state != 0 and not getattr(card, "last_review", None):
-        card.last_review = card.due
+    conn = _open_fsrs_db(db_path)
+    try:
+        cur = conn.cursor()
+        # 读取卡片历史状态（单行主键查询）
+        cur.execute(
+            "SELECT card_json FROM fsrs_card_states WHERE profile_id = ? AND quest_id = ?",
+            (profile_id, quest_id),
+        )
+        row = cur.fetchone()
+        card = Card.from_dict(json.loads(row["card_json"])) if row else Card()
 
-    # 映射评级并复习
-    rating_val = prompt_level_to_fsrs_rating(prompt_level)
-    rating = Rating(rating_val)
-    new_card, _ = scheduler.review_card(card, rating)
+        # FSRS 要求：state != New 时必须有 last_review，否则 review_card 会报错
+        if card.state != 0 and not getattr(card, "last_review", None):
+            card.last_review = card.due
 
-    # 将更新后的卡片存回 extracted_data
-    fsrs_states[quest_id] = new_card.to_dict()
-    extracted["fsrs_states"] = fsrs_states
+        # 映射评级并复习
+        rating_val = prompt_level_to_fsrs_rating(prompt_level)
+        rating = Rating(rating_val)
+        new_card, _ = scheduler.review_card(card, rating)
 
-    # 自动追加系统打卡日志到 quest_logs（Topic Chat），供家校接力查看
-    system_content = f"✅ 打卡完成: {prompt_level}"
-    quest_logs = extracted.setdefault("quest_logs", {})
-    logs = quest_logs.setdefault(quest_id, [])
-    logs.append({
-        "role": "system",
-        "content": system_content,
-        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
-    })
-    quest_logs[quest_id] = logs
-    extracted["quest_logs"] = quest_logs
-
-    # 执行 SQL 真正落盘到数据库（extracted_data 已用 json.loads 解析，修改后用 json.dumps 转回）
-    conn = sqlite3.connect(str(db_path))
-    cur = conn.cursor()
-    now_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-    cur.execute(
-        "UPDATE profiles SET extracted_data = ?, updated_at = ? WHERE id = ?",
-        (json.dumps(extracted, ensure_ascii=False), now_str, profile_id),
-    )
-    conn.commit()
-    conn.close()
+        # 只改写这一张卡片，并向复习记录追加一行；打卡日志由 get_quest_logs 从复习记录合成
+        now = datetime.now(timezone.utc)
+        now_str = now.strftime("%Y-%m-%d %H:%M:%S")
+        _upsert_card_state(cur, profile_id, quest_id, new_card.to_dict(), now_str)
+        cur.execute(
+            """
+            INSERT INTO fsrs_review_logs (profile_id, quest_id, rating, prompt_level, reviewed_at, due_after)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (profile_id, quest_id, rating_val, prompt_level, _fsrs_ts(now), _fsrs_ts(new_card.due)),
+        )
+        conn.commit()
+    finally:
+        conn.close()
 
     print(f"✅ 已持久化记录：{quest_id} → {prompt_level} (FSRS {rating_val})")
     due_str = new_card.due.strftime("%Y-%m-%d") if new_card.due else "—"
@@ -916,6 +1263,7 @@ def main() -> None:
         choices=["全辅助", "部分辅助", "独立完成"],
         help="家长反馈的辅助层级",
     )
+    subparsers.add_parser("migrate-fsrs", help="将 extracted_data 中的 fsrs_states 迁移到 fsrs_card_states 表")
 
     args = parser.parse_args()
     db_path = Path(args.db) if args.db else None
@@ -927,6 +1275,9 @@ def main() -> None:
         )
     elif args.cmd == "record":
         record_feedback(args.child, args.quest_id, args.prompt_level, db_path)
+    elif args.cmd == "migrate-fsrs":
+        moved = migrate_fsrs_states_from_blobs(db_path)
+        print(f"✅ 已迁移 {moved} 条 FSRS 卡片状态到 fsrs_card_states")
 
 
 if __name__ == "__main__":
@@ -947,7 +1298,7 @@ def get_target_milestone_uri(profile_id: str, db_path: Path) -> tuple[Optional[s
     milestone_uri = None
     milestone_source = "none"
 
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite_connect(db_path)
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
@@ -341,32 +341,28 @@ def seed_fsrs_new_for_all_profiles(db_path: Path, quest_ids: list[str]) -> int:
         print("fsrs not installed; skip --seed-fsrs-new", file=sys.stderr)
         return 0
 
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
+    from scripts.daily_scheduler import (
+        _open_fsrs_db,
+        _upsert_card_state,
+        migrate_fsrs_states_from_blobs,
+    )
+
+    # Profiles still carrying legacy extracted_data['fsrs_states'] are moved first
+    migrate_fsrs_states_from_blobs(db_path)
+
+    conn = _open_fsrs_db(db_path)
     cur = conn.cursor()
-    cur.execute("SELECT id, extracted_data FROM profiles")
-    rows = cur.fetchall()
+    cur.execute("SELECT id FROM profiles")
+    profile_ids = [row["id"] for row in cur.fetchall()]
     touched = 0
     new_card = Card().to_dict()
-    for row in rows:
-        raw = row["extracted_data"]
-        data = json.loads(raw) if raw else {}
-        fsrs = data.setdefault("fsrs_states", {})
-        changed = False
+    now_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    for profile_id in profile_ids:
+        before = conn.total_changes
         for qid in quest_ids:
-            if qid not in fsrs:
-                fsrs[qid] = dict(new_card)
-                changed = True
-        if changed:
+            _upsert_card_state(cur, profile_id, qid, dict(new_card), now_str, overwrite=False)
+        if conn.total_changes != before:
             touched += 1
-            cur.execute(
-                "UPDATE profiles SET extracted_data = ?, updated_at = ? WHERE id = ?",
-                (
-                    json.dumps(data, ensure_ascii=False),
-                    datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
-                    row["id"],
-                ),
-            )
     conn.commit()
     conn.close()
     return touched
@@ -414,7 +410,7 @@ def main() -> None:
     if args.seed_fsrs_new:
         ids = list({r["quest_id"] for r in all_rows})
         n = seed_fsrs_new_for_all_profiles(db_path, ids)
-        print(f"✅ Seeded fsrs_states for HHS quest_ids on {n} profile(s)")
+        print(f"✅ Seeded fsrs_card_states for HHS quest_ids on {n} profile(s)")
 
 
 if __name__ == "__main__":
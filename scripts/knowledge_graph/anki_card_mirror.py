@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Local mirror of the Anki card states behind the mastery vector.
+
+`AnkiMasteryExtractor` used to pull every CUMA note and card from AnkiConnect
+(`findNotes`, then `notesInfo`/`cardsInfo` in chunks of 250) and JSON-parse
+every `_KG_Map` field on each mastery-vector build.  This module keeps those
+results in a small SQLite file keyed by card ID and only asks Anki for what
+changed:
+
+  notes    note_id -> mod time, raw `_KG_Map`, card ids
+  cards    card_id -> note, mod time, ord, interval/lapses/reps/factor, KG ids
+  meta     query/field the mirror was built for, last sync time
+
+Each (query, field) scope gets its own file next to the configured path
+(`anki_card_mirror-<digest>.sqlite`), so recommenders with different queries
+never overwrite each other's mirror.
+
+A refresh costs one `findNotes`, one `notesModTime` and one `cardsModTime`
+pass (ids and timestamps only); `notesInfo` and `cardsInfo` are only called
+for notes/cards whose mod time moved.  AnkiConnect versions without the
+*ModTime actions fall back to a full fetch.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from anki_integration.anki_connect import AnkiConnect, AnkiConnectError
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_MIRROR_PATH = PROJECT_ROOT / "data" / "content_db" / "anki_card_mirror.sqlite"
+
+# Parsed `_KG_Map` + 1-based card index -> normalised KG ids
+KgIdResolver = Callable[[Any, int], List[str]]
+
+_CHUNK_SIZE = 250
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notes (
+    note_id INTEGER PRIMARY KEY,
+    mod INTEGER NOT NULL,
+    kg_map TEXT,
+    card_ids TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    card_id INTEGER PRIMARY KEY,
+    note_id INTEGER NOT NULL,
+    mod INTEGER NOT NULL,
+    ord INTEGER NOT NULL,
+    interval INTEGER NOT NULL,
+    lapses INTEGER NOT NULL,
+    reps INTEGER NOT NULL,
+    factor INTEGER,
+    kg_ids TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cards_note ON cards (note_id);
+"""
+
+
+@dataclass(frozen=True)
+class MirroredCard:
+    """One card as stored in the mirror."""
+
+    card_id: int
+    note_id: int
+    mod: int
+    ord: int
+    interval: int
+    lapses: int
+    reps: int
+    factor: Optional[int]
+    kg_ids: Tuple[str, ...]
+
+
+@dataclass
+class MirrorRefresh:
+    """Outcome of one incremental refresh."""
+
+    cards: Dict[int, MirroredCard]
+    changed_kg_ids: Set[str]
+    fetched_cards: int
+    full: bool
+
+
+def _chunked(seq: Iterable[int], size: int = _CHUNK_SIZE) -> Iterable[List[int]]:
+    items = list(seq)
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _field_value(note: Dict[str, Any], field_name: str) -> Optional[str]:
+    kg_field = note.get("fields", {}).get(field_name)
+    if isinstance(kg_field, dict):
+        return kg_field.get("value")
+    if isinstance(kg_field, str):
+        return kg_field
+    return None
+
+
+class AnkiCardMirror:
+    """SQLite-backed mirror of CUMA card states, refreshed incrementally."""
+
+    def __init__(
+        self,
+        client: AnkiConnect,
+        anki_query: str,
+        kg_field_name: str,
+        resolve_kg_ids: KgIdResolver,
+        path: Optional[Path] = None,
+    ):
+        self.client = client
+        self.anki_query = anki_query
+        self.kg_field_name = kg_field_name
+        self.resolve_kg_ids = resolve_kg_ids
+        base = Path(path or DEFAULT_MIRROR_PATH)
+        digest = hashlib.sha1(self._scope().encode("utf-8")).hexdigest()[:12]
+        self.path = base.with_name(f"{base.stem}-{digest}{base.suffix}")
+        self._lock = threading.Lock()
+        self._loaded = False
+        # note_id -> (mod, raw _KG_Map, card ids)
+        self._notes: Dict[int, Tuple[int, Optional[str], Tuple[int, ...]]] = {}
+        self._cards: Dict[int, MirroredCard] = {}
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _scope(self) -> str:
+        return json.dumps([self.anki_query, self.kg_field_name])
+
+    def _load(self) -> None:
+        """Read this scope's mirror file into memory."""
+        self._notes, self._cards = {}, {}
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO meta (key, value) VALUES ('scope', ?)",
+                    (self._scope(),),
+                )
+            for note_id, mod, kg_map, card_ids in conn.execute(
+                "SELECT note_id, mod, kg_map, card_ids FROM notes"
+            ):
+                self._notes[note_id] = (mod, kg_map, tuple(json.loads(card_ids)))
+            for row in conn.execute(
+                "SELECT card_id, note_id, mod, ord, interval, lapses, reps, factor, kg_ids FROM cards"
+            ):
+                self._cards[row[0]] = MirroredCard(*row[:8], kg_ids=tuple(json.loads(row[8])))
+        finally:
+            conn.close()
+        self._loaded = True
+
+    def _save(
+        self,
+        notes: Dict[int, Tuple[int, Optional[str], Tuple[int, ...]]],
+        removed_notes: Set[int],
+        cards: Dict[int, MirroredCard],
+        removed_cards: Set[int],
+    ) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "DELETE FROM notes WHERE note_id = ?", ((n,) for n in removed_notes)
+                )
+                conn.executemany(
+                    "DELETE FROM cards WHERE card_id = ?", ((c,) for c in removed_cards)
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO notes (note_id, mod, kg_map, card_ids) VALUES (?, ?, ?, ?)",
+                    (
+                        (note_id, mod, kg_map, json.dumps(list(card_ids)))
+                        for note_id, (mod, kg_map, card_ids) in notes.items()
+                    ),
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO cards "
+                    "(card_id, note_id, mod, ord, interval, lapses, reps, factor, kg_ids) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        (
+                            c.card_id, c.note_id, c.mod, c.ord, c.interval,
+                            c.lapses, c.reps, c.factor, json.dumps(list(c.kg_ids)),
+                        )
+                        for c in cards.values()
+                    ),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_sync', ?)",
+                    (str(int(time.time())),),
+                )
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # AnkiConnect helpers
+    # ------------------------------------------------------------------
+
+    def _mod_times(self, action: str, ids: List[int], id_key: str) -> Optional[Dict[int, int]]:
+        """id -> mod via notesModTime/cardsModTime, or None if the action is unavailable."""
+        mods: Dict[int, int] = {}
+        try:
+            for chunk in _chunked(ids, 1000):
+                key = "notes" if action == "notesModTime" else "cards"
+                for entry in self.client._invoke(action, {key: chunk}) or []:
+                    mods[int(entry[id_key])] = int(entry.get("mod", 0))
+        except AnkiConnectError as exc:
+            print(f"⚠️  {action} unavailable ({exc}); falling back to a full fetch")
+            return None
+        return mods
+
+    def _fetch(self, action: str, ids: Iterable[int], key: str) -> List[Dict[str, Any]]:
+        data: List[Dict[str, Any]] = []
+        for chunk in _chunked(ids):
+            result = self.client._invoke(action, {key: chunk})
+            if result:
+                data.extend(item for item in result if item)
+        return data
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    def refresh(self) -> MirrorRefresh:
+        """Bring the mirror up to date with Anki and report which KG nodes changed."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            return self._refresh()
+
+    def _refresh(self) -> MirrorRefresh:
+        note_ids = [int(n) for n in self.client._invoke("findNotes", {"query": self.anki_query}) or []]
+        changed_kg_ids: Set[str] = set()
+
+        current_notes = set(note_ids)
+        removed_notes = set(self._notes) - current_notes
+
+        # 1. Notes: refetch new ones and those edited since the last sync
+        note_mods = self._mod_times("notesModTime", note_ids, "noteId") if note_ids else {}
+        full = note_mods is None
+        if full:
+            stale_notes = note_ids
+        else:
+            stale_notes = [
+                n for n in note_ids
+                if n not in self._notes or self._notes[n][0] != note_mods.get(n)
+            ]
+
+        updated_notes: Dict[int, Tuple[int, Optional[str], Tuple[int, ...]]] = {}
+        for note in self._fetch("notesInfo", stale_notes, "notes"):
+            note_id = int(note.get("noteId"))
+            updated_notes[note_id] = (
+                int(note.get("mod", 0)),
+                _field_value(note, self.kg_field_name),
+                tuple(int(c) for c in note.get("cards", [])),
+            )
+        notes = {n: self._notes[n] for n in note_ids if n in self._notes and n not in updated_notes}
+        notes.update(updated_notes)
+
+        # 2. Cards: refetch cards of refetched notes and any card whose mod moved
+        card_ids = [c for _, _, cards in notes.values() for c in cards]
+        known_cards = set(card_ids)
+        removed_cards = {c for c in self._cards if c not in known_cards}
+        card_mods = None if full else self._mod_times("cardsModTime", card_ids, "cardId")
+        if card_mods is None:
+            stale_cards = card_ids
+            full = True
+        else:
+            from_notes = {c for n in updated_notes for c in notes[n][2]}
+            stale_cards = [
+                c for c in card_ids
+                if c in from_notes or c not in self._cards or self._cards[c].mod != card_mods.get(c)
+            ]
+
+        parsed_maps: Dict[int, Any] = {}
+
+        def kg_map_for(note_id: int) -> Any:
+            if note_id not in parsed_maps:
+                raw = notes[note_id][1]
+                try:
+                    parsed_maps[note_id] = json.loads(raw) if raw else None
+                except json.JSONDecodeError:
+                    print(f"⚠️  Invalid JSON in {self.kg_field_name} field: {raw[:50]}...")
+                    parsed_maps[note_id] = None
+            return parsed_maps[note_id]
+
+        note_of_card = {c: n for n, (_, _, cards) in notes.items() for c in cards}
+        updated_cards: Dict[int, MirroredCard] = {}
+        for card in self._fetch("cardsInfo", stale_cards, "cards"):
+            card_id = int(card.get("cardId"))
+            note_id = note_of_card.get(card_id, int(card.get("note", 0)))
+            ord_ = int(card.get("ord", 0))
+            kg_map = kg_map_for(note_id) if note_id in notes else None
+            kg_ids = tuple(self.resolve_kg_ids(kg_map, ord_ + 1)) if kg_map else ()
+            updated_cards[card_id] = MirroredCard(
+                card_id=card_id,
+                note_id=note_id,
+                mod=int(card.get("mod", 0)),
+                ord=ord_,
+                interval=int(card.get("interval", 0)),
+                lapses=int(card.get("lapses", 0)),
+                reps=int(card.get("reps", 0)),
+                factor=int(card.get("factor")) if card.get("factor") else None,
+                kg_ids=kg_ids,
+            )
+
+        for card_id in removed_cards:
+            changed_kg_ids.update(self._cards[card_id].kg_ids)
+        for card_id, card in updated_cards.items():
+            previous = self._cards.get(card_id)
+            if previous != card:
+                changed_kg_ids.update(card.kg_ids)
+                if previous:
+                    changed_kg_ids.update(previous.kg_ids)
+
+        self._save(updated_notes, removed_notes, updated_cards, removed_cards)
+        self._notes = notes
+        # Keep Anki's note/card order so the mastery vector is built in a stable order
+        self._cards = {
+            c: updated_cards.get(c) or self._cards[c]
+            for c in card_ids
+            if c in updated_cards or c in self._cards
+        }
+
+        print(
+            f"🔄 Anki mirror: {len(note_ids)} notes, {len(card_ids)} cards "
+            f"({len(updated_cards)} fetched, {len(removed_cards)} removed"
+            f"{', full sync' if full else ''})"
+        )
+        return MirrorRefresh(
+            cards=dict(self._cards),
+            changed_kg_ids=changed_kg_ids,
+            fetched_cards=len(updated_cards),
+            full=full,
+        )
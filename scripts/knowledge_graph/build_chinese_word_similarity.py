@@ -25,6 +25,7 @@ from __future__ import annotations
 import argparse
 import json
 import math
+import sys
 import time
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
@@ -34,6 +35,15 @@ from rdflib import Graph, Namespace
 from rdflib.namespace import RDF, RDFS
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.knowledge_graph.similarity_engine import (
+    add_engine_arguments,
+    compute_topk,
+    neighbours_to_map,
+    normalize_rows,
+)
 KG_FILE = PROJECT_ROOT / "knowledge_graph" / "world_model_cwn.ttl"
 OUTPUT_FILE = PROJECT_ROOT / "data" / "content_db" / "chinese_word_similarity.json"
 
@@ -286,43 +296,18 @@ def build_similarity(
     labels: List[str],
     top_k: int,
     threshold: float,
+    method: str = "exact",
+    workers: Optional[int] = None,
+    block_size: Optional[int] = None,
 ) -> Dict[str, List[Dict[str, float]]]:
     """Compute top-k cosine similarity neighbours for each word."""
-    similarity_map: Dict[str, List[Dict[str, float]]] = {}
-    
     # Normalize vectors for cosine similarity
-    matrix = np.vstack(vectors).astype("float32")
-    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
-    norms[norms == 0] = 1.0  # Avoid division by zero
-    matrix = matrix / norms
-
-    print("🕸️  Computing pairwise similarities...")
-    for idx in range(matrix.shape[0]):
-        sims = matrix @ matrix[idx]
-        sims[idx] = -1.0  # Exclude self
-
-        # Get top-k neighbours
-        if top_k < len(sims):
-            top_indices = np.argpartition(sims, -top_k)[-top_k:]
-            top_indices = top_indices[np.argsort(sims[top_indices])[::-1]]
-        else:
-            top_indices = np.argsort(sims)[::-1]
-
-        neighbours = []
-        for neighbour_idx in top_indices:
-            sim = float(sims[neighbour_idx])
-            if sim < threshold:
-                continue
-            neighbours.append({
-                "neighbor_id": node_ids[neighbour_idx],
-                "neighbor_label": labels[neighbour_idx],
-                "similarity": round(sim, 4),
-            })
-
-        similarity_map[node_ids[idx]] = neighbours
+    matrix = normalize_rows(np.vstack(vectors))
 
-        if (idx + 1) % 500 == 0:
-            print(f"   Processed {idx + 1}/{matrix.shape[0]} words...")
+    indices, sims = compute_topk(
+        matrix, top_k, method=method, block_size=block_size, workers=workers
+    )
+    similarity_map = neighbours_to_map(node_ids, labels, indices, sims, threshold)
 
     print("✅ Similarity computation complete")
     return similarity_map
@@ -399,6 +384,7 @@ def main():
         default=OUTPUT_FILE,
         help="Output JSON path (default: data/content_db/chinese_word_similarity.json)"
     )
+    add_engine_arguments(parser)
 
     args = parser.parse_args()
 
@@ -432,6 +418,9 @@ def main():
         labels,
         top_k=args.top_k,
         threshold=args.threshold,
+        method=args.method,
+        workers=args.workers,
+        block_size=args.block_size,
     )
 
     # Save results
@@ -15,9 +15,10 @@ from __future__ import annotations
 import argparse
 import json
 import math
+import sys
 import time
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import spacy
@@ -25,6 +26,16 @@ from rdflib import Graph, Namespace
 from rdflib.namespace import RDF, RDFS
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.knowledge_graph.similarity_engine import (
+    add_engine_arguments,
+    compute_topk,
+    neighbours_to_map,
+    normalize_rows,
+)
+
 KG_FILE = PROJECT_ROOT / "knowledge_graph" / "world_model_english.ttl"
 OUTPUT_FILE = PROJECT_ROOT / "data" / "content_db" / "english_word_similarity.json"
 
@@ -77,6 +88,9 @@ def build_similarity(
     model: str,
     top_k: int,
     threshold: float,
+    method: str = "exact",
+    workers: Optional[int] = None,
+    block_size: Optional[int] = None,
 ) -> Dict[str, List[Dict[str, float]]]:
     """Compute top-k cosine similarity neighbours for each word."""
     print(f"🧠 Loading spaCy model '{model}'...")
@@ -136,39 +150,12 @@ def build_similarity(
         filtered_labels = [filtered_labels[i] for i in valid_indices]
         print(f"✅ Filtered to {len(filtered_node_ids)} words with unique vectors")
     
-    matrix = matrix_raw
-    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
-    matrix = matrix / (norms + 1e-8)
-
-    similarity_map: Dict[str, List[Dict[str, float]]] = {}
+    matrix = normalize_rows(matrix_raw, eps=1e-8)
 
-    print("🕸️  Computing pairwise similarities...")
-    for idx in range(matrix.shape[0]):
-        sims = matrix @ matrix[idx]
-        sims[idx] = -1.0  # Exclude self
-
-        # Get top-k neighbours
-        if top_k < len(sims):
-            top_indices = np.argpartition(sims, -top_k)[-top_k:]
-            top_indices = top_indices[np.argsort(sims[top_indices])[::-1]]
-        else:
-            top_indices = np.argsort(sims)[::-1]
-
-        neighbours = []
-        for neighbour_idx in top_indices:
-            sim = float(sims[neighbour_idx])
-            if sim < threshold:
-                continue
-            neighbours.append({
-                "neighbor_id": filtered_node_ids[neighbour_idx],
-                "neighbor_label": filtered_labels[neighbour_idx],
-                "similarity": round(sim, 4),
-            })
-
-        similarity_map[filtered_node_ids[idx]] = neighbours
-
-        if (idx + 1) % 500 == 0:
-            print(f"   Processed {idx + 1}/{matrix.shape[0]} words...")
+    indices, sims = compute_topk(
+        matrix, top_k, method=method, block_size=block_size, workers=workers
+    )
+    similarity_map = neighbours_to_map(filtered_node_ids, filtered_labels, indices, sims, threshold)
 
     print("✅ Similarity computation complete")
     return similarity_map
@@ -212,6 +199,7 @@ def main():
                         help="Optional cap on number of words to process")
     parser.add_argument("--output", type=Path, default=OUTPUT_FILE,
                         help="Output JSON path")
+    add_engine_arguments(parser)
 
     args = parser.parse_args()
 
@@ -221,6 +209,9 @@ def main():
         model=args.model,
         top_k=args.top_k,
         threshold=args.threshold,
+        method=args.method,
+        workers=args.workers,
+        block_size=args.block_size,
     )
     save_similarity(similarity_map, args.model, args.threshold,
                     args.top_k, args.output)
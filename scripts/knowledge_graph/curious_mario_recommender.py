@@ -26,8 +26,9 @@ import argparse
 import json
 import math
 import sys
+import threading
 from dataclasses import dataclass, field
-from typing import Dict, Iterable, List, Optional, Tuple, Union
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 from pathlib import Path
 
 import requests
@@ -39,6 +40,7 @@ if project_root not in sys.path:
 
 from backend.database.kg_client import KnowledgeGraphClient, KnowledgeGraphError
 from anki_integration.anki_connect import AnkiConnect
+from scripts.knowledge_graph.anki_card_mirror import DEFAULT_MIRROR_PATH, AnkiCardMirror
 
 
 # ---------------------------------------------------------------------------
@@ -116,6 +118,8 @@ class RecommenderConfig:
     mental_age: Optional[float] = None  # Mental age for AoA filtering (e.g., 7.0 for a 7-year-old)
     aoa_buffer: float = 2.0  # Allow words with AoA up to mental_age + buffer
     target_language: Optional[str] = None # For filtering grammar recommendations by language
+    # Local mirror of Anki card states (None = fetch everything from Anki on each build)
+    anki_mirror_path: Optional[str] = str(DEFAULT_MIRROR_PATH)
 
 
 # ---------------------------------------------------------------------------
@@ -179,6 +183,17 @@ class AnkiMasteryExtractor:
     def __init__(self, config: RecommenderConfig):
         self.config = config
         self.client = AnkiConnect()
+        self.mirror: Optional[AnkiCardMirror] = None
+        if config.anki_mirror_path:
+            self.mirror = AnkiCardMirror(
+                self.client,
+                anki_query=config.anki_query,
+                kg_field_name=config.kg_field_name,
+                resolve_kg_ids=self._normalized_kg_ids_for_card,
+                path=Path(config.anki_mirror_path),
+            )
+        # KG ids whose cards changed in the last fetch (None = unknown, recompute all)
+        self.last_changed_kg_ids: Optional[Set[str]] = None
 
     def fetch_kg_card_states(self) -> Dict[str, List[CardState]]:
         """Return mapping of kg_id -> list of card states."""
@@ -189,6 +204,10 @@ class AnkiMasteryExtractor:
                 "with the AnkiConnect add-on installed."
             )
 
+        if self.mirror is not None:
+            return self._fetch_from_mirror()
+
+        self.last_changed_kg_ids = None
         note_ids = self.client._invoke("findNotes", {"query": self.config.anki_query})
         if not note_ids:
             print("⚠️  No CUMA notes with _KG_Map field were found via Anki search.")
@@ -257,6 +276,34 @@ class AnkiMasteryExtractor:
 
         return kg_to_card_states
 
+    def _fetch_from_mirror(self) -> Dict[str, List[CardState]]:
+        """Refresh the local mirror incrementally and group its cards by KG id."""
+
+        refresh = self.mirror.refresh()
+        self.last_changed_kg_ids = None if refresh.full else refresh.changed_kg_ids
+        if not refresh.cards:
+            print("⚠️  No CUMA notes with _KG_Map field were found via Anki search.")
+            return {}
+
+        kg_to_card_states: Dict[str, List[CardState]] = {}
+        for card in refresh.cards.values():
+            if not card.kg_ids:
+                continue
+            card_state = CardState(
+                card_id=card.card_id,
+                interval=card.interval,
+                lapses=card.lapses,
+                reps=card.reps,
+                ease_factor=card.factor,
+            )
+            for kg_id in card.kg_ids:
+                kg_to_card_states.setdefault(kg_id, []).append(card_state)
+        return kg_to_card_states
+
+    @classmethod
+    def _normalized_kg_ids_for_card(cls, kg_map: object, card_index: int) -> List[str]:
+        return [_normalize_kg_id(kg_id) for kg_id in cls._kg_ids_for_card(kg_map, card_index)]
+
     @staticmethod
     def _kg_ids_for_card(kg_map: object, card_index: int) -> List[str]:
         """Return KG identifiers for a given card (supports legacy and new formats)."""
@@ -310,12 +357,34 @@ class MasteryVectorGenerator:
 
     def __init__(self, config: RecommenderConfig):
         self.config = config
+        self._last_vector: Optional[Dict[str, float]] = None
 
-    def generate(self, kg_to_card_states: Dict[str, List[CardState]]) -> Dict[str, float]:
-        vector: Dict[str, float] = {}
-        for kg_id, states in kg_to_card_states.items():
-            vector[kg_id] = self._calculate_score(states)
-        return vector
+    def generate(
+        self,
+        kg_to_card_states: Dict[str, List[CardState]],
+        changed_kg_ids: Optional[Set[str]] = None,
+    ) -> Dict[str, float]:
+        """
+        Score every KG node from its card states.
+
+        When *changed_kg_ids* is given and a previous vector exists, only
+        those nodes are rescored; the rest are carried over.
+        """
+        if changed_kg_ids is None or self._last_vector is None:
+            vector = {
+                kg_id: self._calculate_score(states)
+                for kg_id, states in kg_to_card_states.items()
+            }
+        else:
+            previous = self._last_vector
+            vector = {}
+            for kg_id, states in kg_to_card_states.items():
+                if kg_id in changed_kg_ids or kg_id not in previous:
+                    vector[kg_id] = self._calculate_score(states)
+                else:
+                    vector[kg_id] = previous[kg_id]
+        self._last_vector = vector
+        return dict(vector)
 
     def _calculate_score(self, states: List[CardState]) -> float:
         if not states:
@@ -340,6 +409,39 @@ class MasteryVectorGenerator:
         return max(0.0, min(1.0, score))
 
 
+# Per-profile extractor + generator (+ a lock serialising their builds) kept across
+# recommender instances: services are created per request, and the incremental path
+# in MasteryVectorGenerator only pays off if the next request sees the last vector
+_profile_mastery: Dict[Tuple, Tuple[AnkiMasteryExtractor, MasteryVectorGenerator, threading.Lock]] = {}
+_profile_mastery_lock = threading.Lock()
+
+
+def _profile_mastery_state(
+    profile_id: str, config: RecommenderConfig
+) -> Tuple[AnkiMasteryExtractor, MasteryVectorGenerator, threading.Lock]:
+    """Shared mastery state for a profile and the config fields that shape its vector."""
+
+    key = (
+        profile_id,
+        config.anki_query,
+        config.kg_field_name,
+        config.anki_mirror_path,
+        config.lapse_penalty,
+        config.max_interval_for_norm,
+        config.ease_factor_scale,
+    )
+    with _profile_mastery_lock:
+        state = _profile_mastery.get(key)
+        if state is None:
+            state = (
+                AnkiMasteryExtractor(config),
+                MasteryVectorGenerator(config),
+                threading.Lock(),
+            )
+            _profile_mastery[key] = state
+        return state
+
+
 # ---------------------------------------------------------------------------
 # Knowledge graph client
 # ---------------------------------------------------------------------------
@@ -474,15 +576,25 @@ class KnowledgeGraphService:
 class CuriousMarioRecommender:
     """Main façade class that orchestrates the pipeline."""
 
-    def __init__(self, config: Optional[RecommenderConfig] = None, kg_client=None):
+    def __init__(self, config: Optional[RecommenderConfig] = None, kg_client=None, profile_id: Optional[str] = None):
         self.config = config or RecommenderConfig()
-        self.anki_extractor = AnkiMasteryExtractor(self.config)
-        self.mastery_generator = MasteryVectorGenerator(self.config)
+        if profile_id is not None:
+            # Reuse the profile's mirror and last mastery vector from earlier requests
+            self.anki_extractor, self.mastery_generator, self._mastery_lock = _profile_mastery_state(
+                profile_id, self.config
+            )
+        else:
+            self.anki_extractor = AnkiMasteryExtractor(self.config)
+            self.mastery_generator = MasteryVectorGenerator(self.config)
+            self._mastery_lock = threading.Lock()
         self.kg_service = KnowledgeGraphService(self.config, kg_client=kg_client)
 
     def build_mastery_vector(self) -> Dict[str, float]:
-        kg_to_card_states = self.anki_extractor.fetch_kg_card_states()
-        return self.mastery_generator.generate(kg_to_card_states)
+        with self._mastery_lock:
+            kg_to_card_states = self.anki_extractor.fetch_kg_card_states()
+            return self.mastery_generator.generate(
+                kg_to_card_states, self.anki_extractor.last_changed_kg_ids
+            )
 
     def _detect_language(self, nodes: Dict[str, KnowledgeNode]) -> str:
         """Detect if we're working with Chinese or English words."""
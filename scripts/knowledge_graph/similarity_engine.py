@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared top-k cosine similarity engine for the word-similarity builders.
+
+`build_english_word_similarity.py` and `build_chinese_word_similarity.py` used
+to compute one full similarity vector per word (a matrix-vector product) and
+`argpartition` it, all on one core.  This module computes the same top-k
+neighbours in row blocks instead:
+
+  exact  each block is a (block x n) matrix-matrix product (BLAS), reduced to
+         its top-k per row; blocks are spread over a process pool.
+  hnsw   approximate nearest neighbours from a local HNSW index (`hnswlib`,
+         optional), for vocabularies where even blocked O(n^2) is too slow.
+
+Exact search is the default.  Approximate results are opt-in: pass
+method="hnsw", or method="auto" to use HNSW only above ANN_AUTO_THRESHOLD
+words (the switch is logged).
+
+Both return `(indices, sims)` arrays of shape (n, k), best neighbour first,
+with the word itself excluded.  `neighbours_to_map` turns them into the
+`similarities` JSON structure the recommenders read.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Vocabulary size above which the opt-in method="auto" switches to HNSW (if installed)
+ANN_AUTO_THRESHOLD = 100_000
+
+# Target size of one block's similarity matrix (float32 elements)
+_BLOCK_ELEMENTS = 16 * 1024 * 1024
+
+_worker_matrix: Optional[np.ndarray] = None
+
+
+def normalize_rows(matrix: np.ndarray, eps: float = 0.0) -> np.ndarray:
+    """L2-normalise rows as float32; zero rows stay zero."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    if eps:
+        return matrix / (norms + eps)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def default_block_size(n_rows: int) -> int:
+    """Rows per block so that one block of similarities stays around 64 MB."""
+    return int(max(16, min(1024, _BLOCK_ELEMENTS // max(n_rows, 1))))
+
+
+def _topk_block(matrix: np.ndarray, start: int, stop: int, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    sims = matrix[start:stop] @ matrix.T
+    rows = np.arange(stop - start)
+    sims[rows, rows + start] = -1.0  # Exclude self
+
+    k = min(top_k, sims.shape[1])
+    if k < sims.shape[1]:
+        top = np.argpartition(sims, -k, axis=1)[:, -k:]
+    else:
+        top = np.broadcast_to(np.arange(sims.shape[1]), sims.shape).copy()
+    top_sims = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_sims, axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_sims, order, axis=1)
+
+
+def _init_worker(matrix: np.ndarray) -> None:
+    global _worker_matrix
+    _worker_matrix = matrix
+    # The pool already uses every core; keep BLAS from oversubscribing them
+    try:
+        from threadpoolctl import threadpool_limits
+
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def _topk_block_worker(args: Tuple[int, int, int]) -> Tuple[int, np.ndarray, np.ndarray]:
+    start, stop, top_k = args
+    indices, sims = _topk_block(_worker_matrix, start, stop, top_k)
+    return start, indices, sims
+
+
+def topk_exact(
+    matrix: np.ndarray,
+    top_k: int,
+    block_size: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact top-k by cosine similarity for L2-normalised rows.
+
+    Args:
+        matrix: (n, d) normalised float32 matrix
+        top_k: Neighbours per row (capped at n)
+        block_size: Rows per matrix-matrix product (default: ~64 MB per block)
+        workers: Worker processes (default: all cores; 1 = in-process)
+    """
+    n = matrix.shape[0]
+    k = min(top_k, n)
+    block_size = block_size or default_block_size(n)
+    workers = workers or os.cpu_count() or 1
+    blocks = [(start, min(start + block_size, n), k) for start in range(0, n, block_size)]
+
+    indices = np.empty((n, k), dtype=np.int64)
+    sims = np.empty((n, k), dtype=np.float32)
+    done = 0
+
+    def collect(start: int, block_indices: np.ndarray, block_sims: np.ndarray) -> None:
+        nonlocal done
+        stop = start + block_indices.shape[0]
+        indices[start:stop] = block_indices
+        sims[start:stop] = block_sims
+        previous = done
+        done += stop - start
+        if done // 5000 != previous // 5000 or done == n:
+            print(f"   Processed {done}/{n} words...")
+
+    if workers <= 1 or len(blocks) == 1:
+        for start, stop, _ in blocks:
+            collect(start, *_topk_block(matrix, start, stop, k))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(matrix,)
+        ) as executor:
+            for start, block_indices, block_sims in executor.map(_topk_block_worker, blocks):
+                collect(start, block_indices, block_sims)
+    return indices, sims
+
+
+def topk_hnsw(
+    matrix: np.ndarray,
+    top_k: int,
+    m: int = 32,
+    ef_construction: int = 200,
+    ef_search: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Approximate top-k with an HNSW index (requires `pip install hnswlib`).
+
+    Rows must be L2-normalised; the index uses inner product, so the returned
+    similarities are cosine similarities like topk_exact.
+    """
+    try:
+        import hnswlib
+    except ImportError as exc:
+        raise ImportError(
+            "hnswlib is required for the HNSW mode. Install with: pip install hnswlib"
+        ) from exc
+
+    n, dim = matrix.shape
+    k = min(top_k, n - 1)
+    threads = workers or os.cpu_count() or 1
+
+    print(f"🧭 Building HNSW index (M={m}, ef_construction={ef_construction}) for {n} words...")
+    index = hnswlib.Index(space="ip", dim=dim)
+    index.init_index(max_elements=n, M=m, ef_construction=ef_construction)
+    index.add_items(matrix, np.arange(n), num_threads=threads)
+    index.set_ef(max(ef_search or 0, 2 * (k + 1), 50))
+
+    labels, distances = index.knn_query(matrix, k=k + 1, num_threads=threads)
+    sims = 1.0 - distances.astype(np.float32)
+
+    # Drop the word itself (normally the first hit, but not guaranteed for duplicates)
+    indices = np.empty((n, k), dtype=np.int64)
+    top_sims = np.empty((n, k), dtype=np.float32)
+    for row in range(n):
+        keep = labels[row] != row
+        indices[row] = labels[row][keep][:k]
+        top_sims[row] = sims[row][keep][:k]
+    print(f"   Processed {n}/{n} words...")
+    return indices, top_sims
+
+
+def compute_topk(
+    matrix: np.ndarray,
+    top_k: int,
+    method: str = "exact",
+    block_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    ann_threshold: int = ANN_AUTO_THRESHOLD,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k neighbours with the requested method ("exact", "hnsw" or "auto").
+
+    "exact" (the default) never approximates.  "auto" opts in to approximate
+    HNSW results for vocabularies larger than ann_threshold when hnswlib is
+    installed, and uses the exact blocked search otherwise.
+    """
+    n = matrix.shape[0]
+    if method == "auto":
+        method = "exact"
+        if n > ann_threshold:
+            try:
+                import hnswlib  # noqa: F401
+
+                method = "hnsw"
+                print(
+                    f"ℹ️  {n} words > {ann_threshold:,}: method=auto switches to approximate "
+                    f"HNSW search (use --method exact for exact neighbours)"
+                )
+            except ImportError:
+                print(f"ℹ️  {n} words but hnswlib is not installed; using exact search")
+
+    if method == "hnsw":
+        return topk_hnsw(matrix, top_k, workers=workers)
+    if method != "exact":
+        raise ValueError(f"Unknown similarity method: {method}")
+    print(f"🕸️  Computing pairwise similarities ({n} words, {workers or os.cpu_count() or 1} workers)...")
+    return topk_exact(matrix, top_k, block_size=block_size, workers=workers)
+
+
+def neighbours_to_map(
+    node_ids: Sequence[str],
+    labels: Sequence[str],
+    indices: np.ndarray,
+    sims: np.ndarray,
+    threshold: float,
+) -> Dict[str, List[Dict[str, float]]]:
+    """Build the {node_id: [{neighbor_id, neighbor_label, similarity}]} map, dropping edges below threshold."""
+    similarity_map: Dict[str, List[Dict[str, float]]] = {}
+    for row, node_id in enumerate(node_ids):
+        neighbours = []
+        for neighbour_idx, sim in zip(indices[row], sims[row]):
+            sim = float(sim)
+            if sim < threshold:
+                continue
+            neighbours.append({
+                "neighbor_id": node_ids[neighbour_idx],
+                "neighbor_label": labels[neighbour_idx],
+                "similarity": round(sim, 4),
+            })
+        similarity_map[node_id] = neighbours
+    return similarity_map
+
+
+def add_engine_arguments(parser) -> None:
+    """Register the --method/--workers/--block-size options shared by the builders."""
+    parser.add_argument(
+        "--method",
+        choices=["auto", "exact", "hnsw"],
+        default="exact",
+        help=f"Neighbour search: exact blocked search, approximate HNSW (needs hnswlib), "
+             f"or auto (approximate HNSW above {ANN_AUTO_THRESHOLD:,} words). Default: exact"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for the similarity search (default: all cores)"
+    )
+    parser.add_argument(
+        "--block-size",
+        type=int,
+        default=None,
+        help="Rows per similarity block (default: sized to ~64 MB per block)"
+    )
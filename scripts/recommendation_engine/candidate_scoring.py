@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vectorized candidate scoring for the PPR recommenders.
+
+The English CLI (`ppr_recommender.main`) and both PPR services used to walk
+every graph node in Python, calling small transform closures per node.  This
+module precomputes the per-node features once (aligned with `PPRGraph` rows)
+and applies exclusions, the AoA penalty and the logit model to a whole PPR
+score vector in one NumPy pass, returning only the top-N rows.
+
+Scoring model (unchanged from the loops it replaces):
+
+  z = b0 + b_ppr * ppr' + b_conc * conc' + b_freq * freq' - b_aoa * max(0, AoA - MentalAge)
+  P(Recommend) = sigmoid(z)
+
+where ppr' is log10(PPR) (optionally z-scored against the current score
+vector), and conc'/freq' are z-scored against the full metadata set.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# graph node id -> (output node id, metadata object), or None when the node has no metadata
+Resolver = Callable[[str], Optional[Tuple[str, Any]]]
+
+
+def feature_stats(
+    values: Sequence[float], default_mean: float, default_std: float
+) -> Tuple[float, float]:
+    """Population mean/std with the fallbacks the recommenders have always used."""
+    mean = sum(values) / len(values) if values else default_mean
+    std = (
+        math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+        if len(values) > 1
+        else default_std
+    )
+    return mean, std
+
+
+def _zscore(raw: np.ndarray, mean: float, std: float) -> np.ndarray:
+    """(raw - mean) / std, with NaN (unknown) and a zero std both mapping to 0.0."""
+    if std <= 0:
+        return np.zeros_like(raw)
+    return np.nan_to_num((raw - mean) / std, nan=0.0)
+
+
+class CandidateFeatures:
+    """
+    Per-node feature columns for one graph + metadata pair.
+
+    Rows follow ``node_ids`` (the PPRGraph order).  Unknown values are NaN;
+    ``concreteness`` and ``frequency`` are already z-scored so they only need
+    to be multiplied by their betas at request time.
+    """
+
+    def __init__(
+        self,
+        node_ids: Sequence[str],
+        resolve: Resolver,
+        labels: Mapping[str, str],
+        frequency_feature: Callable[[Any], Optional[float]],
+        level: Callable[[Any], Optional[float]],
+        conc_stats: Tuple[float, float],
+        freq_stats: Tuple[float, float],
+    ):
+        n = len(node_ids)
+        self.node_ids = list(node_ids)
+        self.output_ids: List[Optional[str]] = [None] * n
+        self.meta: List[Any] = [None] * n
+        self.labels: List[str] = [""] * n
+        self.has_meta = np.zeros(n, dtype=bool)
+        self.multiword = np.zeros(n, dtype=bool)
+        concreteness = np.full(n, np.nan)
+        frequency = np.full(n, np.nan)
+        self.aoa = np.full(n, np.nan)
+        self.level = np.full(n, np.nan)
+
+        self.row_of_node: Dict[str, int] = {}
+        self.rows_by_output_id: Dict[str, List[int]] = {}
+        for row, node_id in enumerate(self.node_ids):
+            self.row_of_node[node_id] = row
+            resolved = resolve(node_id)
+            if resolved is None:
+                continue
+            output_id, meta = resolved
+            label = meta.label or labels.get(output_id, output_id)
+            self.output_ids[row] = output_id
+            self.meta[row] = meta
+            self.labels[row] = label
+            self.has_meta[row] = True
+            self.multiword[row] = " " in label or "-" in label
+            self.rows_by_output_id.setdefault(output_id, []).append(row)
+
+            if meta.concreteness is not None:
+                concreteness[row] = meta.concreteness
+            freq_value = frequency_feature(meta)
+            if freq_value is not None:
+                frequency[row] = freq_value
+            if meta.age_of_acquisition is not None:
+                self.aoa[row] = meta.age_of_acquisition
+            level_value = level(meta)
+            if level_value is not None:
+                self.level[row] = level_value
+
+        self.concreteness = _zscore(concreteness, *conc_stats)
+        self.frequency = _zscore(frequency, *freq_stats)
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def rows_for_node_ids(self, node_ids: Iterable[str]) -> List[int]:
+        return [self.row_of_node[n] for n in node_ids if n in self.row_of_node]
+
+    def rows_for_output_ids(self, output_ids: Iterable[str]) -> List[int]:
+        rows: List[int] = []
+        for output_id in output_ids:
+            rows.extend(self.rows_by_output_id.get(output_id, ()))
+        return rows
+
+
+@dataclass
+class ScoringParams:
+    beta_intercept: float = 0.0
+    beta_ppr: float = 1.0
+    beta_concreteness: float = 0.8
+    beta_frequency: float = 0.3
+    beta_aoa_penalty: float = 2.0
+    mental_age: Optional[float] = None
+    aoa_buffer: float = 0.0
+    max_level: Optional[float] = None
+    exclude_missing_level: bool = False
+    exclude_multiword: bool = False
+    zscore_ppr: bool = True
+    top_n: int = 50
+
+
+@dataclass
+class ScoredCandidates:
+    """Top-N rows (best first) plus full-length feature columns for building results."""
+
+    rows: np.ndarray
+    score: np.ndarray
+    log_ppr: np.ndarray
+    aoa_penalty: np.ndarray
+    kept: np.ndarray
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+def score_candidates(
+    features: CandidateFeatures,
+    ppr: np.ndarray,
+    skip_rows: Iterable[int],
+    params: ScoringParams,
+) -> ScoredCandidates:
+    """
+    Score every node at once and return the top ``params.top_n`` kept rows.
+
+    Args:
+        features: Precomputed feature columns
+        ppr: Raw PPR scores aligned with ``features`` rows
+        skip_rows: Rows never recommended (seeds, explicit exclusions)
+        params: Model coefficients and filters
+    """
+    eligible = features.has_meta.copy()
+    skip = np.fromiter(skip_rows, dtype=np.int64)
+    if skip.size:
+        eligible[skip] = False
+    if params.exclude_multiword:
+        eligible &= ~features.multiword
+
+    counts: Dict[str, int] = {}
+    if params.max_level is not None:
+        with np.errstate(invalid="ignore"):
+            too_high = features.level > params.max_level
+        if params.exclude_missing_level:
+            too_high |= np.isnan(features.level)
+        counts["filtered_by_level"] = int(np.count_nonzero(eligible & too_high))
+        eligible &= ~too_high
+
+    has_aoa = ~np.isnan(features.aoa)
+    counts["with_aoa"] = int(np.count_nonzero(eligible & has_aoa))
+    if params.mental_age is not None:
+        with np.errstate(invalid="ignore"):
+            too_old = has_aoa & (features.aoa > params.mental_age + params.aoa_buffer)
+            aoa_penalty = np.where(has_aoa, np.maximum(0.0, features.aoa - params.mental_age), 0.0)
+        counts["filtered_by_aoa"] = int(np.count_nonzero(eligible & too_old))
+        eligible &= ~too_old
+    else:
+        aoa_penalty = np.zeros(len(features))
+        counts["filtered_by_aoa"] = 0
+
+    log_ppr = np.log10(ppr + 1e-10)
+    if params.zscore_ppr:
+        positive = ppr[ppr > 0]
+        ppr_mean = math.log10(positive.mean()) if positive.size else 0.0
+        ppr_std = (
+            math.sqrt(float(np.mean((np.log10(positive) - ppr_mean) ** 2)))
+            if positive.size > 1
+            else 1.0
+        )
+        log_ppr = (log_ppr - ppr_mean) / ppr_std if ppr_std > 0 else np.zeros_like(log_ppr)
+
+    z = (
+        params.beta_intercept
+        + params.beta_ppr * log_ppr
+        + params.beta_concreteness * features.concreteness
+        + params.beta_frequency * features.frequency
+        - params.beta_aoa_penalty * aoa_penalty
+    )
+    with np.errstate(over="ignore"):
+        score = 1.0 / (1.0 + np.exp(-z))
+
+    candidates = np.flatnonzero(eligible)
+    k = min(params.top_n, candidates.size)
+    if k == 0:
+        top = candidates[:0]
+    elif k < candidates.size:
+        top = candidates[np.argpartition(-score[candidates], k - 1)[:k]]
+    else:
+        top = candidates
+    # Best score first; ties keep graph order like the old stable sort
+    top = top[np.lexsort((top, -score[top]))]
+
+    return ScoredCandidates(
+        rows=top,
+        score=score,
+        log_ppr=log_ppr,
+        aoa_penalty=aoa_penalty,
+        kept=eligible,
+        counts=counts,
+    )
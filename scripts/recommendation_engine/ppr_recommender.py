@@ -35,9 +35,14 @@ import sys
 from collections import defaultdict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Mapping, MutableMapping, Tuple
+from typing import Dict, Iterable, List, Mapping, MutableMapping, Sequence, Tuple, Union
 
 import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+
+from candidate_scoring import CandidateFeatures, ScoringParams, feature_stats, score_candidates
+from word_metadata_index import read_metadata_index
 
 try:
     import inflect
@@ -356,6 +361,35 @@ def build_label_index(metadata: Mapping[str, WordMetadata]) -> Dict[str, str]:
     return index
 
 
+def load_word_metadata_and_label_index(
+    kg_file: Path,
+) -> Tuple[Dict[str, WordMetadata], Dict[str, str]]:
+    """
+    Return (metadata, label index) for English words.
+
+    Served from the precompiled word_metadata_index when it matches ``kg_file``;
+    otherwise parses the TTL and builds the label index as before.
+    """
+    indexed = read_metadata_index("en", kg_file)
+    if indexed is not None:
+        rows, label_index = indexed
+        metadata = {
+            row["node_id"]: WordMetadata(
+                node_id=row["node_id"],
+                label=row["label"],
+                cefr=row["cefr"],
+                concreteness=row["concreteness"],
+                frequency_rank=row["frequency_rank"],
+                age_of_acquisition=row["age_of_acquisition"],
+            )
+            for row in rows
+        }
+        return metadata, label_index
+
+    metadata = load_word_metadata(kg_file)
+    return metadata, build_label_index(metadata)
+
+
 def _map_word_to_node_id(
     phrase: str, label_index: Mapping[str, str]
 ) -> str | None:
@@ -700,14 +734,165 @@ def build_personalization_vector(
     return personalization
 
 
+class PPRGraph:
+    """
+    Immutable CSR view of the similarity graph for repeated PPR runs.
+
+    Holds the symmetric weighted adjacency matrix, the inverse weighted
+    out-degree (so one PPR step is a single sparse mat-vec / mat-mat product),
+    the dangling-node mask and the node id <-> row index mapping.  The
+    adjacency arrays may be read-only memory maps (see similarity_snapshot.py);
+    nothing here writes to them.  Exposes the small subset of the networkx
+    Graph API the services rely on (``in``, ``nodes()``, ``degree()``,
+    ``number_of_nodes()``, ``number_of_edges()``) so it can replace the
+    dict-of-dicts graph once loading is done.
+    """
+
+    def __init__(self, node_ids: List[str], adjacency: sp.csr_matrix):
+        self.node_ids = node_ids
+        self.index: Dict[str, int] = {node_id: i for i, node_id in enumerate(node_ids)}
+        self.adjacency = adjacency
+        self._degree = np.diff(adjacency.indptr)
+        self._edge_count = int(adjacency.nnz // 2)
+
+        out_weight = np.asarray(adjacency.sum(axis=1), dtype=np.float64).ravel()
+        self.dangling = out_weight == 0
+        self.inv_out = np.zeros_like(out_weight)
+        self.inv_out[~self.dangling] = 1.0 / out_weight[~self.dangling]
+
+    def propagate(self, x: np.ndarray) -> np.ndarray:
+        """
+        One random-walk step: x_next[j] = sum_i x[i] * A[i, j] / out(i).
+
+        The adjacency is symmetric, so A^T D^-1 x == A (D^-1 x) and no
+        transposed copy is needed.
+        """
+        return self.adjacency @ (x * self.inv_out[:, None])
+
+    def __contains__(self, node_id: object) -> bool:
+        return node_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def nodes(self) -> List[str]:
+        return self.node_ids
+
+    def number_of_nodes(self) -> int:
+        return len(self.node_ids)
+
+    def number_of_edges(self) -> int:
+        return self._edge_count
+
+    def degree(self, node_id: str) -> int:
+        return int(self._degree[self.index[node_id]])
+
+
+def build_ppr_graph(graph: nx.Graph) -> PPRGraph:
+    """
+    Convert the undirected similarity graph into a PPRGraph (CSR adjacency).
+    """
+    node_ids = list(graph.nodes())
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+
+    rows: List[int] = []
+    cols: List[int] = []
+    data: List[float] = []
+    for source, target, weight in graph.edges(data="weight", default=1.0):
+        i, j = index[source], index[target]
+        rows.extend((i, j))
+        cols.extend((j, i))
+        data.extend((weight, weight))
+
+    n = len(node_ids)
+    adjacency = sp.csr_matrix(
+        (np.asarray(data, dtype=np.float64), (rows, cols)), shape=(n, n)
+    )
+    return PPRGraph(node_ids, adjacency)
+
+
+def personalization_matrix(
+    ppr_graph: PPRGraph, personalizations: Sequence[Mapping[str, float]]
+) -> np.ndarray:
+    """
+    Stack restart distributions into a dense (n_nodes, n_vectors) matrix.
+
+    Nodes missing from the graph are ignored; each column is renormalised to sum to 1.
+    """
+    matrix = np.zeros((len(ppr_graph), len(personalizations)), dtype=np.float64)
+    for col, personalization in enumerate(personalizations):
+        for node_id, weight in personalization.items():
+            row = ppr_graph.index.get(node_id)
+            if row is not None:
+                matrix[row, col] += weight
+    totals = matrix.sum(axis=0)
+    if np.any(totals <= 0):
+        raise ValueError("Personalization vector has no weight on nodes in the graph.")
+    return matrix / totals
+
+
+def run_ppr_batch(
+    ppr_graph: PPRGraph,
+    personalizations: Union[np.ndarray, Sequence[Mapping[str, float]]],
+    alpha: float,
+    max_iter: int = 100,
+    tol: float = 1.0e-6,
+) -> np.ndarray:
+    """
+    Power-iteration Personalized PageRank for many restart vectors at once.
+
+    Mirrors ``nx.pagerank`` semantics (damping ``alpha``, dangling mass
+    redistributed along the personalization vector, L1 stopping rule of
+    ``n * tol`` per column) but runs as one sparse x dense product per step.
+
+    Returns:
+        Dense (n_nodes, n_vectors) array; column k holds the scores for
+        personalization k, rows follow ``ppr_graph.node_ids``.
+    """
+    if isinstance(personalizations, np.ndarray):
+        restart = personalizations
+    else:
+        restart = personalization_matrix(ppr_graph, personalizations)
+
+    n = len(ppr_graph)
+    if n == 0:
+        return np.zeros_like(restart)
+
+    x = np.full(restart.shape, 1.0 / n, dtype=np.float64)
+    dangling = ppr_graph.dangling
+    for _ in range(max_iter):
+        x_last = x
+        dangling_mass = x[dangling].sum(axis=0)
+        x = alpha * (ppr_graph.propagate(x) + restart * dangling_mass) + (1.0 - alpha) * restart
+        if np.all(np.abs(x - x_last).sum(axis=0) < n * tol):
+            return x
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+def run_ppr_vector(
+    ppr_graph: PPRGraph,
+    personalization: Mapping[str, float],
+    alpha: float,
+) -> np.ndarray:
+    """
+    Single-vector PPR returning scores as an array aligned with ``ppr_graph.node_ids``.
+    """
+    return run_ppr_batch(ppr_graph, [personalization], alpha=alpha)[:, 0]
+
+
 def run_ppr(
-    graph: nx.Graph,
+    graph: Union[nx.Graph, PPRGraph],
     personalization: Mapping[str, float],
     alpha: float,
 ) -> Dict[str, float]:
     """
     Execute Personalized PageRank with the given restart distribution.
+
+    A PPRGraph runs the CSR power iteration; a plain networkx graph falls back
+    to ``nx.pagerank``.
     """
+    if isinstance(graph, PPRGraph):
+        return dict(zip(graph.node_ids, run_ppr_vector(graph, personalization, alpha).tolist()))
     scores = nx.pagerank(graph, alpha=alpha, personalization=personalization, weight="weight")
     return scores
 
@@ -843,8 +1028,7 @@ def main() -> None:
 
     args = parser.parse_args()
 
-    word_metadata = load_word_metadata(args.kg_file)
-    label_index_full = build_label_index(word_metadata)
+    word_metadata, label_index_full = load_word_metadata_and_label_index(args.kg_file)
 
     if (
         not args.mastered
@@ -910,7 +1094,10 @@ def main() -> None:
 
     print(f"🌱 Using {len(seed_weights)} total seed nodes for PPR.")
 
-    graph, labels = load_similarity_graph(args.similarity_file, args.min_similarity)
+    # Imported here: similarity_snapshot itself imports this module
+    from similarity_snapshot import load_ppr_graph
+
+    graph, labels = load_ppr_graph(args.similarity_file, args.min_similarity)
 
     if graph.number_of_nodes() == 0:
         parser.error(
@@ -922,61 +1109,27 @@ def main() -> None:
     except ValueError as exc:
         parser.error(str(exc))
 
-    scores = run_ppr(graph, personalization, alpha=args.alpha)
+    scores = run_ppr_vector(graph, personalization, alpha=args.alpha)
 
-    # Calculate statistics for transformations
-    all_ppr_scores = [s for s in scores.values() if s > 0]
-    all_concreteness = [
-        meta.concreteness
-        for meta in word_metadata.values()
-        if meta.concreteness is not None
-    ]
-    conc_mean = sum(all_concreteness) / len(all_concreteness) if all_concreteness else 3.0
-    conc_std = (
-        math.sqrt(
-            sum((c - conc_mean) ** 2 for c in all_concreteness) / len(all_concreteness)
-        )
-        if len(all_concreteness) > 1
-        else 1.5
+    # Feature columns: log(PPR) is used raw, concreteness is z-scored,
+    # frequency is -log10(rank + 1) (lower rank = higher score), AoA penalty
+    # is one-sided (only when AoA > MentalAge).
+    conc_stats = feature_stats(
+        [meta.concreteness for meta in word_metadata.values() if meta.concreteness is not None],
+        default_mean=3.0,
+        default_std=1.5,
+    )
+    features = CandidateFeatures(
+        graph.node_ids,
+        lambda node_id: (node_id, word_metadata[node_id]) if node_id in word_metadata else None,
+        labels,
+        frequency_feature=lambda meta: -math.log10(meta.frequency_rank + 1)
+        if meta.frequency_rank and meta.frequency_rank > 0
+        else None,
+        level=lambda meta: None,
+        conc_stats=conc_stats,
+        freq_stats=(0.0, 1.0),
     )
-
-    def transform_ppr(raw_ppr: float) -> float:
-        """
-        Log-transform PPR score to handle power law distribution.
-        PPR scores decay exponentially; log captures relative magnitude.
-        """
-        # Avoid log(0) by adding small epsilon
-        return math.log10(raw_ppr + 1e-10)
-
-    def transform_concreteness(value: float | None) -> float:
-        """
-        Z-score standardization of concreteness.
-        Centers around mean: >mean adds to score, <mean subtracts.
-        """
-        if value is None:
-            return 0.0  # Neutral if unknown
-        return (value - conc_mean) / conc_std
-
-    def transform_frequency(rank: int | None) -> float:
-        """
-        Log-transform frequency rank (negated so lower rank = higher score).
-        Higher frequency (lower rank) = higher score.
-        """
-        if not rank or rank <= 0:
-            return 0.0  # Neutral if unknown
-        # Negate log so lower rank (higher frequency) gives positive score
-        # Use log10, with +1 to handle rank=1
-        return -math.log10(rank + 1)
-
-    def calculate_aoa_penalty(aoa: float | None, mental_age: float | None) -> float:
-        """
-        One-sided penalty: only penalize if AoA > MentalAge.
-        Uses ReLU-style penalty (no penalty if AoA <= MentalAge).
-        """
-        if aoa is None or mental_age is None:
-            return 0.0
-        excess = max(0.0, aoa - mental_age)
-        return excess
 
     # Map excluded words to node IDs
     excluded_node_ids: set[str] = set()
@@ -998,60 +1151,35 @@ def main() -> None:
     if args.exclude_multiword:
         print("🚫 Filtering out all multi-word phrases (words with spaces or hyphens).")
 
-    candidates: List[Tuple[str, float, float, float, float, str]] = []
-    for node_id, raw_score in scores.items():
-        if node_id in seed_weights:
-            continue
-        if node_id in excluded_node_ids:
-            continue
-        meta = word_metadata.get(node_id)
-        if not meta:
-            continue
-        # Filter out multi-word phrases if requested
-        if args.exclude_multiword:
-            label = meta.label or labels.get(node_id, node_id)
-            if " " in label or "-" in label:
-                continue
-        if (
-            args.mental_age is not None
-            and meta.age_of_acquisition is not None
-            and meta.age_of_acquisition > args.mental_age + args.aoa_buffer
-        ):
-            continue
-
-        # Transform features using probability-based approach
-        ppr_transformed = transform_ppr(raw_score)
-        conc_transformed = transform_concreteness(meta.concreteness)
-        freq_transformed = transform_frequency(meta.frequency_rank)
-        aoa_penalty = calculate_aoa_penalty(meta.age_of_acquisition, args.mental_age)
-
-        # Calculate logit z-score
-        z = (
-            args.beta_intercept
-            + args.beta_ppr * ppr_transformed
-            + args.beta_concreteness * conc_transformed
-            + args.beta_frequency * freq_transformed
-            - args.beta_aoa_penalty * aoa_penalty
-        )
-
-        # Convert logit to probability using sigmoid
-        final_score = 1.0 / (1.0 + math.exp(-z))
-
-        label = meta.label or labels.get(node_id, node_id)
-        candidates.append(
-            (
-                node_id,
-                final_score,
-                ppr_transformed,
-                conc_transformed,
-                freq_transformed,
-                aoa_penalty,
-                label,
-            )
+    result = score_candidates(
+        features,
+        scores,
+        features.rows_for_node_ids(set(seed_weights) | excluded_node_ids),
+        ScoringParams(
+            beta_intercept=args.beta_intercept,
+            beta_ppr=args.beta_ppr,
+            beta_concreteness=args.beta_concreteness,
+            beta_frequency=args.beta_frequency,
+            beta_aoa_penalty=args.beta_aoa_penalty,
+            mental_age=args.mental_age,
+            aoa_buffer=args.aoa_buffer,
+            exclude_multiword=args.exclude_multiword,
+            zscore_ppr=False,
+            top_n=args.top_n,
+        ),
+    )
+    recommendations = [
+        (
+            features.node_ids[row],
+            float(result.score[row]),
+            float(result.log_ppr[row]),
+            float(features.concreteness[row]),
+            float(features.frequency[row]),
+            float(result.aoa_penalty[row]),
+            features.labels[row],
         )
-
-    candidates.sort(key=lambda item: item[1], reverse=True)
-    recommendations = candidates[: args.top_n]
+        for row in result.rows.tolist()
+    ]
 
     print("\n=== Personalized PageRank Recommendations ===")
     print(f"Total nodes in graph: {graph.number_of_nodes():,}")
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compile a word-similarity JSON file into a memory-mappable CSR snapshot.
+
+`load_similarity_graph` parses the full similarity JSON and builds a networkx
+graph on every process start.  This module does that once, offline, and writes
+the result (spelling variants already merged) as a single binary file that the
+PPR services map read-only.  Worker processes mapping the same file share one
+page-cached copy of the adjacency arrays.
+
+File layout (little-endian, every section 64-byte aligned):
+
+  magic      8 bytes   b"SRSSIM01"
+  hdr_len    uint64    length of the JSON header
+  header     JSON      n_nodes, nnz, min_similarity, source signature and
+                       {offset, length, dtype} per section (offsets relative
+                       to the first aligned byte after the header)
+  node_ids   utf-8     "\\n"-joined node id string table
+  labels     utf-8     "\\n"-joined labels, same order ("" when unknown)
+  indptr     int32/64  CSR row offsets (n_nodes + 1)
+  indices    int32/64  CSR column indices (nnz)
+  weights    float32   CSR edge weights (nnz)
+
+Usage:
+
+  # Rebuild snapshots next to the default English and Chinese similarity files
+  python similarity_snapshot.py
+
+  # Compile a specific file
+  python similarity_snapshot.py data/content_db/english_word_similarity.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from ppr_recommender import (
+    PROJECT_ROOT,
+    PPRGraph,
+    build_ppr_graph,
+    load_similarity_graph,
+)
+
+SNAPSHOT_MAGIC = b"SRSSIM01"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".csr"
+_ALIGN = 64
+
+DEFAULT_SIMILARITY_FILES = (
+    PROJECT_ROOT / "data" / "content_db" / "english_word_similarity.json",
+    PROJECT_ROOT / "data" / "content_db" / "chinese_word_similarity.json",
+)
+
+
+def snapshot_path_for(similarity_file: Path) -> Path:
+    """Snapshot location for a similarity JSON (same directory, .csr suffix)."""
+    return Path(similarity_file).with_suffix(SNAPSHOT_SUFFIX)
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _source_signature(similarity_file: Path) -> Optional[Dict[str, int]]:
+    try:
+        stat = Path(similarity_file).stat()
+    except OSError:
+        return None
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def write_similarity_snapshot(
+    ppr_graph: PPRGraph,
+    labels: Dict[str, str],
+    output: Path,
+    min_similarity: float = 0.0,
+    source_file: Optional[Path] = None,
+) -> Path:
+    """
+    Serialize a PPRGraph (plus labels) to the snapshot format.
+
+    The file is written to a temporary path and swapped in with os.replace, so
+    processes that already mapped the previous snapshot keep a valid view.
+    """
+    adjacency = ppr_graph.adjacency
+    index_dtype = np.int32 if adjacency.nnz < np.iinfo(np.int32).max else np.int64
+    node_ids = ppr_graph.node_ids
+
+    sections: List[Tuple[str, bytes, Optional[str]]] = [
+        ("node_ids", "\n".join(node_ids).encode("utf-8"), None),
+        (
+            "labels",
+            "\n".join(labels.get(node_id, "").replace("\n", " ") for node_id in node_ids).encode("utf-8"),
+            None,
+        ),
+        ("indptr", np.ascontiguousarray(adjacency.indptr, dtype=index_dtype).tobytes(), np.dtype(index_dtype).str),
+        ("indices", np.ascontiguousarray(adjacency.indices, dtype=index_dtype).tobytes(), np.dtype(index_dtype).str),
+        ("weights", np.ascontiguousarray(adjacency.data, dtype=np.float32).tobytes(), np.dtype(np.float32).str),
+    ]
+
+    layout: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for name, payload, dtype in sections:
+        layout[name] = {"offset": offset, "length": len(payload), "dtype": dtype}
+        offset = _aligned(offset + len(payload))
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "n_nodes": len(node_ids),
+        "nnz": int(adjacency.nnz),
+        "min_similarity": float(min_similarity),
+        "source": {
+            "path": str(source_file) if source_file else None,
+            "signature": _source_signature(source_file) if source_file else None,
+        },
+        "sections": layout,
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    data_start = _aligned(len(SNAPSHOT_MAGIC) + 8 + len(header_bytes))
+
+    output = Path(output)
+    tmp_path = output.with_name(output.name + ".tmp")
+    with tmp_path.open("wb") as fh:
+        fh.write(SNAPSHOT_MAGIC)
+        fh.write(struct.pack("<Q", len(header_bytes)))
+        fh.write(header_bytes)
+        for name, payload, _ in sections:
+            fh.seek(data_start + layout[name]["offset"])
+            fh.write(payload)
+        fh.truncate(data_start + offset)
+    os.replace(tmp_path, output)
+    return output
+
+
+def read_snapshot_header(snapshot_file: Path) -> Tuple[Dict[str, Any], int]:
+    """Return (header, data_start) without mapping the arrays."""
+    with Path(snapshot_file).open("rb") as fh:
+        magic = fh.read(len(SNAPSHOT_MAGIC))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"Not a similarity snapshot: {snapshot_file}")
+        (header_len,) = struct.unpack("<Q", fh.read(8))
+        header = json.loads(fh.read(header_len).decode("utf-8"))
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"Unsupported snapshot version {header.get('version')} in {snapshot_file}"
+        )
+    return header, _aligned(len(SNAPSHOT_MAGIC) + 8 + header_len)
+
+
+def load_similarity_snapshot(snapshot_file: Path) -> Tuple[PPRGraph, Dict[str, str]]:
+    """
+    Map a snapshot read-only and return (PPRGraph, labels).
+
+    The CSR arrays stay backed by the file mapping; only the string table is
+    decoded into Python objects.
+    """
+    header, data_start = read_snapshot_header(snapshot_file)
+    mapped = np.memmap(snapshot_file, dtype=np.uint8, mode="r")
+
+    def section(name: str) -> np.ndarray:
+        meta = header["sections"][name]
+        start = data_start + meta["offset"]
+        raw = mapped[start:start + meta["length"]]
+        return raw.view(np.dtype(meta["dtype"])) if meta["dtype"] else raw
+
+    n_nodes = header["n_nodes"]
+    node_ids = section("node_ids").tobytes().decode("utf-8").split("\n") if n_nodes else []
+    label_list = section("labels").tobytes().decode("utf-8").split("\n") if n_nodes else []
+    labels = {node_id: label for node_id, label in zip(node_ids, label_list) if label}
+
+    adjacency = sp.csr_matrix(
+        (section("weights"), section("indices"), section("indptr")),
+        shape=(n_nodes, n_nodes),
+        copy=False,
+    )
+    return PPRGraph(node_ids, adjacency), labels
+
+
+def build_similarity_snapshot(
+    similarity_file: Path,
+    output: Optional[Path] = None,
+    min_similarity: float = 0.0,
+) -> Path:
+    """Compile a similarity JSON file into a snapshot (variant merging applied)."""
+    similarity_file = Path(similarity_file)
+    output = Path(output) if output else snapshot_path_for(similarity_file)
+    graph, labels = load_similarity_graph(similarity_file, min_similarity)
+    ppr_graph = build_ppr_graph(graph)
+    write_similarity_snapshot(
+        ppr_graph, labels, output, min_similarity=min_similarity, source_file=similarity_file
+    )
+    print(
+        f"✅ Wrote {output} ({ppr_graph.number_of_nodes():,} nodes, "
+        f"{ppr_graph.number_of_edges():,} edges, {output.stat().st_size / 1e6:.1f} MB)"
+    )
+    return output
+
+
+def load_ppr_graph(
+    similarity_file: Path,
+    min_similarity: float = 0.0,
+) -> Tuple[PPRGraph, Dict[str, str]]:
+    """
+    Load the PPR graph for a similarity file, preferring its snapshot.
+
+    The snapshot is used when it exists, was built with the same
+    min_similarity, and still matches the JSON's size/mtime (or the JSON is
+    absent).  Otherwise the JSON is parsed as before.
+    """
+    similarity_file = Path(similarity_file)
+    snapshot_file = snapshot_path_for(similarity_file)
+
+    if snapshot_file.exists():
+        try:
+            header, _ = read_snapshot_header(snapshot_file)
+            current = _source_signature(similarity_file)
+            built_from = (header.get("source") or {}).get("signature")
+            if header.get("min_similarity") != float(min_similarity):
+                print(f"⚠️  Snapshot {snapshot_file.name} built with different min_similarity; using JSON")
+            elif current is not None and built_from != current:
+                print(f"⚠️  Snapshot {snapshot_file.name} is stale; using JSON (rebuild with similarity_snapshot.py)")
+            else:
+                return load_similarity_snapshot(snapshot_file)
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"⚠️  Failed to load snapshot {snapshot_file}: {exc}; using JSON")
+
+    graph, labels = load_similarity_graph(similarity_file, min_similarity)
+    return build_ppr_graph(graph), labels
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compile word-similarity JSON files into memory-mappable CSR snapshots."
+    )
+    parser.add_argument(
+        "similarity_files",
+        nargs="*",
+        type=Path,
+        help="Similarity JSON files (default: English and Chinese files in data/content_db)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Output path (only valid with a single input; default: <input>.csr)",
+    )
+    parser.add_argument(
+        "--min-similarity",
+        type=float,
+        default=0.0,
+        help="Drop edges below this weight (must match the services' min_similarity). Default: 0.0",
+    )
+    args = parser.parse_args()
+
+    files = args.similarity_files or [f for f in DEFAULT_SIMILARITY_FILES if f.exists()]
+    if not files:
+        parser.error("No similarity files given and none found in data/content_db.")
+    if args.output and len(files) != 1:
+        parser.error("--output can only be used with a single similarity file.")
+
+    for similarity_file in files:
+        build_similarity_snapshot(similarity_file, args.output, args.min_similarity)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Precompiled word-metadata index for the PPR recommenders.
+
+`load_word_metadata` (English) and `load_chinese_word_metadata` (Chinese)
+regex-scan the whole world-model Turtle file to recover CEFR/HSK level,
+concreteness, frequency and AoA, and `build_label_index` then runs inflect
+over every label.  This module runs those parsers once at build time and
+stores the results in a small SQLite file:
+
+  sources        (kind, kg_path, kg_size, kg_mtime_ns, built_at)
+  word_metadata  one row per word, in parser order
+  label_index    normalized label key -> node id, in insertion order
+
+`kind` is "en" or "zh".  Readers only trust a kind whose recorded KG file
+size/mtime still match, so a regenerated TTL silently falls back to parsing.
+
+Usage:
+
+  # Export both languages from the master KG and cross-check with Oxigraph
+  python word_metadata_index.py
+
+  # Export from a specific TTL, skipping the Oxigraph comparison
+  python word_metadata_index.py --kg-file knowledge_graph/world_model_final_master.ttl \\
+      --skip-oxigraph-check
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_INDEX_PATH = PROJECT_ROOT / "data" / "content_db" / "word_metadata_index.sqlite"
+DEFAULT_KG_FILE = PROJECT_ROOT / "knowledge_graph" / "world_model_final_master.ttl"
+
+METADATA_COLUMNS = (
+    "node_id",
+    "label",
+    "cefr",
+    "hsk_level",
+    "concreteness",
+    "frequency_rank",
+    "frequency_value",
+    "age_of_acquisition",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    kind TEXT PRIMARY KEY,
+    kg_path TEXT NOT NULL,
+    kg_size INTEGER NOT NULL,
+    kg_mtime_ns INTEGER NOT NULL,
+    built_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS word_metadata (
+    kind TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    cefr TEXT,
+    hsk_level INTEGER,
+    concreteness REAL,
+    frequency_rank INTEGER,
+    frequency_value REAL,
+    age_of_acquisition REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_word_metadata_kind_node ON word_metadata (kind, node_id);
+CREATE TABLE IF NOT EXISTS label_index (
+    kind TEXT NOT NULL,
+    label_key TEXT NOT NULL,
+    node_id TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_label_index_kind_key ON label_index (kind, label_key);
+"""
+
+
+def _kg_signature(kg_file: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = Path(kg_file).stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def read_metadata_index(
+    kind: str,
+    kg_file: Path,
+    index_path: Optional[Path] = None,
+) -> Optional[Tuple[List[Dict[str, Any]], Dict[str, str]]]:
+    """
+    Load (metadata rows, label index) for one language if the index is fresh.
+
+    Returns None when the index file or kind is missing, or the KG file has
+    changed since export; callers then fall back to parsing the TTL.
+    """
+    index_path = Path(index_path or DEFAULT_INDEX_PATH)
+    if not index_path.exists():
+        return None
+
+    try:
+        conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        source = conn.execute(
+            "SELECT kg_size, kg_mtime_ns FROM sources WHERE kind = ?", (kind,)
+        ).fetchone()
+        if source is None:
+            return None
+        current = _kg_signature(kg_file)
+        if current is not None and tuple(source) != current:
+            print(f"⚠️  Word metadata index for '{kind}' is stale ({kg_file.name} changed); parsing TTL")
+            return None
+
+        rows = [
+            dict(zip(METADATA_COLUMNS, row))
+            for row in conn.execute(
+                f"SELECT {', '.join(METADATA_COLUMNS)} FROM word_metadata WHERE kind = ? ORDER BY rowid",
+                (kind,),
+            )
+        ]
+        label_index = dict(
+            conn.execute(
+                "SELECT label_key, node_id FROM label_index WHERE kind = ? ORDER BY rowid",
+                (kind,),
+            ).fetchall()
+        )
+        return rows, label_index
+    except sqlite3.Error as exc:
+        print(f"⚠️  Failed to read word metadata index {index_path}: {exc}")
+        return None
+    finally:
+        conn.close()
+
+
+def write_metadata_index(
+    kind: str,
+    kg_file: Path,
+    metadata: Mapping[str, Any],
+    label_index: Mapping[str, str],
+    index_path: Optional[Path] = None,
+) -> int:
+    """Replace one language's rows in the index. Returns the number of words written."""
+    index_path = Path(index_path or DEFAULT_INDEX_PATH)
+    signature = _kg_signature(kg_file)
+    if signature is None:
+        raise FileNotFoundError(f"KG file not found: {kg_file}")
+
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(index_path)
+    try:
+        conn.executescript(_SCHEMA)
+        with conn:
+            conn.execute("DELETE FROM word_metadata WHERE kind = ?", (kind,))
+            conn.execute("DELETE FROM label_index WHERE kind = ?", (kind,))
+            conn.executemany(
+                f"INSERT INTO word_metadata (kind, {', '.join(METADATA_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' for _ in METADATA_COLUMNS)})",
+                (
+                    (kind, *(getattr(meta, column, None) for column in METADATA_COLUMNS))
+                    for meta in metadata.values()
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO label_index (kind, label_key, node_id) VALUES (?, ?, ?)",
+                ((kind, key, node_id) for key, node_id in label_index.items()),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO sources (kind, kg_path, kg_size, kg_mtime_ns, built_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (kind, str(kg_file), signature[0], signature[1], datetime.now().isoformat()),
+            )
+    finally:
+        conn.close()
+    return len(metadata)
+
+
+_OXIGRAPH_WORDS_QUERY = """
+PREFIX srs-kg: <http://srs4autism.com/schema/>
+SELECT ?word ?cefr ?hsk ?conc ?aoa WHERE {
+    ?word a srs-kg:Word .
+    OPTIONAL { ?word srs-kg:cefrLevel ?cefr }
+    OPTIONAL { ?word srs-kg:hskLevel ?hsk }
+    OPTIONAL { ?word srs-kg:concreteness ?conc }
+    OPTIONAL { ?word srs-kg:ageOfAcquisition ?aoa }
+}
+"""
+
+_NAMESPACES = ("http://srs4autism.com/schema/", "http://srs4autism.com/instance/")
+
+
+def _local_id(iri: str) -> str:
+    for namespace in _NAMESPACES:
+        if iri.startswith(namespace):
+            return iri[len(namespace):]
+    return iri
+
+
+def _fetch_oxigraph_word_attributes() -> Dict[str, Dict[str, str]]:
+    """Word attributes as stored in the embedded Oxigraph store (first value per property)."""
+    for path in (PROJECT_ROOT, PROJECT_ROOT / "backend"):
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+    from database.kg_client import KnowledgeGraphClient
+
+    attributes: Dict[str, Dict[str, str]] = {}
+    for binding in KnowledgeGraphClient().query_bindings(_OXIGRAPH_WORDS_QUERY):
+        entry = attributes.setdefault(_local_id(binding["word"]["value"]), {})
+        for var in ("cefr", "hsk", "conc", "aoa"):
+            if var in binding and var not in entry:
+                entry[var] = binding[var]["value"]
+    return attributes
+
+
+def _values_differ(indexed: Any, stored: Optional[str], numeric: bool) -> bool:
+    if indexed is None or stored is None:
+        return (indexed is None) != (stored is None)
+    if not numeric:
+        return str(indexed) != stored
+    try:
+        return abs(float(indexed) - float(stored)) > 1e-6
+    except ValueError:
+        return True
+
+
+def check_against_oxigraph(
+    kind: str,
+    metadata: Mapping[str, Any],
+    store_attributes: Mapping[str, Mapping[str, str]],
+    max_examples: int = 5,
+) -> int:
+    """
+    Compare exported metadata with the Oxigraph store and print a report.
+
+    Returns the number of words that are missing from the store or disagree
+    on at least one attribute.
+    """
+    fields = (
+        [("cefr", "cefr", False)] if kind == "en" else [("hsk_level", "hsk", True)]
+    ) + [("concreteness", "conc", True), ("age_of_acquisition", "aoa", True)]
+
+    missing: List[str] = []
+    mismatched: Dict[str, List[str]] = {field: [] for field, _, _ in fields}
+    for node_id, meta in metadata.items():
+        stored = store_attributes.get(node_id)
+        if stored is None:
+            missing.append(node_id)
+            continue
+        for field, var, numeric in fields:
+            if _values_differ(getattr(meta, field, None), stored.get(var), numeric):
+                mismatched[field].append(node_id)
+
+    disagreeing = set(missing).union(*mismatched.values())
+    print(f"   🔎 Oxigraph check ({kind}): {len(metadata) - len(disagreeing):,}/{len(metadata):,} words agree")
+    if missing:
+        print(f"      ⚠️  {len(missing):,} indexed words not in store (e.g. {', '.join(missing[:max_examples])})")
+    for field, node_ids in mismatched.items():
+        if node_ids:
+            print(f"      ⚠️  {len(node_ids):,} words differ on {field} (e.g. {', '.join(node_ids[:max_examples])})")
+    return len(disagreeing)
+
+
+def _parse_english(kg_file: Path) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    from ppr_recommender import build_label_index, load_word_metadata
+
+    metadata = load_word_metadata(kg_file)
+    return metadata, build_label_index(metadata)
+
+
+def _parse_chinese(kg_file: Path) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    backend_path = PROJECT_ROOT / "backend"
+    if str(backend_path) not in sys.path:
+        sys.path.insert(0, str(backend_path))
+    from services.chinese_ppr_recommender_service import (
+        build_chinese_label_index,
+        load_chinese_word_metadata,
+    )
+
+    metadata = load_chinese_word_metadata(kg_file)
+    return metadata, build_chinese_label_index(metadata)
+
+
+_PARSERS = {"en": _parse_english, "zh": _parse_chinese}
+
+
+def export_metadata_index(
+    kg_file: Path,
+    index_path: Optional[Path] = None,
+    kinds: Iterable[str] = ("en", "zh"),
+    check_oxigraph: bool = True,
+) -> int:
+    """
+    Parse the KG once per language and write the index.
+
+    Returns the total number of words disagreeing with Oxigraph (0 when the
+    check is skipped or the store is unavailable).
+    """
+    store_attributes: Optional[Dict[str, Dict[str, str]]] = None
+    if check_oxigraph:
+        try:
+            store_attributes = _fetch_oxigraph_word_attributes()
+            print(f"📡 Loaded attributes for {len(store_attributes):,} words from Oxigraph")
+        except Exception as exc:
+            print(f"⚠️  Oxigraph check skipped (store unavailable: {exc})")
+
+    disagreements = 0
+    for kind in kinds:
+        print(f"📚 Parsing {kind} word metadata from {kg_file}...")
+        metadata, label_index = _PARSERS[kind](kg_file)
+        written = write_metadata_index(kind, kg_file, metadata, label_index, index_path)
+        print(f"   ✅ Indexed {written:,} words, {len(label_index):,} label keys")
+        if store_attributes is not None:
+            disagreements += check_against_oxigraph(kind, metadata, store_attributes)
+    return disagreements
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Export PPR word metadata from the world-model TTL into a SQLite index."
+    )
+    parser.add_argument(
+        "--kg-file",
+        type=Path,
+        default=DEFAULT_KG_FILE,
+        help="World-model Turtle file to parse (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--index",
+        type=Path,
+        default=DEFAULT_INDEX_PATH,
+        help="Output SQLite index (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--kind",
+        choices=sorted(_PARSERS),
+        action="append",
+        help="Language(s) to export (default: all)",
+    )
+    parser.add_argument(
+        "--skip-oxigraph-check",
+        action="store_true",
+        help="Do not compare the exported attributes with the Oxigraph store.",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Exit non-zero if any word disagrees with Oxigraph.",
+    )
+    args = parser.parse_args()
+
+    if not args.kg_file.exists():
+        parser.error(f"KG file not found: {args.kg_file}")
+
+    disagreements = export_metadata_index(
+        args.kg_file,
+        args.index,
+        kinds=args.kind or sorted(_PARSERS),
+        check_oxigraph=not args.skip_oxigraph_check,
+    )
+    if args.strict and disagreements:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Test script for the incremental Anki card mirror (fake AnkiConnect, no Anki needed)."""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from anki_integration.anki_connect import AnkiConnectError
+from scripts.knowledge_graph.anki_card_mirror import AnkiCardMirror
+
+
+class _FakeAnki:
+    """Answers the AnkiConnect actions the mirror uses from in-memory notes and cards."""
+
+    def __init__(self, mod_times=True):
+        self.mod_times = mod_times
+        self.notes = {}
+        self.cards = {}
+        self.calls = []
+
+    def add_note(self, note_id, mod, kg_ids, cards):
+        kg_map = [{"card_index": i + 1, "kg_ids": ids} for i, ids in enumerate(kg_ids)]
+        self.notes[note_id] = {
+            "noteId": note_id,
+            "mod": mod,
+            "cards": [card_id for card_id, _ in cards],
+            "fields": {"_KG_Map": {"value": json.dumps(kg_map)}},
+        }
+        for ord_, (card_id, interval) in enumerate(cards):
+            self.cards[card_id] = {
+                "cardId": card_id, "note": note_id, "ord": ord_, "mod": mod,
+                "interval": interval, "lapses": 0, "reps": 1, "factor": 2500,
+            }
+
+    def _invoke(self, action, params):
+        self.calls.append((action, len(next(iter(params.values()))) if params else 0))
+        if action == "findNotes":
+            return list(self.notes)
+        if action in ("notesModTime", "cardsModTime") and not self.mod_times:
+            raise AnkiConnectError(f"AnkiConnect error: unsupported action {action}")
+        if action == "notesModTime":
+            return [{"noteId": n, "mod": self.notes[n]["mod"]} for n in params["notes"]]
+        if action == "cardsModTime":
+            return [{"cardId": c, "mod": self.cards[c]["mod"]} for c in params["cards"]]
+        if action == "notesInfo":
+            return [self.notes[n] for n in params["notes"]]
+        if action == "cardsInfo":
+            return [self.cards[c] for c in params["cards"]]
+        raise AssertionError(f"unexpected action {action}")
+
+    def fetched(self, action):
+        return sum(size for name, size in self.calls if name == action)
+
+
+def _resolve(kg_map, card_index):
+    for entry in kg_map:
+        if entry["card_index"] == card_index:
+            return entry["kg_ids"]
+    return []
+
+
+def _mirror(anki, path, query="deck:CUMA"):
+    return AnkiCardMirror(anki, anki_query=query, kg_field_name="_KG_Map", resolve_kg_ids=_resolve, path=path)
+
+
+def _deck():
+    anki = _FakeAnki()
+    anki.add_note(10, 100, [["word-a"], ["word-a-rev"]], [(1, 5), (2, 0)])
+    anki.add_note(20, 100, [["word-b"]], [(3, 12)])
+    return anki
+
+
+def test_refresh_fetches_only_changes():
+    """The first refresh fetches everything; later ones only what moved or was removed."""
+    print("✅ Testing incremental refresh...")
+    with tempfile.TemporaryDirectory() as tmp:
+        anki = _deck()
+        mirror = _mirror(anki, Path(tmp) / "mirror.sqlite")
+        first = mirror.refresh()
+        assert first.fetched_cards == 3 and not first.full
+        assert first.cards[1].kg_ids == ("word-a",)
+
+        anki.calls.clear()
+        assert mirror.refresh().changed_kg_ids == set()
+        assert anki.fetched("notesInfo") == 0 and anki.fetched("cardsInfo") == 0
+
+        anki.cards[3].update(mod=200, interval=30)
+        del anki.notes[10]
+        anki.calls.clear()
+        refresh = mirror.refresh()
+        assert anki.fetched("cardsInfo") == 1
+        assert refresh.changed_kg_ids == {"word-a", "word-a-rev", "word-b"}
+        assert set(refresh.cards) == {3} and refresh.cards[3].interval == 30
+    print("   ✅ unchanged deck costs no info calls; edits and deletions reported")
+
+
+def test_restart_reuses_mirror_file():
+    """A new mirror object over the same file starts from the stored cards."""
+    print("\n✅ Testing reload from disk...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "mirror.sqlite"
+        _mirror(_deck(), path).refresh()
+        anki = _deck()
+        refresh = _mirror(anki, path).refresh()
+        assert refresh.fetched_cards == 0 and len(refresh.cards) == 3
+        assert anki.fetched("cardsInfo") == 0
+    print("   ✅ no cards refetched after a restart")
+
+
+def test_scopes_keep_separate_files():
+    """Mirrors for different queries use their own files and never wipe each other."""
+    print("\n✅ Testing per-scope files...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "mirror.sqlite"
+        mirror_a = _mirror(_deck(), path, query="deck:A")
+        mirror_b = _mirror(_deck(), path, query="deck:B")
+        assert mirror_a.path != mirror_b.path
+        assert mirror_a.path.parent == path.parent and mirror_a.path.name.startswith("mirror-")
+        mirror_a.refresh()
+        mirror_b.refresh()
+        anki = _deck()
+        assert _mirror(anki, path, query="deck:A").refresh().fetched_cards == 0
+        assert anki.fetched("cardsInfo") == 0
+    print(f"   ✅ {mirror_a.path.name} / {mirror_b.path.name}")
+
+
+def test_full_sync_without_mod_time_actions():
+    """AnkiConnect without notesModTime/cardsModTime falls back to a full fetch."""
+    print("\n✅ Testing full-sync fallback...")
+    with tempfile.TemporaryDirectory() as tmp:
+        anki = _deck()
+        anki.mod_times = False
+        refresh = _mirror(anki, Path(tmp) / "mirror.sqlite").refresh()
+        assert refresh.full and refresh.fetched_cards == 3
+    print("   ✅ full sync reported")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🧪 Testing Anki card mirror")
+    print("=" * 60)
+    try:
+        test_refresh_fetches_only_changes()
+        test_restart_reuses_mirror_file()
+        test_scopes_keep_separate_files()
+        test_full_sync_without_mod_time_actions()
+        print("\n" + "=" * 60)
+        print("✅ All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Test script for keyset paging of GET /cards and /cards/curation (in-memory database)."""
+
+import sys
+from pathlib import Path
+
+# Add project root and backend to path (as backend/run.py does)
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.routers import cards
+from backend.database.db import get_db
+from backend.database.models import Base
+from backend.database.services import CardService, ProfileService
+
+TOTAL_CARDS = 1205  # More than the old silent 1000-row cap
+
+
+def _client():
+    """The cards router on a bare app whose get_db yields one in-memory session."""
+    # get_test_db() builds the legacy backend.app.models schema, so set up the card tables here
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    ProfileService.create(db, {"id": "p-ann", "name": "Ann"})
+    ProfileService.create(db, {"id": "p-bob", "name": "Bob"})
+    for i in range(TOTAL_CARDS):
+        status = "pending" if i % 3 else "approved"
+        CardService.create(db, "p-ann", "basic", {"front": f"q{i}", "back": f"a{i}"}, status=status)
+    for i in range(5):
+        CardService.create(db, "p-bob", "basic", {"front": f"bob{i}"})
+
+    app = FastAPI()
+    app.include_router(cards.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+def _ids(response):
+    return [int(card["id"]) for card in response.json()]
+
+
+def _walk(client, url, **params):
+    """Follow X-Next-Before-Id until the last page; returns (ids, page count)."""
+    ids, pages = [], 0
+    while True:
+        response = client.get(url, params=params)
+        assert response.status_code == 200, response.text
+        ids.extend(_ids(response))
+        pages += 1
+        cursor = response.headers.get("X-Next-Before-Id")
+        if cursor is None:
+            return ids, pages
+        assert int(cursor) == ids[-1]
+        params = {**params, "before_id": cursor}
+
+
+def test_unlimited_listing_returns_everything():
+    """Without limit every card comes back, newest first, and no cursor is set."""
+    print("✅ Testing listing without limit...")
+    client = _client()
+    response = client.get("/cards")
+    ids = _ids(response)
+    assert len(ids) == TOTAL_CARDS + 5
+    assert ids == sorted(ids, reverse=True)
+    assert "X-Next-Before-Id" not in response.headers
+    print(f"   ✅ {len(ids)} cards, no cursor header")
+
+
+def test_keyset_pages_cover_listing():
+    """Walking the cursor header visits every card once, in the same order."""
+    print("\n✅ Testing keyset pages...")
+    client = _client()
+    everything = _ids(client.get("/cards"))
+    ids, pages = _walk(client, "/cards", limit=500)
+    assert ids == everything
+    assert pages == 3
+    pending = _ids(client.get("/cards", params={"status": "pending"}))
+    ids, _ = _walk(client, "/cards", limit=100, status="pending")
+    assert ids == pending
+    print(f"   ✅ limit=500 -> {pages} pages; status filter kept across pages")
+
+
+def test_full_last_page_and_limit_bounds():
+    """A full final page still gets a cursor; the next request is empty. limit is bounded."""
+    print("\n✅ Testing page edges...")
+    client = _client()
+    response = client.get("/cards/curation/p-bob", params={"limit": 5})
+    assert len(response.json()) == 5
+    cursor = response.headers["X-Next-Before-Id"]
+    response = client.get("/cards/curation/p-bob", params={"limit": 5, "before_id": cursor})
+    assert response.json() == []
+    assert "X-Next-Before-Id" not in response.headers
+    assert client.get("/cards", params={"limit": 0}).status_code == 422
+    assert client.get("/cards", params={"limit": 1001}).status_code == 422
+    print("   ✅ empty page after a full one; limit outside 1..1000 rejected")
+
+
+def test_curation_pages_by_profile():
+    """Curation listings page one profile's cards only."""
+    print("\n✅ Testing curation paging...")
+    client = _client()
+    ids, pages = _walk(client, "/cards/curation/p-ann", limit=400, status="approved")
+    assert len(ids) == len(range(0, TOTAL_CARDS, 3))
+    assert ids == sorted(ids, reverse=True)
+    assert len(_ids(client.get("/cards/curation/p-bob"))) == 5
+    print(f"   ✅ {len(ids)} approved cards for p-ann over {pages} pages")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🧪 Testing card listing pagination")
+    print("=" * 60)
+    try:
+        test_unlimited_listing_returns_everything()
+        test_keyset_pages_cover_listing()
+        test_full_last_page_and_limit_bounds()
+        test_curation_pages_by_profile()
+        print("\n" + "=" * 60)
+        print("✅ All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Test script for the POST /chat/stream SSE protocol: done, error and cancel paths (no LLM needed)."""
+
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add project root and backend to path (as backend/run.py does)
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.routers import chat
+from agent.intent_detector import IntentType
+
+
+class _Intents:
+    @staticmethod
+    def detect_intent(message, api_key=None, provider=None):
+        return {"intent": IntentType.CONVERSATION, "confidence": 1.0}
+
+
+class _Handler:
+    """Stands in for ConversationHandler; `script` decides what stream_conversation does."""
+
+    def __init__(self, script):
+        self.script = script
+        self.started = threading.Event()
+
+    def stream_conversation(self, message, context_tags, child_profile, chat_history, cancel):
+        self.started.set()
+        yield from self.script(cancel)
+
+
+def _patched_client(script):
+    """Chat router on a bare app, with the LLM, intent detection and history storage replaced."""
+    saved = []
+    handler = _Handler(script)
+    originals = {
+        name: getattr(chat, name)
+        for name in ("_append_global_message", "_assemble_chat_context", "_chat_conversation_handler", "IntentDetector")
+    }
+    chat._append_global_message = saved.append
+    chat._assemble_chat_context = lambda content, mentions: ([], None, [])
+    chat._chat_conversation_handler = lambda message: (handler, "")
+    chat.IntentDetector = _Intents
+
+    def restore():
+        for name, value in originals.items():
+            setattr(chat, name, value)
+
+    app = FastAPI()
+    app.include_router(chat.router)
+    return TestClient(app), handler, saved, restore
+
+
+def _message(text="Hi"):
+    return {"id": "m1", "content": text, "role": "user", "timestamp": datetime.now().isoformat()}
+
+
+def _events(body: str):
+    """[(event, data)] parsed from an SSE body."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_reply_streams_tokens_then_done():
+    """Deltas arrive as token events and the full reply is saved and sent as done."""
+    print("✅ Testing a complete reply...")
+
+    def script(cancel):
+        yield "Hel"
+        yield "lo"
+
+    client, _, saved, restore = _patched_client(script)
+    try:
+        events = _events(client.post("/chat/stream", json=_message()).text)
+    finally:
+        restore()
+    assert [e for e, _ in events] == ["intent", "token", "token", "done"]
+    assert events[-1][1]["content"] == "Hello"
+    assert [m["role"] for m in saved] == ["user", "assistant"]
+    assert saved[-1]["content"] == "Hello"
+    print("   ✅ intent, token x2, done; reply saved")
+
+
+def test_mid_stream_failure_sends_error():
+    """An LLM failure after some tokens ends the stream with error and saves nothing partial."""
+    print("\n✅ Testing a mid-stream failure...")
+
+    def script(cancel):
+        yield "partial "
+        raise RuntimeError("upstream closed the connection")
+
+    client, _, saved, restore = _patched_client(script)
+    try:
+        events = _events(client.post("/chat/stream", json=_message()).text)
+    finally:
+        restore()
+    assert [e for e, _ in events] == ["intent", "token", "error"]
+    assert "upstream closed the connection" in events[-1][1]["detail"]
+    assert [m["role"] for m in saved] == ["user"]
+    print("   ✅ intent, token, error; partial reply not saved")
+
+
+def test_cancel_endpoint_stops_stream():
+    """POST /chat/stream/{id}/cancel ends the stream with cancelled and saves no reply."""
+    print("\n✅ Testing cancel...")
+
+    def script(cancel):
+        yield "first "
+        # Like the LLM clients: the read is aborted once the token is cancelled
+        if not cancel.wait(10):
+            raise AssertionError("stream was never cancelled")
+
+    client, handler, saved, restore = _patched_client(script)
+    result = {}
+    try:
+        with client:
+            stream = threading.Thread(
+                target=lambda: result.setdefault(
+                    "body", client.post("/chat/stream", params={"stream_id": "s1"}, json=_message()).text
+                )
+            )
+            stream.start()
+            assert handler.started.wait(5)
+            deadline = time.monotonic() + 5
+            while "s1" not in chat._active_streams and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert client.post("/chat/stream/s1/cancel").json() == {"cancelled": True}
+            stream.join(10)
+            assert not stream.is_alive()
+            assert client.post("/chat/stream/s1/cancel").json() == {"cancelled": False}
+    finally:
+        restore()
+    events = _events(result["body"])
+    assert [e for e, _ in events] == ["intent", "token", "cancelled"]
+    assert [m["role"] for m in saved] == ["user"]
+    assert "s1" not in chat._active_streams
+    print("   ✅ intent, token, cancelled; stream id released, unknown id reports False")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🧪 Testing chat SSE stream")
+    print("=" * 60)
+    try:
+        test_reply_streams_tokens_then_done()
+        test_mid_stream_failure_sends_error()
+        test_cancel_endpoint_stops_stream()
+        print("\n" + "=" * 60)
+        print("✅ All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
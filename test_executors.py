@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Test script for the resource pools in backend.app.core.executors (no services needed)."""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add project root and backend to path (as backend/run.py does)
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from backend.app.core.executors import get_pool, iterate_blocking, run_blocking
+
+
+def test_run_blocking_uses_resource_pool():
+    """Each resource class has its own named threads, and failures are counted."""
+    print("✅ Testing run_blocking...")
+
+    async def main():
+        kg_thread = await run_blocking("kg", lambda: threading.current_thread().name)
+        db_thread = await run_blocking("db", lambda: threading.current_thread().name)
+        try:
+            await run_blocking("kg", lambda: 1 / 0)
+        except ZeroDivisionError:
+            pass
+        else:
+            raise AssertionError("the error was not propagated")
+        return kg_thread, db_thread
+
+    failed_before = get_pool("kg").metrics()["failed"]
+    kg_thread, db_thread = asyncio.run(main())
+    assert kg_thread.startswith("kg-pool"), kg_thread
+    assert db_thread.startswith("db-pool"), db_thread
+    assert get_pool("kg") is get_pool("kg")
+    assert get_pool("kg").metrics()["failed"] == failed_before + 1
+    print(f"   ✅ {kg_thread} / {db_thread}; errors re-raised and counted")
+
+
+def test_iterate_blocking_runs_on_one_thread():
+    """Items arrive in order, produced on a single pool thread; errors reach the consumer."""
+    print("\n✅ Testing iterate_blocking...")
+    threads = set()
+
+    def produce():
+        for i in range(50):
+            threads.add(threading.current_thread().name)
+            yield i
+
+    def broken():
+        yield 1
+        raise ValueError("boom")
+
+    async def main():
+        items = [item async for item in iterate_blocking("kg", produce)]
+        received = []
+        try:
+            async for item in iterate_blocking("kg", broken):
+                received.append(item)
+        except ValueError as exc:
+            return items, received, str(exc)
+        raise AssertionError("the error was not propagated")
+
+    items, received, error = asyncio.run(main())
+    assert items == list(range(50))
+    assert len(threads) == 1 and next(iter(threads)).startswith("kg-pool"), threads
+    assert received == [1] and error == "boom"
+    print("   ✅ 50 items in order on one kg-pool thread; error re-raised after item 1")
+
+
+def test_early_stop_cancels_and_closes_producer():
+    """Leaving the loop early calls cancel and closes the producer's generator."""
+    print("\n✅ Testing early stop...")
+    cancelled = threading.Event()
+    closed = threading.Event()
+    produced = []
+
+    def produce():
+        try:
+            for i in range(10_000):
+                produced.append(i)
+                yield i
+                time.sleep(0.001)
+        finally:
+            closed.set()
+
+    async def main():
+        stream = iterate_blocking("kg", produce, cancel=cancelled.set)
+        async for item in stream:
+            if item == 2:
+                break
+        await stream.aclose()
+
+    asyncio.run(main())
+    assert cancelled.is_set()
+    assert closed.wait(5)
+    assert len(produced) < 10_000
+    print(f"   ✅ cancel called, generator closed after {len(produced)} items")
+
+
+def test_max_buffered_applies_backpressure():
+    """With max_buffered, a producer runs at most that many items ahead of the consumer."""
+    print("\n✅ Testing max_buffered...")
+    produced = []
+
+    def produce():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    async def main():
+        ahead = 0
+        async for item in iterate_blocking("kg", produce, max_buffered=3):
+            await asyncio.sleep(0.005)  # Slow consumer
+            ahead = max(ahead, len(produced) - item - 1)
+        return ahead
+
+    ahead = asyncio.run(main())
+    assert len(produced) == 100
+    # The producer may hold one extra item while it waits for a free slot
+    assert ahead <= 4, ahead
+    print(f"   ✅ producer was at most {ahead} items ahead")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🧪 Testing resource executors")
+    print("=" * 60)
+    try:
+        test_run_blocking_uses_resource_pool()
+        test_iterate_blocking_runs_on_one_thread()
+        test_early_stop_cancels_and_closes_producer()
+        test_max_buffered_applies_backpressure()
+        print("\n" + "=" * 60)
+        print("✅ All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Test script for the keyword rules in agent.intent_detector (no API key or network needed)."""
+
+import sys
+from pathlib import Path
+
+# Add project root and backend to path (as backend/run.py does)
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from agent.intent_detector import IntentDetector, IntentType, RULE_CONFIDENCE_THRESHOLD
+
+
+def _settled(message):
+    """Rule result if the rules are confident enough to skip the LLM, else None."""
+    result = IntentDetector.classify_by_rules(message)
+    if result and result["confidence"] >= RULE_CONFIDENCE_THRESHOLD:
+        return result
+    return None
+
+
+def test_explicit_card_requests_skip_llm():
+    """Card verbs with a topic, and @tags, are settled locally."""
+    print("✅ Testing explicit card requests...")
+    for message, topic in [
+        ("Please make 3 cards for 'apple'", "apple"),
+        ("Can you create flashcards about colors?", "colors"),
+        ("@word:banana @quantity:2", "banana"),
+    ]:
+        result = _settled(message)
+        assert result is not None, message
+        assert result["intent"] == IntentType.CARD_GENERATION, message
+        assert result["extracted_topic"] == topic, (message, result["extracted_topic"])
+        print(f"   ✅ {message!r} -> card_generation ({topic})")
+
+
+def test_parent_questions_go_to_llm():
+    """Advice questions that merely mention teaching or cards are left to the LLM."""
+    print("\n✅ Testing parent questions...")
+    for message in [
+        "How do I teach him to use the toilet?",
+        "Can you teach me how to handle his meltdowns?",
+        "Do the cards for colors work well?",
+        "What should I do when she won't help me learn her routine?",
+    ]:
+        assert _settled(message) is None, message
+        print(f"   ✅ {message!r} -> LLM decides")
+
+
+def test_no_key_fallback_keeps_questions_conversational():
+    """Without an API key, uncertain rule matches fall back to conversation, not card generation."""
+    print("\n✅ Testing no-key fallback...")
+    for message in [
+        "How do I teach him to use the toilet?",
+        "Do the cards for colors work well?",
+    ]:
+        result = IntentDetector.detect_intent(message, api_key=None)
+        assert result["intent"] == IntentType.CONVERSATION, message
+        print(f"   ✅ {message!r} -> conversation")
+    result = IntentDetector.detect_intent("make some cards", api_key=None)
+    assert result["intent"] == IntentType.CARD_GENERATION
+    print("   ✅ 'make some cards' -> card_generation")
+
+
+def test_small_talk():
+    print("\n✅ Testing small talk...")
+    for message in ["Hello!", "谢谢", "thank you"]:
+        result = _settled(message)
+        assert result is not None and result["intent"] == IntentType.CONVERSATION, message
+        print(f"   ✅ {message!r} -> conversation")
+
+
+if __name__ == "__main__":
+    test_explicit_card_requests_skip_llm()
+    test_parent_questions_go_to_llm()
+    test_no_key_fallback_keeps_questions_conversational()
+    test_small_talk()
+    print("\n✅ All intent rule tests passed")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Test script for the google-generativeai hooks in backend.app.core.llm_clients (no network needed)."""
+
+import sys
+from pathlib import Path
+
+# Add project root and backend to path (as backend/run.py does)
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from backend.app.core import llm_clients
+from backend.app.core.llm_clients import LLMClient, _gemini_stream_abort
+
+
+class _FakeCall:
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class _FakeStreamResponse:
+    def __init__(self):
+        self._iterator = _FakeCall()
+
+
+def _with_supported(supported, check):
+    original = llm_clients._genai_private_api_supported
+    llm_clients._genai_private_api_supported = lambda: supported
+    try:
+        check()
+    finally:
+        llm_clients._genai_private_api_supported = original
+
+
+def test_installed_sdk_is_supported():
+    """The installed google-generativeai release is one the private hooks were checked against."""
+    print("✅ Testing installed SDK version...")
+    assert llm_clients._genai_private_api_supported()
+    print("   ✅ private hooks enabled")
+
+
+def test_per_key_client_binding():
+    """A supported SDK gets its own service client; otherwise the global key is configured."""
+    print("\n✅ Testing per-key Gemini client...")
+
+    def supported():
+        model = LLMClient._make_gemini_model("gemini-test", "key-a")
+        assert model._client is not None
+        print("   ✅ supported: client bound to the model")
+
+    def unsupported():
+        configured = []
+        original = llm_clients.ensure_genai_configured
+        llm_clients.ensure_genai_configured = configured.append
+        try:
+            model = LLMClient._make_gemini_model("gemini-test", "key-b")
+        finally:
+            llm_clients.ensure_genai_configured = original
+        assert getattr(model, "_client", None) is None
+        assert configured == ["key-b"]
+        print("   ✅ unsupported: falls back to genai.configure()")
+
+    _with_supported(True, supported)
+    _with_supported(False, unsupported)
+
+
+def test_stream_abort_fallback():
+    """Stream cancel uses the gRPC call when supported and is a no-op otherwise."""
+    print("\n✅ Testing stream abort...")
+
+    def supported():
+        response = _FakeStreamResponse()
+        _gemini_stream_abort(response)()
+        assert response._iterator.cancelled
+        _gemini_stream_abort(object())()  # Missing hook: no-op
+        print("   ✅ supported: gRPC call cancelled")
+
+    def unsupported():
+        response = _FakeStreamResponse()
+        _gemini_stream_abort(response)()
+        assert not response._iterator.cancelled
+        print("   ✅ unsupported: no-op")
+
+    _with_supported(True, supported)
+    _with_supported(False, unsupported)
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🧪 Testing LLM client SDK hooks")
+    print("=" * 60)
+    try:
+        test_installed_sdk_is_supported()
+        test_per_key_client_binding()
+        test_stream_abort_fallback()
+        print("\n" + "=" * 60)
+        print("✅ All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)